@@ -0,0 +1,204 @@
+"""
+Benchmark: End-to-End-Latenz der LLM-Pipeline gegen den lokalen Stand-in.
+
+Startet benchmarks/llm_standin.py im selben Prozess, treibt LLMEngine durch
+Markt-Analyse (Analyst → Guardian), /next und Weekly Summary und misst pro
+Stufe (Prompt-Aufbau, LLM-Aufruf pro Template, gesamte Pipeline) p50/p95/p99.
+Streaming, Hedging, Retries und JSON-Korrektur lassen sich per Option
+umschalten, um Änderungen offline zu vergleichen.
+
+Aufruf (aus dem Projekt-Root):
+    python benchmarks/bench_llm_pipeline.py --iterations 20 --time-scale 0.02 --error-rate 0.05
+    python benchmarks/bench_llm_pipeline.py --no-streaming --malformed-rate 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, "src"))
+sys.path.insert(0, os.path.join(_ROOT, "benchmarks"))
+
+import numpy as np  # noqa: E402
+
+import llm_engine  # noqa: E402
+from llm_engine import LLMEngine  # noqa: E402
+from llm_standin import LLMStandin, add_profile_arguments, profile_from_args  # noqa: E402
+from prompt_context import PromptContext  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+COINS = ("BTC", "ETH", "SOL", "ADA", "DOT", "LINK", "AVAX", "ATOM", "XRP", "DOGE",
+         "LTC", "UNI", "AAVE", "NEAR", "ALGO", "FIL", "ARB", "OP", "INJ", "TIA")
+
+
+def _indicator(i: int, price: float) -> Dict:
+    return {
+        "price": price, "rsi_14": 30 + (i * 7) % 45, "sma200": price * 0.93,
+        "trend": "bullish" if i % 3 else "bearish", "macd_line": 0.8, "macd_signal": 0.5,
+        "macd_histogram": 0.3, "macd_bullish": i % 2 == 0, "macd_bearish": i % 2 == 1,
+        "macd_crossover": None, "bb_upper": price * 1.05, "bb_middle": price, "bb_lower": price * 0.95,
+        "bb_position": "neutral", "volatility_30d": 40 + i, "volume_ratio": 1.1, "obv_trend": "rising",
+        "ichimoku_cloud_position": "above", "rsi_divergence": {"bullish": False, "bearish": False},
+    }
+
+
+def synthetic_inputs(n_portfolio: int = 5) -> Dict:
+    """Portfolio, Indikatoren, Markt-Übersicht, Performance und Risiko-Metriken."""
+    prices = {coin: round(60000 / (i + 1) ** 1.7, 4) for i, coin in enumerate(COINS)}
+    held = COINS[:n_portfolio]
+    portfolio = {coin: round(1000 / prices[coin], 6) for coin in held}
+    weights = {coin: round(100 / n_portfolio, 2) for coin in held}
+    return {
+        "portfolio_data": portfolio,
+        "portfolio_indicators": {coin: _indicator(i, prices[coin]) for i, coin in enumerate(held)},
+        "market_overview": {coin: _indicator(i, prices[coin]) for i, coin in enumerate(COINS) if coin not in held},
+        "performance_data": {"total_value_eur": 1000.0 * n_portfolio, "roi_percent": 3.4, "outperformance_pct": 1.2},
+        "risk_metrics": {
+            "current_drawdown_percent": {coin: 5.0 + i for i, coin in enumerate(held)},
+            "portfolio_weights": weights,
+            "diversification_score": 61.0,
+            "concentration_risks": [],
+            "portfolio_volatility": 48.0,
+        },
+    }
+
+
+class StageTimer:
+    """Sammelt Laufzeiten pro Stufe, indem Engine-Methoden umwickelt werden."""
+
+    def __init__(self, engine: LLMEngine):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        build_prompt = engine._build_prompt
+        execute = engine._execute_with_retry
+
+        def timed_build(template_name, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return build_prompt(template_name, *args, **kwargs)
+            finally:
+                self.samples[f"prompt {template_name}"].append(time.perf_counter() - start)
+
+        async def timed_execute(*args, template: str = "", **kwargs):
+            start = time.perf_counter()
+            try:
+                return await execute(*args, template=template, **kwargs)
+            finally:
+                self.samples[f"llm {template}"].append(time.perf_counter() - start)
+
+        engine._build_prompt = timed_build
+        engine._execute_with_retry = timed_execute
+
+    async def pipeline(self, name: str, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.samples[f"pipeline {name}"].append(time.perf_counter() - start)
+
+    def report(self) -> None:
+        print(f"{'Stufe':<34} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for stage in sorted(self.samples, key=lambda s: (s.split()[0] != "pipeline", s)):
+            values = np.asarray(self.samples[stage]) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(f"{stage:<34} {len(values):>5} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f}")
+
+
+def _apply_engine_options(args: argparse.Namespace) -> None:
+    """Schaltet Engine-Optionen für diesen Lauf um (Modul-Konstanten aus config)."""
+    llm_engine.LLM_STREAMING_ENABLED = not args.no_streaming
+    llm_engine.LLM_HEDGING_ENABLED = not args.no_hedging
+    llm_engine.LLM_JSON_REASK_ENABLED = not args.no_reask
+    if args.retries is not None:
+        llm_engine.MAX_LLM_RETRY_ATTEMPTS = args.retries
+    if args.retry_delay is not None:
+        llm_engine.LLM_RETRY_BASE_DELAY = args.retry_delay
+    if args.hedge_delay is not None:
+        llm_engine.LLM_HEDGE_DEFAULT_DELAY = args.hedge_delay
+    if args.hedge_model:
+        llm_engine.LLM_HEDGE_BACKUP_MODEL = args.hedge_model
+
+
+async def run(args: argparse.Namespace, base_url: str, key_path: str) -> StageTimer:
+    engine = LLMEngine(base_url=base_url, api_key_path=key_path)
+    # Keine Abkürzungen: jeder Durchlauf soll die Modelle wirklich aufrufen
+    engine.response_cache = ResponseCache(enabled=False)
+    engine.prompt_context = PromptContext(state_path=None, enabled=False)
+    timer = StageTimer(engine)
+    inputs = synthetic_inputs(args.portfolio_size)
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        jobs = [timer.pipeline("cycle", engine.analyze_market(**inputs))]
+        if args.next:
+            jobs.append(timer.pipeline("next", engine.analyze_next_investment(
+                500, inputs["portfolio_data"], inputs["portfolio_indicators"],
+                inputs["market_overview"], inputs["performance_data"],
+            )))
+        if args.weekly:
+            jobs.append(timer.pipeline("weekly", engine.analyze_weekly_summary(**inputs)))
+        for result in await asyncio.gather(*jobs):
+            failures += result is None
+
+    try:
+        for done in range(0, args.iterations, args.concurrency):
+            await asyncio.gather(*(one() for _ in range(min(args.concurrency, args.iterations - done))))
+        await asyncio.gather(*engine._drain_tasks)
+    finally:
+        await engine.aclose()
+
+    timer.failures = failures
+    timer.cost = engine.cost_tracker
+    return timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallele Durchläufe")
+    parser.add_argument("--portfolio-size", type=int, default=5)
+    parser.add_argument("--next", action="store_true", help="/next-Pipeline mitmessen")
+    parser.add_argument("--weekly", action="store_true", help="Weekly Summary mitmessen")
+    parser.add_argument("--no-streaming", action="store_true")
+    parser.add_argument("--no-hedging", action="store_true")
+    parser.add_argument("--no-reask", action="store_true", help="Keine gezielte JSON-Korrektur")
+    parser.add_argument("--retries", type=int, default=None, help="MAX_LLM_RETRY_ATTEMPTS überschreiben")
+    parser.add_argument("--retry-delay", type=float, default=None, help="LLM_RETRY_BASE_DELAY überschreiben")
+    parser.add_argument("--hedge-delay", type=float, default=None, help="Hedge-Wartezeit ohne Historie (s)")
+    parser.add_argument("--hedge-model", default=None)
+    parser.add_argument("--verbose", action="store_true", help="Engine-Logs ausgeben")
+    add_profile_arguments(parser)
+    parser.set_defaults(time_scale=0.02)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    _apply_engine_options(args)
+    standin = LLMStandin(profile_from_args(args)).start()
+    with tempfile.NamedTemporaryFile("w", suffix=".key", delete=False) as key_file:
+        key_file.write("standin-key")
+    try:
+        start = time.perf_counter()
+        timer = asyncio.run(run(args, standin.base_url, key_file.name))
+        elapsed = time.perf_counter() - start
+    finally:
+        standin.stop()
+        os.unlink(key_file.name)
+
+    print(f"Stand-in: {standin.base_url}  time-scale={args.time_scale:g}  "
+          f"Streaming={'aus' if args.no_streaming else 'an'}  Hedging={'aus' if args.no_hedging else 'an'}")
+    timer.report()
+    print(f"\nDurchläufe: {args.iterations} in {elapsed:.1f}s, fehlgeschlagen: {timer.failures}")
+    print(f"LLM-Aufrufe: {timer.cost.calls}, Tokens: {timer.cost.total_tokens}, "
+          f"Kosten laut Preistabelle: ${timer.cost.total_cost:.4f}")
+    print("Stand-in: " + ", ".join(f"{k}={v}" for k, v in sorted(standin.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: Requests, Bytes und Laufzeit der Marktdaten-Abrufe gegen den Kraken-Stand-in.
+
+Treibt MarketData (echter ccxt.kraken, In-Process oder per HTTP gegen
+benchmarks/kraken_standin.py) durch get_portfolio_with_prices,
+get_portfolio_indicators und get_market_overview – je einmal mit leerem
+und einmal mit warmem Cache – für mehrere Portfolio-Größen. Der Markt hat
+dreimal so viele EUR-Paare wie das Portfolio Coins, die Markt-Übersicht
+analysiert so viele Coins wie das Portfolio hält (oder --overview-top).
+
+Die Spalte "Drosselung" schätzt die Zusatzzeit, die ccxt im Bot mit
+enableRateLimit (rateLimit 1000 ms für Kraken) zwischen den Requests wartet.
+
+Aufruf (aus dem Projekt-Root):
+    python benchmarks/bench_market_data.py --sizes 5,50,500 --latency 0.15 --time-scale 0.1
+    python benchmarks/bench_market_data.py --sizes 50 --http --error-rate 0.02
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, "src"))
+sys.path.insert(0, os.path.join(_ROOT, "benchmarks"))
+
+import data_fetcher  # noqa: E402
+from cache_manager import IntelligentCache  # noqa: E402
+from data_fetcher import MarketData  # noqa: E402
+from kraken_standin import (  # noqa: E402
+    KrakenStandin, MarketSnapshot, add_profile_arguments, make_exchange, profile_from_args,
+)
+
+
+def measure(standin: KrakenStandin, fn: Callable) -> Tuple[object, Dict[str, float]]:
+    """Führt fn aus und liefert Ergebnis + Requests, Bytes und Wall-Time."""
+    standin.reset_stats()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    stats = standin.reset_stats()
+    return result, {
+        "requests": stats.get("requests", 0),
+        "bytes": stats.get("bytes_received", 0) + stats.get("bytes_sent", 0),
+        "seconds": elapsed,
+        "errors": stats.get("injected_errors", 0) + stats.get("rate_limited", 0),
+    }
+
+
+def run_size(args: argparse.Namespace, n_coins: int) -> List[Tuple[str, str, Dict[str, float]]]:
+    snapshot = (MarketSnapshot.load(args.recording) if args.recording
+                else MarketSnapshot.synthetic(n_coins=n_coins * 3, portfolio_size=n_coins, seed=args.seed))
+    standin = KrakenStandin(snapshot, profile_from_args(args))
+    if args.http:
+        standin.start()
+    rows: List[Tuple[str, str, Dict[str, float]]] = []
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # Frischer Cache pro Größe, damit der erste Lauf wirklich kalt ist
+            data_fetcher.cache_manager = IntelligentCache(cache_dir=cache_dir)
+            exchange = make_exchange(standin, http=args.http, throttle=args.throttle)
+            market, stats = measure(standin, lambda: MarketData(exchange=exchange))
+            rows.append(("setup", "load_markets", stats))
+
+            overview_top = args.overview_top or n_coins
+            for run in ("kalt", "warm"):
+                (portfolio, _), stats = measure(standin, market.get_portfolio_with_prices)
+                rows.append((run, "get_portfolio_with_prices", stats))
+                _, stats = measure(standin, lambda: market.get_portfolio_indicators(portfolio))
+                rows.append((run, "get_portfolio_indicators", stats))
+                _, stats = measure(standin, lambda: market.get_market_overview(
+                    top_n=overview_top, exclude_coins=list(portfolio)))
+                rows.append((run, "get_market_overview", stats))
+    finally:
+        standin.stop()
+    return rows
+
+
+def report(results: Dict[int, List[Tuple[str, str, Dict[str, float]]]], throttle_ms: float) -> None:
+    print(f"{'Coins':>5}  {'Lauf':<6} {'Stufe':<27} {'Requests':>8} {'KB':>10} {'Wall s':>8} "
+          f"{'Drosselung s':>12} {'Fehler':>6}")
+    for n_coins, rows in results.items():
+        for run, stage, stats in rows:
+            print(f"{n_coins:>5}  {run:<6} {stage:<27} {stats['requests']:>8} {stats['bytes'] / 1024:>10.1f} "
+                  f"{stats['seconds']:>8.2f} {stats['requests'] * throttle_ms / 1000:>12.0f} {stats['errors']:>6}")
+        cycle = [stats for run, _, stats in rows if run == "kalt"]
+        print(f"{n_coins:>5}  {'Zyklus':<6} {'(kalt, ohne Setup)':<27} {sum(s['requests'] for s in cycle):>8} "
+              f"{sum(s['bytes'] for s in cycle) / 1024:>10.1f} {sum(s['seconds'] for s in cycle):>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="5,50,500", help="Portfolio-Größen (kommagetrennt)")
+    parser.add_argument("--overview-top", type=int, default=None, help="top_n der Markt-Übersicht (Default: Größe)")
+    parser.add_argument("--http", action="store_true", help="Über HTTP statt In-Process")
+    parser.add_argument("--throttle", action="store_true", help="ccxt-Drosselung aktivieren (skaliert)")
+    parser.add_argument("--verbose", action="store_true", help="MarketData-Logs ausgeben")
+    add_profile_arguments(parser)
+    parser.set_defaults(time_scale=0.1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    results = {}
+    for n_coins in (int(s) for s in args.sizes.split(",")):
+        results[n_coins] = run_size(args, n_coins)
+
+    print(f"Stand-in: {'HTTP' if args.http else 'In-Process'}  Latenz={args.latency:g}s × {args.time_scale:g}  "
+          f"Rate-Limit={args.rate_limit:g}/s  Fehlerrate={args.error_rate:g}")
+    report(results, throttle_ms=1000.0)
+
+
+if __name__ == "__main__":
+    main()
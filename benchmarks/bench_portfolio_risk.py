@@ -0,0 +1,83 @@
+"""
+Benchmark: Durchsatz der Portfolio-VaR/CVaR-Engine (Pfade pro Sekunde).
+
+Misst Monte Carlo auf einem Kern und mit Prozess-Pool sowie die gefilterte
+historische Simulation mit synthetischen, korrelierten Daten.
+
+Aufruf (aus dem Projekt-Root):
+    python benchmarks/bench_portfolio_risk.py --paths 100000 --coins 10 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# BLAS auf einen Thread begrenzen, damit "ein Kern" auch wirklich einer ist
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np  # noqa: E402
+
+from portfolio_risk import PortfolioRiskEngine  # noqa: E402
+
+
+def _synthetic_market(n_coins: int, n_returns: int, seed: int = 42):
+    """Erzeugt Positionswerte, Kovarianz und Return-Historie mit Faktorstruktur."""
+    rng = np.random.default_rng(seed)
+    coins = [f"C{i}" for i in range(n_coins)]
+    loadings = rng.uniform(0.3, 0.9, n_coins)
+    idio = rng.uniform(0.01, 0.03, n_coins)
+    market = rng.normal(0, 0.03, n_returns)
+    returns = market[:, None] * loadings + rng.normal(0, 1, (n_returns, n_coins)) * idio
+    cov = np.cov(returns, rowvar=False)
+    mean = returns.mean(axis=0)
+    values = {c: float(v) for c, v in zip(coins, rng.uniform(100, 5000, n_coins))}
+    return coins, values, mean, cov, returns
+
+
+def _timed(label: str, paths: int, fn, repeats: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {best * 1000:9.1f} ms   {paths / best:14,.0f} Pfade/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--coins", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--history", type=int, default=500, help="Anzahl historischer Returns für FHS")
+    parser.add_argument("--memory-mb", type=float, default=32.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    coins, values, mean, cov, returns = _synthetic_market(args.coins, args.history)
+    engine = PortfolioRiskEngine(n_paths=args.paths, memory_budget_mb=args.memory_mb)
+
+    print(f"Portfolio-VaR Benchmark: {args.paths:,} Pfade, {args.coins} Coins, "
+          f"Budget {args.memory_mb:g} MB/Chunk, CPUs {os.cpu_count()}")
+    result = _timed("Monte Carlo (1 Kern)", args.paths,
+                    lambda: engine.monte_carlo(coins, values, mean, cov, seed=1, n_workers=1), args.repeats)
+    if args.workers > 1:
+        _timed(f"Monte Carlo (Pool, {args.workers} Prozesse)", args.paths,
+               lambda: engine.monte_carlo(coins, values, mean, cov, seed=1, n_workers=args.workers),
+               args.repeats)
+    _timed("Gefilterte hist. Simulation", args.paths,
+           lambda: engine.filtered_historical(coins, values, returns, seed=1), args.repeats)
+
+    print("\nErgebnis Monte Carlo:")
+    for level, metrics in result["levels"].items():
+        print(f"  {level:>6}: VaR {metrics['var_eur']:>10.2f} EUR ({metrics['var_percent']:.2f}%)"
+              f"  CVaR {metrics['cvar_eur']:>10.2f} EUR ({metrics['cvar_percent']:.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+"""
+Lokaler Stand-in für die Kraken-REST-API (Marktdaten + Kontostand).
+
+Beantwortet /0/public/Assets, AssetPairs, Ticker, OHLC und
+/0/private/BalanceEx im Kraken-Wire-Format – aus synthetischen (GBM, fester
+Seed) oder aufgezeichneten Daten. Latenz (log-normal), Rate-Limit
+(Token-Bucket wie Krakens API-Counter) und Fehler (503) sind einstellbar.
+Gezählt werden Requests und übertragene Bytes pro Endpoint.
+
+Zwei Betriebsarten:
+    - HTTP: echter ccxt.kraken mit urls['api'] auf den Stand-in
+    - In-Process: InProcessKraken (ccxt.kraken-Unterklasse) ruft den Stand-in
+      ohne Socket auf; ccxt-Parsing und Fehlerbehandlung laufen trotzdem
+
+Aufruf (aus dem Projekt-Root):
+    python benchmarks/kraken_standin.py --port 8809 --coins 50 --latency 0.15
+    python benchmarks/kraken_standin.py --record benchmarks/fixtures/kraken_recording.json --record-pairs 30
+"""
+
+import argparse
+import base64
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import ccxt
+import numpy as np
+
+KRAKEN_URL = "https://api.kraken.com"
+CANDLE_SECONDS = 4 * 3600
+
+# Bekannte Coins (Reihenfolge ≈ Marktkapitalisierung), danach synthetische Namen
+KNOWN_COINS = ("BTC", "ETH", "SOL", "XRP", "ADA", "DOGE", "DOT", "LINK", "AVAX", "LTC",
+               "ATOM", "UNI", "XLM", "AAVE", "NEAR", "ALGO", "FIL", "ARB", "OP", "INJ",
+               "TIA", "MATIC", "GRT", "SAND", "MANA", "SNX", "CRV", "LDO", "RUNE", "KSM")
+# Kraken-Asset-IDs mit X/Z-Präfix bzw. eigenem Altname (ccxt bildet sie zurück ab)
+_ASSET_IDS = {"BTC": "XXBT", "ETH": "XETH", "LTC": "XLTC", "XRP": "XXRP", "DOGE": "XXDG",
+              "XLM": "XXLM", "EUR": "ZEUR"}
+_ALTNAMES = {"BTC": "XBT", "DOGE": "XDG"}
+
+
+def coin_names(n: int) -> List[str]:
+    return list(KNOWN_COINS[:n]) + [f"C{i:04d}" for i in range(len(KNOWN_COINS), n)]
+
+
+def _fmt(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+class MarketSnapshot:
+    """Marktdaten im Kraken-Wire-Format (Ergebnis-Objekte ohne 'error'-Hülle)."""
+
+    def __init__(self, assets: Dict[str, Dict], pairs: Dict[str, Dict], balance: Dict[str, Dict],
+                 ohlc: Optional[Dict[str, List[List]]] = None, tickers: Optional[Dict[str, Dict]] = None):
+        self.assets = assets
+        self.pairs = pairs
+        self.balance = balance
+        self._ohlc = ohlc or {}
+        self._tickers = tickers or {}
+        self._params: Dict[str, Tuple[int, float, float, float]] = {}
+        self._seed = 0
+        self._candles = 720
+        self._lock = threading.Lock()
+
+    @classmethod
+    def synthetic(cls, n_coins: int = 50, portfolio_size: int = 5, candles: int = 720,
+                  eur_balance: float = 250.0, seed: int = 42) -> "MarketSnapshot":
+        """Erzeugt n_coins EUR-Paare; die ersten portfolio_size Coins liegen im Konto.
+
+        Kerzen werden erst beim ersten Abruf pro Paar erzeugt (GBM, Seed pro Paar).
+        """
+        rng = np.random.default_rng(seed)
+        assets = {"ZEUR": {"aclass": "currency", "altname": "EUR", "decimals": 4,
+                           "display_decimals": 2, "status": "enabled"}}
+        pairs: Dict[str, Dict] = {}
+        balance = {"ZEUR": {"balance": _fmt(eur_balance, 4), "hold_trade": "0.0000"}}
+        snapshot = cls(assets, pairs, balance)
+        snapshot._seed, snapshot._candles = seed, candles
+
+        for i, coin in enumerate(coin_names(n_coins)):
+            asset_id = _ASSET_IDS.get(coin, coin)
+            altname = _ALTNAMES.get(coin, coin)
+            pair_id = asset_id + "ZEUR" if asset_id != coin else coin + "EUR"
+            price = float(60000 / (i + 1) ** 1.6 * rng.uniform(0.8, 1.2))
+            decimals = max(1, min(8, 4 - int(math.floor(math.log10(price)))))
+            assets[asset_id] = {"aclass": "currency", "altname": altname, "decimals": 10,
+                                "display_decimals": 5, "status": "enabled"}
+            pairs[pair_id] = {
+                "altname": altname + "EUR", "wsname": f"{altname}/EUR",
+                "aclass_base": "currency", "base": asset_id, "aclass_quote": "currency", "quote": "ZEUR",
+                "lot": "unit", "cost_decimals": 5, "pair_decimals": decimals, "lot_decimals": 8,
+                "lot_multiplier": 1, "leverage_buy": [], "leverage_sell": [],
+                "fees": [[0, 0.4], [10000, 0.35], [50000, 0.24]],
+                "fees_maker": [[0, 0.25], [10000, 0.2], [50000, 0.14]],
+                "fee_volume_currency": "ZUSD", "margin_call": 80, "margin_stop": 40,
+                "ordermin": _fmt(5 / price, 8), "costmin": "0.5",
+                "tick_size": _fmt(10 ** -decimals, decimals), "status": "online",
+            }
+            # Seed-Index, Start-Preis, Volatilität pro Kerze, mittleres Volumen in EUR
+            snapshot._params[pair_id] = (i, price, float(rng.uniform(0.01, 0.035)),
+                                         float(2e6 / (i + 1) * rng.uniform(0.5, 2.0)))
+            if i < portfolio_size:
+                balance[asset_id] = {"balance": _fmt(float(rng.uniform(200, 2000)) / price, 10),
+                                     "hold_trade": "0.0000000000"}
+        return snapshot
+
+    @classmethod
+    def load(cls, path: str) -> "MarketSnapshot":
+        """Lädt eine Aufzeichnung (siehe save/record_from_kraken)."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["assets"], data["pairs"], data["balance"], data.get("ohlc"), data.get("tickers"))
+
+    def save(self, path: str) -> None:
+        for pair_id in self.pairs:
+            self.ohlc(pair_id)
+        data = {"assets": self.assets, "pairs": self.pairs, "balance": self.balance,
+                "ohlc": self._ohlc, "tickers": {p: self.ticker(p) for p in self.pairs}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def ohlc(self, pair_id: str) -> List[List]:
+        """Kerzen [time, open, high, low, close, vwap, volume, count] (4h, aufsteigend)."""
+        with self._lock:
+            rows = self._ohlc.get(pair_id)
+            if rows is None and pair_id in self._params:
+                rows = self._ohlc[pair_id] = self._generate(pair_id)
+        return rows or []
+
+    def _generate(self, pair_id: str) -> List[List]:
+        index, price, sigma, volume_eur = self._params[pair_id]
+        decimals = self.pairs[pair_id]["pair_decimals"]
+        rng = np.random.default_rng([self._seed, index])
+        n = self._candles
+        close = price * np.exp(np.cumsum(rng.normal(-sigma ** 2 / 2, sigma, n)))
+        open_ = np.concatenate(([price], close[:-1]))
+        wick = np.abs(rng.normal(0, sigma / 2, (2, n)))
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = volume_eur / 6 / close * rng.lognormal(0, 0.4, n)
+        start = (int(time.time()) // CANDLE_SECONDS - n + 1) * CANDLE_SECONDS
+        return [
+            [start + k * CANDLE_SECONDS, _fmt(open_[k], decimals), _fmt(high[k], decimals),
+             _fmt(low[k], decimals), _fmt(close[k], decimals),
+             _fmt((open_[k] + high[k] + low[k] + close[k]) / 4, decimals), _fmt(volume[k], 8),
+             int(volume[k] * close[k] / 500) + 1]
+            for k in range(n)
+        ]
+
+    def ticker(self, pair_id: str) -> Optional[Dict]:
+        """Ticker aus Aufzeichnung oder aus den letzten 6 Kerzen (24h)."""
+        if pair_id in self._tickers:
+            return self._tickers[pair_id]
+        rows = self.ohlc(pair_id)
+        if not rows:
+            return None
+        day = rows[-6:]
+        decimals = self.pairs[pair_id]["pair_decimals"]
+        last = float(day[-1][4])
+        volume = sum(float(r[6]) for r in day)
+        vwap = sum(float(r[5]) * float(r[6]) for r in day) / volume
+        spread = 10 ** -decimals
+        return {
+            "a": [_fmt(last + spread, decimals), "1", "1.000"], "b": [_fmt(last, decimals), "1", "1.000"],
+            "c": [_fmt(last, decimals), "0.05000000"], "v": [_fmt(float(day[-1][6]), 8), _fmt(volume, 8)],
+            "p": [day[-1][5], _fmt(vwap, decimals)], "t": [day[-1][7], sum(r[7] for r in day)],
+            "l": [day[-1][3], min(r[3] for r in day)], "h": [day[-1][2], max(r[2] for r in day)],
+            "o": day[0][1],
+        }
+
+
+class ExchangeProfile:
+    """Verhalten des Stand-ins (Zeiten in Sekunden, vor time_scale)."""
+
+    def __init__(self, latency: float = 0.15, latency_sigma: float = 0.3, rate_limit: float = 0.0,
+                 burst: int = 15, error_rate: float = 0.0, time_scale: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency: Median der Antwortzeit pro Request
+            latency_sigma: Streuung der Log-Normalverteilung
+            rate_limit: Erlaubte Requests pro Sekunde (0 = kein Limit)
+            burst: Größe des Token-Buckets (Kraken: 15 für Starter-Konten)
+            error_rate: Anteil der Requests mit 503
+            time_scale: Faktor für Latenz und Bucket-Nachfüllzeit
+            seed: Zufalls-Seed
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+
+    def delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        with self.lock:
+            return self.random.lognormvariate(math.log(self.latency), self.latency_sigma) * self.time_scale
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def take_token(self) -> bool:
+        """False, wenn das Rate-Limit greift."""
+        if self.rate_limit <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            refill = (now - self._refilled) * self.rate_limit / max(self.time_scale, 1e-9)
+            self._tokens = min(float(self.burst), self._tokens + refill)
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class KrakenStandin:
+    """Kraken-REST-Stand-in über einem MarketSnapshot."""
+
+    def __init__(self, snapshot: MarketSnapshot, profile: Optional[ExchangeProfile] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.snapshot = snapshot
+        self.profile = profile or ExchangeProfile()
+        self.host, self.port = host, port
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    # ── Statistik ─────────────────────────────────────────────────────────
+
+    def count(self, key: str, value: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + value
+
+    def reset_stats(self) -> Dict[str, int]:
+        """Gibt die bisherigen Zähler zurück und setzt sie auf 0."""
+        with self._stats_lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    # ── Request-Verarbeitung ──────────────────────────────────────────────
+
+    def handle(self, method: str, path: str, params: Dict[str, str], request_bytes: int = 0) -> Tuple[int, str]:
+        """Beantwortet einen Request im Kraken-Format.
+
+        Returns:
+            (HTTP-Status, Body)
+        """
+        endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+        self.count("requests")
+        self.count(f"requests_{endpoint}")
+        self.count("bytes_sent", request_bytes)
+        time.sleep(self.profile.delay())
+
+        if not self.profile.take_token():
+            self.count("rate_limited")
+            status, body = 200, json.dumps({"error": ["EAPI:Rate limit exceeded"]})
+        elif self.profile.roll(self.profile.error_rate):
+            self.count("injected_errors")
+            status, body = 503, "Service Unavailable (injected)"
+        else:
+            status, body = 200, json.dumps(self._dispatch(method, path, endpoint, params))
+        self.count("bytes_received", len(body.encode()))
+        self.count(f"bytes_{endpoint}", len(body.encode()))
+        return status, body
+
+    def _dispatch(self, method: str, path: str, endpoint: str, params: Dict[str, str]) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        pair_ids = [p for p in params.get("pair", "").split(",") if p]
+        unknown = [p for p in pair_ids if p not in snapshot.pairs]
+        if unknown:
+            return {"error": ["EQuery:Unknown asset pair"]}
+
+        if "/private/" in path:
+            if method != "POST":
+                return {"error": ["EGeneral:Invalid arguments"]}
+            if endpoint in ("BalanceEx", "Balance"):
+                if endpoint == "Balance":
+                    return {"error": [], "result": {k: v["balance"] for k, v in snapshot.balance.items()}}
+                return {"error": [], "result": snapshot.balance}
+            return {"error": ["EGeneral:Unknown method"]}
+
+        if endpoint == "Assets":
+            return {"error": [], "result": snapshot.assets}
+        if endpoint == "AssetPairs":
+            pairs = snapshot.pairs if not pair_ids else {p: snapshot.pairs[p] for p in pair_ids}
+            return {"error": [], "result": pairs}
+        if endpoint == "Ticker":
+            return {"error": [], "result": {p: snapshot.ticker(p) for p in (pair_ids or snapshot.pairs)}}
+        if endpoint == "OHLC":
+            if len(pair_ids) != 1:
+                return {"error": ["EGeneral:Invalid arguments"]}
+            if params.get("interval", "1") != "240":
+                return {"error": ["EGeneral:Invalid arguments:interval"]}
+            rows = snapshot.ohlc(pair_ids[0])
+            since = int(params.get("since") or 0)
+            rows = [r for r in rows if r[0] > since]
+            return {"error": [], "result": {pair_ids[0]: rows, "last": rows[-1][0] if rows else since}}
+        if endpoint == "Time":
+            now = int(time.time())
+            return {"error": [], "result": {"unixtime": now, "rfc1123": time.strftime("%a, %d %b %y %H:%M:%S +0000", time.gmtime(now))}}
+        return {"error": ["EGeneral:Unknown method"]}
+
+    # ── HTTP-Betrieb ──────────────────────────────────────────────────────
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "KrakenStandin":
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 – Signatur der Basisklasse
+                pass
+
+            def _respond(self, method: str, params: Dict[str, str], request_bytes: int) -> None:
+                path = urllib.parse.urlsplit(self.path).path
+                status, body = standin.handle(method, path, params, request_bytes)
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json" if status == 200 else "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                query = urllib.parse.urlsplit(self.path).query
+                self._respond("GET", dict(urllib.parse.parse_qsl(query)), len(self.path))
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                self._respond("POST", dict(urllib.parse.parse_qsl(raw)), len(self.path) + len(raw))
+
+        return Handler
+
+
+class InProcessKraken(ccxt.kraken):
+    """ccxt.kraken, dessen HTTP-Schicht direkt den Stand-in aufruft.
+
+    Signatur, Parsing und Fehler-Mapping von ccxt bleiben aktiv; nur der
+    Socket entfällt.
+    """
+
+    def __init__(self, standin: KrakenStandin, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config or {})
+        self.standin = standin
+
+    def fetch(self, url, method="GET", headers=None, body=None):
+        parts = urllib.parse.urlsplit(url)
+        params = dict(urllib.parse.parse_qsl(body if method == "POST" and body else parts.query))
+        status, text = self.standin.handle(method, parts.path, params, len(url) + len(body or ""))
+        response_headers = {"Content-Type": "application/json" if status == 200 else "text/plain"}
+        json_response = self.parse_json(text)
+        reason = "OK" if status == 200 else "Service Unavailable"
+        if status >= 400:
+            self.handle_errors(status, reason, url, method, response_headers, text, json_response, headers, body)
+            self.handle_http_status_code(status, reason, url, method, text)
+            raise ccxt.ExchangeError(" ".join([self.id, method, url]))
+        self.handle_errors(status, reason, url, method, response_headers, text, json_response, headers, body)
+        return json_response
+
+
+def make_exchange(standin: KrakenStandin, http: bool = False, throttle: bool = False) -> ccxt.kraken:
+    """ccxt.kraken gegen den Stand-in (HTTP oder In-Process).
+
+    Args:
+        standin: Stand-in (für http=True bereits gestartet)
+        http: Über den HTTP-Server statt direkt im Prozess
+        throttle: ccxt-Drosselung aktiv lassen (rateLimit wird mit time_scale skaliert)
+    """
+    config = {
+        "apiKey": "standin-key",
+        "secret": base64.b64encode(b"standin-secret").decode(),
+        "enableRateLimit": throttle,
+    }
+    if http:
+        config["urls"] = {"api": {"public": standin.base_url, "private": standin.base_url}}
+        exchange = ccxt.kraken(config)
+    else:
+        exchange = InProcessKraken(standin, config)
+    exchange.rateLimit = exchange.rateLimit * standin.profile.time_scale
+    return exchange
+
+
+def record_from_kraken(path: str, n_pairs: int = 30, portfolio_size: int = 5, quote: str = "ZEUR") -> None:
+    """Zeichnet öffentliche Kraken-Daten (Assets, Paare, Ticker, 4h-Kerzen) auf.
+
+    Der Kontostand wird synthetisch aus den ersten portfolio_size Paaren gebildet;
+    Credentials werden nicht benötigt.
+    """
+    def get(endpoint: str, **params: str) -> Dict[str, Any]:
+        url = f"{KRAKEN_URL}/0/public/{endpoint}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = json.loads(response.read())
+        if data.get("error"):
+            raise RuntimeError(f"{endpoint}: {data['error']}")
+        time.sleep(1.0)  # öffentliches Rate-Limit respektieren
+        return data["result"]
+
+    all_pairs = {k: v for k, v in get("AssetPairs").items() if v.get("quote") == quote and ".d" not in k}
+    tickers = get("Ticker", pair=",".join(all_pairs))
+    by_volume = sorted(all_pairs, key=lambda p: float(tickers[p]["v"][1]) * float(tickers[p]["p"][1]), reverse=True)
+    chosen = by_volume[:n_pairs]
+    assets = get("Assets")
+    pairs = {p: all_pairs[p] for p in chosen}
+    used_assets = {quote} | {pairs[p]["base"] for p in chosen}
+    ohlc = {p: get("OHLC", pair=p, interval="240")[p] for p in chosen}
+    balance = {quote: {"balance": "250.0000", "hold_trade": "0.0000"}}
+    for p in chosen[:portfolio_size]:
+        balance[pairs[p]["base"]] = {"balance": _fmt(500 / float(tickers[p]["c"][0]), 10), "hold_trade": "0"}
+    snapshot = MarketSnapshot({a: assets[a] for a in used_assets if a in assets}, pairs, balance,
+                              ohlc, {p: tickers[p] for p in chosen})
+    snapshot.save(path)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Gemeinsame CLI-Optionen für Stand-in und Benchmark."""
+    parser.add_argument("--latency", type=float, default=0.15, help="Median Antwortzeit pro Request (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests pro Sekunde (0 = aus)")
+    parser.add_argument("--burst", type=int, default=15, help="Größe des Token-Buckets")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil 503-Antworten")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Faktor für Latenz und Rate-Limit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recording", default=None, help="Aufzeichnung statt synthetischer Daten")
+
+
+def profile_from_args(args: argparse.Namespace) -> ExchangeProfile:
+    return ExchangeProfile(latency=args.latency, latency_sigma=args.latency_sigma, rate_limit=args.rate_limit,
+                           burst=args.burst, error_rate=args.error_rate, time_scale=args.time_scale, seed=args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--coins", type=int, default=50, help="Anzahl synthetischer EUR-Paare")
+    parser.add_argument("--portfolio-size", type=int, default=5)
+    parser.add_argument("--record", metavar="PFAD", help="Öffentliche Kraken-Daten aufzeichnen und beenden")
+    parser.add_argument("--record-pairs", type=int, default=30)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.record:
+        record_from_kraken(args.record, n_pairs=args.record_pairs, portfolio_size=args.portfolio_size)
+        print(f"Aufzeichnung gespeichert: {args.record}")
+        return
+
+    snapshot = (MarketSnapshot.load(args.recording) if args.recording
+                else MarketSnapshot.synthetic(args.coins, args.portfolio_size, seed=args.seed))
+    standin = KrakenStandin(snapshot, profile_from_args(args), host=args.host, port=args.port).start()
+    print(f"Kraken-Stand-in läuft auf {standin.base_url} ({len(snapshot.pairs)} Paare, Strg+C beendet)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        print(json.dumps(standin.stats, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Lokaler, OpenAI-kompatibler Stand-in für den AI-Hub.
+
+Beantwortet POST /v1/chat/completions (gestreamt per SSE oder am Stück) mit
+aufgezeichneten Analyst-/Guardian-/Next-/Weekly-Antworten aus
+benchmarks/fixtures/llm_responses.json. Latenz bis zum ersten Token
+(log-normal pro Modell), Token-Rate, Thinking-Dauer, Ablehnung von
+Thinking/response_format sowie Fehler und kaputtes JSON sind einstellbar –
+damit lassen sich Retries, Streaming und Hedging offline vermessen.
+
+Aufruf (aus dem Projekt-Root):
+    python benchmarks/llm_standin.py --port 8808 --ttft 8 --tps 60 --error-rate 0.05
+Dann z.B. AI_BASE_URL=http://127.0.0.1:8808/v1 setzen.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "llm_responses.json")
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 8
+
+# Prompt-Marker → Rolle (Reihenfolge zählt: Korrektur-Anfragen enthalten die alte Antwort)
+_PROMPT_MARKERS = (
+    ("<previous_answer>", "json_repair"),
+    ("<analyst_proposal>", "guardian"),
+    ("<invest_amount>", "next_invest"),
+    ('"week_number"', "weekly_summary"),
+)
+# Feld in einer Antwort → Rolle (für Korrektur-Anfragen)
+_ANSWER_MARKERS = (('"approved"', "guardian"), ('"splits"', "next_invest"), ('"week_number"', "weekly_summary"))
+
+
+class StandinProfile:
+    """Verhalten des Stand-ins (alle Zeiten in Sekunden, vor time_scale)."""
+
+    def __init__(self, ttft_median: float = 8.0, ttft_sigma: float = 0.5, tokens_per_second: float = 60.0,
+                 thinking_tokens_per_second: float = 150.0, thinking_usage: float = 0.6,
+                 model_ttft: Optional[Dict[str, Tuple[float, float]]] = None,
+                 reject_thinking: Tuple[str, ...] = (), reject_structured: Tuple[str, ...] = (),
+                 error_rate: float = 0.0, malformed_rate: float = 0.0, broken_rate: float = 0.0,
+                 time_scale: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            ttft_median: Median der Zeit bis zum ersten Token
+            ttft_sigma: Streuung der Log-Normalverteilung
+            tokens_per_second: Ausgabe-Rate
+            thinking_tokens_per_second: Rate für Thinking-Token (vor dem ersten Token)
+            thinking_usage: Anteil des Thinking-Budgets, der verbraucht wird
+            model_ttft: Modell → (Median, Sigma), überschreibt ttft_* pro Modell
+            reject_thinking: Modelle, die Thinking mit 400 ablehnen
+            reject_structured: Modelle, die response_format mit 400 ablehnen
+            error_rate: Anteil der Anfragen mit 503
+            malformed_rate: Anteil reparierbar kaputter Antworten (Fence, Trailing Comma, Prosa danach)
+            broken_rate: Anteil nicht reparierbarer Antworten (fehlender Wert)
+            time_scale: Faktor für alle Wartezeiten (0.01 = 100× schneller)
+            seed: Zufalls-Seed
+        """
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.thinking_tokens_per_second = thinking_tokens_per_second
+        self.thinking_usage = thinking_usage
+        self.model_ttft = model_ttft or {}
+        self.reject_thinking = set(reject_thinking)
+        self.reject_structured = set(reject_structured)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.broken_rate = broken_rate
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def ttft(self, model: str) -> float:
+        median, sigma = self.model_ttft.get(model, (self.ttft_median, self.ttft_sigma))
+        with self.lock:
+            return self.random.lognormvariate(math.log(median), sigma)
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+
+def detect_role(body: Dict[str, Any]) -> str:
+    """Rolle der Anfrage aus response_format-Name oder Prompt-Markern."""
+    prompt = "".join(m.get("content") or "" for m in body.get("messages", []))
+    for marker, role in _PROMPT_MARKERS:
+        if marker in prompt:
+            if role != "json_repair":
+                return role
+            for answer_marker, answer_role in _ANSWER_MARKERS:
+                if answer_marker in prompt.split("<previous_answer>", 1)[1]:
+                    return answer_role
+            return "analyst"
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+    return schema or "analyst"
+
+
+def _corrupt(content: str, repairable: bool) -> str:
+    """Macht aus gültigem JSON reparierbaren oder nicht reparierbaren Text."""
+    if repairable:
+        # Markdown-Fence, Trailing Comma vor der letzten Klammer, Prosa danach
+        return "```json\n" + re.sub(r"\}\s*$", ",}", content) + "\n```\nHoffe, das hilft!"
+    return content.replace('"sentiment": ', '"sentiment": , "x": ', 1).replace('"approved": true', '"approved": ', 1)
+
+
+class LLMStandin:
+    """OpenAI-kompatibler HTTP-Server mit aufgezeichneten Antworten."""
+
+    def __init__(self, profile: Optional[StandinProfile] = None, host: str = "127.0.0.1", port: int = 0,
+                 fixtures_path: str = FIXTURES_PATH):
+        self.profile = profile or StandinProfile()
+        with open(fixtures_path, "r", encoding="utf-8") as f:
+            self.responses = {role: json.dumps(obj, ensure_ascii=False) for role, obj in json.load(f).items()}
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def start(self) -> "LLMStandin":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 – Signatur der Basisklasse
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self, status: int, message: str) -> None:
+                standin.count(f"error_{status}")
+                self._send_json(status, {"error": {"message": message, "type": "standin_error", "code": status}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._error(404, f"Unbekannter Pfad {self.path}")
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                standin.handle(self, body)
+
+        return Handler
+
+    def handle(self, request: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        """Beantwortet eine Chat-Completion-Anfrage gemäß Profil."""
+        profile = self.profile
+        model = body.get("model", "unknown")
+        thinking = (body.get("thinking") or {}).get("budget_tokens", 0)
+        role = detect_role(body)
+        self.count(f"requests_{role}")
+
+        if thinking and model in profile.reject_thinking:
+            request._error(400, f"thinking is not supported for model {model}")
+            return
+        if body.get("response_format") and model in profile.reject_structured:
+            request._error(400, f"response_format is not supported for model {model}")
+            return
+        if profile.roll(profile.error_rate):
+            request._error(503, "upstream overloaded (injected)")
+            return
+
+        content = self.responses.get(role, self.responses["analyst"])
+        if profile.roll(profile.broken_rate):
+            self.count("injected_broken")
+            content = _corrupt(content, repairable=False)
+        elif profile.roll(profile.malformed_rate):
+            self.count("injected_malformed")
+            content = _corrupt(content, repairable=True)
+
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        thinking_tokens = int(thinking * profile.thinking_usage)
+        output_tokens = max(len(content) // CHARS_PER_TOKEN, 1)
+        usage = {
+            "prompt_tokens": prompt_chars // CHARS_PER_TOKEN,
+            "completion_tokens": output_tokens + thinking_tokens,
+            "total_tokens": prompt_chars // CHARS_PER_TOKEN + output_tokens + thinking_tokens,
+            "completion_tokens_details": {"reasoning_tokens": thinking_tokens},
+        }
+        first_token = profile.ttft(model) + thinking_tokens / profile.thinking_tokens_per_second
+        per_chunk = TOKENS_PER_CHUNK / profile.tokens_per_second
+        scale = profile.time_scale
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        try:
+            if not body.get("stream"):
+                time.sleep((first_token + output_tokens / profile.tokens_per_second) * scale)
+                request._send_json(200, {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                })
+                return
+
+            request.send_response(200)
+            request.send_header("Content-Type", "text/event-stream")
+            request.send_header("Cache-Control", "no-cache")
+            request.send_header("Connection", "close")
+            request.end_headers()
+            request.close_connection = True
+
+            def event(payload: Any) -> None:
+                data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+                request.wfile.write(f"data: {data}\n\n".encode())
+                request.wfile.flush()
+
+            def chunk(delta: Dict[str, Any], finish: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+                choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}]
+                return {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": model, "choices": choices, **extra}
+
+            time.sleep(first_token * scale)
+            event(chunk({"role": "assistant", "content": ""}))
+            step = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+            for i in range(0, len(content), step):
+                event(chunk({"content": content[i:i + step]}))
+                time.sleep(per_chunk * scale)
+            event(chunk({}, finish="stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event(chunk(None, usage=usage))
+            event("[DONE]")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hat abgebrochen (z.B. Hedging oder früher Stream-Abschluss)
+            self.count("client_disconnects")
+
+
+def _model_ttft(values) -> Dict[str, Tuple[float, float]]:
+    """'modell=median:sigma' → {'modell': (median, sigma)}"""
+    result = {}
+    for value in values or []:
+        model, spec = value.split("=", 1)
+        median, _, sigma = spec.partition(":")
+        result[model] = (float(median), float(sigma or 0.5))
+    return result
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Gemeinsame CLI-Optionen für Stand-in und Benchmark."""
+    parser.add_argument("--ttft", type=float, default=8.0, help="Median Zeit bis zum ersten Token (s)")
+    parser.add_argument("--ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--model-ttft", action="append", metavar="MODELL=MEDIAN:SIGMA",
+                        help="Latenz pro Modell (mehrfach möglich)")
+    parser.add_argument("--tps", type=float, default=60.0, help="Ausgabe-Token pro Sekunde")
+    parser.add_argument("--thinking-tps", type=float, default=150.0)
+    parser.add_argument("--reject-thinking", action="append", default=[], metavar="MODELL")
+    parser.add_argument("--reject-structured", action="append", default=[], metavar="MODELL")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--broken-rate", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Faktor für alle Wartezeiten")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def profile_from_args(args: argparse.Namespace) -> StandinProfile:
+    return StandinProfile(
+        ttft_median=args.ttft, ttft_sigma=args.ttft_sigma, tokens_per_second=args.tps,
+        thinking_tokens_per_second=args.thinking_tps, model_ttft=_model_ttft(args.model_ttft),
+        reject_thinking=tuple(args.reject_thinking), reject_structured=tuple(args.reject_structured),
+        error_rate=args.error_rate, malformed_rate=args.malformed_rate, broken_rate=args.broken_rate,
+        time_scale=args.time_scale, seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    standin = LLMStandin(profile_from_args(args), host=args.host, port=args.port)
+    print(f"LLM-Stand-in läuft auf {standin.base_url} (Strg+C beendet)")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+        print(json.dumps(standin.stats, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,14 +6,23 @@ from dataclasses import dataclass, asdict
 import os
 import shutil
 import logging
+import threading
 
 try:
     import psutil  # type: ignore
 except Exception:  # pragma: no cover - optional dependency
     psutil = None
 
+from metrics import registry
+
 logger = logging.getLogger(__name__)
 
+_CACHE_HITS = registry.counter('cache_hits_total', 'Cache-Treffer', ('cache',))
+_CACHE_MISSES = registry.counter('cache_misses_total', 'Cache-Fehlzugriffe (fehlend, abgelaufen, Abhängigkeit)', ('cache',))
+_CACHE_EVICTIONS = registry.counter('cache_evictions_total', 'Verdrängte Cache-Einträge', ('cache', 'reason'))
+_CACHE_BYTES = registry.gauge('cache_bytes', 'Serialisierte Größe aller Cache-Einträge', ('cache',))
+_CACHE_ENTRIES = registry.gauge('cache_entries', 'Anzahl der Cache-Einträge', ('cache',))
+
 
 @dataclass
 class CacheEntry:
@@ -33,15 +42,27 @@ class IntelligentCache:
     automatischer Speicherbereinigung.
     """
 
-    def __init__(self, cache_dir: str = "/tmp/cache"):
+    def __init__(self, cache_dir: str = "/tmp/cache", name: Optional[str] = None):
         """Initialisiert den IntelligentCache.
         
         Args:
             cache_dir (str): Verzeichnis für Cache-Dateien
+            name (str): Label für Metriken (Default: Verzeichnisname)
         """
         self.cache_dir = cache_dir
+        self.name = name or os.path.basename(os.path.normpath(cache_dir)) or "cache"
         self._entries = {}
+        # Zugriffe kommen aus mehreren Worker-Threads (asyncio.to_thread);
+        # reentrant, weil get/set intern invalidate aufrufen
+        self._lock = threading.RLock()
+        # Serialisierte Größe pro Key, laufend nachgeführt (kein Durchlauf beim Scrape)
+        self._sizes = {}
+        self._bytes = 0
+        self._hits = _CACHE_HITS.labels(self.name)
+        self._misses = _CACHE_MISSES.labels(self.name)
         self._load_all()
+        _CACHE_BYTES.set_function(lambda: self._bytes, cache=self.name)
+        _CACHE_ENTRIES.set_function(lambda: len(self._entries), cache=self.name)
         self._memory_limit_mb = 100  # Default memory limit
         self._adaptive_ttl = True
         self._memory_pressure_threshold = 80  # Memory usage percentage
@@ -57,93 +78,117 @@ class IntelligentCache:
             if filename.endswith('.json'):
                 key = filename[:-5]
                 try:
-                    with open(os.path.join(self.cache_dir, filename), 'r') as f:
+                    path = os.path.join(self.cache_dir, filename)
+                    with open(path, 'r') as f:
                         data = json.load(f)
                         self._entries[key] = CacheEntry(**data)
+                    self._track_size(key, os.path.getsize(path))
                 except Exception as e:
                     logger.warning(f"Failed to load cache entry {key}: {e}")
                     continue
 
+    def _track_size(self, key: str, size: int):
+        """Update the running byte total for a key (0 = removed)"""
+        self._bytes += size - self._sizes.pop(key, 0)
+        if size:
+            self._sizes[key] = size
+
     def _save_entry(self, key: str, entry: CacheEntry):
         """Save cache entry to disk"""
         try:
+            data = json.dumps(asdict(entry)).encode('utf-8')
+            self._track_size(key, len(data))
             os.makedirs(self.cache_dir, exist_ok=True)
-            with open(os.path.join(self.cache_dir, f"{key}.json"), 'w') as f:
-                json.dump(asdict(entry), f)
+            with open(os.path.join(self.cache_dir, f"{key}.json"), 'wb') as f:
+                f.write(data)
         except Exception as e:
             logger.error(f"Failed to save cache entry {key}: {e}")
 
     def get(self, key: str, default=None) -> Optional[Any]:
         """Get cached data with TTL and dependency check"""
-        if key not in self._entries:
-            return default
-
-        entry = self._entries[key]
+        with self._lock:
+            if key not in self._entries:
+                self._misses.inc()
+                return default
 
-        # Check TTL
-        if time.time() - entry.timestamp > entry.ttl:
-            logger.debug(f"Cache entry {key} expired (TTL: {entry.ttl}s)")
-            self.invalidate(key)
-            return default
+            entry = self._entries[key]
 
-        # Check dependencies
-        for dep in entry.depends_on:
-            if dep not in self._entries:
-                logger.debug(f"Cache entry {key} invalidated (dependency {dep} missing)")
+            # Check TTL
+            if time.time() - entry.timestamp > entry.ttl:
+                logger.debug(f"Cache entry {key} expired (TTL: {entry.ttl}s)")
                 self.invalidate(key)
+                self._misses.inc()
+                _CACHE_EVICTIONS.labels(self.name, 'ttl').inc()
                 return default
 
-        # Update access metrics
-        entry.access_count += 1
-        entry.last_access = time.time()
+            # Check dependencies
+            for dep in entry.depends_on:
+                if dep not in self._entries:
+                    logger.debug(f"Cache entry {key} invalidated (dependency {dep} missing)")
+                    self.invalidate(key)
+                    self._misses.inc()
+                    _CACHE_EVICTIONS.labels(self.name, 'dependency').inc()
+                    return default
+
+            self._hits.inc()
 
-        # Adaptive TTL adjustment based on access frequency
-        if self._adaptive_ttl and entry.access_count > 5:
-            self._adjust_ttl_automatically(key)
+            # Update access metrics
+            entry.access_count += 1
+            entry.last_access = time.time()
 
-        return entry.data
+            # Adaptive TTL adjustment based on access frequency
+            if self._adaptive_ttl and entry.access_count > 5:
+                self._adjust_ttl_automatically(key)
+
+            return entry.data
 
     def set(self, key: str, data: Any, ttl: int = 300, depends_on: List[str] = None):
         """Set cache entry with TTL and dependencies"""
-        if depends_on is None:
-            depends_on = []
-
-        entry = CacheEntry(
-            data=data,
-            timestamp=time.time(),
-            ttl=ttl,
-            depends_on=depends_on,
-            access_count=0,
-            last_access=time.time()
-        )
-        self._entries[key] = entry
-        self._save_entry(key, entry)
+        with self._lock:
+            if depends_on is None:
+                depends_on = []
+
+            entry = CacheEntry(
+                data=data,
+                timestamp=time.time(),
+                ttl=ttl,
+                depends_on=depends_on,
+                access_count=0,
+                last_access=time.time()
+            )
+            self._entries[key] = entry
+            self._save_entry(key, entry)
 
-        # Check memory pressure after adding new entry
-        self._check_memory_pressure()
+            # Check memory pressure after adding new entry
+            self._check_memory_pressure()
 
     def invalidate(self, key: str):
         """Invalidate cache entry and all dependents"""
-        if key in self._entries:
-            del self._entries[key]
-            try:
-                os.remove(os.path.join(self.cache_dir, f"{key}.json"))
-            except OSError:
-                pass
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self._track_size(key, 0)
+                try:
+                    os.remove(os.path.join(self.cache_dir, f"{key}.json"))
+                except OSError:
+                    pass
 
-        # Invalidate dependents (recursive)
-        for other_key, entry in list(self._entries.items()):
-            if key in entry.depends_on:
-                self.invalidate(other_key)
+            # Invalidate dependents (recursive)
+            for other_key, entry in list(self._entries.items()):
+                if key in entry.depends_on:
+                    self.invalidate(other_key)
 
     def clear(self):
         """Clear entire cache"""
-        self._entries.clear()
-        if os.path.exists(self.cache_dir):
-            try:
-                shutil.rmtree(self.cache_dir)
-            except OSError as e:
-                logger.error(f"Failed to clear cache directory: {e}")
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            if os.path.exists(self.cache_dir):
+                try:
+                    shutil.rmtree(self.cache_dir)
+                except OSError as e:
+                    logger.error(f"Failed to clear cache directory: {e}")
 
     def get_stats(self) -> dict:
         """Get cache statistics"""
@@ -199,6 +244,7 @@ class IntelligentCache:
             
             freed_mb += self._estimate_entry_size(entry)
             self.invalidate(key)
+            _CACHE_EVICTIONS.labels(self.name, 'memory').inc()
 
         logger.info(f"Freed {freed_mb:.1f} MB by cleaning up least used cache entries")
 
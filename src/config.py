@@ -38,10 +38,18 @@ PRICE_ALERT_THRESHOLD_DOWN = float(os.getenv("PRICE_ALERT_THRESHOLD_DOWN", 0.15)
 PAUSE_STATE_PATH = "/tmp_docker/SlopCoin_paused.json"
 BASELINE_PATH = os.getenv("BASELINE_PATH", "/tmp_docker/portfolio_baseline.json")
 PERFORMANCE_HISTORY_PATH = os.getenv("PERFORMANCE_HISTORY_PATH", "/tmp_docker/performance_history.json")
+LOT_LEDGER_PATH = os.getenv("LOT_LEDGER_PATH", "/tmp_docker/lot_ledger.json")
+TIMESERIES_PATH = os.getenv("TIMESERIES_PATH", "/tmp_docker/portfolio_timeseries.npz")
+SIGNAL_GATE_LOG_PATH = os.getenv("SIGNAL_GATE_LOG_PATH", "/tmp_docker/signal_gate.jsonl")
+PROMPT_CONTEXT_PATH = os.getenv("PROMPT_CONTEXT_PATH", "/tmp_docker/prompt_context.json")
+BASELINE_WATCH_EXTERNAL = os.getenv("BASELINE_WATCH_EXTERNAL", "false").lower() == "true"  # Baseline-Datei wird auch extern geändert
+BASELINE_REVALIDATE_SECONDS = float(os.getenv("BASELINE_REVALIDATE_SECONDS", 60))  # Nur mit BASELINE_WATCH_EXTERNAL: max. Alter ohne stat()
 
 # ── Timeout-Konfiguration ─────────────────────────────────────────────────────
 API_TIMEOUT = int(os.getenv("API_TIMEOUT", 30))
 OPENAI_TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", 300))   # 300s für Extended Thinking
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))          # HTTP-Verbindungspool zum LLM-Proxy
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 5))  # Offen gehaltene Verbindungen
 CCXT_TIMEOUT = int(os.getenv("CCXT_TIMEOUT", 30))
 CCXT_TIMEOUT_SECONDS = CCXT_TIMEOUT  # Alias für data_fetcher
 
@@ -60,17 +68,115 @@ MARKET_OVERVIEW_TOP_N = int(os.getenv("MARKET_OVERVIEW_TOP_N", 20))
 VOLATILITY_LOOKBACK = int(os.getenv("VOLATILITY_LOOKBACK", 30))         # Anzahl Preis-Punkte für Volatilität
 MAX_HISTORY_PER_COIN = int(os.getenv("MAX_HISTORY_PER_COIN", 1000))     # Max Einträge pro Coin
 MAX_TOTAL_HISTORY_ENTRIES = int(os.getenv("MAX_TOTAL_HISTORY_ENTRIES", 8000))  # Max Gesamt-Einträge
+MACD_CROSSOVER_LOOKBACK = int(os.getenv("MACD_CROSSOVER_LOOKBACK", 6))   # Kerzen (4h) für MACD-Crossover (6 = 24h)
+CORRELATION_MIN_POINTS = int(os.getenv("CORRELATION_MIN_POINTS", 3))    # Min. gemeinsame Rasterpunkte für Korrelation
+RISK_EWMA_DECAY = float(os.getenv("RISK_EWMA_DECAY", 0.94))             # EWMA-Zerfallsfaktor λ (RiskMetrics)
+RISK_STATE_MIN_OBSERVATIONS = int(os.getenv("RISK_STATE_MIN_OBSERVATIONS", 10))  # Returns bis EWMA-Schätzer genutzt werden
+RISK_EWMA_STEP_SECONDS = int(os.getenv("RISK_EWMA_STEP_SECONDS", 86400))   # Fester Return-Horizont des EWMA-Zustands (1 Tag)
+
+# ── Einstandspreise (Lot-Ledger aus Kraken-Trades) ───────────────────────────
+COST_BASIS_METHOD = os.getenv("COST_BASIS_METHOD", "FIFO").upper()       # FIFO, LIFO oder AVG
+TRADE_SYNC_PAGE_LIMIT = int(os.getenv("TRADE_SYNC_PAGE_LIMIT", 50))      # Trades pro fetch_my_trades-Seite (Kraken: 50)
+TRADE_SYNC_MAX_PAGES = int(os.getenv("TRADE_SYNC_MAX_PAGES", 200))       # Obergrenze pro Sync-Lauf
+
+# ── Portfolio-Zeitreihen (Snapshots mit Downsampling) ─────────────────────────
+TIMESERIES_RAW_RETENTION_HOURS = float(os.getenv("TIMESERIES_RAW_RETENTION_HOURS", 24))   # Rohdaten, danach stündlich
+TIMESERIES_HOURLY_RETENTION_DAYS = float(os.getenv("TIMESERIES_HOURLY_RETENTION_DAYS", 30))  # Stundenwerte, danach täglich
+TIMESERIES_SAVE_INTERVAL_SECONDS = int(os.getenv("TIMESERIES_SAVE_INTERVAL_SECONDS", 3600))  # Gebündeltes Speichern der Snapshots
+
+# ── Portfolio-VaR/CVaR (Monte Carlo + gefilterte historische Simulation) ─────
+PORTFOLIO_VAR_PATHS = int(os.getenv("PORTFOLIO_VAR_PATHS", 100000))        # Simulierte Pfade
+PORTFOLIO_VAR_CONFIDENCES = tuple(
+    float(c) for c in os.getenv("PORTFOLIO_VAR_CONFIDENCES", "0.95,0.99,0.999").split(",") if c.strip()
+)
+PORTFOLIO_VAR_MEMORY_MB = float(os.getenv("PORTFOLIO_VAR_MEMORY_MB", 32))  # Speicherbudget pro Simulations-Chunk
+PORTFOLIO_VAR_WORKERS = int(os.getenv("PORTFOLIO_VAR_WORKERS", 1))         # Prozesse für Monte Carlo
+PORTFOLIO_FHS_MIN_RETURNS = int(os.getenv("PORTFOLIO_FHS_MIN_RETURNS", 20))  # Min. Returns für historische Simulation
+PORTFOLIO_VAR_SEED = int(os.getenv("PORTFOLIO_VAR_SEED", 42))              # Fester Seed → reproduzierbare Ergebnisse
+PORTFOLIO_VAR_INTERVAL_SECONDS = int(os.getenv("PORTFOLIO_VAR_INTERVAL_SECONDS", 21600))  # Eigener Job (6h)
 
 # ── Prompt-Optimierung ────────────────────────────────────────────────────────
 PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "True").lower() == "true"
 PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", 3600))             # Prompt-Cache TTL in Sekunden
 TOKEN_OPTIMIZATION_ENABLED = os.getenv("TOKEN_OPTIMIZATION_ENABLED", "True").lower() == "true"
-MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", 2500))
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", 6000))      # Token-Budget pro Prompt (inkl. Template)
+# Kürzbare Prompt-Abschnitte, wichtigster zuerst (portfolio und proposal werden nie gekürzt)
+PROMPT_SECTION_PRIORITY = tuple(
+    s.strip() for s in os.getenv(
+        "PROMPT_SECTION_PRIORITY", "risk_metrics,performance_data,portfolio_indicators,market_overview"
+    ).split(",") if s.strip()
+)
+PROMPT_COMPACT_ENABLED = os.getenv("PROMPT_COMPACT_ENABLED", "True").lower() == "true"  # CSV/kompaktes JSON statt indent=2
+PROMPT_SIGNIFICANT_DIGITS = int(os.getenv("PROMPT_SIGNIFICANT_DIGITS", 5))  # Signifikante Stellen für Zahlen im Prompt
+
+# ── LLM-Antwort-Cache ─────────────────────────────────────────────────────────
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+LLM_RESPONSE_CACHE_DIR = os.getenv("LLM_RESPONSE_CACHE_DIR", "/tmp/cache/llm_responses")
+LLM_CACHE_PRICE_BUCKET = float(os.getenv("LLM_CACHE_PRICE_BUCKET", 0.005))   # Preis-Bucket (relativ, 0.005 = 0.5%)
+LLM_CACHE_WEIGHT_STEP = float(os.getenv("LLM_CACHE_WEIGHT_STEP", 5))        # Raster für Portfolio-Gewichte (Prozentpunkte)
+LLM_CACHE_TTL_MARKET = int(os.getenv("LLM_CACHE_TTL_MARKET", 21600))         # Markt-Analyse (Sekunden)
+LLM_CACHE_TTL_NEXT_INVEST = int(os.getenv("LLM_CACHE_TTL_NEXT_INVEST", 1800))  # /next-Empfehlung (Sekunden)
+LLM_CACHE_TTL_WEEKLY = int(os.getenv("LLM_CACHE_TTL_WEEKLY", 0))             # Weekly Summary (0 = nicht cachen)
+
+# ── Delta-Prompting (Markt-Analyse) ───────────────────────────────────────────
+PROMPT_DELTA_ENABLED = os.getenv("PROMPT_DELTA_ENABLED", "True").lower() == "true"
+PROMPT_DELTA_FULL_REFRESH_CYCLES = int(os.getenv("PROMPT_DELTA_FULL_REFRESH_CYCLES", 7))  # Vollständiger Prompt alle N Zyklen
+PROMPT_DELTA_PRICE_THRESHOLD = float(os.getenv("PROMPT_DELTA_PRICE_THRESHOLD", 0.03))     # Preisbewegung, ab der ein Coin gemeldet wird
+PROMPT_DELTA_METRIC_THRESHOLD = float(os.getenv("PROMPT_DELTA_METRIC_THRESHOLD", 0.05))   # Relative Änderung für Risiko-Metriken
+PROMPT_DELTA_SUMMARY_LENGTH = int(os.getenv("PROMPT_DELTA_SUMMARY_LENGTH", 5))            # Anzahl gemerkter Schlussfolgerungen
+
+# ── Signal-Gate (regelbasierter Vorfilter vor der LLM-Analyse) ────────────────
+SIGNAL_GATE_ENABLED = os.getenv("SIGNAL_GATE_ENABLED", "True").lower() == "true"
+SIGNAL_GATE_RSI_LOW = float(os.getenv("SIGNAL_GATE_RSI_LOW", 30))                  # RSI darunter = überverkauft
+SIGNAL_GATE_RSI_HIGH = float(os.getenv("SIGNAL_GATE_RSI_HIGH", 70))                # RSI darüber = überkauft
+SIGNAL_GATE_DRAWDOWN_PCT = float(os.getenv("SIGNAL_GATE_DRAWDOWN_PCT", 15))        # Aktueller Drawdown eines Coins in %
+SIGNAL_GATE_CONCENTRATION_PCT = float(os.getenv("SIGNAL_GATE_CONCENTRATION_PCT", 50))  # Max. Gewicht eines Coins in %
+SIGNAL_GATE_MAX_SKIP_DAYS = float(os.getenv("SIGNAL_GATE_MAX_SKIP_DAYS", 7))       # Spätestens nach so vielen Tagen analysieren
+SIGNAL_GATE_LOG_MAX_BYTES = int(os.getenv("SIGNAL_GATE_LOG_MAX_BYTES", 5_000_000))  # Log-Größe bis zur Rotation (eine Vorgänger-Datei .1)
+
+# ── Zyklus-Tracing (Spans pro Stufe, /debug/cycles) ───────────────────────────
+CYCLE_TRACE_ENABLED = os.getenv("CYCLE_TRACE_ENABLED", "True").lower() == "true"
+CYCLE_TRACE_BUFFER_SIZE = int(os.getenv("CYCLE_TRACE_BUFFER_SIZE", 20))            # Anzahl aufbewahrter Zyklen (Ringpuffer)
+CYCLE_PROFILE_SAMPLE_RATE = float(os.getenv("CYCLE_PROFILE_SAMPLE_RATE", 0.0))     # Anteil der Zyklen mit cProfile pro Stufe (0 = aus)
+CYCLE_PROFILE_TOP_N = int(os.getenv("CYCLE_PROFILE_TOP_N", 15))                    # Gespeicherte Funktionen pro Stufen-Profil
+
+# ── Metriken (/metrics im Prometheus-Format) ──────────────────────────────────
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "SlopCoin")
+EXCHANGE_LATENCY_BUCKETS = tuple(
+    float(b) for b in os.getenv("EXCHANGE_LATENCY_BUCKETS", "0.05,0.1,0.25,0.5,1,2,5,10,30").split(",") if b.strip()
+)  # Sekunden pro Kraken-Aufruf
+RETRY_DELAY_BUCKETS = tuple(
+    float(b) for b in os.getenv("RETRY_DELAY_BUCKETS", "0.5,1,2,5,10,30,60").split(",") if b.strip()
+)  # Wartezeit vor einem erneuten Versuch
+JOB_DURATION_BUCKETS = tuple(
+    float(b) for b in os.getenv("JOB_DURATION_BUCKETS", "0.1,0.5,1,5,10,30,60,120,300,600").split(",") if b.strip()
+)  # Laufzeit und Verspätung geplanter Jobs
 
 # ── Fehler-Resilienz ──────────────────────────────────────────────────────────
 MAX_LLM_RETRY_ATTEMPTS = int(os.getenv("MAX_LLM_RETRY_ATTEMPTS", 3))
 LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 1.0))
 LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 10.0))
+LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING_ENABLED", "True").lower() == "true"  # Antworten streamen, JSON inkrementell prüfen
+LLM_STRUCTURED_OUTPUT_MODE = os.getenv("LLM_STRUCTURED_OUTPUT_MODE", "json_schema")   # json_schema | json_object | off
+LLM_JSON_REASK_ENABLED = os.getenv("LLM_JSON_REASK_ENABLED", "True").lower() == "true"  # Kaputtes JSON gezielt korrigieren lassen
+LLM_JSON_REASK_MAX_TOKENS = int(os.getenv("LLM_JSON_REASK_MAX_TOKENS", 4000))  # Max. Ausgabe-Tokens der Korrektur-Anfrage
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "True").lower() == "true"  # Backup-Anfrage bei langsamem ersten Token
+LLM_HEDGE_BACKUP_MODEL = os.getenv("LLM_HEDGE_BACKUP_MODEL", AI_MODEL_GUARDIAN)  # Modell für die Hedge-Anfrage
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))      # Perzentil der Zeit bis zum ersten Token
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 10))      # Messwerte, bevor das Perzentil gilt
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", 60.0))  # Schwellenwert bis dahin (Sekunden)
+LLM_HEDGE_HISTORY = int(os.getenv("LLM_HEDGE_HISTORY", 50))              # Messwerte pro Modell
+
+# ── LLM-Kosten & Latenz ───────────────────────────────────────────────────────
+PRICE_TABLE_PATH = os.getenv(
+    "PRICE_TABLE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prices.csv")
+)  # Preise pro Modell (USD pro 1 Mio. Token)
+LLM_LATENCY_BUCKETS = tuple(
+    float(b) for b in os.getenv("LLM_LATENCY_BUCKETS", "1,2,5,10,20,30,60,120,300").split(",") if b.strip()
+)  # Histogramm-Grenzen Latenz (Sekunden)
+LLM_TOKEN_BUCKETS = tuple(
+    float(b) for b in os.getenv("LLM_TOKEN_BUCKETS", "250,500,1000,2000,4000,8000,16000,32000").split(",") if b.strip()
+)  # Histogramm-Grenzen Token
 
 # ── Kosten-Optimierung ────────────────────────────────────────────────────────
 # Token-Limits müssen budget_tokens + Output-Tokens umfassen wenn Thinking aktiv ist
@@ -86,3 +192,19 @@ THINKING_ENABLED = os.getenv("THINKING_ENABLED", "True").lower() == "true"
 THINKING_BUDGET_ANALYST = int(os.getenv("THINKING_BUDGET_ANALYST", 10000))       # Tokens zum Denken (Analyst)
 THINKING_BUDGET_GUARDIAN = int(os.getenv("THINKING_BUDGET_GUARDIAN", 5000))      # Tokens zum Denken (Guardian)
 THINKING_BUDGET_NEXT_INVEST = int(os.getenv("THINKING_BUDGET_NEXT_INVEST", 8000)) # Tokens zum Denken (/next)
+THINKING_MIN_BUDGET = int(os.getenv("THINKING_MIN_BUDGET", 1024))              # Kleinstes sinnvolles Budget (sonst aus)
+
+# ── Modell-Routing ────────────────────────────────────────────────────────────
+LLM_ROUTER_ENABLED = os.getenv("LLM_ROUTER_ENABLED", "True").lower() == "true"
+# Ausweich-Modelle, von stark nach schnell/günstig (werden nach dem Standard-Modell geprüft)
+LLM_ROUTER_FALLBACK_MODELS = tuple(
+    m.strip() for m in os.getenv("LLM_ROUTER_FALLBACK_MODELS", "claude-sonnet-4-6,claude-haiku-4-5").split(",") if m.strip()
+)
+LLM_ROUTER_P95_TARGET_CYCLE = float(os.getenv("LLM_ROUTER_P95_TARGET_CYCLE", 240))    # Ziel-p95 täglicher Zyklus (s)
+LLM_ROUTER_P95_TARGET_NEXT = float(os.getenv("LLM_ROUTER_P95_TARGET_NEXT", 90))       # Ziel-p95 /next (s)
+LLM_ROUTER_P95_TARGET_WEEKLY = float(os.getenv("LLM_ROUTER_P95_TARGET_WEEKLY", 300))  # Ziel-p95 Weekly Summary (s)
+LLM_ROUTER_MAX_CALL_COST = float(os.getenv("LLM_ROUTER_MAX_CALL_COST", 0.50))        # Max. geschätzte Kosten pro Aufruf (USD)
+LLM_ROUTER_MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", 0.5))       # Fehlerquote (EWMA), ab der ausgewichen wird
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", 5))                 # Messwerte, bevor p95 zählt
+LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", 0.2))               # Gewicht des neuesten Messwerts
+LLM_ROUTER_PROBE_INTERVAL = float(os.getenv("LLM_ROUTER_PROBE_INTERVAL", 1800))      # Pause (s), nach der ein gemiedenes Modell erneut versucht wird
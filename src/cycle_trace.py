@@ -0,0 +1,222 @@
+"""
+Leichtgewichtiges Tracing des Analyse-Zyklus.
+
+Ein Zyklus (z.B. run_cycle) wird mit ``tracer.cycle()`` geöffnet, jede Stufe
+darin mit ``tracer.span()``. Spans bilden einen Baum, gemessen wird mit der
+monotonen Uhr (perf_counter_ns). Die Bäume der letzten CYCLE_TRACE_BUFFER_SIZE
+Zyklen liegen in einem Ringpuffer, den der Health-Server unter /debug/cycles
+ausliefert – als JSON-Baum oder als Chrome-Trace (chrome://tracing, Perfetto).
+
+Außerhalb eines Zyklus ist ``span()`` ein No-op; Module wie llm_engine
+können Spans daher unabhängig vom Aufrufer setzen. Der aktuelle Span liegt
+in einer ContextVar und folgt so auch ``await``-Ketten.
+
+Optional wird ein Anteil der Zyklen (CYCLE_PROFILE_SAMPLE_RATE) pro Stufe
+der obersten Ebene mit cProfile aufgezeichnet; gespeichert werden nur die
+teuersten Funktionen nach kumulierter Zeit. Da die Event-Loop während eines
+``await`` andere Tasks ausführt, können diese im Profil einer Stufe auftauchen.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import (
+    CYCLE_TRACE_ENABLED, CYCLE_TRACE_BUFFER_SIZE, CYCLE_PROFILE_SAMPLE_RATE, CYCLE_PROFILE_TOP_N,
+)
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("cycle_trace_span", default=None)
+
+
+class Span:
+    """Eine gemessene Stufe mit Kind-Spans."""
+
+    __slots__ = ("name", "attrs", "start_ns", "end_ns", "children", "error", "profile", "parent", "wall_start",
+                 "sampled")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attrs: Any):
+        self.name = name
+        self.attrs: Dict[str, Any] = attrs
+        self.parent = parent
+        self.children: List[Span] = []
+        self.error: Optional[str] = None
+        self.profile: Optional[List[Dict[str, Any]]] = None
+        self.sampled = False
+        self.wall_start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self, origin_ns: Optional[int] = None) -> Dict[str, Any]:
+        """Span-Baum als JSON-taugliches Dict (Offsets relativ zum Zyklus-Start)."""
+        origin_ns = self.start_ns if origin_ns is None else origin_ns
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "offset_ms": round((self.start_ns - origin_ns) / 1e6, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.profile:
+            data["profile"] = self.profile
+        if self.children:
+            data["children"] = [child.to_dict(origin_ns) for child in self.children]
+        return data
+
+
+def _profile_summary(profiler: cProfile.Profile, top_n: int) -> List[Dict[str, Any]]:
+    """Teuerste Funktionen eines Profils nach kumulierter Zeit."""
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top_n]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+class CycleTracer:
+    """Sammelt Span-Bäume der letzten Zyklen in einem Ringpuffer."""
+
+    def __init__(self, capacity: int = CYCLE_TRACE_BUFFER_SIZE, profile_rate: float = CYCLE_PROFILE_SAMPLE_RATE,
+                 profile_top_n: int = CYCLE_PROFILE_TOP_N, enabled: bool = CYCLE_TRACE_ENABLED):
+        """
+        Args:
+            capacity: Anzahl der aufbewahrten Zyklen
+            profile_rate: Anteil der Zyklen mit cProfile pro Stufe (0 = aus)
+            profile_top_n: Gespeicherte Funktionen pro Stufen-Profil
+            enabled: False = cycle() und span() sind No-ops
+        """
+        self.enabled = enabled
+        self.profile_rate = profile_rate
+        self.profile_top_n = profile_top_n
+        self._cycles: deque = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def cycle(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Öffnet einen Zyklus (Wurzel-Span); nach dem Ende landet er im Ringpuffer."""
+        if not self.enabled:
+            yield None
+            return
+        root = Span(name, **attrs)
+        root.sampled = self.profile_rate > 0 and random.random() < self.profile_rate
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            root.end_ns = time.perf_counter_ns()
+            _current.reset(token)
+            with self._lock:
+                self._cycles.append(root)
+            logger.debug(f"Zyklus '{name}' in {root.duration_ms:.1f} ms: "
+                         + ", ".join(f"{c.name}={c.duration_ms:.0f}ms" for c in root.children))
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Misst eine Stufe als Kind des aktuellen Spans (No-op ohne offenen Zyklus)."""
+        parent = _current.get()
+        if parent is None or parent.end_ns is not None:
+            # Kein Zyklus offen (oder Hintergrund-Task eines beendeten Zyklus)
+            yield None
+            return
+        span = Span(name, parent, **attrs)
+        parent.children.append(span)
+        token = _current.set(span)
+        profiler = None
+        if parent.parent is None and parent.sampled:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Anderer Profiler aktiv (z.B. paralleler Zyklus) – diese Stufe ohne Profil
+                profiler = None
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            if profiler is not None:
+                profiler.disable()
+                span.profile = _profile_summary(profiler, self.profile_top_n)
+            _current.reset(token)
+
+    def annotate(self, **attrs: Any) -> None:
+        """Ergänzt Attribute am Wurzel-Span des laufenden Zyklus (z.B. outcome)."""
+        span = _current.get()
+        while span is not None and span.parent is not None:
+            span = span.parent
+        if span is not None:
+            span.attrs.update(attrs)
+
+    def recent(self, limit: Optional[int] = None) -> List[Span]:
+        """Abgeschlossene Zyklen, neuester zuletzt."""
+        with self._lock:
+            cycles = list(self._cycles)
+        return cycles[-limit:] if limit else cycles
+
+    def to_json(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Zyklen als JSON-Bäume (neuester zuerst)."""
+        result = []
+        for root in reversed(self.recent(limit)):
+            data = root.to_dict()
+            data["started_at"] = root.wall_start
+            result.append(data)
+        return result
+
+    def chrome_trace(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Zyklen im Chrome-Trace-Format (Complete Events, eine Zeile pro Zyklus)."""
+        events: List[Dict[str, Any]] = []
+        for tid, root in enumerate(self.recent(limit), start=1):
+            # Wanduhr-Anker pro Zyklus, damit Zyklen zeitlich korrekt nebeneinander liegen
+            origin_us = root.wall_start * 1e6
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                           "args": {"name": f"{root.name} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(root.wall_start))}"}})
+            stack = [root]
+            while stack:
+                span = stack.pop()
+                args = dict(span.attrs)
+                if span.error:
+                    args["error"] = span.error
+                events.append({
+                    "name": span.name, "cat": "cycle", "ph": "X", "pid": 1, "tid": tid,
+                    "ts": round(origin_us + (span.start_ns - root.start_ns) / 1e3, 1),
+                    "dur": round(span.duration_ms * 1e3, 1),
+                    "args": args,
+                })
+                stack.extend(span.children)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str, limit: Optional[int] = None) -> None:
+        """Schreibt den Chrome-Trace als JSON-Datei."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(limit), f, default=str)
+
+
+# Modul-Singleton: run_cycle öffnet Zyklen, andere Module setzen Spans
+tracer = CycleTracer()
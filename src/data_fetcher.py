@@ -12,12 +12,36 @@ from config import (
     PRICE_CACHE_TTL, PRICE_CACHE_TTL_STATIC, PRICE_CACHE_TTL_MIN, PRICE_CACHE_TTL_MAX,
     VOLATILITY_LOOKBACK, MAX_HISTORY_PER_COIN, MAX_TOTAL_HISTORY_ENTRIES,
     INDICATOR_CACHE_TTL, PORTFOLIO_CACHE_TTL, MARKET_OVERVIEW_TOP_N,
+    TRADE_SYNC_PAGE_LIMIT, TRADE_SYNC_MAX_PAGES, MACD_CROSSOVER_LOOKBACK,
+    EXCHANGE_LATENCY_BUCKETS,
 )
 from cache_manager import IntelligentCache
+from metrics import registry
 from retry import retry
 
 logger = logging.getLogger(__name__)
 
+_EXCHANGE_REQUESTS = registry.counter('exchange_requests_total', 'Exchange-API-Aufrufe', ('endpoint', 'status'))
+_EXCHANGE_LATENCY = registry.histogram('exchange_request_seconds', 'Latenz der Exchange-API-Aufrufe',
+                                       ('endpoint',), EXCHANGE_LATENCY_BUCKETS)
+
+
+def _timed(endpoint: str, fn, *args, **kwargs):
+    """Ruft eine ccxt-Methode auf und zählt Latenz und Ergebnis pro Endpoint.
+
+    Jeder einzelne Versuch wird gezählt, Retries erscheinen also mit status="error".
+    """
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        status = 'rate_limited' if isinstance(e, ccxt.RateLimitExceeded) else 'error'
+        raise
+    finally:
+        _EXCHANGE_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        _EXCHANGE_REQUESTS.labels(endpoint, status).inc()
+
 # Intelligenter Cache (Singleton auf Modul-Ebene)
 cache_manager = IntelligentCache(cache_dir="/tmp/cache")
 
@@ -25,13 +49,35 @@ cache_manager = IntelligentCache(cache_dir="/tmp/cache")
 class MarketData:
     """Marktdatenabrufe von Kraken Exchange via CCXT."""
 
-    def __init__(self, secrets_path: str = None):
+    def __init__(self, secrets_path: str = None, exchange: Any = None):
         """Initialisiert MarketData mit Kraken API Verbindung.
 
         Args:
             secrets_path: Pfad zur Kraken API JSON-Datei.
                           Default: KRAKEN_API_PATH aus config
+            exchange: Fertiges ccxt-kompatibles Exchange-Objekt (z.B. Stand-in
+                      für Benchmarks); dann werden keine Credentials gelesen
         """
+        if exchange is not None:
+            self.exchange = exchange
+        else:
+            self.exchange = self._create_exchange(secrets_path)
+
+        # Markets einmalig laden für Verfügbarkeitsprüfung (mit Retry)
+        try:
+            self._load_markets_with_retry()
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der Markets nach Retry: {e}")
+            self.markets = {}
+
+        # Preis-Historie für Volatilitätsberechnung (in-memory)
+        self._price_history: Dict[str, List[float]] = {}
+
+    # ── Interne Hilfsmethoden ────────────────────────────────────────────────
+
+    @staticmethod
+    def _create_exchange(secrets_path: Optional[str]) -> ccxt.kraken:
+        """Erstellt die Read-Only Kraken-Verbindung aus der Credentials-Datei."""
         if secrets_path is None:
             secrets_path = KRAKEN_API_PATH
 
@@ -43,29 +89,18 @@ class MarketData:
             raise
 
         # Read-Only Verbindung zu Kraken
-        self.exchange = ccxt.kraken({
+        exchange = ccxt.kraken({
             'apiKey': creds['key'],
             'secret': creds['secret'],
             'enableRateLimit': True,
         })
         # Globalen Timeout für alle Requests setzen (ms)
         try:
-            self.exchange.timeout = CCXT_TIMEOUT_SECONDS * 1000
+            exchange.timeout = CCXT_TIMEOUT_SECONDS * 1000
         except Exception as e:
             logger.warning(f"Konnte ccxt Timeout nicht setzen: {e}")
-        logger.info(f"ccxt Version: {ccxt.__version__}, Timeout: {getattr(self.exchange, 'timeout', 'unknown')} ms")
-
-        # Markets einmalig laden für Verfügbarkeitsprüfung (mit Retry)
-        try:
-            self._load_markets_with_retry()
-        except Exception as e:
-            logger.error(f"Fehler beim Laden der Markets nach Retry: {e}")
-            self.markets = {}
-
-        # Preis-Historie für Volatilitätsberechnung (in-memory)
-        self._price_history: Dict[str, List[float]] = {}
-
-    # ── Interne Hilfsmethoden ────────────────────────────────────────────────
+        logger.info(f"ccxt Version: {ccxt.__version__}, Timeout: {getattr(exchange, 'timeout', 'unknown')} ms")
+        return exchange
 
     def _update_price_history(self, coin: str, price: float, max_length: int = VOLATILITY_LOOKBACK) -> None:
         """Aktualisiert die Preis-Historie für Volatilitätsberechnung.
@@ -139,20 +174,20 @@ class MarketData:
            exceptions=(ccxt.NetworkError, ccxt.ExchangeError, ConnectionError, TimeoutError))
     def _load_markets_with_retry(self) -> None:
         """Lädt Markets mit Retry-Logik."""
-        self.markets = self.exchange.load_markets()
+        self.markets = _timed('load_markets', self.exchange.load_markets)
         logger.info(f"Markets geladen: {len(self.markets)} verfügbar")
 
     @retry(max_attempts=3, base_delay=1.0, max_delay=30.0,
            exceptions=(ccxt.NetworkError, ccxt.ExchangeError, ConnectionError, TimeoutError))
     def _fetch_balance_with_retry(self) -> Dict:
         """Holt Kontostand mit Retry-Logik."""
-        return self.exchange.fetch_balance()
+        return _timed('fetch_balance', self.exchange.fetch_balance)
 
     @retry(max_attempts=3, base_delay=1.0, max_delay=30.0,
            exceptions=(ccxt.NetworkError, ccxt.ExchangeError, ConnectionError, TimeoutError))
     def _fetch_ticker_with_retry(self, symbol: str) -> Dict:
         """Holt einzelnen Ticker mit Retry-Logik."""
-        return self.exchange.fetch_ticker(symbol)
+        return _timed('fetch_ticker', self.exchange.fetch_ticker, symbol)
 
     @retry(max_attempts=3, base_delay=1.0, max_delay=30.0,
            exceptions=(ccxt.NetworkError, ccxt.ExchangeError, ConnectionError, TimeoutError))
@@ -165,7 +200,7 @@ class MarketData:
         Returns:
             Dict mit Ticker-Daten pro Symbol
         """
-        tickers = self.exchange.fetch_tickers(symbols=symbols)
+        tickers = _timed('fetch_tickers', self.exchange.fetch_tickers, symbols=symbols)
         logger.debug(f"Batch-Tickers geladen: {len(tickers)} Coins")
         return tickers
 
@@ -182,10 +217,54 @@ class MarketData:
         Returns:
             Liste von OHLCV-Datenpunkten
         """
-        return self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        return _timed('fetch_ohlcv', self.exchange.fetch_ohlcv, symbol, timeframe, limit=limit)
+
+    @retry(max_attempts=3, base_delay=1.0, max_delay=30.0,
+           exceptions=(ccxt.NetworkError, ccxt.ExchangeError, ConnectionError, TimeoutError))
+    def _fetch_my_trades_with_retry(self, since: Optional[int] = None, limit: Optional[int] = None) -> List:
+        """Holt eigene Trades (alle Paare) mit Retry-Logik.
+
+        Args:
+            since: Startzeitpunkt in ms (inklusive)
+            limit: Maximale Anzahl Trades pro Seite
+
+        Returns:
+            Liste von Trades im ccxt-Format, aufsteigend nach Zeit
+        """
+        return _timed('fetch_my_trades', self.exchange.fetch_my_trades, since=since, limit=limit)
 
     # ── Öffentliche Datenabruf-Methoden ──────────────────────────────────────
 
+    def fetch_my_trades_since(self, since: Optional[int] = None,
+                              page_limit: int = TRADE_SYNC_PAGE_LIMIT,
+                              max_pages: int = TRADE_SYNC_MAX_PAGES) -> List[Dict]:
+        """Holt alle eigenen Trades ab einem Zeitpunkt, seitenweise.
+
+        Seiten überlappen am Grenz-Zeitstempel; Duplikate filtert der
+        Aufrufer (LotLedger) über die Trade-ID.
+
+        Args:
+            since: Startzeitpunkt in ms (None = gesamte Historie)
+            page_limit: Trades pro API-Aufruf
+            max_pages: Obergrenze an Seiten pro Aufruf (Rest beim nächsten Sync)
+
+        Returns:
+            Liste von Trades im ccxt-Format
+        """
+        trades: List[Dict] = []
+        cursor = since
+        for _ in range(max_pages):
+            page = self._fetch_my_trades_with_retry(since=cursor, limit=page_limit)
+            if not page:
+                break
+            trades.extend(page)
+            last_ts = page[-1].get('timestamp')
+            if len(page) < page_limit or last_ts is None or last_ts == cursor:
+                break
+            cursor = last_ts
+        logger.debug(f"Trades seit {since}: {len(trades)} geladen")
+        return trades
+
     def get_portfolio(self) -> Dict[str, float]:
         """Holt Kontostand-Positionen.
 
@@ -264,6 +343,9 @@ class MarketData:
         # Zuerst alle Preise aus Cache laden
         coins_to_fetch: List[Tuple[str, str]] = []
         for coin in portfolio:
+            if coin == BASE_CURRENCY:
+                # Kein Markt "EUR/EUR" – würde den Batch-Abruf scheitern lassen
+                continue
             symbol = self._normalize_symbol(coin)
             price_key = f'price_{symbol}'
             cached_price = cache_manager.get(price_key)
@@ -418,6 +500,14 @@ class MarketData:
                 macd_bullish = macd_line > macd_signal and macd_histogram > 0
                 macd_bearish = macd_line < macd_signal and macd_histogram < 0
 
+            # MACD-Crossover: Vorzeichenwechsel des Histogramms in den letzten Kerzen
+            macd_crossover: Optional[str] = None
+            if 'MACDh_12_26_9' in macd_data.columns:
+                hist_signs = np.sign(macd_data['MACDh_12_26_9'].dropna().tail(MACD_CROSSOVER_LOOKBACK + 1).to_numpy())
+                flips = np.flatnonzero(np.diff(hist_signs))
+                if flips.size:
+                    macd_crossover = "bullish" if hist_signs[flips[-1] + 1] > 0 else "bearish"
+
             # Bollinger Bands
             bb_upper = bb_data['BBU_20_2.0'].iloc[-1] if 'BBU_20_2.0' in bb_data.columns else None
             bb_middle = bb_data['BBM_20_2.0'].iloc[-1] if 'BBM_20_2.0' in bb_data.columns else None
@@ -481,6 +571,7 @@ class MarketData:
                 "macd_histogram": round(float(macd_histogram), 4) if macd_histogram is not None else None,
                 "macd_bullish": macd_bullish,
                 "macd_bearish": macd_bearish,
+                "macd_crossover": macd_crossover,
                 "bb_upper": round(float(bb_upper), 2) if bb_upper is not None else None,
                 "bb_middle": round(float(bb_middle), 2) if bb_middle is not None else None,
                 "bb_lower": round(float(bb_lower), 2) if bb_lower is not None else None,
@@ -518,6 +609,10 @@ class MarketData:
         """
         indicators: Dict[str, Optional[Dict]] = {}
         for coin in portfolio_coins:
+            if coin == BASE_CURRENCY:
+                # Basis-Währung hat keinen Markt – leere Indikatoren wie beim Fehler-Fallback
+                indicators[coin] = {}
+                continue
             try:
                 symbol = self._normalize_symbol(coin)
                 indicators[coin] = self.get_indicators(symbol)
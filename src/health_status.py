@@ -0,0 +1,79 @@
+"""
+In-Memory-Status für den Health-Check (/health).
+
+Zyklen schreiben ihren Stand (letzter Lauf, Ergebnis, Dauer, Fehlerserie,
+Portfolio-Größe) in einen vorab zusammengesetzten Snapshot. Der
+Health-Server liest nur diesen Snapshot: kein Dateizugriff, kein Parsen der
+Performance-Historie, konstante Kosten pro Probe.
+
+Schreiber ersetzen den Snapshot als Ganzes (Kopie + Referenz-Tausch), Leser
+brauchen daher keinen Lock und sehen nie einen halb aktualisierten Stand.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class HealthStatus:
+    """Vorab zusammengesetzter Status-Snapshot für /health."""
+
+    def __init__(self, container: str = "SlopCoin_advisor"):
+        """
+        Args:
+            container: Container-Name in der Antwort
+        """
+        self._started: Optional[float] = None
+        self._snapshot: Dict[str, Any] = {
+            "status": "ok",
+            "container": container,
+            "last_cycle": None,
+            "last_outcome": None,
+            "last_cycle_duration_ms": None,
+            "consecutive_errors": 0,
+            "portfolio_size": 0,
+        }
+        self._lock = threading.Lock()  # nur für Schreiber
+
+    def mark_started(self, timestamp: Optional[float] = None) -> None:
+        """Setzt den Startzeitpunkt für die Uptime."""
+        self._started = time.time() if timestamp is None else timestamp
+
+    def update(self, **fields: Any) -> None:
+        """Ersetzt einzelne Felder des Snapshots."""
+        with self._lock:
+            snapshot = dict(self._snapshot)
+            snapshot.update(fields)
+            self._snapshot = snapshot
+
+    def record_cycle(self, outcome: Optional[str], duration_ms: float, consecutive_errors: int = 0) -> None:
+        """Hält das Ergebnis eines abgeschlossenen Analyse-Zyklus fest.
+
+        Args:
+            outcome: Ergebnis laut Zyklus (z.B. 'alert', 'no_signal', 'error')
+            duration_ms: Laufzeit des Zyklus in Millisekunden
+            consecutive_errors: Aktuelle Fehlerserie (AlertManager)
+        """
+        self.update(
+            last_cycle=time.time(),
+            last_outcome=outcome,
+            last_cycle_duration_ms=round(duration_ms, 1),
+            consecutive_errors=consecutive_errors,
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aktueller Status inkl. Zeitstempel und Uptime."""
+        now = time.time()
+        data = dict(self._snapshot)
+        data["timestamp"] = now
+        data["uptime"] = now - self._started if self._started is not None else None
+        return data
+
+    def to_json(self) -> bytes:
+        """Antwort-Body für /health."""
+        return json.dumps(self.snapshot()).encode()
+
+
+# Modul-Singleton: run_cycle schreibt, der Health-Server liest
+health_status = HealthStatus()
@@ -18,6 +18,19 @@ class WhatIfRequest(BaseModel):
         return v.upper()
 
 
+class WhatIfGridRequest(BaseModel):
+    """Validierung für /what_if grid – Schock-Raster über alle Coins"""
+    range_percent: float = Field(50.0, gt=0, le=90, description="Maximaler Schock in Prozent (±)")
+    step_percent: float = Field(1.0, ge=0.1, le=50, description="Schrittweite in Prozent")
+
+    @validator('step_percent')
+    def step_within_range(cls, v, values):
+        """Schrittweite darf den Bereich nicht überschreiten"""
+        if 'range_percent' in values and v > values['range_percent']:
+            raise ValueError("Schrittweite größer als Bereich")
+        return v
+
+
 class SetIntervalRequest(BaseModel):
     """Validierung für /set_interval Befehl"""
     hours: int = Field(..., ge=1, le=24, description="Intervall in Stunden (1-24)")
@@ -58,6 +71,28 @@ def validate_what_if_args(args: list) -> tuple[bool, Optional[WhatIfRequest], st
         return False, None, f"Validation error: {str(e)}"
 
 
+def validate_what_if_grid_args(args: list) -> tuple[bool, Optional[WhatIfGridRequest], str]:
+    """Validiert /what_if grid [range%] [step%] (args ohne das Schlüsselwort 'grid').
+
+    Args:
+        args: Optionale Argumente: Bereich und Schrittweite in Prozent
+
+    Returns:
+        Tuple aus (valid, WhatIfGridRequest | None, Fehlermeldung)
+    """
+    if len(args) > 2:
+        return False, None, "Usage: /what_if grid [range%] [step%]\nBeispiel: /what_if grid 50 1 (−50%…+50% in 1%-Schritten)"
+
+    try:
+        values = [float(a.replace(',', '.')) for a in args]
+        request = WhatIfGridRequest(**dict(zip(('range_percent', 'step_percent'), values)))
+        return True, request, ""
+    except ValueError as e:
+        return False, None, f"Invalid numbers: {str(e)}"
+    except Exception as e:
+        return False, None, f"Validation error: {str(e)}"
+
+
 def validate_set_interval_args(args: list) -> tuple[bool, Optional[SetIntervalRequest], str]:
     """Validiert /set_interval Argumente"""
     if len(args) != 1:
@@ -0,0 +1,231 @@
+"""
+Inkrementeller JSON-Parser für gestreamte LLM-Antworten.
+
+Der Parser bekommt die Text-Deltas in beliebigen Stücken, überspringt
+Vortext und Markdown-Fences bis zur ersten '{' und prüft danach Zeichen für
+Zeichen die Struktur (Klammer-Paare, Strings, erlaubte Literale). Fehler
+werden sofort gemeldet. Sobald das äußere Objekt geschlossen ist, steht
+das Ergebnis bereit.
+
+repair_json repariert fast gültiges JSON (Trailing Commas, Python-Literale,
+Zeilenumbrüche in Strings, falsche oder fehlende schließende Klammern,
+Text nach dem Objekt), damit eine teure Antwort nicht verworfen werden muss.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+# Außerhalb von Strings erlaubt (Zahlen, true/false/null, Trenner, Whitespace)
+_LITERAL_CHARS = frozenset('0123456789+-.eEtruefalsn')
+_STRUCTURAL_CHARS = frozenset(',: \t\r\n')
+_PAIRS = {'}': '{', ']': '['}
+
+
+class StreamingJSONError(json.JSONDecodeError):
+    """Strukturfehler im JSON-Stream (kompatibel zu json.JSONDecodeError)."""
+
+
+class JSONStreamParser:
+    """Prüft ein JSON-Objekt, während es Stück für Stück eintrifft."""
+
+    def __init__(self, max_preamble: int = 2000):
+        """Initialisiert den Parser.
+
+        Args:
+            max_preamble: Max. Zeichen Vortext vor der ersten '{' (sonst Abbruch)
+        """
+        self.max_preamble = max_preamble
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._preamble = 0
+        self._pos = 0
+        self.complete = False
+
+    def _fail(self, message: str) -> None:
+        raise StreamingJSONError(message, ''.join(self._buffer), self._pos)
+
+    def feed(self, chunk: str) -> bool:
+        """Verarbeitet ein Text-Delta.
+
+        Args:
+            chunk: Nächstes Stück der Antwort
+
+        Returns:
+            True sobald das äußere Objekt vollständig ist
+
+        Raises:
+            StreamingJSONError: bei ungültiger Struktur
+        """
+        if self.complete or not chunk:
+            return self.complete
+        for char in chunk:
+            self._pos += 1
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._stack.append('{')
+                    self._buffer.append(char)
+                else:
+                    self._preamble += 1
+                    if self._preamble > self.max_preamble:
+                        self._fail("Kein JSON-Objekt im Vortext")
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                elif char == '\n':
+                    self._fail("Zeilenumbruch in String")
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._stack.append(char)
+            elif char in '}]':
+                if not self._stack or self._stack.pop() != _PAIRS[char]:
+                    self._fail(f"Unerwartetes '{char}'")
+                if not self._stack:
+                    self.complete = True
+                    return True
+            elif char not in _STRUCTURAL_CHARS and char not in _LITERAL_CHARS:
+                self._fail(f"Unerwartetes Zeichen {char!r}")
+        return False
+
+    @property
+    def started(self) -> bool:
+        """True sobald die erste '{' gesehen wurde."""
+        return self._started
+
+    @property
+    def text(self) -> str:
+        """Bisher gesammelter JSON-Text (ab der ersten '{')."""
+        return ''.join(self._buffer)
+
+    def result(self) -> Dict[str, Any]:
+        """Parst das vollständige Objekt.
+
+        Raises:
+            StreamingJSONError: wenn das Objekt unvollständig oder ungültig ist
+        """
+        if not self.complete:
+            self._fail("JSON-Objekt unvollständig")
+        try:
+            return json.loads(self.text)
+        except json.JSONDecodeError as e:
+            raise StreamingJSONError(e.msg, e.doc, e.pos) from e
+
+
+def parse_complete(text: str, max_preamble: Optional[int] = None) -> Dict[str, Any]:
+    """Parst eine komplette (nicht gestreamte) Antwort mit demselben Parser."""
+    parser = JSONStreamParser(max_preamble=len(text) if max_preamble is None else max_preamble)
+    parser.feed(text)
+    return parser.result()
+
+
+# Python-/JS-Literale, die Modelle gelegentlich statt JSON ausgeben
+_LITERAL_FIXES = {'True': 'true', 'False': 'false', 'None': 'null', 'NaN': 'null', 'undefined': 'null'}
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def repair_json(text: str) -> Dict[str, Any]:
+    """Repariert fast gültiges JSON und parst das äußere Objekt.
+
+    Behoben werden Vortext/Fences, Text nach dem Objekt, Trailing Commas,
+    Python-Literale (True/False/None), rohe Zeilenumbrüche in Strings,
+    falsche schließende Klammern und ein abgeschnittenes Ende.
+
+    Args:
+        text: Rohe Modell-Antwort
+
+    Returns:
+        Geparstes JSON-Objekt
+
+    Raises:
+        StreamingJSONError: wenn auch die reparierte Fassung ungültig ist
+    """
+    start = text.find('{')
+    if start < 0:
+        raise StreamingJSONError("Kein JSON-Objekt gefunden", text, 0)
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    i = start
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                char = '\\n'
+            elif char == '\t':
+                char = '\\t'
+            out.append(char)
+            i += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+        elif char in '}]':
+            if not stack:
+                break
+            # Falsche Klammer → die erwartete einsetzen
+            char = _CLOSERS[stack.pop()]
+            while out and out[-1] in ' \t\r\n':
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            out.append(char)
+            if not stack:
+                break
+            i += 1
+            continue
+        elif char.isalpha():
+            end = i
+            while end < len(text) and text[end].isalpha():
+                end += 1
+            word = text[i:end]
+            out.append(_LITERAL_FIXES.get(word, word))
+            i = end
+            continue
+        out.append(char)
+        i += 1
+
+    # Abgeschnittenes Ende: String und offene Klammern schließen
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    repaired = ''.join(out).rstrip()
+    if stack:
+        repaired = repaired.rstrip(',:').rstrip() + ''.join(_CLOSERS[c] for c in reversed(stack))
+    try:
+        result = json.loads(repaired)
+    except json.JSONDecodeError as e:
+        raise StreamingJSONError(f"Reparatur fehlgeschlagen: {e.msg}", text, start + e.pos) from e
+    if not isinstance(result, dict):
+        raise StreamingJSONError("Kein JSON-Objekt", text, start)
+    return result
+
+
+def parse_lenient(text: str) -> Dict[str, Any]:
+    """Parst eine komplette Antwort, bei Bedarf mit repair_json."""
+    try:
+        return parse_complete(text)
+    except StreamingJSONError:
+        return repair_json(text)
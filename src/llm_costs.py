@@ -0,0 +1,236 @@
+"""
+Kosten- und Latenz-Erfassung für LLM-Aufrufe.
+
+Die Preise stammen aus prices.csv (Semikolon-getrennt, Preise wie
+"$0.45M tokens" pro 1 Mio. Token, "Free" = 0). Pro Modell und Template
+werden Latenz, Input-/Output-/Thinking-Token und Retries in Histogrammen
+mit festen Buckets (numpy-Arrays) gezählt und im Prometheus-Format
+exportiert – Grundlage, um Thinking-Budgets gegen Latenz abzuwägen.
+"""
+
+import csv
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import PRICE_TABLE_PATH, LLM_LATENCY_BUCKETS, LLM_TOKEN_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+_PRICE_PATTERN = re.compile(r"\$?\s*([0-9]+(?:[.,][0-9]+)?)\s*M")
+RETRY_BUCKETS = (0, 1, 2, 3, 5)
+
+
+def parse_price(text: str) -> Optional[float]:
+    """'$0.45M tokens' → 0.45 (USD pro 1 Mio. Token), 'Free' → 0.0, sonst None."""
+    text = (text or '').strip()
+    if not text:
+        return None
+    if 'free' in text.lower():
+        return 0.0
+    match = _PRICE_PATTERN.search(text)
+    return float(match.group(1).replace(',', '.')) if match else None
+
+
+def load_price_table(path: str = PRICE_TABLE_PATH) -> Dict[str, Tuple[float, float]]:
+    """Lädt die Preistabelle.
+
+    Fortsetzungszeilen (leerer Modellname, nur Features) und Zeilen ohne
+    Preise werden übersprungen.
+
+    Args:
+        path: Pfad zur prices.csv
+
+    Returns:
+        Dict Modell → (Input-Preis, Output-Preis) in USD pro 1 Mio. Token
+    """
+    table = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                model = (row.get('Model Name') or '').strip()
+                input_price = parse_price(row.get('Input Price'))
+                output_price = parse_price(row.get('Output Price'))
+                if not model or input_price is None or output_price is None:
+                    continue
+                table[model] = (input_price, output_price)
+        logger.info(f"Preistabelle geladen: {len(table)} Modelle")
+    except FileNotFoundError:
+        logger.warning(f"Preistabelle nicht gefunden: {path} – Kosten werden mit 0 erfasst")
+    except Exception as e:
+        logger.warning(f"Fehler beim Laden der Preistabelle: {e}")
+    return table
+
+
+class Histogram:
+    """Histogramm mit festen Bucket-Grenzen (Prometheus-Semantik: le = kleiner gleich)."""
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = np.asarray(sorted(bounds), dtype=np.float64)
+        # Letztes Feld = +Inf
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[int(np.searchsorted(self.bounds, value, side='left'))] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Obere Bucket-Grenze, unter der der Anteil q der Werte liegt (None wenn leer)."""
+        total = self.count
+        if not total:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * total, side='left'))
+        return float(self.bounds[index]) if index < len(self.bounds) else float('inf')
+
+    def prometheus_lines(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = np.cumsum(self.counts)
+        for bound, count in zip(self.bounds, cumulative):
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {int(count)}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {int(cumulative[-1])}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:g}')
+        lines.append(f'{name}_count{{{labels}}} {int(cumulative[-1])}')
+        return lines
+
+
+# Histogramm-Metrik → Bucket-Grenzen
+_HISTOGRAMS = {
+    'latency_seconds': LLM_LATENCY_BUCKETS,
+    'input_tokens': LLM_TOKEN_BUCKETS,
+    'output_tokens': LLM_TOKEN_BUCKETS,
+    'thinking_tokens': LLM_TOKEN_BUCKETS,
+    'retries': RETRY_BUCKETS,
+}
+
+
+class CostTracker:
+    """Verfolgt API-Kosten, Token-Verbrauch und Latenz über alle LLM-Aufrufe."""
+
+    def __init__(self, price_table: Optional[Dict[str, Tuple[float, float]]] = None):
+        """Initialisiert den Tracker.
+
+        Args:
+            price_table: Modell → (Input, Output) USD pro 1 Mio. Token (Default: prices.csv)
+        """
+        self.prices = load_price_table() if price_table is None else price_table
+        self.total_cost: float = 0.0
+        self.total_tokens: int = 0
+        self.calls: int = 0
+        self.cost_by_model: Dict[str, float] = {}
+        # (Metrik, Modell, Template) → Histogram
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._unpriced = set()
+
+    def _observe(self, metric: str, model: str, template: str, value: float) -> None:
+        key = (metric, model, template)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(_HISTOGRAMS[metric])
+        self.histograms[key].observe(value)
+
+    def price_for(self, model_name: str) -> Optional[Tuple[float, float]]:
+        """Preise eines Modells (auch mit Provider-Präfix wie 'google/claude-...')."""
+        if model_name in self.prices:
+            return self.prices[model_name]
+        return self.prices.get(model_name.rsplit('/', 1)[-1])
+
+    def call_cost(self, model_name: str, input_tokens: int, output_tokens: int) -> float:
+        """Kosten eines Aufrufs in USD (0 für Modelle ohne Preis)."""
+        price = self.price_for(model_name)
+        if price is None:
+            if model_name not in self._unpriced:
+                self._unpriced.add(model_name)
+                logger.warning(f"Kein Preis für Modell {model_name} in der Preistabelle")
+            return 0.0
+        return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+    def log_usage(self, model_name: str, input_tokens: int, output_tokens: int,
+                  cycle_num: Optional[int] = None, template: str = '',
+                  thinking_tokens: int = 0) -> None:
+        """Erfasst Token-Verbrauch und Kosten eines LLM-Aufrufs.
+
+        Args:
+            model_name: Name des verwendeten Modells
+            input_tokens: Anzahl der Input-Tokens
+            output_tokens: Anzahl der Output-Tokens (inkl. Thinking)
+            cycle_num: Optionale Zyklus-Nummer für Logging
+            template: Prompt-Template des Aufrufs (Label der Histogramme)
+            thinking_tokens: Davon für Extended Thinking verwendete Tokens
+        """
+        tokens = input_tokens + output_tokens
+        cost = self.call_cost(model_name, input_tokens, output_tokens)
+        self.total_tokens += tokens
+        self.total_cost += cost
+        self.cost_by_model[model_name] = self.cost_by_model.get(model_name, 0.0) + cost
+        self.calls += 1
+        self._observe('input_tokens', model_name, template, input_tokens)
+        self._observe('output_tokens', model_name, template, output_tokens)
+        self._observe('thinking_tokens', model_name, template, thinking_tokens)
+        logger.debug(
+            f"LLM-Aufruf #{self.calls} | Modell: {model_name} | "
+            f"Tokens: {tokens} (in={input_tokens}, out={output_tokens}, thinking={thinking_tokens}) | "
+            f"Kosten: ${cost:.4f} | Gesamt: {self.total_tokens} / ${self.total_cost:.4f} | Zyklus: {cycle_num}"
+        )
+
+    def observe_call(self, model_name: str, template: str, latency: float, retries: int) -> None:
+        """Erfasst Latenz (Sekunden bis zur geparsten Antwort) und Retries eines Aufrufs."""
+        self._observe('latency_seconds', model_name, template, latency)
+        self._observe('retries', model_name, template, retries)
+
+    def latency_counts(self, model_name: str) -> np.ndarray:
+        """Bucket-Zähler der Latenz eines Modells über alle Templates."""
+        counts = np.zeros(len(LLM_LATENCY_BUCKETS) + 1, dtype=np.int64)
+        for (metric, model, _), hist in self.histograms.items():
+            if metric == 'latency_seconds' and model == model_name:
+                counts += hist.counts
+        return counts
+
+    def latency_quantile(self, model_name: str, q: float = 0.95, min_count: int = 1,
+                         since: Optional[np.ndarray] = None) -> Optional[float]:
+        """Latenz-Quantil eines Modells über alle Templates (Bucket-Genauigkeit).
+
+        Args:
+            since: Stand von latency_counts(); nur neuere Messwerte zählen
+
+        Returns:
+            Obere Bucket-Grenze oder None bei weniger als min_count Messwerten
+        """
+        merged = Histogram(LLM_LATENCY_BUCKETS)
+        merged.counts = self.latency_counts(model_name)
+        if since is not None:
+            merged.counts -= since
+        if merged.count < min_count or not merged.count:
+            return None
+        return merged.quantile(q)
+
+    def prometheus_lines(self, prefix: str = 'SlopCoin') -> List[str]:
+        """Alle Kosten-, Token- und Latenz-Metriken im Prometheus-Textformat."""
+        lines = [
+            f"# TYPE {prefix}_total_cost gauge",
+            f"{prefix}_total_cost {self.total_cost}",
+            f"# TYPE {prefix}_total_tokens counter",
+            f"{prefix}_total_tokens {self.total_tokens}",
+            f"# TYPE {prefix}_llm_calls counter",
+            f"{prefix}_llm_calls {self.calls}",
+            f"# TYPE {prefix}_llm_cost_usd counter",
+        ]
+        for model, cost in sorted(self.cost_by_model.items()):
+            lines.append(f'{prefix}_llm_cost_usd{{model="{model}"}} {cost}')
+        for metric in _HISTOGRAMS:
+            name = f"{prefix}_llm_{metric}"
+            keys = sorted(k for k in self.histograms if k[0] == metric)
+            if not keys:
+                continue
+            lines.append(f"# TYPE {name} histogram")
+            for _, model, template in keys:
+                labels = f'model="{model}",template="{template}"'
+                lines.extend(self.histograms[(metric, model, template)].prometheus_lines(name, labels))
+        return lines
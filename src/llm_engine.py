@@ -1,51 +1,43 @@
+import asyncio
 import json
 import logging
 import os
+import re
 import time
 import hashlib
-from typing import Optional, Dict, Any
-from openai import OpenAI
+import math
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from openai import AsyncOpenAI, APIStatusError
 from jinja2 import Environment, FileSystemLoader
+from prompt_encoder import PromptEncoder
+from token_budget import TokenBudgeter, count_tokens
+from response_cache import ResponseCache
+from llm_costs import CostTracker
+from model_router import ModelRouter
+from prompt_context import PromptContext
+from cycle_trace import tracer
+from json_stream import JSONStreamParser, StreamingJSONError, parse_lenient, repair_json
+from llm_schemas import SchemaValidationError, response_format, schema_for, validate as validate_schema
 from config import (
     AI_BASE_URL, AI_MODEL_NAME, AI_MODEL_GUARDIAN, AI_HUB_KEY_PATH, OPENAI_TIMEOUT,
     PROMPT_CACHE_ENABLED, PROMPT_CACHE_TTL, TOKEN_OPTIMIZATION_ENABLED,
-    MAX_PROMPT_TOKENS, MAX_LLM_RETRY_ATTEMPTS, LLM_RETRY_BASE_DELAY,
+    MAX_LLM_RETRY_ATTEMPTS, LLM_RETRY_BASE_DELAY,
     LLM_RETRY_MAX_DELAY, COST_AWARENESS_ENABLED, MAX_ANALYST_TOKENS,
     MAX_GUARDIAN_TOKENS, MAX_NEXT_INVEST_TOKENS,
     THINKING_ENABLED, THINKING_BUDGET_ANALYST, THINKING_BUDGET_GUARDIAN,
-    THINKING_BUDGET_NEXT_INVEST
+    THINKING_BUDGET_NEXT_INVEST, LLM_STREAMING_ENABLED, LLM_HEDGING_ENABLED,
+    LLM_JSON_REASK_ENABLED, LLM_JSON_REASK_MAX_TOKENS,
+    LLM_HEDGE_BACKUP_MODEL, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DEFAULT_DELAY, LLM_HEDGE_HISTORY, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_CACHE_TTL_MARKET, LLM_CACHE_TTL_NEXT_INVEST,
+    LLM_CACHE_TTL_WEEKLY
 )
 
 logger = logging.getLogger(__name__)
 
 
-class CostTracker:
-    """Verfolgt API-Kosten und Token-Verbrauch über alle LLM-Aufrufe."""
-
-    def __init__(self):
-        self.total_cost: float = 0.0
-        self.total_tokens: int = 0
-        self.calls: int = 0
-
-    def log_usage(self, model_name: str, input_tokens: int, output_tokens: int, cycle_num: Optional[int] = None) -> None:
-        """Erfasst Token-Verbrauch eines LLM-Aufrufs.
-
-        Args:
-            model_name: Name des verwendeten Modells
-            input_tokens: Anzahl der Input-Tokens
-            output_tokens: Anzahl der Output-Tokens
-            cycle_num: Optionale Zyklus-Nummer für Logging
-        """
-        tokens = input_tokens + output_tokens
-        self.total_tokens += tokens
-        self.calls += 1
-        logger.debug(
-            f"LLM-Aufruf #{self.calls} | Modell: {model_name} | "
-            f"Tokens: {tokens} (in={input_tokens}, out={output_tokens}) | "
-            f"Gesamt: {self.total_tokens} | Zyklus: {cycle_num}"
-        )
-
-
 class LLMEngine:
     def __init__(self, base_url=None, model_name=None, guardian_model_name=None, api_key_path=None):
         # API Key sicher laden
@@ -68,11 +60,19 @@ class LLMEngine:
             logger.critical(f"API Key fehlt: {api_key_path}")
             raise
 
-        # Custom Client mit Timeout
-        self.client = OpenAI(
+        # Async-Client mit gepoolten HTTP-Verbindungen (geteilt von allen Aufrufen)
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=OPENAI_TIMEOUT,
+        )
+        self.client = AsyncOpenAI(
             api_key=api_key,
             base_url=base_url,
-            timeout=OPENAI_TIMEOUT  # Timeout hinzufügen
+            timeout=OPENAI_TIMEOUT,
+            http_client=self.http_client,
         )
         self.model_name = model_name
         self.guardian_model_name = guardian_model_name
@@ -80,32 +80,88 @@ class LLMEngine:
         # Template-Environment (Pfad relativ zu src/)
         template_path = os.path.join(os.path.dirname(__file__), 'prompts')
         self.template_env = Environment(loader=FileSystemLoader(template_path))
+        # Kompilierte Templates mit Quell-Hash, invalidiert über die mtime der Datei
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._precompile_templates()
 
         # Cost Tracker initialisieren
         self.cost_tracker = CostTracker()
+        # Modell und Thinking-Budget pro Aufgabe (Latenz, Fehlerquote, Kosten)
+        self.router = ModelRouter(self.cost_tracker)
+
+        # Kompakte Prompt-Payloads (CSV-Tabellen, JSON ohne Leerzeichen, gerundete Zahlen)
+        self.encoder = PromptEncoder()
+        # Token-Budget mit Abschnitts-Prioritäten statt Abschneiden nach 10 Zeilen
+        self.budgeter = TokenBudgeter()
+        # Hintergrund-Tasks, die gestreamte Antworten nach dem JSON-Ende zu Ende lesen
+        self._drain_tasks = set()
+        # Thinking-Unterstützung pro Modell (vom Proxy ausdrücklich abgelehnt → nie wieder versucht)
+        self._thinking_support: Dict[str, bool] = {}
+        # Structured Output (response_format) pro Modell, analog zum Thinking-Cache
+        self._structured_support: Dict[str, bool] = {}
+        # Zeit bis zum ersten Token pro Modell (Basis für den Hedging-Schwellenwert)
+        self._first_token_latency: Dict[str, deque] = {}
+
+        # Antwort-Cache: unveränderte (quantisierte) Eingaben → kein Modell-Aufruf
+        self.response_cache = ResponseCache()
+        # Delta-Prompting: letzte Analyse-Eingaben und Schlussfolgerungen
+        self.prompt_context = PromptContext()
 
         # Prompt-Caching initialisieren
-        self.prompt_cache = {}
+        self.prompt_cache = OrderedDict()  # Schlüssel → {prompt, timestamp}, älteste zuerst
         self.cache_hits = 0
         self.cache_misses = 0
 
         logger.info(f"SlopCoin connected to {base_url} | Analyst: {model_name} | Guardian: {guardian_model_name}")
 
-    def _clean_json(self, text):
-        """Reinigt LLM Output von Markdown-Artefakten"""
-        text = text.strip()
+    async def aclose(self) -> None:
+        """Schließt den HTTP-Verbindungspool (beim Shutdown aufrufen)."""
+        await self.client.close()
 
-        # Entferne Markdown Code-Blöcke
-        if "```json" in text:
-            parts = text.split("```json")
-            if len(parts) > 1:
-                text = parts[1].split("```")[0]
-        elif "```" in text:
-            parts = text.split("```")
-            if len(parts) > 1:
-                text = parts[1].split("```")[0]
+    def _precompile_templates(self) -> None:
+        """Lädt und kompiliert alle Prompt-Templates einmalig beim Start."""
+        try:
+            names = self.template_env.list_templates(extensions=['j2'])
+        except Exception as e:
+            logger.warning(f"Templates konnten nicht vorab geladen werden: {e}")
+            return
+        for name in names:
+            try:
+                self._get_template_entry(name)
+            except Exception as e:
+                logger.warning(f"Template {name} konnte nicht kompiliert werden: {e}")
 
-        return text.strip()
+    def _get_template_entry(self, template_name: str) -> Dict[str, Any]:
+        """Kompiliertes Template samt Quell-Hash; neu geladen nur bei geänderter mtime.
+
+        Returns:
+            Dict mit 'template', 'filename', 'mtime_ns', 'source_hash'
+        """
+        entry = self._templates.get(template_name)
+        if entry is not None:
+            filename = entry['filename']
+            try:
+                if filename is None or os.stat(filename).st_mtime_ns == entry['mtime_ns']:
+                    return entry
+            except OSError:
+                return entry
+
+        template = self.template_env.get_template(template_name)
+        filename = getattr(template, 'filename', None)
+        if isinstance(filename, str) and os.path.isfile(filename):
+            with open(filename, 'rb') as f:
+                source = f.read()
+            mtime_ns = os.stat(filename).st_mtime_ns
+        else:
+            filename, mtime_ns, source = None, None, template_name.encode('utf-8')
+        entry = {
+            'template': template,
+            'filename': filename,
+            'mtime_ns': mtime_ns,
+            'source_hash': hashlib.sha256(source).hexdigest(),
+        }
+        self._templates[template_name] = entry
+        return entry
 
     def _get_prompt_hash(self, template_name: str, data: Dict[str, Any]) -> str:
         """Erstellt einen Hash für den Prompt basierend auf Template und Daten.
@@ -117,123 +173,516 @@ class LLMEngine:
         Returns:
             SHA-256 Hash als Hex-String
         """
-        template_source, _, _ = self.template_env.loader.get_source(self.template_env, template_name)
+        source_hash = self._get_template_entry(template_name)['source_hash']
         data_str = json.dumps(data, sort_keys=True)
-        combined = f"{template_name}:{template_source}:{data_str}"
+        combined = f"{template_name}:{source_hash}:{data_str}"
         return hashlib.sha256(combined.encode('utf-8')).hexdigest()
 
-    def _get_cached_prompt(self, template_name: str, data: Dict[str, Any]) -> Optional[str]:
-        """Holt einen gecachten Prompt oder None"""
+    def _get_cached_prompt(self, template_name: str, data: Dict[str, Any],
+                           cache_key: Optional[str] = None) -> Optional[str]:
+        """Holt einen gecachten Prompt oder None (cache_key spart das erneute Hashen)"""
         if not PROMPT_CACHE_ENABLED:
             return None
-            
-        cache_key = self._get_prompt_hash(template_name, data)
-        return self.prompt_cache.get(cache_key)
 
-    def _cache_prompt(self, template_name: str, data: Dict[str, Any], prompt: str):
+        if cache_key is None:
+            cache_key = self._get_prompt_hash(template_name, data)
+        entry = self.prompt_cache.get(cache_key)
+        if entry is None or time.time() - entry['timestamp'] >= PROMPT_CACHE_TTL:
+            return None
+        return entry['prompt']
+
+    def _cache_prompt(self, template_name: str, data: Dict[str, Any], prompt: str,
+                      cache_key: Optional[str] = None):
         """Cacht einen Prompt"""
         if not PROMPT_CACHE_ENABLED:
             return
-            
-        cache_key = self._get_prompt_hash(template_name, data)
+
+        if cache_key is None:
+            cache_key = self._get_prompt_hash(template_name, data)
+        current_time = time.time()
         self.prompt_cache[cache_key] = {
             'prompt': prompt,
-            'timestamp': time.time()
-        }
-        
-        # Alte Einträge entfernen
-        current_time = time.time()
-        self.prompt_cache = {
-            k: v for k, v in self.prompt_cache.items()
-            if current_time - v['timestamp'] < PROMPT_CACHE_TTL
+            'timestamp': current_time
         }
+        self.prompt_cache.move_to_end(cache_key)
+
+        # Alte Einträge entfernen – Einfügereihenfolge = Alter, daher nur von vorne
+        while self.prompt_cache:
+            oldest = next(iter(self.prompt_cache.values()))
+            if current_time - oldest['timestamp'] < PROMPT_CACHE_TTL:
+                break
+            self.prompt_cache.popitem(last=False)
 
     def _optimize_tokens(self, prompt: str) -> str:
-        """Reduziert Token-Verbrauch durch Optimierung"""
+        """Reduziert Token-Verbrauch durch Entfernen überflüssiger Leerzeichen und Leerzeilen.
+
+        Das Einhalten von MAX_PROMPT_TOKENS übernimmt der TokenBudgeter
+        (abschnittsweise statt durch Abschneiden des Prompts).
+        """
         if not TOKEN_OPTIMIZATION_ENABLED:
             return prompt
-            
-        # Token-Reduktion durch Entfernen von überflüssigen Leerzeichen und Zeilenumbrüchen
-        optimized = prompt.replace('\n\n', '\n').replace('  ', ' ').strip()
-        
-        # Wenn der Prompt zu lang ist, kürzen
-        if len(optimized.split()) > MAX_PROMPT_TOKENS:
-            lines = optimized.split('\n')
-            optimized = '\n'.join(lines[:10]) + '\n... (Prompt gekürzt für Token-Effizienz)'
-        
-        return optimized
-
-    def _execute_with_retry(
+
+        lines = (re.sub(r'[ \t]+', ' ', line).strip() for line in prompt.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    def _response_key(self, kind: str, templates, route, **inputs) -> str:
+        """Fingerprint für den Antwort-Cache (Eingaben, geroutetes Modell, Template-Quellen).
+
+        Enthält Modell und Thinking-Budget der Analyst-Route: eine degradierte
+        Antwort landet nie unter dem Schlüssel des Standard-Modells.
+        """
+        template_hash = ':'.join(self._get_template_entry(t)['source_hash'] for t in templates)
+        return self.response_cache.market_fingerprint(
+            kind, models=[route.model, self.guardian_model_name],
+            thinking_budget=route.thinking_budget,
+            templates=template_hash, **inputs
+        )
+
+    @staticmethod
+    def _cache_ttl(ttl: int, route, default_model: str, thinking_budget: int) -> int:
+        """TTL für den Antwort-Cache – 0 wenn der Guardian degradiert lief (nicht cachen)."""
+        if route.model != default_model or route.thinking_budget != thinking_budget:
+            logger.info(f"Guardian lief degradiert ({route.reason}) – Antwort wird nicht gecacht")
+            return 0
+        return ttl
+
+    def _cached_response(self, key: str) -> Optional[Dict[str, Any]]:
+        """Gecachte Antwort (markiert mit 'cached': True) oder None."""
+        cached = self.response_cache.get(key)
+        if cached is None:
+            return None
+        return {**cached, 'cached': True}
+
+    def _store_response(self, key: str, result: Dict[str, Any], ttl: int) -> Dict[str, Any]:
+        """Speichert eine vollständige (Guardian-geprüfte) Antwort und gibt sie zurück."""
+        self.response_cache.set(key, result, ttl)
+        return result
+
+    @staticmethod
+    def _position_weights(portfolio_data, portfolio_indicators):
+        """Positionswert je Coin (Menge × Indikator-Preis) als Kürzungs-Gewicht"""
+        if not isinstance(portfolio_data, dict) or not isinstance(portfolio_indicators, dict):
+            return None
+        return {
+            coin: (portfolio_data.get(coin) or 0) * ((indicators or {}).get('price') or 0)
+            for coin, indicators in portfolio_indicators.items()
+        }
+
+    def _build_prompt(self, template_name: str, fields: Dict[str, Any],
+                      extra: Optional[Dict[str, Any]] = None,
+                      weights: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """Serialisiert die Abschnitte, rendert das Template und hält das Token-Budget ein.
+
+        Args:
+            template_name: Name der Jinja2-Template-Datei
+            fields: Abschnitte (Objekte), werden vom PromptEncoder serialisiert
+            extra: Weitere Template-Variablen, die unverändert übergeben werden
+            weights: Zeilengewichte pro Abschnitt für das Kürzen
+
+        Returns:
+            Fertiger Prompt-Text
+        """
+        data = self.encoder.encode_payload(fields, label=template_name)
+        data.update(extra or {})
+
+        # Daten-Fingerprint nur einmal pro Aufruf berechnen
+        cache_key = self._get_prompt_hash(template_name, data) if PROMPT_CACHE_ENABLED else None
+        prompt = self._get_cached_prompt(template_name, data, cache_key)
+        if prompt is not None:
+            self.cache_hits += 1
+            return prompt
+        self.cache_misses += 1
+
+        template = self._get_template_entry(template_name)['template']
+        prompt = self.budgeter.fit(
+            fields, data,
+            render=lambda encoded: self._optimize_tokens(template.render(encoded)),
+            encode=self.encoder.encode,
+            weights=weights,
+        )
+        self._cache_prompt(template_name, data, prompt, cache_key)
+        return prompt
+
+    def _log_usage(self, model: str, usage: Any, cycle_num: Optional[int], template: str = '') -> None:
+        """Erfasst Token-Verbrauch und Kosten eines Aufrufs (usage=None → 0 Token).
+
+        Im Stream kommt usage je nach SDK-Version als Objekt oder als dict.
+        """
+        def field(obj: Any, name: str) -> Any:
+            return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+        input_tokens = field(usage, 'prompt_tokens') or 0
+        output_tokens = field(usage, 'completion_tokens') or 0
+        thinking_tokens = field(field(usage, 'completion_tokens_details'), 'reasoning_tokens') or 0
+        self.cost_tracker.log_usage(model, input_tokens, output_tokens, cycle_num,
+                                    template=template, thinking_tokens=thinking_tokens)
+
+    async def _complete_json(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        thinking_budget: int,
+        cycle_num: Optional[int],
+        first_token: Optional[asyncio.Event] = None,
+        template: str = '',
+        output_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Ein einzelner LLM-Aufruf, dessen Antwort als JSON-Objekt geparst wird.
+
+        Im Streaming-Modus prüft der JSONStreamParser die Struktur, während die
+        Token eintreffen; sobald das Objekt geschlossen ist, kehrt der Aufruf
+        zurück und der Rest des Streams (Fences, Usage) wird im Hintergrund
+        gelesen. Fast gültiges JSON wird nicht verworfen: der Stream wird zu
+        Ende gelesen und mit repair_json repariert.
+
+        Args:
+            thinking_budget: Token-Budget für Extended Thinking (0 = Standard-Aufruf)
+            first_token: Wird beim ersten Stream-Chunk gesetzt (für Hedging)
+            template: Prompt-Template (Label für Kosten-Histogramme, Schema für die Prüfung)
+            output_format: response_format für Structured Output (None = freies JSON)
+
+        Raises:
+            StreamingJSONError: bei nicht reparierbarem JSON
+            SchemaValidationError: wenn Pflichtfelder oder Typen fehlen
+        """
+        kwargs = {
+            'model': model,
+            'messages': [{"role": "user", "content": prompt}],
+            # Thinking erfordert temperature=1 (Anthropic-Anforderung)
+            'temperature': 1.0 if thinking_budget > 0 else temperature,
+            'max_tokens': max_tokens,
+            'timeout': OPENAI_TIMEOUT,
+        }
+        if output_format is not None:
+            kwargs['response_format'] = output_format
+        extra_body = {}
+        if thinking_budget > 0:
+            extra_body['thinking'] = {"type": "enabled", "budget_tokens": thinking_budget}
+
+        if not LLM_STREAMING_ENABLED:
+            if extra_body:
+                kwargs['extra_body'] = extra_body
+            resp = await self.client.chat.completions.create(**kwargs)
+            self._log_usage(model, resp.usage, cycle_num, template)
+            return self._checked_json(template, parse_lenient(resp.choices[0].message.content or ''))
+
+        extra_body['stream_options'] = {"include_usage": True}
+        started = time.monotonic()
+        try:
+            stream = await self.client.chat.completions.create(**kwargs, extra_body=extra_body, stream=True)
+        except asyncio.CancelledError:
+            # Abgebrochene Anfrage (z.B. verlorenes Hedge-Rennen): der Prompt wird trotzdem berechnet
+            self._log_usage(model, {'prompt_tokens': count_tokens(prompt)}, cycle_num, template)
+            raise
+        chunks = stream.__aiter__()
+        parser = JSONStreamParser()
+        raw = []
+        broken = None
+        usage = None
+        try:
+            async for chunk in chunks:
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                if first_token is not None and not first_token.is_set():
+                    first_token.set()
+                    self._record_first_token(model, time.monotonic() - started)
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                raw.append(delta)
+                if broken is not None:
+                    continue
+                try:
+                    if parser.feed(delta):
+                        break
+                except StreamingJSONError as e:
+                    if not parser.started:
+                        raise
+                    # Fast gültiges JSON: Rest lesen und reparieren, statt die Antwort zu verwerfen
+                    broken = e
+                    logger.warning(f"JSON-Strukturfehler im Stream ({e}), lese weiter und repariere")
+        except BaseException:
+            await self._close_stream(stream)
+            self._log_usage(model, usage or {'prompt_tokens': count_tokens(prompt)}, cycle_num, template)
+            raise
+
+        parsed = None
+        if parser.complete:
+            # Aufrufer (z.B. Guardian) kann sofort weiterarbeiten
+            task = asyncio.create_task(self._drain_stream(stream, chunks, model, cycle_num, template))
+            self._drain_tasks.add(task)
+            task.add_done_callback(self._drain_tasks.discard)
+            try:
+                parsed = parser.result()
+            except StreamingJSONError:
+                pass
+        else:
+            self._log_usage(model, usage, cycle_num, template)
+        if parsed is None:
+            parsed = repair_json(''.join(raw))
+            logger.warning(f"JSON-Antwort repariert ({template or model})")
+        return self._checked_json(template, parsed)
+
+    @staticmethod
+    def _checked_json(template: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Prüft das Ergebnis gegen das Schema des Templates."""
+        errors = validate_schema(template, parsed)
+        if errors:
+            raise SchemaValidationError('; '.join(errors), json.dumps(parsed, ensure_ascii=False), 0)
+        return parsed
+
+    async def _drain_stream(self, stream: Any, chunks: Any, model: str, cycle_num: Optional[int],
+                            template: str = '') -> None:
+        """Liest den Rest eines Streams und verbucht anschließend die Token."""
+        usage = None
+        try:
+            async for chunk in chunks:
+                usage = getattr(chunk, 'usage', None) or usage
+        except Exception as e:
+            logger.debug(f"Stream-Rest konnte nicht gelesen werden: {e}")
+        finally:
+            await self._close_stream(stream)
+            self._log_usage(model, usage, cycle_num, template)
+
+    @staticmethod
+    async def _close_stream(stream: Any) -> None:
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                logger.debug(f"Stream konnte nicht geschlossen werden: {e}")
+
+    def _record_first_token(self, model: str, seconds: float) -> None:
+        history = self._first_token_latency.setdefault(model, deque(maxlen=LLM_HEDGE_HISTORY))
+        history.append(seconds)
+
+    def _hedge_delay(self, model: str) -> float:
+        """Wartezeit bis zur Backup-Anfrage: Perzentil der Zeit bis zum ersten Token."""
+        history = self._first_token_latency.get(model)
+        if not history or len(history) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        ordered = sorted(history)
+        index = max(math.ceil(LLM_HEDGE_PERCENTILE / 100 * len(ordered)) - 1, 0)
+        return ordered[index]
+
+    def _thinking_budget_for(self, model: str, thinking_budget: int) -> int:
+        """Thinking-Budget, sofern das Modell Thinking nicht schon abgelehnt hat."""
+        if not THINKING_ENABLED or thinking_budget <= 0:
+            return 0
+        return thinking_budget if self._thinking_support.get(model, True) else 0
+
+    def _output_format_for(self, model: str, template: str) -> Optional[Dict[str, Any]]:
+        """response_format des Templates, sofern das Modell es nicht schon abgelehnt hat."""
+        if not self._structured_support.get(model, True):
+            return None
+        return response_format(template)
+
+    @staticmethod
+    def _rejected_parameter(error: APIStatusError, thinking: bool, structured: bool) -> Optional[str]:
+        """Parameter, den eine 4xx-Antwort ablehnt ('thinking', 'response_format' oder None).
+
+        Gezählt wird nur, was die Fehlermeldung (oder das param-Feld) ausdrücklich nennt.
+        """
+        if not 400 <= error.status_code < 500 or error.status_code == 429:
+            return None
+        text = f"{error} {getattr(error, 'param', None) or ''}".lower()
+        if thinking and any(name in text for name in ('thinking', 'budget_tokens')):
+            return 'thinking'
+        if structured and any(name in text for name in ('response_format', 'json_schema', 'structured')):
+            return 'response_format'
+        return None
+
+    async def _call_with_thinking_probe(self, model: str, prompt: str, max_tokens: int,
+                                        temperature: float, thinking_budget: int,
+                                        cycle_num: Optional[int],
+                                        first_token: Optional[asyncio.Event] = None,
+                                        template: str = '') -> Dict[str, Any]:
+        """Aufruf mit Thinking und Structured Output; lehnt der Proxy einen der
+        Parameter ab, wird das pro Modell gemerkt.
+
+        Nur eine Client-Fehlerantwort (4xx), die den Parameter nennt, gilt als
+        "nicht unterstützt" – andere 4xx (z.B. zu langer Prompt), Netzwerkfehler
+        und 5xx gehen normal in die Retry-Logik.
+        """
+        budget = self._thinking_budget_for(model, thinking_budget)
+        output_format = self._output_format_for(model, template)
+        while True:
+            try:
+                result = await self._complete_json(model, prompt, max_tokens, temperature, budget,
+                                                   cycle_num, first_token, template, output_format)
+                if budget > 0:
+                    self._thinking_support[model] = True
+                if output_format is not None:
+                    self._structured_support[model] = True
+                return result
+            except APIStatusError as e:
+                rejected = self._rejected_parameter(e, budget > 0, output_format is not None)
+                if rejected is None:
+                    raise
+                if rejected == 'response_format':
+                    logger.warning(f"Structured Output für {model} nicht unterstützt ({e}), nutze künftig freies JSON.")
+                    self._structured_support[model] = False
+                    output_format = None
+                else:
+                    # Proxy unterstützt Thinking nicht → Fallback auf Standard, für dieses Modell dauerhaft
+                    logger.warning(
+                        f"Thinking für {model} nicht unterstützt ({e}), "
+                        f"nutze künftig den Standard-Modus."
+                    )
+                    self._thinking_support[model] = False
+                    budget = 0
+
+    async def _reask_json(self, model: str, error: StreamingJSONError, cycle_num: Optional[int],
+                          template: str = '') -> Optional[Dict[str, Any]]:
+        """Gezielte Korrektur-Anfrage: nur Fehler, bisherige Antwort und Schema – nicht der Prompt.
+
+        Returns:
+            Korrigiertes JSON oder None (keine verwertbare Antwort / Korrektur gescheitert)
+        """
+        if not LLM_JSON_REASK_ENABLED or '{' not in (error.doc or ''):
+            return None
+        schema = schema_for(template)
+        prompt = self._get_template_entry('5_json_repair.j2')['template'].render(
+            error=error.msg,
+            answer=error.doc,
+            schema=json.dumps(schema, ensure_ascii=False) if schema else '',
+        )
+        try:
+            logger.info(f"Korrektur-Anfrage an {model} ({len(prompt)} Zeichen statt vollem Prompt)")
+            return await self._complete_json(
+                model, prompt, LLM_JSON_REASK_MAX_TOKENS, 0.0, 0, cycle_num,
+                template=template, output_format=self._output_format_for(model, template),
+            )
+        except Exception as e:
+            logger.warning(f"Korrektur-Anfrage fehlgeschlagen: {e}")
+            return None
+
+    async def _hedged_call(self, model: str, prompt: str, max_tokens: int, temperature: float,
+                           thinking_budget: int, cycle_num: Optional[int],
+                           template: str = '') -> Tuple[Dict[str, Any], str]:
+        """Aufruf mit Hedging: kein erstes Token innerhalb des Perzentils → Backup-Anfrage.
+
+        Die erste gültige Antwort gewinnt, die andere Anfrage wird abgebrochen.
+        Gewinnt das Backup, zählt die Primär-Anfrage im Router als Fehlschlag;
+        ein gescheitertes Backup ebenso. Scheitern beide, wird der Fehler der
+        Primär-Anfrage weitergereicht (verbucht vom Aufrufer).
+
+        Returns:
+            (JSON-Antwort, Modell, das geantwortet hat)
+        """
+        if not (LLM_HEDGING_ENABLED and LLM_STREAMING_ENABLED):
+            result = await self._call_with_thinking_probe(model, prompt, max_tokens, temperature,
+                                                          thinking_budget, cycle_num, template=template)
+            return result, model
+
+        started = asyncio.Event()
+        primary = asyncio.create_task(self._call_with_thinking_probe(
+            model, prompt, max_tokens, temperature, thinking_budget, cycle_num, started, template
+        ))
+        waiter = asyncio.create_task(started.wait())
+        delay = self._hedge_delay(model)
+        try:
+            await asyncio.wait({primary, waiter}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            primary.cancel()
+            raise
+        finally:
+            waiter.cancel()
+        if primary.done() or started.is_set():
+            return await primary, model
+
+        backup_model = LLM_HEDGE_BACKUP_MODEL or model
+        logger.info(f"Kein erstes Token von {model} nach {delay:.1f}s – Hedge-Anfrage an {backup_model}")
+        backup = asyncio.create_task(self._call_with_thinking_probe(
+            backup_model, prompt, max_tokens, temperature, thinking_budget, cycle_num, template=template
+        ))
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (t for t in (primary, backup) if t in done):
+                    if task.exception() is None:
+                        if task is primary:
+                            logger.info("Hedge: Antwort vom Primär-Modell genutzt")
+                            return task.result(), model
+                        logger.info(f"Hedge: Antwort vom Backup-Modell {backup_model} genutzt")
+                        self.router.record(model, None, False)
+                        return task.result(), backup_model
+                    if task is backup:
+                        self.router.record(backup_model, None, False)
+            raise primary.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _execute_with_retry(
         self,
         prompt: str,
         max_tokens: int,
         temperature: float,
         thinking_budget: int = 0,
-    ) -> Any:
-        """Führt einen LLM-Aufruf mit Retry-Logik aus.
+        model: Optional[str] = None,
+        cycle_num: Optional[int] = None,
+        template: str = '',
+    ) -> Dict[str, Any]:
+        """Führt einen LLM-Aufruf mit Retry-Logik aus und gibt das geparste JSON zurück.
 
         Wenn THINKING_ENABLED und thinking_budget > 0, wird Extended Thinking
-        via extra_body an den OpenAI-kompatiblen Proxy weitergegeben.
-        Proxies, die den Parameter nicht unterstützen, lösen eine Exception aus –
-        in diesem Fall wird automatisch auf Standard-Modus zurückgefallen.
+        via extra_body an den OpenAI-kompatiblen Proxy weitergegeben. Lehnt der
+        Proxy das ab, wird pro Modell gemerkt, dass Thinking nicht unterstützt
+        wird – der fehlschlagende Erstversuch passiert also nur einmal.
+        Bleibt das erste Token länger aus als üblich, wird eine Hedge-Anfrage
+        gestartet. Nicht reparierbares JSON wird zuerst gezielt korrigiert
+        (nur Fehler und bisherige Antwort) und erst danach ohne Backoff
+        vollständig neu angefragt.
 
         Args:
             prompt: Der vollständige Prompt-Text
             max_tokens: Maximale Ausgabe-Tokens (muss budget + output umfassen)
             temperature: Sampling-Temperatur (bei Thinking zwingend 1.0)
             thinking_budget: Token-Budget für Extended Thinking (0 = deaktiviert)
+            model: Modell für diesen Aufruf (Default: Analyst-Modell)
+            cycle_num: Optionale Zyklus-Nummer für das Kosten-Logging
+            template: Prompt-Template (Label für Kosten- und Latenz-Histogramme)
+
+        Raises:
+            StreamingJSONError: wenn alle Versuche ungültiges JSON liefern
         """
+        model = model or self.model_name
         last_exception = None
-        use_thinking = THINKING_ENABLED and thinking_budget > 0
-
-        # Thinking erfordert temperature=1 (Anthropic-Anforderung)
-        effective_temperature = 1.0 if use_thinking else temperature
+        started = time.monotonic()
 
         for attempt in range(MAX_LLM_RETRY_ATTEMPTS):
+            attempt_started = time.monotonic()
             try:
-                if use_thinking:
-                    logger.info(
-                        f"LLM-Aufruf mit Thinking (budget={thinking_budget}, "
-                        f"Versuch {attempt + 1}/{MAX_LLM_RETRY_ATTEMPTS})"
-                    )
-                    try:
-                        resp = self.client.chat.completions.create(
-                            model=self.model_name,
-                            messages=[{"role": "user", "content": prompt}],
-                            temperature=effective_temperature,
-                            max_tokens=max_tokens,
-                            timeout=OPENAI_TIMEOUT,
-                            extra_body={
-                                "thinking": {
-                                    "type": "enabled",
-                                    "budget_tokens": thinking_budget,
-                                }
-                            },
-                        )
-                        return resp
-                    except Exception as thinking_exc:
-                        # Proxy unterstützt Thinking nicht → Fallback auf Standard
-                        logger.warning(
-                            f"Thinking nicht unterstützt ({thinking_exc}), "
-                            f"Fallback auf Standard-Modus."
-                        )
-                        use_thinking = False
-                        effective_temperature = temperature
-                        # Kein sleep, direkt Standard-Aufruf im selben Attempt
-
-                # Standard-Aufruf (kein Thinking oder nach Fallback)
-                logger.info(f"LLM-Aufruf Standard (Versuch {attempt + 1}/{MAX_LLM_RETRY_ATTEMPTS})")
-                resp = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=effective_temperature,
-                    max_tokens=max_tokens,
-                    timeout=OPENAI_TIMEOUT,
+                logger.info(
+                    f"LLM-Aufruf {model} (Thinking-Budget={self._thinking_budget_for(model, thinking_budget)}, "
+                    f"Versuch {attempt + 1}/{MAX_LLM_RETRY_ATTEMPTS})"
                 )
-                return resp
+                result, answered = await self._hedged_call(model, prompt, max_tokens, temperature,
+                                                           thinking_budget, cycle_num, template)
+                self.cost_tracker.observe_call(answered, template, time.monotonic() - started, attempt)
+                self.router.record(answered, time.monotonic() - attempt_started, True)
+                return result
+
+            except StreamingJSONError as e:
+                last_exception = e
+                logger.warning(f"Ungültiges JSON (Versuch {attempt + 1}): {e}")
+                result = await self._reask_json(model, e, cycle_num, template)
+                if result is not None:
+                    self.cost_tracker.observe_call(model, template, time.monotonic() - started, attempt)
+                    self.router.record(model, time.monotonic() - attempt_started, True)
+                    return result
+                self.router.record(model, None, False)
+                logger.warning("Korrektur nicht möglich, frage sofort vollständig neu an...")
 
             except Exception as e:
                 last_exception = e
+                self.router.record(model, None, False)
                 delay = LLM_RETRY_BASE_DELAY * (2 ** attempt)
                 if delay > LLM_RETRY_MAX_DELAY:
                     delay = LLM_RETRY_MAX_DELAY
@@ -241,11 +690,11 @@ class LLMEngine:
                     f"LLM-Aufruf fehlgeschlagen (Versuch {attempt + 1}): {e}. "
                     f"Warte {delay}s..."
                 )
-                time.sleep(delay)
+                await asyncio.sleep(delay)
 
         raise last_exception
 
-    def analyze_market(self, portfolio_data, portfolio_indicators, market_overview, performance_data=None, risk_metrics=None, cycle_num=None, news_context=None):
+    async def analyze_market(self, portfolio_data, portfolio_indicators, market_overview, performance_data=None, risk_metrics=None, cycle_num=None, news_context=None):
         """Führt den PTCREI Prozess aus (Analyst > Guardian).
 
         Args:
@@ -257,79 +706,73 @@ class LLMEngine:
             cycle_num: Optionale Zyklus-Nummer für Logging
             news_context: Optionaler News-Kontext (falls kein Web-Search verfügbar)
         """
-
-        # SCHRITT 1: Der Analyst
-        analyst_data = {
-            'portfolio': json.dumps(portfolio_data, indent=2),
-            'portfolio_indicators': json.dumps(portfolio_indicators, indent=2),
-            'market_overview': json.dumps(market_overview, indent=2),
-            'performance_data': json.dumps(performance_data, indent=2) if performance_data else json.dumps({}),
-            'risk_metrics': json.dumps(risk_metrics, indent=2) if risk_metrics else json.dumps({}),
+        # SCHRITT 1: Der Analyst (vollständig oder nur Änderungen seit der letzten Analyse)
+        context = self.prompt_context.prepare(
+            portfolio_data, portfolio_indicators, market_overview, performance_data, risk_metrics,
+        )
+        analyst_prompt = self._build_prompt('1_analyst.j2', context['fields'], extra={
             'news_context': news_context if news_context else 'Kein News-Kontext bereitgestellt. Bitte Web-Search nutzen.'
-        }
-
-        # Prompt aus Cache holen oder erstellen
-        analyst_prompt = self._get_cached_prompt('1_analyst.j2', analyst_data)
-        if analyst_prompt is None:
-            analyst_prompt = self.template_env.get_template('1_analyst.j2').render(analyst_data)
-            analyst_prompt = self._optimize_tokens(analyst_prompt)
-            self._cache_prompt('1_analyst.j2', analyst_data, analyst_prompt)
-        else:
-            self.cache_hits += 1
+        }, weights={'portfolio_indicators': self._position_weights(portfolio_data, portfolio_indicators)})
+
+        # Routing vor dem Cache-Lookup: der Schlüssel enthält das tatsächlich genutzte Modell
+        route = self.router.route('cycle', analyst_prompt, self.model_name,
+                                  THINKING_BUDGET_ANALYST, MAX_ANALYST_TOKENS)
+        cache_key = self._response_key(
+            'analyze_market', ('1_analyst.j2', '2_guardian.j2'), route,
+            portfolio_data=portfolio_data, portfolio_indicators=portfolio_indicators,
+            market_overview=market_overview, performance_data=performance_data,
+            risk_metrics=risk_metrics, news_context=news_context,
+        )
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
 
+        logger.info(f"Analyst-Prompt im Modus '{context['mode']}'")
         try:
-            logger.info("Analyst denkt nach...")
-            resp = self._execute_with_retry(
-                analyst_prompt, MAX_ANALYST_TOKENS, 0.1,
-                thinking_budget=THINKING_BUDGET_ANALYST
-            )
-            analyst_content = resp.choices[0].message.content
-            analyst_json = json.loads(self._clean_json(analyst_content))
-
-            # Kosten tracken für Analyst
-            input_tokens = resp.usage.prompt_tokens if resp.usage else 0
-            output_tokens = resp.usage.completion_tokens if resp.usage else 0
-            self.cost_tracker.log_usage(self.model_name, input_tokens, output_tokens, cycle_num)
+            logger.info(f"Analyst denkt nach... (Modell: {route.model})")
+            with tracer.span('analyst', model=route.model, mode=context['mode']):
+                analyst_json = await self._execute_with_retry(
+                    analyst_prompt, MAX_ANALYST_TOKENS, 0.1,
+                    thinking_budget=route.thinking_budget,
+                    model=route.model,
+                    cycle_num=cycle_num,
+                    template='1_analyst.j2',
+                )
         except json.JSONDecodeError as e:
             logger.error(f"Analyst JSON Parse Error: {e}")
-            logger.debug(f"Raw response: {analyst_content[:500]}")
+            logger.debug(f"Raw response: {e.doc[:500]}")
             return None
         except Exception as e:
             logger.error(f"Analyst failed: {e}")
             return None
 
-        # SCHRITT 2: Der Guardian (Risk Check)
-        guardian_data = {
-            'proposal': json.dumps(analyst_json, indent=2),
-            'risk_metrics': json.dumps(risk_metrics, indent=2) if risk_metrics else json.dumps({})
-        }
-
-        # Prompt aus Cache holen oder erstellen
-        guardian_prompt = self._get_cached_prompt('2_guardian.j2', guardian_data)
-        if guardian_prompt is None:
-            guardian_prompt = self.template_env.get_template('2_guardian.j2').render(guardian_data)
-            guardian_prompt = self._optimize_tokens(guardian_prompt)
-            self._cache_prompt('2_guardian.j2', guardian_data, guardian_prompt)
-        else:
-            self.cache_hits += 1
+        self.prompt_context.record(context['mode'], {
+            'portfolio': portfolio_data,
+            'portfolio_indicators': portfolio_indicators,
+            'market_overview': market_overview,
+            'risk_metrics': risk_metrics,
+        }, analyst_json)
 
-        # Guardian verwendet separates Modell — original_model vor try-Block sichern
-        original_model = self.model_name
-        self.model_name = self.guardian_model_name
+        # SCHRITT 2: Der Guardian (Risk Check)
+        guardian_prompt = self._build_prompt('2_guardian.j2', {
+            'proposal': analyst_json,
+            'risk_metrics': risk_metrics,
+        })
+
+        # Guardian verwendet separates Modell (explizit pro Aufruf, kein Umschalten von self.model_name)
+        route = self.router.route('cycle', guardian_prompt, self.guardian_model_name,
+                                  THINKING_BUDGET_GUARDIAN, MAX_GUARDIAN_TOKENS)
+        ttl = self._cache_ttl(LLM_CACHE_TTL_MARKET, route, self.guardian_model_name, THINKING_BUDGET_GUARDIAN)
         try:
-            logger.info(f"Guardian prüft... (Modell: {self.guardian_model_name})")
-            resp = self._execute_with_retry(
-                guardian_prompt, MAX_GUARDIAN_TOKENS, 0.0,
-                thinking_budget=THINKING_BUDGET_GUARDIAN
-            )
-            self.model_name = original_model
-            guardian_content = resp.choices[0].message.content
-            guardian_result = json.loads(self._clean_json(guardian_content))
-
-            # Kosten tracken für Guardian (mit Guardian-Modell-Name)
-            input_tokens = resp.usage.prompt_tokens if resp.usage else 0
-            output_tokens = resp.usage.completion_tokens if resp.usage else 0
-            self.cost_tracker.log_usage(self.guardian_model_name, input_tokens, output_tokens, cycle_num)
+            logger.info(f"Guardian prüft... (Modell: {route.model})")
+            with tracer.span('guardian', model=route.model):
+                guardian_result = await self._execute_with_retry(
+                    guardian_prompt, MAX_GUARDIAN_TOKENS, 0.0,
+                    thinking_budget=route.thinking_budget,
+                    model=route.model,
+                    cycle_num=cycle_num,
+                    template='2_guardian.j2',
+                )
 
             # Guardian-Ergebnis verarbeiten
             if guardian_result.get("approved", True):
@@ -339,19 +782,19 @@ class LLMEngine:
                 news_val = guardian_result.get("news_validation", {})
                 if news_val.get("source_quality") == "low":
                     final_message += "\n\n⚠️ _Hinweis: News-Quellen mit niedriger Qualität — bitte selbst verifizieren._"
-                return {
+                return self._store_response(cache_key, {
                     "approved": True,
                     "message": final_message,
                     "confidence": guardian_result.get("confidence", "high"),
                     "warnings": guardian_result.get("warnings", []),
                     "sentiment_consistency": guardian_result.get("sentiment_consistency", "consistent"),
                     "news_validation": news_val
-                }
+                }, ttl)
             else:
                 # Wenn nicht approved, verwende die korrigierte Nachricht
                 corrections = guardian_result.get("corrections", {})
                 corrected_message = corrections.get("reason", "Empfehlung wurde abgelehnt")
-                return {
+                return self._store_response(cache_key, {
                     "approved": False,
                     "message": corrected_message,
                     "confidence": guardian_result.get("confidence", "low"),
@@ -359,12 +802,11 @@ class LLMEngine:
                     "original_recommendation": corrections.get("original_recommendation"),
                     "corrected_recommendation": corrections.get("corrected_recommendation"),
                     "news_validation": guardian_result.get("news_validation", {})
-                }
+                }, ttl)
 
         except json.JSONDecodeError as e:
             logger.error(f"Guardian JSON Parse Error: {e}")
-            logger.debug(f"Raw response: {guardian_content[:500]}")
-            self.model_name = original_model  # Modell immer zurücksetzen
+            logger.debug(f"Raw response: {e.doc[:500]}")
             return {
                 "approved": True,
                 "message": analyst_json.get("telegram_message", "Analyse abgeschlossen") + "\n\n⚠️ (Guardian Error)",
@@ -374,7 +816,6 @@ class LLMEngine:
         except Exception as e:
             logger.error(f"Guardian failed: {e}")
             # Fallback: Wenn Guardian stirbt, ist Analyst besser als nichts (aber markiert)
-            self.model_name = original_model  # Modell zurücksetzen
             return {
                 "approved": True,
                 "message": analyst_json.get("telegram_message", "Analyse abgeschlossen") + "\n\n⚠️ (Guardian Error)",
@@ -382,7 +823,7 @@ class LLMEngine:
                 "warnings": [f"Guardian exception: {str(e)}"]
             }
 
-    def analyze_next_investment(
+    async def analyze_next_investment(
         self,
         invest_amount: float,
         portfolio_data: Dict[str, Any],
@@ -410,78 +851,65 @@ class LLMEngine:
             oder None bei kritischem Fehler.
         """
         # SCHRITT 1: Analyst – Investment-Empfehlung erstellen
-        analyst_data = {
-            'invest_amount': invest_amount,
-            'portfolio': json.dumps(portfolio_data, indent=2),
-            'portfolio_indicators': json.dumps(portfolio_indicators, indent=2),
-            'market_overview': json.dumps(market_overview, indent=2),
-            'performance_data': json.dumps(performance_data, indent=2) if performance_data else json.dumps({}),
-        }
-
-        # Prompt aus Cache holen oder erstellen
-        next_invest_prompt = self._get_cached_prompt('3_next_invest.j2', analyst_data)
-        if next_invest_prompt is None:
-            next_invest_prompt = self.template_env.get_template('3_next_invest.j2').render(analyst_data)
-            next_invest_prompt = self._optimize_tokens(next_invest_prompt)
-            self._cache_prompt('3_next_invest.j2', analyst_data, next_invest_prompt)
-        else:
-            self.cache_hits += 1
+        next_invest_prompt = self._build_prompt('3_next_invest.j2', {
+            'portfolio': portfolio_data,
+            'portfolio_indicators': portfolio_indicators,
+            'market_overview': market_overview,
+            'performance_data': performance_data,
+        }, extra={'invest_amount': invest_amount},
+            weights={'portfolio_indicators': self._position_weights(portfolio_data, portfolio_indicators)})
+
+        route = self.router.route('next', next_invest_prompt, self.model_name,
+                                  THINKING_BUDGET_NEXT_INVEST, MAX_NEXT_INVEST_TOKENS)
+        cache_key = self._response_key(
+            'next_invest', ('3_next_invest.j2', '2_guardian.j2'), route,
+            portfolio_data=portfolio_data, portfolio_indicators=portfolio_indicators,
+            market_overview=market_overview, performance_data=performance_data,
+            invest_amount=invest_amount,
+        )
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            logger.info(f"Next-Invest Analyst denkt nach... (Betrag: {invest_amount} EUR)")
-            resp = self._execute_with_retry(
+            logger.info(f"Next-Invest Analyst denkt nach... (Betrag: {invest_amount} EUR, Modell: {route.model})")
+            analyst_json = await self._execute_with_retry(
                 next_invest_prompt, MAX_NEXT_INVEST_TOKENS, 0.1,
-                thinking_budget=THINKING_BUDGET_NEXT_INVEST
+                thinking_budget=route.thinking_budget,
+                model=route.model,
+                cycle_num=cycle_num,
+                template='3_next_invest.j2',
             )
-            analyst_content = resp.choices[0].message.content
-            analyst_json = json.loads(self._clean_json(analyst_content))
-
-            # Kosten tracken
-            input_tokens = resp.usage.prompt_tokens if resp.usage else 0
-            output_tokens = resp.usage.completion_tokens if resp.usage else 0
-            self.cost_tracker.log_usage(self.model_name, input_tokens, output_tokens, cycle_num)
 
         except json.JSONDecodeError as e:
             logger.error(f"Next-Invest Analyst JSON Parse Error: {e}")
-            logger.debug(f"Raw response: {analyst_content[:500]}")
+            logger.debug(f"Raw response: {e.doc[:500]}")
             return None
         except Exception as e:
             logger.error(f"Next-Invest Analyst failed: {e}")
             return None
 
         # SCHRITT 2: Guardian – Empfehlung validieren
-        guardian_data = {
-            'proposal': json.dumps(analyst_json, indent=2),
-            'risk_metrics': json.dumps({
+        guardian_prompt = self._build_prompt('2_guardian.j2', {
+            'proposal': analyst_json,
+            'risk_metrics': {
                 'invest_amount': invest_amount,
                 'context': 'next_investment_recommendation'
-            }, indent=2)
-        }
-
-        guardian_prompt = self._get_cached_prompt('2_guardian.j2', guardian_data)
-        if guardian_prompt is None:
-            guardian_prompt = self.template_env.get_template('2_guardian.j2').render(guardian_data)
-            guardian_prompt = self._optimize_tokens(guardian_prompt)
-            self._cache_prompt('2_guardian.j2', guardian_data, guardian_prompt)
-        else:
-            self.cache_hits += 1
+            },
+        })
 
-        original_model = self.model_name
-        self.model_name = self.guardian_model_name
+        route = self.router.route('next', guardian_prompt, self.guardian_model_name,
+                                  THINKING_BUDGET_GUARDIAN, MAX_GUARDIAN_TOKENS)
+        ttl = self._cache_ttl(LLM_CACHE_TTL_NEXT_INVEST, route, self.guardian_model_name, THINKING_BUDGET_GUARDIAN)
         try:
-            logger.info(f"Next-Invest Guardian prüft... (Modell: {self.guardian_model_name})")
-            resp = self._execute_with_retry(
+            logger.info(f"Next-Invest Guardian prüft... (Modell: {route.model})")
+            guardian_result = await self._execute_with_retry(
                 guardian_prompt, MAX_GUARDIAN_TOKENS, 0.0,
-                thinking_budget=THINKING_BUDGET_GUARDIAN
+                thinking_budget=route.thinking_budget,
+                model=route.model,
+                cycle_num=cycle_num,
+                template='2_guardian.j2',
             )
-            self.model_name = original_model
-            guardian_content = resp.choices[0].message.content
-            guardian_result = json.loads(self._clean_json(guardian_content))
-
-            # Kosten tracken für Guardian
-            input_tokens = resp.usage.prompt_tokens if resp.usage else 0
-            output_tokens = resp.usage.completion_tokens if resp.usage else 0
-            self.cost_tracker.log_usage(self.guardian_model_name, input_tokens, output_tokens, cycle_num)
 
             if guardian_result.get("approved", True):
                 final_message = (
@@ -493,7 +921,7 @@ class LLMEngine:
                 news_val = guardian_result.get("news_validation", {})
                 if news_val.get("source_quality") == "low":
                     final_message += "\n\n⚠️ _Hinweis: Quellen mit niedriger Qualität – bitte selbst verifizieren._"
-                return {
+                return self._store_response(cache_key, {
                     "approved": True,
                     "message": final_message,
                     "splits": analyst_json.get("splits", []),
@@ -504,21 +932,20 @@ class LLMEngine:
                     "warnings": guardian_result.get("warnings", []),
                     "sentiment": analyst_json.get("sentiment", "neutral"),
                     "sources": analyst_json.get("sources", []),
-                }
+                }, ttl)
             else:
                 corrections = guardian_result.get("corrections", {})
                 corrected_message = corrections.get("reason", "Empfehlung wurde abgelehnt")
-                return {
+                return self._store_response(cache_key, {
                     "approved": False,
                     "message": corrected_message,
                     "splits": [],
                     "confidence": guardian_result.get("confidence", "low"),
                     "warnings": guardian_result.get("warnings", []),
-                }
+                }, ttl)
 
         except json.JSONDecodeError as e:
             logger.error(f"Next-Invest Guardian JSON Parse Error: {e}")
-            self.model_name = original_model
             return {
                 "approved": True,
                 "message": analyst_json.get("telegram_message", "Investment-Analyse abgeschlossen") + "\n\n⚠️ (Guardian Error)",
@@ -530,7 +957,6 @@ class LLMEngine:
             }
         except Exception as e:
             logger.error(f"Next-Invest Guardian failed: {e}")
-            self.model_name = original_model
             return {
                 "approved": True,
                 "message": analyst_json.get("telegram_message", "Investment-Analyse abgeschlossen") + "\n\n⚠️ (Guardian Error)",
@@ -541,7 +967,7 @@ class LLMEngine:
                 "warnings": [f"Guardian exception: {str(e)}"],
             }
 
-    def analyze_weekly_summary(
+    async def analyze_weekly_summary(
         self,
         portfolio_data: Dict[str, Any],
         portfolio_indicators: Dict[str, Any],
@@ -568,36 +994,35 @@ class LLMEngine:
             Dict mit 'message' und weiteren Feldern, oder None bei kritischem Fehler.
             Gibt IMMER eine Nachricht zurück (auch bei HOLD).
         """
-        analyst_data = {
-            'portfolio': json.dumps(portfolio_data, indent=2),
-            'portfolio_indicators': json.dumps(portfolio_indicators, indent=2),
-            'market_overview': json.dumps(market_overview, indent=2),
-            'performance_data': json.dumps(performance_data, indent=2) if performance_data else json.dumps({}),
-            'risk_metrics': json.dumps(risk_metrics, indent=2) if risk_metrics else json.dumps({}),
-        }
-
-        # Prompt aus Cache holen oder erstellen
-        weekly_prompt = self._get_cached_prompt('4_weekly_summary.j2', analyst_data)
-        if weekly_prompt is None:
-            weekly_prompt = self.template_env.get_template('4_weekly_summary.j2').render(analyst_data)
-            weekly_prompt = self._optimize_tokens(weekly_prompt)
-            self._cache_prompt('4_weekly_summary.j2', analyst_data, weekly_prompt)
-        else:
-            self.cache_hits += 1
+        weekly_prompt = self._build_prompt('4_weekly_summary.j2', {
+            'portfolio': portfolio_data,
+            'portfolio_indicators': portfolio_indicators,
+            'market_overview': market_overview,
+            'performance_data': performance_data,
+            'risk_metrics': risk_metrics,
+        }, weights={'portfolio_indicators': self._position_weights(portfolio_data, portfolio_indicators)})
+
+        route = self.router.route('weekly', weekly_prompt, self.model_name,
+                                  THINKING_BUDGET_ANALYST, MAX_ANALYST_TOKENS)
+        cache_key = self._response_key(
+            'weekly_summary', ('4_weekly_summary.j2',), route,
+            portfolio_data=portfolio_data, portfolio_indicators=portfolio_indicators,
+            market_overview=market_overview, performance_data=performance_data,
+            risk_metrics=risk_metrics,
+        )
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            logger.info("Weekly Summary Analyst denkt nach...")
-            resp = self._execute_with_retry(
+            logger.info(f"Weekly Summary Analyst denkt nach... (Modell: {route.model})")
+            analyst_json = await self._execute_with_retry(
                 weekly_prompt, MAX_ANALYST_TOKENS, 0.2,
-                thinking_budget=THINKING_BUDGET_ANALYST
+                thinking_budget=route.thinking_budget,
+                model=route.model,
+                cycle_num=cycle_num,
+                template='4_weekly_summary.j2',
             )
-            analyst_content = resp.choices[0].message.content
-            analyst_json = json.loads(self._clean_json(analyst_content))
-
-            # Kosten tracken
-            input_tokens = resp.usage.prompt_tokens if resp.usage else 0
-            output_tokens = resp.usage.completion_tokens if resp.usage else 0
-            self.cost_tracker.log_usage(self.model_name, input_tokens, output_tokens, cycle_num)
 
             # Telegram-Nachricht direkt aus Analyst-Output — kein Guardian
             message = analyst_json.get("telegram_message", "")
@@ -615,7 +1040,7 @@ class LLMEngine:
                     f"⚠️ _Keine Finanzberatung. Eigene Due Diligence erforderlich._"
                 )
 
-            return {
+            return self._store_response(cache_key, {
                 "message": message,
                 "recommendation": analyst_json.get("recommendation", "HOLD"),
                 "sentiment": analyst_json.get("sentiment", "neutral"),
@@ -623,11 +1048,11 @@ class LLMEngine:
                 "portfolio_summary": analyst_json.get("portfolio_summary", {}),
                 "action_items": analyst_json.get("action_items", []),
                 "sources": analyst_json.get("sources", []),
-            }
+            }, LLM_CACHE_TTL_WEEKLY)
 
         except json.JSONDecodeError as e:
             logger.error(f"Weekly Summary JSON Parse Error: {e}")
-            logger.debug(f"Raw response: {analyst_content[:500] if 'analyst_content' in locals() else 'N/A'}")
+            logger.debug(f"Raw response: {e.doc[:500]}")
             return None
         except Exception as e:
             logger.error(f"Weekly Summary failed: {e}")
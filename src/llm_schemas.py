@@ -0,0 +1,177 @@
+"""
+JSON-Schemas der Modell-Antworten pro Prompt-Template.
+
+Die Schemas werden (sofern der Proxy es unterstützt) als response_format
+mitgeschickt und nach dem Parsen zur Prüfung der Pflichtfelder genutzt. Die
+Prüfung deckt bewusst nur das ab, worauf der Code sich verlässt: Pflicht-
+felder und Grundtypen der obersten Ebene. Felder, für die der Aufrufer
+einen Default oder Fallback hat (z.B. telegram_message im Weekly Summary,
+approved beim Guardian), sind nicht Pflicht – eine Teil-Antwort löst keine
+Korrektur-Anfrage aus. Enums dienen dem Modell als Vorgabe, werden aber
+nicht hart geprüft.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from config import LLM_STRUCTURED_OUTPUT_MODE
+from json_stream import StreamingJSONError
+
+_STRING = {'type': 'string'}
+_STRINGS = {'type': 'array', 'items': _STRING}
+_SENTIMENT = {'type': 'string', 'enum': ['bullish', 'bearish', 'neutral']}
+_LEVEL = {'type': 'string', 'enum': ['high', 'medium', 'low']}
+
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    '1_analyst.j2': {
+        'type': 'object',
+        'properties': {
+            'sentiment': _SENTIMENT,
+            'urgency_score': {'type': 'integer', 'minimum': 1, 'maximum': 10},
+            'recommendation': {'type': 'string', 'enum': [
+                'HOLD', 'REBALANCE', 'BUY_DIP', 'TAKE_PROFIT', 'CUT_LOSSES',
+                'BUY_NEW_COIN', 'NEWS_SELL', 'NEWS_BUY', 'MACRO_RISK',
+            ]},
+            'reasoning': _STRING,
+            'news_summary': _STRING,
+            'sources': _STRINGS,
+            'macro_context': _STRING,
+            'telegram_message': _STRING,
+        },
+        'required': [],
+    },
+    '2_guardian.j2': {
+        'type': 'object',
+        'properties': {
+            'approved': {'type': 'boolean'},
+            'corrections': {
+                'type': 'object',
+                'properties': {
+                    'original_recommendation': _STRING,
+                    'corrected_recommendation': _STRING,
+                    'reason': _STRING,
+                },
+            },
+            'confidence': _LEVEL,
+            'news_validation': {
+                'type': 'object',
+                'properties': {
+                    'sources_verified': {'type': 'boolean'},
+                    'source_quality': {'type': 'string', 'enum': ['high', 'medium', 'low', 'none']},
+                    'news_age_ok': {'type': 'boolean'},
+                    'comment': _STRING,
+                },
+            },
+            'sentiment_consistency': {'type': 'string', 'enum': ['consistent', 'mixed', 'contradictory']},
+            'warnings': _STRINGS,
+            'final_message': _STRING,
+        },
+        'required': [],
+    },
+    '3_next_invest.j2': {
+        'type': 'object',
+        'properties': {
+            'invest_amount': {'type': 'number'},
+            'splits': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'coin': _STRING,
+                        'amount_eur': {'type': 'number'},
+                        'percent_of_investment': {'type': 'number'},
+                        'reasoning': _STRING,
+                        'entry_signal': _STRING,
+                        'risk_level': _LEVEL,
+                    },
+                    'required': ['coin', 'amount_eur'],
+                },
+            },
+            'total_splits': {'type': 'integer'},
+            'split_strategy_reasoning': _STRING,
+            'strategy': {'type': 'string', 'enum': ['DIVERSIFIED', 'CONCENTRATED', 'SINGLE', 'DIP_BUYING', 'MOMENTUM']},
+            'sentiment': _SENTIMENT,
+            'urgency_score': {'type': 'integer'},
+            'market_context': _STRING,
+            'sources': _STRINGS,
+            'telegram_message': _STRING,
+        },
+        'required': ['splits'],
+    },
+    '4_weekly_summary.j2': {
+        'type': 'object',
+        'properties': {
+            'week_number': _STRING,
+            'recommendation': {'type': 'string', 'enum': [
+                'HOLD', 'WATCH', 'TAKE_PROFIT', 'CUT_LOSSES', 'REBALANCE', 'BUY_OPPORTUNITY',
+            ]},
+            'sentiment': _SENTIMENT,
+            'portfolio_summary': {'type': 'object'},
+            'market_context': _STRING,
+            'weekly_recap': _STRING,
+            'outlook_next_week': _STRING,
+            'action_items': _STRINGS,
+            'sources': _STRINGS,
+            'telegram_message': _STRING,
+        },
+        'required': [],
+    },
+}
+
+class SchemaValidationError(StreamingJSONError):
+    """Gültiges JSON, das Pflichtfelder oder Typen des Schemas verletzt."""
+
+
+# JSON-Schema-Typ → erlaubte Python-Typen (bool ist kein int/number)
+_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'array': (list,),
+    'object': (dict,),
+}
+
+
+def schema_for(template: str) -> Optional[Dict[str, Any]]:
+    return SCHEMAS.get(template)
+
+
+def response_format(template: str, mode: str = LLM_STRUCTURED_OUTPUT_MODE) -> Optional[Dict[str, Any]]:
+    """response_format-Parameter für ein Template (None = keiner).
+
+    Args:
+        template: Prompt-Template
+        mode: 'json_schema' (Schema erzwingen), 'json_object' (nur JSON) oder 'off'
+    """
+    schema = schema_for(template)
+    if schema is None or mode == 'off':
+        return None
+    if mode == 'json_object':
+        return {'type': 'json_object'}
+    name = template.rsplit('.', 1)[0].lstrip('0123456789_')
+    return {'type': 'json_schema', 'json_schema': {'name': name, 'schema': schema}}
+
+
+def _type_ok(value: Any, expected: str) -> bool:
+    if expected in ('integer', 'number') and isinstance(value, bool):
+        return False
+    if expected == 'integer' and isinstance(value, float):
+        return value.is_integer()
+    return isinstance(value, _TYPES.get(expected, (object,)))
+
+
+def validate(template: str, obj: Dict[str, Any]) -> List[str]:
+    """Prüft Pflichtfelder und Grundtypen der obersten Ebene.
+
+    Returns:
+        Liste der Fehler (leer = gültig oder kein Schema)
+    """
+    schema = schema_for(template)
+    if schema is None:
+        return []
+    errors = [f"Pflichtfeld '{key}' fehlt" for key in schema.get('required', []) if key not in obj]
+    for key, spec in schema['properties'].items():
+        value = obj.get(key)
+        if value is not None and not _type_ok(value, spec['type']):
+            errors.append(f"Feld '{key}' muss vom Typ {spec['type']} sein, ist {type(value).__name__}")
+    return errors
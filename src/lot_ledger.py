@@ -0,0 +1,335 @@
+"""
+Lot-basierte Einstandspreise (FIFO / LIFO / Durchschnittskosten).
+
+Das Ledger liest Kraken-Trades inkrementell ein (Cursor = letzter Zeitstempel
+plus die dort bereits verarbeiteten Trade-IDs) und führt pro Coin eine nach
+Zeit sortierte Lot-Liste. Verkäufe werden in O(log n) gegen das älteste
+(FIFO) bzw. jüngste (LIFO) Lot gematcht; realisierter und unrealisierter
+P&L stehen pro Coin bereit.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional
+
+from config import BASE_CURRENCY, COST_BASIS_METHOD
+
+try:
+    from sortedcontainers import SortedKeyList
+except ImportError:  # pragma: no cover - Fallback ohne sortedcontainers
+    SortedKeyList = None
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('FIFO', 'LIFO', 'AVG')
+
+
+class _BisectKeyList:
+    """Minimaler Ersatz für SortedKeyList (bisect, O(n) beim Einfügen)."""
+
+    def __init__(self, key):
+        self._key = key
+        self._keys = []
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, item):
+        k = self._key(item)
+        i = bisect_right(self._keys, k)
+        self._keys.insert(i, k)
+        self._items.insert(i, item)
+
+    def pop(self, index=-1):
+        self._keys.pop(index)
+        return self._items.pop(index)
+
+
+def _sorted_lots():
+    """Nach (Zeitstempel, Sequenz) sortierte Lot-Liste."""
+    key = lambda lot: (lot.timestamp, lot.seq)  # noqa: E731
+    return SortedKeyList(key=key) if SortedKeyList is not None else _BisectKeyList(key)
+
+
+class Lot:
+    """Offener Kauf-Lot (Restmenge wird beim Matching reduziert)."""
+
+    __slots__ = ('timestamp', 'seq', 'amount', 'price')
+
+    def __init__(self, timestamp: int, seq: int, amount: float, price: float):
+        self.timestamp = timestamp
+        self.seq = seq
+        self.amount = amount
+        self.price = price
+
+
+class CoinLots:
+    """Lots und P&L eines einzelnen Coins."""
+
+    def __init__(self, method: str = 'FIFO'):
+        self.method = method
+        self.lots = _sorted_lots()
+        self.amount = 0.0
+        self.cost = 0.0
+        self.realized_pnl = 0.0
+        self.unmatched_sell_amount = 0.0
+        self._seq = 0
+
+    def buy(self, amount: float, cost: float, timestamp: int) -> None:
+        """Verbucht einen Kauf (cost inkl. Gebühren in BASE_CURRENCY)."""
+        if amount <= 0:
+            return
+        self.amount += amount
+        self.cost += cost
+        if self.method != 'AVG':
+            self._seq += 1
+            self.lots.add(Lot(timestamp, self._seq, amount, cost / amount))
+
+    def sell(self, amount: float, proceeds: float) -> float:
+        """Verbucht einen Verkauf und gibt den realisierten P&L zurück.
+
+        Verkäufe ohne passenden Bestand (z.B. Coins aus Einzahlungen vor der
+        Trade-Historie) werden nicht realisiert, sondern als unmatched gezählt.
+        """
+        if amount <= 0:
+            return 0.0
+        matched = min(amount, self.amount)
+        if matched < amount:
+            self.unmatched_sell_amount += amount - matched
+        if matched <= 0:
+            return 0.0
+
+        if self.method == 'AVG':
+            cost_out = self.cost * matched / self.amount
+        else:
+            cost_out = 0.0
+            remaining = matched
+            index = 0 if self.method == 'FIFO' else -1
+            while remaining > 1e-12 and len(self.lots):
+                lot = self.lots[index]
+                take = min(lot.amount, remaining)
+                cost_out += take * lot.price
+                lot.amount -= take
+                remaining -= take
+                if lot.amount <= 1e-12:
+                    self.lots.pop(index)
+
+        pnl = proceeds * matched / amount - cost_out
+        self.amount -= matched
+        self.cost = max(self.cost - cost_out, 0.0) if self.amount > 1e-12 else 0.0
+        if self.amount <= 1e-12:
+            self.amount = 0.0
+        self.realized_pnl += pnl
+        return pnl
+
+    @property
+    def average_entry(self) -> Optional[float]:
+        """Durchschnittlicher Einstandspreis der offenen Menge."""
+        return self.cost / self.amount if self.amount > 0 else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'amount': self.amount,
+            'cost': self.cost,
+            'realized_pnl': self.realized_pnl,
+            'unmatched_sell_amount': self.unmatched_sell_amount,
+            'seq': self._seq,
+            'lots': [[lot.timestamp, lot.seq, lot.amount, lot.price] for lot in self.lots],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, method: str) -> "CoinLots":
+        coin_lots = cls(method)
+        coin_lots.amount = data['amount']
+        coin_lots.cost = data['cost']
+        coin_lots.realized_pnl = data['realized_pnl']
+        coin_lots.unmatched_sell_amount = data.get('unmatched_sell_amount', 0.0)
+        coin_lots._seq = data.get('seq', 0)
+        for timestamp, seq, amount, price in data.get('lots', []):
+            coin_lots.lots.add(Lot(timestamp, seq, amount, price))
+        return coin_lots
+
+
+class LotLedger:
+    """Inkrementelles Trade-Ledger mit Lot-Matching pro Coin."""
+
+    def __init__(self, state_path: Optional[str] = None, method: str = COST_BASIS_METHOD,
+                 quote_currency: str = BASE_CURRENCY):
+        """Initialisiert das Ledger und lädt ggf. einen gespeicherten Stand.
+
+        Args:
+            state_path: JSON-Datei für Lots und Cursor (None = nur im Speicher)
+            method: 'FIFO', 'LIFO' oder 'AVG'
+            quote_currency: Nur Trades gegen diese Währung werden verbucht
+        """
+        method = method.upper()
+        if method not in METHODS:
+            raise ValueError(f"Unbekannte Cost-Basis-Methode: {method}")
+        self.method = method
+        self.quote_currency = quote_currency
+        self.state_path = state_path
+        self.coins: Dict[str, CoinLots] = {}
+        # Cursor: letzter verarbeiteter Zeitstempel (ms) und die IDs genau dort
+        self.last_timestamp: Optional[int] = None
+        self._ids_at_last: set = set()
+        self.trade_count = 0
+        if state_path:
+            self.load()
+
+    def _coin(self, coin: str) -> CoinLots:
+        if coin not in self.coins:
+            self.coins[coin] = CoinLots(self.method)
+        return self.coins[coin]
+
+    def _is_new(self, trade: Dict) -> bool:
+        ts = trade.get('timestamp') or 0
+        if self.last_timestamp is None or ts > self.last_timestamp:
+            return True
+        return ts == self.last_timestamp and str(trade.get('id')) not in self._ids_at_last
+
+    def ingest(self, trades: Iterable[Dict]) -> int:
+        """Verbucht neue ccxt-Trades (bereits verarbeitete werden übersprungen).
+
+        Args:
+            trades: Trades im ccxt-Format (id, timestamp, symbol, side, amount, price, cost, fee)
+
+        Returns:
+            Anzahl neu verbuchter Trades
+        """
+        new_trades = sorted(
+            (t for t in trades if self._is_new(t)),
+            key=lambda t: (t.get('timestamp') or 0, str(t.get('id'))),
+        )
+        processed = 0
+        for trade in new_trades:
+            if not self._is_new(trade):
+                continue  # Duplikat innerhalb derselben Lieferung
+            ts = trade.get('timestamp') or 0
+            if self.last_timestamp is None or ts > self.last_timestamp:
+                self.last_timestamp = ts
+                self._ids_at_last = set()
+            self._ids_at_last.add(str(trade.get('id')))
+            if self._apply(trade):
+                processed += 1
+        self.trade_count += processed
+        return processed
+
+    def _apply(self, trade: Dict) -> bool:
+        """Verbucht einen Trade; False wenn er nicht in BASE_CURRENCY notiert."""
+        base, _, quote = (trade.get('symbol') or '').partition('/')
+        if quote != self.quote_currency:
+            logger.debug(f"Trade {trade.get('id')} in {quote or '?'} ignoriert")
+            return False
+
+        amount = float(trade.get('amount') or 0)
+        cost = float(trade.get('cost') or amount * float(trade.get('price') or 0))
+        fee = trade.get('fee') or {}
+        fee_cost = float(fee.get('cost') or 0)
+        if fee.get('currency') == quote:
+            cost = cost + fee_cost if trade.get('side') == 'buy' else cost - fee_cost
+        elif fee.get('currency') == base:
+            amount = amount - fee_cost if trade.get('side') == 'buy' else amount + fee_cost
+
+        if trade.get('side') == 'buy':
+            self._coin(base).buy(amount, cost, trade.get('timestamp') or 0)
+        else:
+            self._coin(base).sell(amount, cost)
+        return True
+
+    def sync(self, market) -> int:
+        """Holt nur neue Trades seit dem Cursor über MarketData und verbucht sie.
+
+        Args:
+            market: Objekt mit fetch_my_trades_since(since_ms)
+
+        Returns:
+            Anzahl neu verbuchter Trades (0 bei Fehler)
+        """
+        try:
+            trades = market.fetch_my_trades_since(self.last_timestamp)
+            processed = self.ingest(trades)
+            if processed:
+                logger.info(f"Lot-Ledger: {processed} neue Trades verbucht ({self.trade_count} gesamt)")
+                self.save()
+            return processed
+        except Exception as e:
+            logger.error(f"Fehler beim Trade-Sync: {e}")
+            return 0
+
+    def positions(self, prices: Dict[str, Optional[float]]) -> Dict[str, Dict]:
+        """Einstandspreis sowie realisierter/unrealisierter P&L pro Coin.
+
+        Args:
+            prices: Dict Coin → aktueller Preis
+
+        Returns:
+            Dict Coin → {'amount', 'average_entry', 'cost_basis_eur',
+            'realized_pnl_eur', 'unrealized_pnl_eur'}
+        """
+        result = {}
+        for coin, coin_lots in self.coins.items():
+            price = prices.get(coin)
+            unrealized = coin_lots.amount * price - coin_lots.cost if price else None
+            entry = coin_lots.average_entry
+            result[coin] = {
+                'amount': coin_lots.amount,
+                'average_entry': round(entry, 2) if entry is not None else None,
+                'cost_basis_eur': round(coin_lots.cost, 2),
+                'realized_pnl_eur': round(coin_lots.realized_pnl, 2),
+                'unrealized_pnl_eur': round(unrealized, 2) if unrealized is not None else None,
+            }
+        return result
+
+    # ── Persistenz ───────────────────────────────────────────────────────────
+
+    def to_dict(self) -> Dict:
+        return {
+            'method': self.method,
+            'last_timestamp': self.last_timestamp,
+            'ids_at_last': sorted(self._ids_at_last),
+            'trade_count': self.trade_count,
+            'coins': {coin: lots.to_dict() for coin, lots in self.coins.items()},
+        }
+
+    def save(self) -> None:
+        """Schreibt Lots und Cursor atomar (Temp-Datei + rename)."""
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(self.state_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.lot_ledger_', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Fehler beim Speichern des Lot-Ledgers: {e}")
+
+    def load(self) -> None:
+        """Lädt einen gespeicherten Stand (bei anderer Methode wird neu aufgebaut)."""
+        try:
+            if not self.state_path or not os.path.exists(self.state_path):
+                return
+            with open(self.state_path, 'r') as f:
+                data = json.load(f)
+            if data.get('method') != self.method:
+                logger.info("Lot-Ledger mit anderer Methode gespeichert – baue neu auf")
+                return
+            coins = {coin: CoinLots.from_dict(d, self.method) for coin, d in data.get('coins', {}).items()}
+            self.coins = coins
+            self.last_timestamp = data.get('last_timestamp')
+            self._ids_at_last = set(data.get('ids_at_last', []))
+            self.trade_count = data.get('trade_count', 0)
+            logger.info(f"Lot-Ledger geladen: {self.trade_count} Trades, {len(coins)} Coins")
+        except Exception as e:
+            logger.warning(f"Fehler beim Laden des Lot-Ledgers: {e}")
+
@@ -1,11 +1,13 @@
 import os
+import asyncio
 import json
 import logging
 import time
 import threading
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from typing import Optional
+from urllib.parse import parse_qs, urlsplit
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -16,6 +18,10 @@ from llm_engine import LLMEngine
 from data_fetcher import MarketData
 from portfolio_tracker import PortfolioTracker
 from risk_analyzer import RiskAnalyzer
+from signal_gate import SignalGate
+from cycle_trace import tracer
+from metrics import registry, track_job
+from health_status import health_status
 from config import (
     TELEGRAM_TOKEN_PATH,
     ALLOWED_TELEGRAM_USER_ID,
@@ -28,10 +34,15 @@ from config import (
     PRICE_ALERT_THRESHOLD_DOWN,
     WEEKLY_SUMMARY_DAY,
     WEEKLY_SUMMARY_HOUR,
+    PORTFOLIO_VAR_INTERVAL_SECONDS,
+    TIMESERIES_SAVE_INTERVAL_SECONDS,
 )
 from config_validator import ConfigValidator
 from signal_handler import setup_signal_handlers, register_cleanup_function, perform_graceful_shutdown
-from input_validator import validate_what_if_args, validate_set_interval_args, validate_next_invest_args
+from input_validator import (
+    validate_what_if_args, validate_what_if_grid_args, validate_set_interval_args, validate_next_invest_args,
+)
+from scenario_engine import ScenarioEngine, shock_grid
 
 # Logging Setup mit structlog (falls verfügbar)
 try:
@@ -68,6 +79,7 @@ market = None
 tracker = None
 risk_analyzer = None
 brain = None
+signal_gate = None
 ADMIN_ID = None
 alert_manager = None
 start_time = None
@@ -180,47 +192,46 @@ class HealthHandler(BaseHTTPRequestHandler):
 
     def do_GET(self):
         if self.path == '/health':
+            # Nur der In-Memory-Snapshot – kein Dateizugriff, keine Anwendungs-Locks
             try:
-                last_cycle = get_last_cycle_time() if 'get_last_cycle_time' in globals() else None
-                uptime = get_uptime() if 'get_uptime' in globals() else None
-
-                response = {
-                    'status': 'ok',
-                    'timestamp': time.time(),
-                    'last_cycle': last_cycle,
-                    'uptime': uptime,
-                    'container': 'SlopCoin_advisor',
-                    'portfolio_size': len(portfolio) if 'portfolio' in globals() else 0
-                }
+                body = health_status.to_json()
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self.wfile.write(body)
             except Exception as e:
                 self.send_response(500)
                 self.end_headers()
                 self.wfile.write(b'{"status": "error", "message": "Internal error"}')
         elif self.path == '/metrics':
-            # Prometheus-Format (einfach)
+            # Prometheus-Textformat: Cache, Retries, Exchange, Jobs + LLM-Collector
             try:
-                metrics = []
-                if 'brain' in globals() and hasattr(brain, 'cost_tracker'):
-                    total_cost = brain.cost_tracker.total_cost
-                    total_tokens = brain.cost_tracker.total_tokens
-                    metrics.append(f"# TYPE SlopCoin_total_cost gauge")
-                    metrics.append(f"SlopCoin_total_cost {total_cost}")
-                    metrics.append(f"# TYPE SlopCoin_total_tokens counter")
-                    metrics.append(f"SlopCoin_total_tokens {total_tokens}")
-
-                metrics_text = "\n".join(metrics)
+                metrics_text = registry.exposition()
                 self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
+                self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
                 self.end_headers()
                 self.wfile.write(metrics_text.encode())
             except Exception as e:
                 self.send_response(500)
                 self.end_headers()
                 self.wfile.write(b'Error')
+        elif self.path.split('?', 1)[0] == '/debug/cycles':
+            # Span-Bäume der letzten Zyklen; ?format=chrome für chrome://tracing, ?limit=N
+            try:
+                query = parse_qs(urlsplit(self.path).query)
+                limit = int(query.get('limit', ['0'])[0]) or None
+                if query.get('format', [''])[0] == 'chrome':
+                    body = tracer.chrome_trace(limit)
+                else:
+                    body = {'cycles': tracer.to_json(limit)}
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(body, default=str).encode())
+            except Exception as e:
+                self.send_response(500)
+                self.end_headers()
+                self.wfile.write(b'{"status": "error", "message": "Internal error"}')
         else:
             self.send_response(404)
             self.end_headers()
@@ -230,49 +241,26 @@ class HealthHandler(BaseHTTPRequestHandler):
         pass
 
 
-def start_health_server(port: int = 8080) -> HTTPServer:
+def start_health_server(port: int = 8080) -> ThreadingHTTPServer:
     """Startet den Health-Check HTTP Server in einem separaten Thread.
     
+    Jede Anfrage läuft in einem eigenen Thread, ein langsamer /metrics-Scrape
+    blockiert so keine Docker-Probe auf /health.
+    
     Args:
         port (int): Port für den Health-Check Server (default: 8080)
         
     Returns:
-        HTTPServer: Instanz des gestarteten HTTP Servers
+        ThreadingHTTPServer: Instanz des gestarteten HTTP Servers
     """
-    server = HTTPServer(('0.0.0.0', port), HealthHandler)
+    server = ThreadingHTTPServer(('0.0.0.0', port), HealthHandler)
+    server.daemon_threads = True
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
     logger.info(f"Health-Check Server gestartet auf Port {port}")
     return server
 
 
-def get_last_cycle_time() -> Optional[float]:
-    """Gibt die Zeit des letzten Analyse-Zyklus zurück.
-    
-    Returns:
-        Optional[float]: Unix-Timestamp des letzten Zyklus oder None
-    """
-    try:
-        history = risk_analyzer._load_history() if 'risk_analyzer' in globals() else {}
-        return history.get('last_cycle_timestamp')
-    except:
-        return None
-
-
-def get_uptime() -> Optional[float]:
-    """Gibt die Uptime in Sekunden zurück.
-    
-    Returns:
-        Optional[float]: Uptime in Sekunden oder None
-    """
-    try:
-        if 'start_time' in globals():
-            return time.time() - start_time
-        return None
-    except:
-        return None
-
-
 @admin_only
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Befehl: /help"""
@@ -282,6 +270,7 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/dashboard – Visuelle Portfolio-Allokation\n"
         "/heatmap – Korrelationsmatrix\n"
         "/what\\_if <COIN> <+/-%> – Szenario-Analyse\n"
+        "/what\\_if grid [±%] [Schritt%] – Schock-Raster über alle Coins\n"
         "/next <EUR> – Investment-Empfehlung für neuen Betrag\n"
         "/pause – Automatische Analyse pausieren\n"
         "/resume – Automatische Analyse wieder starten\n"
@@ -300,12 +289,12 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Befehl: /status – Portfolio-Status abfragen (ohne KI, nur Daten)."""
     await update.message.reply_text("Lade Portfolio-Status…")
     try:
-        portfolio = market.get_portfolio()
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if not portfolio:
             await update.message.reply_text("Portfolio ist leer oder konnte nicht geladen werden.")
             return
 
-        _, prices = market.get_portfolio_with_prices()
+        _, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
 
         # Coins ohne gültigen Preis (None oder 0) für Logging erfassen
         invalid_price_coins = {c: prices.get(c) for c in portfolio if not prices.get(c)}
@@ -362,12 +351,12 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Befehl: /dashboard – Visuelle Portfolio-Übersicht"""
     try:
-        portfolio = market.get_portfolio()
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if not portfolio:
             await update.message.reply_text("Portfolio ist leer.")
             return
 
-        _, prices = market.get_portfolio_with_prices()
+        _, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
         total_eur = sum(portfolio.get(c, 0) * prices.get(c, 0) for c in portfolio if prices.get(c))
 
         # Portfolio-Gewichtungen berechnen
@@ -407,20 +396,16 @@ async def cmd_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_heatmap(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Befehl: /heatmap – Korrelationsmatrix als Text-Heatmap"""
     try:
-        # Preis-Historie laden
-        history = risk_analyzer._load_history()
-        price_history_dict = history.get('price_history', {})
-
-        if len(price_history_dict) < 2:
-            await update.message.reply_text("Nicht genug Daten für Korrelationsmatrix (mind. 2 Coins benötigt).")
-            return
+        # Nur Coins des aktuellen Portfolios (verkaufte Coins bleiben im EWMA-Zustand)
+        portfolio_coins = list((await asyncio.to_thread(market.get_portfolio)).keys())
 
-        # Korrelationsmatrix berechnen
-        portfolio_coins = list(portfolio.keys()) if 'portfolio' in locals() else list(price_history_dict.keys())
-        corr_matrix = risk_analyzer.calculate_correlation_matrix(portfolio_coins, price_history_dict)
+        # Korrelationsmatrix aus dem EWMA-Risiko-Zustand, vor dem Warm-up aus der Historie
+        corr_matrix = await asyncio.to_thread(risk_analyzer.current_correlation_matrix, portfolio_coins)
 
-        if not corr_matrix:
-            await update.message.reply_text("Korrelationsmatrix konnte nicht berechnet werden.")
+        if len(corr_matrix) < 2:
+            await update.message.reply_text(
+                "Nicht genug Daten für Korrelationsmatrix (mind. 2 Coins mit ausreichender Historie benötigt)."
+            )
             return
 
         # Text-basierte Heatmap erstellen
@@ -454,8 +439,12 @@ async def cmd_heatmap(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @admin_only
 async def cmd_what_if(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Befehl: /what_if <COIN> <AMOUNT> <TARGET_PRICE> – Szenario-Analyse"""
+    """Befehl: /what_if <COIN> <+/-%> oder /what_if grid [±%] [Schritt%] – Szenario-Analyse"""
     try:
+        if context.args and context.args[0].lower() == 'grid':
+            await _what_if_grid(update, context.args[1:])
+            return
+
         # Input-Validierung mit Pydantic
         valid, request, error_msg = validate_what_if_args(context.args)
         if not valid:
@@ -466,25 +455,28 @@ async def cmd_what_if(update: Update, context: ContextTypes.DEFAULT_TYPE):
         change_percent = request.change_percent
         change_pct = change_percent / 100  # In Dezimal umwandeln
 
-        portfolio = market.get_portfolio()
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if coin not in portfolio:
             await update.message.reply_text(f"{coin} nicht im Portfolio.")
             return
 
-        _, prices = market.get_portfolio_with_prices()
-        total_old = sum(portfolio.get(c, 0) * prices.get(c, 0) for c in portfolio if prices.get(c))
+        _, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
 
         # Szenario berechnen
         new_portfolio = portfolio.copy()
-        if coin in new_portfolio:
-            new_amount = new_portfolio[coin] * (1 + change_pct)
-            if new_amount < 0.001:  # Kraken Mindestmenge
-                await update.message.reply_text(f"⚠️ {coin} Menge würde unter 0.001 fallen – nicht erlaubt.")
-                return
-            new_portfolio[coin] = new_amount
+        new_amount = new_portfolio[coin] * (1 + change_pct)
+        if new_amount < 0.001:  # Kraken Mindestmenge
+            await update.message.reply_text(f"⚠️ {coin} Menge würde unter 0.001 fallen – nicht erlaubt.")
+            return
+        new_portfolio[coin] = new_amount
 
         # Neuen Gesamtwert berechnen (Preise bleiben gleich)
-        total_new = sum(new_portfolio.get(c, 0) * prices.get(c, 0) for c in new_portfolio if prices.get(c))
+        engine = ScenarioEngine(portfolio, prices)
+        total_old = engine.base_total
+        if coin in engine.coins:
+            total_new = engine.single_change(coin, amount_change=change_pct)['value']
+        else:
+            total_new = total_old
         change_eur = total_new - total_old
         change_pct_total = (change_eur / total_old * 100) if total_old > 0 else 0
 
@@ -504,6 +496,36 @@ async def cmd_what_if(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"Fehler: {str(e)}")
 
 
+async def _what_if_grid(update: Update, args: list):
+    """Bewertet das komplette Schock-Raster (Preis und Menge, alle Coins) und sendet eine Tabelle."""
+    valid, request, error_msg = validate_what_if_grid_args(args)
+    if not valid:
+        await update.message.reply_text(error_msg)
+        return
+
+    portfolio, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
+    cov_coins, _, cov = await asyncio.to_thread(risk_analyzer.moments, list(portfolio.keys()))
+    engine = ScenarioEngine(portfolio, prices, cov_coins=cov_coins, cov=cov)
+    if not engine.coins:
+        await update.message.reply_text("Keine bewertbaren Positionen im Portfolio.")
+        return
+
+    start = time.perf_counter()
+    result = engine.grid(shock_grid(request.range_percent, request.step_percent))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    lines = [
+        "*Szenario-Raster*",
+        f"±{request.range_percent:g}% in {request.step_percent:g}%-Schritten, "
+        f"{result['n_scenarios']:,} Szenarien in {elapsed_ms:.1f} ms",
+        f"Aktueller Wert: {engine.base_total:.2f} EUR",
+        "```",
+        engine.summary_table(result),
+        "```",
+    ]
+    await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+
+
 @admin_only
 async def cmd_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Befehl: /next <EUR> – KI-gestützte Investment-Empfehlung für einen neuen Betrag.
@@ -532,16 +554,18 @@ async def cmd_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
     try:
-        # 2. Portfolio & Marktdaten laden
-        portfolio = market.get_portfolio()
+        # 2. Portfolio & Marktdaten laden (Exchange-Aufrufe im Worker-Thread)
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if not portfolio:
             await update.message.reply_text("⚠️ Portfolio ist leer oder konnte nicht geladen werden.")
             return
 
-        portfolio_with_prices, prices = market.get_portfolio_with_prices()
-        portfolio_indicators = market.get_portfolio_indicators(portfolio)
+        portfolio_with_prices, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
+        portfolio_indicators = await asyncio.to_thread(market.get_portfolio_indicators, portfolio)
         exclude_coins = list(portfolio.keys())
-        market_overview = market.get_market_overview(top_n=20, exclude_coins=exclude_coins)
+        market_overview = await asyncio.to_thread(
+            market.get_market_overview, top_n=20, exclude_coins=exclude_coins
+        )
 
         # Performance-Daten laden (optional, für Kontext)
         performance_data = None
@@ -550,7 +574,7 @@ async def cmd_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
             performance_data = tracker.calculate_performance(portfolio_with_prices, prices, baseline)
 
         # 3. KI-Analyse (Analyst → Guardian)
-        result = brain.analyze_next_investment(
+        result = await brain.analyze_next_investment(
             invest_amount=invest_amount,
             portfolio_data=portfolio_with_prices,
             portfolio_indicators=portfolio_indicators,
@@ -649,17 +673,19 @@ async def run_price_alert_check(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        portfolio = market.get_portfolio()
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if not portfolio:
             return
 
-        if not tracker.has_baseline():
+        # Baseline kommt aus dem Speicher des Trackers – kein Datei-Zugriff pro Tick
+        baseline = tracker.load_baseline()
+        if baseline is None:
             return  # Noch keine Baseline → kein Vergleich möglich
 
-        _, prices = market.get_portfolio_with_prices()
-        baseline = tracker.load_baseline()
+        _, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
         # calculate_performance erwartet {coin: amount} — direkt portfolio übergeben
         performance_data = tracker.calculate_performance(portfolio, prices, baseline)
+        tracker.record_snapshot(performance_data)
 
         if not performance_data or not performance_data.get('coin_performance'):
             return
@@ -700,6 +726,43 @@ async def run_price_alert_check(context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.error(f"Preis-Alert-Check Fehler: {e}", exc_info=True)
 
 
+async def run_var_simulation(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Portfolio-VaR/CVaR per Simulation im eigenen Intervall.
+
+    Monte Carlo und gefilterte historische Simulation laufen in einem
+    Worker-Thread, damit die Event-Loop (Telegram-Befehle, andere Jobs) nicht
+    blockiert. analyze_risks übernimmt nur die gerundete Kurzfassung.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Telegram-Kontext
+    """
+    if is_paused():
+        return
+
+    try:
+        portfolio_with_prices, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
+        if not portfolio_with_prices:
+            return
+        await asyncio.to_thread(
+            risk_analyzer.calculate_portfolio_var_simulation, portfolio_with_prices, prices
+        )
+        logger.info(f"Portfolio-VaR-Simulation aktualisiert: {risk_analyzer.var_simulation_summary()}")
+    except Exception as e:
+        logger.error(f"Portfolio-VaR-Simulation Fehler: {e}", exc_info=True)
+
+
+async def run_snapshot_flush(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Schreibt neue Portfolio-Snapshots gebündelt auf die Platte (Worker-Thread).
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Telegram-Kontext
+    """
+    try:
+        await asyncio.to_thread(tracker.flush_snapshots)
+    except Exception as e:
+        logger.error(f"Fehler beim Speichern der Snapshots: {e}")
+
+
 async def run_weekly_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Wöchentliche Management-Summary — jeden Sonntag um WEEKLY_SUMMARY_HOUR Uhr.
 
@@ -725,17 +788,17 @@ async def run_weekly_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(f"Starte wöchentliche Management-Summary (KW {now.isocalendar()[1]})…")
 
     try:
-        portfolio = market.get_portfolio()
+        portfolio = await asyncio.to_thread(market.get_portfolio)
         if not portfolio:
             logger.warning("Weekly Summary: Portfolio ist leer")
             return
 
-        portfolio_with_prices, prices = market.get_portfolio_with_prices()
+        portfolio_with_prices, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
 
         # Baseline sicherstellen
         if not tracker.has_baseline():
             logger.info("Weekly Summary: Keine Baseline – erstelle Baseline…")
-            tracker.save_baseline(portfolio_with_prices, prices)
+            await asyncio.to_thread(tracker.save_baseline, portfolio_with_prices, prices)
             total = sum(portfolio_with_prices.get(c, 0) * prices.get(c, 0) for c in portfolio_with_prices if prices.get(c))
             try:
                 await context.bot.send_message(
@@ -752,16 +815,24 @@ async def run_weekly_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
             return
 
         baseline = tracker.load_baseline()
+        await asyncio.to_thread(tracker.sync_trades, market)
         performance_data = tracker.calculate_performance(portfolio_with_prices, prices, baseline)
-        portfolio_indicators = market.get_portfolio_indicators(portfolio)
-        risk_metrics = risk_analyzer.analyze_risks(
+        tracker.record_snapshot(performance_data)
+        if performance_data:
+            # Vorberechnete Equity-Kurve der Woche aus den Snapshots
+            performance_data['equity_curve_7d'] = tracker.equity_curve_summary(days=7)
+        portfolio_indicators = await asyncio.to_thread(market.get_portfolio_indicators, portfolio)
+        risk_metrics = await asyncio.to_thread(
+            risk_analyzer.analyze_risks,
             portfolio_with_prices, prices, portfolio_indicators, performance_data
         )
         exclude_coins = list(portfolio.keys())
-        market_overview = market.get_market_overview(top_n=20, exclude_coins=exclude_coins)
+        market_overview = await asyncio.to_thread(
+            market.get_market_overview, top_n=20, exclude_coins=exclude_coins
+        )
 
         # KI-Analyse — kein Guardian (Kosteneinsparung)
-        result = brain.analyze_weekly_summary(
+        result = await brain.analyze_weekly_summary(
             portfolio_data=portfolio_with_prices,
             portfolio_indicators=portfolio_indicators,
             market_overview=market_overview,
@@ -817,87 +888,146 @@ async def run_weekly_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
 async def run_cycle(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Führt den geplanten Haupt-Analyse-Zyklus aus.
     
+    Jede Stufe wird als Span aufgezeichnet (siehe cycle_trace, /debug/cycles).
+    
     Args:
         context (ContextTypes.DEFAULT_TYPE): Telegram-Kontext
         
     Returns:
         None
     """
+    started = time.perf_counter()
+    with tracer.cycle('run_cycle') as root:
+        await _run_cycle(context)
+    health_status.record_cycle(
+        outcome=root.attrs.get('outcome') if root is not None else None,
+        duration_ms=(time.perf_counter() - started) * 1000,
+        consecutive_errors=alert_manager.consecutive_errors,
+    )
+
+
+async def _run_cycle(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Stufen des Analyse-Zyklus (innerhalb des Zyklus-Spans von run_cycle)."""
     global alert_manager
 
     if is_paused():
         logger.info("Zyklus übersprungen: Bot ist pausiert")
+        tracer.annotate(outcome='paused')
         alert_manager.on_cycle_success()
         return
     if not is_inside_analysis_hours():
         logger.info("Zyklus übersprungen: außerhalb des Analyse-Fensters")
+        tracer.annotate(outcome='outside_hours')
         alert_manager.on_cycle_success()
         return
 
     logger.info("Starte Analyse-Zyklus…")
     try:
-        portfolio = market.get_portfolio()
+        with tracer.span('portfolio'):
+            portfolio = await asyncio.to_thread(market.get_portfolio)
+        health_status.update(portfolio_size=len(portfolio) if portfolio else 0)
         if not portfolio:
             logger.warning("Portfolio ist leer")
+            tracer.annotate(outcome='empty_portfolio')
             alert_manager.on_cycle_success()
             return
 
-        portfolio_with_prices, prices = market.get_portfolio_with_prices()
+        with tracer.span('prices', coins=len(portfolio)):
+            portfolio_with_prices, prices = await asyncio.to_thread(market.get_portfolio_with_prices)
 
         if not tracker.has_baseline():
             logger.info("Keine Baseline – erstelle Baseline…")
-            tracker.save_baseline(portfolio_with_prices, prices)
+            tracer.annotate(outcome='baseline_created')
+            with tracer.span('baseline'):
+                await asyncio.to_thread(tracker.save_baseline, portfolio_with_prices, prices)
             total = sum(portfolio_with_prices.get(c, 0) * prices.get(c, 0) for c in portfolio_with_prices if prices.get(c))
             try:
-                await context.bot.send_message(
-                    chat_id=ADMIN_ID,
-                    text=f"*SlopCoin v0.1.0 gestartet*\n\nBaseline erstellt: Portfolio-Wert {total:.2f} EUR\n\nPerformance-Tracking startet beim nächsten Lauf.",
-                    parse_mode='Markdown'
-                )
+                with tracer.span('telegram_send'):
+                    await context.bot.send_message(
+                        chat_id=ADMIN_ID,
+                        text=f"*SlopCoin v0.1.0 gestartet*\n\nBaseline erstellt: Portfolio-Wert {total:.2f} EUR\n\nPerformance-Tracking startet beim nächsten Lauf.",
+                        parse_mode='Markdown'
+                    )
             except Exception as e:
                 logger.error(f"Fehler beim Senden der Start-Nachricht: {e}")
             alert_manager.on_cycle_success()
             return
 
-        baseline = tracker.load_baseline()
-        performance_data = tracker.calculate_performance(portfolio_with_prices, prices, baseline)
-        portfolio_indicators = market.get_portfolio_indicators(portfolio)
-        risk_metrics = risk_analyzer.analyze_risks(
-            portfolio_with_prices, prices, portfolio_indicators, performance_data
-        )
+        with tracer.span('baseline'):
+            baseline = tracker.load_baseline()
+        with tracer.span('performance'):
+            with tracer.span('sync_trades'):
+                await asyncio.to_thread(tracker.sync_trades, market)
+            performance_data = tracker.calculate_performance(portfolio_with_prices, prices, baseline)
+            tracker.record_snapshot(performance_data)
+        with tracer.span('indicators', coins=len(portfolio)):
+            portfolio_indicators = await asyncio.to_thread(market.get_portfolio_indicators, portfolio)
+        with tracer.span('risk'):
+            risk_metrics = await asyncio.to_thread(
+                risk_analyzer.analyze_risks,
+                portfolio_with_prices, prices, portfolio_indicators, performance_data
+            )
+
+        # Regelbasierter Vorfilter: ohne Signal keine Analyst-/Guardian-Aufrufe
+        with tracer.span('signal_gate'):
+            decision = signal_gate.evaluate(portfolio_indicators, risk_metrics)
+        if not decision.analyze:
+            logger.info("Keine Signale – LLM-Analyse übersprungen")
+            tracer.annotate(outcome='no_signal')
+            alert_manager.on_cycle_success()
+            return
+
         exclude_coins = list(portfolio.keys())
-        market_overview = market.get_market_overview(top_n=20, exclude_coins=exclude_coins)
+        with tracer.span('market_overview'):
+            market_overview = await asyncio.to_thread(
+                market.get_market_overview, top_n=20, exclude_coins=exclude_coins
+            )
 
-        result = brain.analyze_market(
-            portfolio_data=portfolio_with_prices,
-            portfolio_indicators=portfolio_indicators,
-            market_overview=market_overview,
-            performance_data=performance_data,
-            risk_metrics=risk_metrics,
-            cycle_num=int(time.time() // 86400),  # Zyklus-Nummer basierend auf 24h-Intervall
-            news_context=None  # Kein vorgeladener News-Kontext → Modell nutzt Web-Search
-        )
+        # Analyst und Guardian setzen eigene Spans innerhalb von llm_analysis
+        with tracer.span('llm_analysis'):
+            result = await brain.analyze_market(
+                portfolio_data=portfolio_with_prices,
+                portfolio_indicators=portfolio_indicators,
+                market_overview=market_overview,
+                performance_data=performance_data,
+                risk_metrics=risk_metrics,
+                cycle_num=int(time.time() // 86400),  # Zyklus-Nummer basierend auf 24h-Intervall
+                news_context=None  # Kein vorgeladener News-Kontext → Modell nutzt Web-Search
+            )
 
-        if result and result.get('approved'):
+        if result:
+            # Erst ein erfolgreicher Lauf setzt den Max-Skip-Zähler des Gates zurück
+            signal_gate.mark_analyzed()
+
+        if result and result.get('cached'):
+            # Eingaben seit der letzten Analyse materiell unverändert → kein erneuter Alert
+            logger.info("Markt unverändert – Analyse aus Cache, kein erneuter Alert")
+            tracer.annotate(outcome='cached')
+        elif result and result.get('approved'):
+            tracer.annotate(outcome='alert')
             try:
-                await context.bot.send_message(
-                    chat_id=ADMIN_ID,
-                    text=result['message'],
-                    parse_mode='Markdown'
-                )
+                with tracer.span('telegram_send'):
+                    await context.bot.send_message(
+                        chat_id=ADMIN_ID,
+                        text=result['message'],
+                        parse_mode='Markdown'
+                    )
                 logger.info("Alert gesendet")
             except Exception as e:
                 logger.error(f"Fehler beim Senden: {e}")
         else:
             if result and not result.get('approved'):
                 logger.warning("Guardian hat Empfehlung abgelehnt")
+                tracer.annotate(outcome='rejected')
             else:
                 logger.info("Keine Handlung erforderlich")
+                tracer.annotate(outcome='no_action')
 
         alert_manager.on_cycle_success()
 
     except Exception as e:
         logger.error(f"Cycle Error: {e}", exc_info=True)
+        tracer.annotate(outcome='error', error=type(e).__name__)
         alert_manager.on_cycle_error()
         try:
             await context.bot.send_message(
@@ -914,7 +1044,7 @@ def main() -> None:
     
     Initialisiert alle Komponenten, validiert Konfiguration und startet den Bot.
     """
-    global market, tracker, risk_analyzer, brain, ADMIN_ID, alert_manager, start_time, health_server
+    global market, tracker, risk_analyzer, brain, signal_gate, ADMIN_ID, alert_manager, start_time, health_server
 
     # Configuration Validation beim Start
     logger.info("🔍 Validiere Konfiguration…")
@@ -930,6 +1060,8 @@ def main() -> None:
     # Graceful Shutdown Cleanup-Funktionen registrieren
     def cleanup_on_shutdown():
         logger.info("Führe Cleanup während Shutdown durch…")
+        if tracker is not None:
+            tracker.flush_snapshots()
         # Hier könnten weitere Cleanup-Aktionen hinzugefügt werden
         # z.B. Cache leeren, Verbindungen schließen, etc.
     
@@ -950,14 +1082,30 @@ def main() -> None:
     tracker = PortfolioTracker()
     risk_analyzer = RiskAnalyzer()
     brain = LLMEngine()
+    signal_gate = SignalGate()
     alert_manager = AlertManager()
+    # Kosten (USD laut prices.csv), Token und Latenz-/Token-Histogramme pro Modell/Template
+    registry.register_collector('llm', lambda: brain.cost_tracker.prometheus_lines(registry.prefix))
     logger.info("Alle Komponenten initialisiert")
 
     # Health-Check Server starten
-    start_health_server(port=8080)
     start_time = time.time()
+    health_status.mark_started(start_time)
+    start_health_server(port=8080)
 
-    app = Application.builder().token(token).build()
+    async def close_llm_client(application: Application) -> None:
+        await brain.aclose()
+
+    # concurrent_updates: mehrere /next-Anfragen teilen sich die Event-Loop, statt nacheinander zu warten.
+    # Blockierende Schritte (ccxt, Trade-Sync, Indikatoren, Risiko-Analyse) laufen
+    # dafür per asyncio.to_thread im Worker-Thread.
+    app = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(True)
+        .post_shutdown(close_llm_client)
+        .build()
+    )
     app.add_handler(CommandHandler("help", cmd_help))
     app.add_handler(CommandHandler("status", cmd_status))
     app.add_handler(CommandHandler("dashboard", cmd_dashboard))
@@ -972,14 +1120,15 @@ def main() -> None:
     job_queue = app.job_queue
     if job_queue:
         # 1x/Tag Deep-Analysis mit KI (Analyst + Guardian + Web-Search) — nur bei Signal
-        job_queue.run_repeating(run_cycle, interval=SCHEDULE_INTERVAL_SECONDS, first=10)
+        job_queue.run_repeating(track_job('run_cycle', run_cycle, SCHEDULE_INTERVAL_SECONDS),
+                                interval=SCHEDULE_INTERVAL_SECONDS, first=10)
         logger.info(
             f"Geplante KI-Analyse: alle {SCHEDULE_INTERVAL_SECONDS // 3600}h, "
             f"nur zwischen {ANALYSIS_START_HOUR:02d}:00 und {ANALYSIS_END_HOUR:02d}:00 (nur bei Signal)"
         )
         # Preis-Alerts alle 30 Min (kein LLM, kostenlos)
         job_queue.run_repeating(
-            run_price_alert_check,
+            track_job('price_alert_check', run_price_alert_check, PRICE_CHECK_INTERVAL_SECONDS),
             interval=PRICE_CHECK_INTERVAL_SECONDS,
             first=60  # Erster Check nach 1 Minute
         )
@@ -987,12 +1136,24 @@ def main() -> None:
             f"Preis-Alert-Check: alle {PRICE_CHECK_INTERVAL_SECONDS // 60} Minuten "
             f"(Schwellenwerte: +{PRICE_ALERT_THRESHOLD_UP * 100:.0f}% / -{PRICE_ALERT_THRESHOLD_DOWN * 100:.0f}%)"
         )
+        # Portfolio-VaR/CVaR-Simulation im eigenen Intervall (Worker-Thread)
+        job_queue.run_repeating(
+            track_job('var_simulation', run_var_simulation, PORTFOLIO_VAR_INTERVAL_SECONDS),
+            interval=PORTFOLIO_VAR_INTERVAL_SECONDS,
+            first=120  # Erster Lauf nach 2 Minuten
+        )
+        # Portfolio-Snapshots gebündelt speichern (Preis-Alert-Ticks bleiben im Speicher)
+        job_queue.run_repeating(
+            track_job('snapshot_flush', run_snapshot_flush, TIMESERIES_SAVE_INTERVAL_SECONDS),
+            interval=TIMESERIES_SAVE_INTERVAL_SECONDS,
+            first=TIMESERIES_SAVE_INTERVAL_SECONDS
+        )
         # Wöchentliche Management-Summary (stündlich prüfen ob Sonntag 10:00)
         # Kein Guardian — Kosteneinsparung ~50%
         WEEKLY_CHECK_INTERVAL = 3600  # Stündlich prüfen
         day_names = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
         job_queue.run_repeating(
-            run_weekly_summary,
+            track_job('weekly_summary', run_weekly_summary, WEEKLY_CHECK_INTERVAL),
             interval=WEEKLY_CHECK_INTERVAL,
             first=90  # Erster Check nach 90 Sekunden
         )
@@ -0,0 +1,367 @@
+"""
+Metrik-Registry im Prometheus-Textformat (Counter, Gauges, Histogramme).
+
+Schreibzugriffe sind ohne Lock: Counter und Histogramme zählen pro Thread in
+eigene Shards (threading.local), erst beim Scrape werden die Shards summiert.
+Ein Lock gibt es nur beim ersten Schreiben eines Threads (Shard anmelden).
+Label-Werte werden einmalig über ``labels()`` gebunden, damit Hot Paths wie
+``IntelligentCache.get`` nur noch ein Dict-Update kosten.
+
+Externe Quellen (z.B. CostTracker.prometheus_lines) werden als Collector
+angemeldet und beim Scrape angehängt. Ein Scrape iteriert nur über bereits
+aggregierte Zähler – alle 5 s abrufbar, ohne die Anwendung zu bremsen.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_PREFIX, JOB_DURATION_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Basis: Name, Hilfetext, Label-Namen und Thread-Shards."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[LabelValues, Any] = {}
+            with self._register_lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _key(self, values: Sequence[Any], kwargs: Dict[str, Any]) -> LabelValues:
+        if kwargs:
+            values = [kwargs[name] for name in self.labelnames]
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: erwartet Labels {self.labelnames}, erhalten {values}")
+        return tuple(str(v) for v in values)
+
+    def _snapshot_shards(self) -> List[List[Tuple[LabelValues, Any]]]:
+        with self._register_lock:
+            shards = list(self._shards)
+        # list(dict.items()) läuft unter dem GIL am Stück – kein Lock im Schreibpfad nötig
+        return [list(shard.items()) for shard in shards]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> List[str]:
+        lines = self.samples()
+        if not lines:
+            return []
+        return [f'# HELP {self.name} {_escape(self.help)}', f'# TYPE {self.name} {self.kind}'] + lines
+
+
+class _BoundCounter:
+    __slots__ = ('_metric', '_key')
+
+    def __init__(self, metric: 'Counter', key: LabelValues):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1) -> None:
+        shard = self._metric._shard()
+        shard[self._key] = shard.get(self._key, 0) + amount
+
+
+class Counter(_Metric):
+    """Monoton steigender Zähler (Name sollte auf _total enden)."""
+
+    kind = 'counter'
+
+    def labels(self, *values: Any, **kwargs: Any) -> _BoundCounter:
+        return _BoundCounter(self, self._key(values, kwargs))
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        self.labels(**labels).inc(amount)
+
+    def value(self, *values: Any, **kwargs: Any) -> float:
+        key = self._key(values, kwargs)
+        return sum(v for shard in self._snapshot_shards() for k, v in shard if k == key)
+
+    def samples(self) -> List[str]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot_shards():
+            for key, value in shard:
+                totals[key] = totals.get(key, 0) + value
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(totals.items())]
+
+
+class Gauge(_Metric):
+    """Momentanwert; entweder gesetzt oder beim Scrape per Funktion ermittelt.
+
+    ``inc``/``dec`` sind für Werte gedacht, die nur ein Thread (die Event-Loop)
+    verändert; ``set`` ist von überall atomar.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key((), labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key((), labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        """Wert wird erst beim Scrape berechnet (fn muss billig sein)."""
+        self._functions[self._key((), labels)] = fn
+
+    def value(self, **labels: Any) -> Optional[float]:
+        key = self._key((), labels)
+        fn = self._functions.get(key)
+        return fn() if fn is not None else self._values.get(key)
+
+    def samples(self) -> List[str]:
+        current = dict(self._values)
+        for key, fn in list(self._functions.items()):
+            try:
+                current[key] = fn()
+            except Exception as e:
+                logger.debug(f"Gauge {self.name}{key} nicht lesbar: {e}")
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(current.items())]
+
+
+class _BoundHistogram:
+    __slots__ = ('_metric', '_key', '_bounds')
+
+    def __init__(self, metric: 'Histogram', key: LabelValues):
+        self._metric = metric
+        self._key = key
+        self._bounds = metric.bounds
+
+    def observe(self, value: float) -> None:
+        shard = self._metric._shard()
+        state = shard.get(self._key)
+        if state is None:
+            # Buckets (nicht kumuliert) + Überlauf, danach Summe
+            state = shard[self._key] = [0] * (len(self._bounds) + 1) + [0.0]
+        state[bisect.bisect_left(self._bounds, value)] += 1
+        state[-1] += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+
+class _Timer:
+    """Kontextmanager: misst die Dauer eines Blocks mit der monotonen Uhr."""
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram: _BoundHistogram):
+        self._histogram = histogram
+
+    def __enter__(self) -> '_Timer':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class Histogram(_Metric):
+    """Histogramm mit festen Bucket-Grenzen (le = kleiner/gleich)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(sorted(float(b) for b in buckets))
+
+    def labels(self, *values: Any, **kwargs: Any) -> _BoundHistogram:
+        return _BoundHistogram(self, self._key(values, kwargs))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.labels(**labels).observe(value)
+
+    def _merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot_shards():
+            for key, state in shard:
+                state = list(state)
+                total = merged.get(key)
+                merged[key] = state if total is None else [a + b for a, b in zip(total, state)]
+        return merged
+
+    def snapshot(self, *values: Any, **kwargs: Any) -> Tuple[List[int], float]:
+        """(Anzahl pro Bucket inkl. Überlauf, nicht kumuliert; Summe)"""
+        state = self._merged().get(self._key(values, kwargs))
+        if state is None:
+            return [0] * (len(self.bounds) + 1), 0.0
+        return [int(c) for c in state[:-1]], state[-1]
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, state in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {int(cumulative)}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state[-1])}')
+            lines.append(f'{self.name}_count{labels} {int(cumulative)}')
+        return lines
+
+
+class MetricsRegistry:
+    """Sammelt Metriken und Collector-Funktionen für /metrics."""
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args: Any, **kwargs: Any):
+        full_name = f'{self.prefix}_{name}' if self.prefix else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metrik {full_name} existiert bereits als {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        if buckets is None:
+            return self._get_or_create(Histogram, name, help_text, labelnames)
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def register_collector(self, name: str, fn: Callable[[], List[str]]) -> None:
+        """Fremde Zeilen im Textformat anhängen; gleicher Name ersetzt den alten Collector."""
+        self._collectors[name] = fn
+
+    def exposition(self) -> str:
+        """Alle Metriken im Prometheus-Textformat (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.exposition())
+        for name, fn in list(self._collectors.items()):
+            try:
+                lines.extend(fn())
+            except Exception as e:
+                logger.warning(f"Metrik-Collector {name} fehlgeschlagen: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+# Modul-Singleton: Module registrieren ihre Metriken beim Import
+registry = MetricsRegistry()
+
+
+# ── Job-Queue ────────────────────────────────────────────────────────────────
+
+_JOB_RUNS = registry.counter('job_runs_total', 'Ausführungen geplanter Jobs', ('job', 'status'))
+_JOB_DURATION = registry.histogram('job_duration_seconds', 'Laufzeit geplanter Jobs', ('job',), JOB_DURATION_BUCKETS)
+_JOB_LAG = registry.histogram('job_lag_seconds', 'Verspätung gegenüber dem geplanten Start', ('job',),
+                              JOB_DURATION_BUCKETS)
+_JOB_OVERLAP = registry.counter('job_overlap_total', 'Job-Starts, während ein anderer Job noch lief', ('job',))
+_JOBS_RUNNING = registry.gauge('jobs_running', 'Aktuell laufende Jobs')
+_running_jobs: Dict[str, int] = {}
+
+
+def _scheduled_start(context: Any, interval: float, now: float) -> Optional[float]:
+    """Geplanter Start des laufenden Durchlaufs aus job.next_t (PTB/APScheduler)."""
+    try:
+        next_t = context.job.next_t
+    except AttributeError:
+        return None
+    if next_t is None:
+        return None
+    scheduled = next_t.timestamp()
+    # next_t zeigt meist schon auf den nächsten Durchlauf
+    return scheduled - interval if scheduled > now else scheduled
+
+
+def track_job(name: str, callback: Callable, interval: float) -> Callable:
+    """Umwickelt einen JobQueue-Callback mit Laufzeit-, Verspätungs- und Überlappungs-Metriken.
+
+    Args:
+        name: Job-Name (Label)
+        callback: async-Callback (context) → None
+        interval: Intervall in Sekunden (für die Verspätung)
+    """
+    duration = _JOB_DURATION.labels(name)
+    lag = _JOB_LAG.labels(name)
+    overlap = _JOB_OVERLAP.labels(name)
+
+    async def wrapper(context: Any) -> None:
+        now = time.time()
+        scheduled = _scheduled_start(context, interval, now)
+        if scheduled is not None:
+            lag.observe(max(0.0, now - scheduled))
+        if any(_running_jobs.values()):
+            overlap.inc()
+        _running_jobs[name] = _running_jobs.get(name, 0) + 1
+        _JOBS_RUNNING.inc()
+        status = 'ok'
+        try:
+            with duration.time():
+                await callback(context)
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            _running_jobs[name] -= 1
+            _JOBS_RUNNING.dec()
+            _JOB_RUNS.labels(name, status).inc()
+
+    wrapper.__name__ = getattr(callback, '__name__', name)
+    wrapper.__doc__ = callback.__doc__
+    return wrapper
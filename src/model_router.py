@@ -0,0 +1,187 @@
+"""
+Kosten- und latenzbewusstes Modell-Routing für LLMEngine.
+
+Pro Aufruf wählt der Router Modell und Thinking-Budget anhand von
+Aufgabe (täglicher Zyklus, /next, Weekly), Prompt-Größe, Latenz (p95 aus
+den Histogrammen des CostTrackers plus EWMA), Fehlerquote (EWMA) und
+Kostenbudget laut Preistabelle. Reißt das Standard-Modell das Latenz-Ziel
+der Aufgabe, wird auf das nächste (schnellere) Ausweich-Modell degradiert.
+Ein gemiedenes Modell bekommt nach LLM_ROUTER_PROBE_INTERVAL einen
+Probe-Aufruf; gelingt er im Ziel, zählen alte Fehler und Latenzen nicht mehr.
+"""
+
+import logging
+import time
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from config import (
+    LLM_ROUTER_ENABLED, LLM_ROUTER_FALLBACK_MODELS, LLM_ROUTER_P95_TARGET_CYCLE,
+    LLM_ROUTER_P95_TARGET_NEXT, LLM_ROUTER_P95_TARGET_WEEKLY, LLM_ROUTER_MAX_CALL_COST,
+    LLM_ROUTER_MAX_ERROR_RATE, LLM_ROUTER_MIN_SAMPLES, LLM_ROUTER_EWMA_ALPHA,
+    LLM_ROUTER_PROBE_INTERVAL, THINKING_MIN_BUDGET,
+)
+from token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Aufgabe → Ziel-p95 der Latenz (Sekunden)
+TASK_LATENCY_TARGETS = {
+    'cycle': LLM_ROUTER_P95_TARGET_CYCLE,
+    'next': LLM_ROUTER_P95_TARGET_NEXT,
+    'weekly': LLM_ROUTER_P95_TARGET_WEEKLY,
+}
+
+
+class Route(NamedTuple):
+    """Routing-Entscheidung für einen Aufruf."""
+    model: str
+    thinking_budget: int
+    reason: str
+
+
+class ModelRouter:
+    """Wählt Modell und Thinking-Budget pro Aufgabe."""
+
+    def __init__(self, cost_tracker, fallback_models: Sequence[str] = LLM_ROUTER_FALLBACK_MODELS,
+                 enabled: bool = LLM_ROUTER_ENABLED, max_call_cost: float = LLM_ROUTER_MAX_CALL_COST,
+                 alpha: float = LLM_ROUTER_EWMA_ALPHA,
+                 probe_interval: float = LLM_ROUTER_PROBE_INTERVAL):
+        """Initialisiert den Router.
+
+        Args:
+            cost_tracker: CostTracker (Preise und Latenz-Histogramme)
+            fallback_models: Ausweich-Modelle, von stark nach schnell
+            enabled: False = immer Standard-Modell und -Budget
+            max_call_cost: Max. geschätzte Kosten pro Aufruf in USD
+            alpha: EWMA-Gewicht des neuesten Messwerts
+            probe_interval: Sekunden ohne Aufruf, nach denen ein gemiedenes Modell erneut versucht wird
+        """
+        self.cost_tracker = cost_tracker
+        self.fallback_models = tuple(fallback_models)
+        self.enabled = enabled
+        self.max_call_cost = max_call_cost
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.latency_ewma: Dict[str, float] = {}
+        self.error_rate: Dict[str, float] = {}
+        # Zeitpunkt (monotonic) des letzten Versuchs pro Modell
+        self.last_attempt: Dict[str, float] = {}
+        # Modell → Latenz-Ziel des laufenden Probe-Aufrufs
+        self._probing: Dict[str, float] = {}
+        # Modell → Latenz-Zähler beim letzten gelungenen Probe-Aufruf (ältere zählen nicht)
+        self._latency_since: Dict[str, np.ndarray] = {}
+
+    def record(self, model: str, latency: Optional[float], ok: bool) -> None:
+        """Aktualisiert Latenz- und Fehler-EWMA eines Modells nach einem Versuch.
+
+        Die Fehlerquote startet bei 0, ein einzelner Fehlschlag sperrt ein
+        Modell also nicht sofort.
+        """
+        self.last_attempt[model] = time.monotonic()
+        target = self._probing.pop(model, None)
+        if target is not None and ok and (latency is None or latency <= target):
+            logger.info(f"Routing: Probe-Aufruf an {model} erfolgreich, Modell wieder verfügbar")
+            self.error_rate[model] = 0.0
+            self._latency_since[model] = self.cost_tracker.latency_counts(model)
+        error = 0.0 if ok else 1.0
+        self.error_rate[model] = self.alpha * error + (1 - self.alpha) * self.error_rate.get(model, 0.0)
+        if ok and latency is not None:
+            self.latency_ewma[model] = (
+                latency if model not in self.latency_ewma
+                else self.alpha * latency + (1 - self.alpha) * self.latency_ewma[model]
+            )
+
+    def estimate_cost(self, model: str, prompt_tokens: int, max_tokens: int) -> Optional[float]:
+        """Obergrenze der Kosten (Prompt + volle Ausgabe), None ohne Preis."""
+        if self.cost_tracker.price_for(model) is None:
+            return None
+        return self.cost_tracker.call_cost(model, prompt_tokens, max_tokens)
+
+    def _health_rejection(self, model: str, target: float) -> Optional[str]:
+        """Fehlerquote oder p95 über der Grenze (None = gesund)."""
+        if self.error_rate.get(model, 0.0) > LLM_ROUTER_MAX_ERROR_RATE:
+            return f"Fehlerquote {self.error_rate[model]:.0%}"
+        p95 = self.cost_tracker.latency_quantile(model, 0.95, min_count=LLM_ROUTER_MIN_SAMPLES,
+                                                 since=self._latency_since.get(model))
+        if p95 is not None and p95 > target:
+            return f"p95 {p95:g}s > Ziel {target:g}s"
+        return None
+
+    def _probe_due(self, model: str) -> bool:
+        """Ob ein gemiedenes Modell lange genug pausiert hat, um es erneut zu versuchen.
+
+        Ohne bisherigen Versuch beginnt die Pause jetzt.
+        """
+        last = self.last_attempt.setdefault(model, time.monotonic())
+        return time.monotonic() - last >= self.probe_interval
+
+    def _rejection(self, model: str, target: float, prompt_tokens: int, max_tokens: int) -> Optional[str]:
+        """Grund, ein Modell nicht zu nehmen (None = passt).
+
+        Ein ungesundes Modell wird nach der Probe-Pause einmal zugelassen;
+        bis zum Ergebnis gilt die Pause erneut (keine parallelen Proben).
+        """
+        unhealthy = self._health_rejection(model, target)
+        if unhealthy is not None and not self._probe_due(model):
+            return unhealthy
+        cost = self.estimate_cost(model, prompt_tokens, max_tokens)
+        if cost is not None and cost > self.max_call_cost:
+            return f"Kosten ≤${cost:.2f} > Budget ${self.max_call_cost:.2f}"
+        if unhealthy is not None:
+            logger.info(f"Routing: Probe-Aufruf an {model} ({unhealthy})")
+            self._probing[model] = target
+            self.last_attempt[model] = time.monotonic()
+        return None
+
+    def _thinking_for(self, model: str, target: float, thinking_budget: int) -> int:
+        """Skaliert das Thinking-Budget herunter, wenn die EWMA-Latenz über dem Ziel liegt."""
+        ewma = self.latency_ewma.get(model)
+        if thinking_budget <= 0 or ewma is None or ewma <= target:
+            return thinking_budget
+        scaled = int(thinking_budget * target / ewma)
+        return scaled if scaled >= THINKING_MIN_BUDGET else 0
+
+    def route(self, task: str, prompt: str, default_model: str, thinking_budget: int,
+              max_tokens: int) -> Route:
+        """Wählt Modell und Thinking-Budget für einen Aufruf.
+
+        Args:
+            task: 'cycle', 'next' oder 'weekly'
+            prompt: Fertiger Prompt (für Größe und Kostenschätzung)
+            default_model: Bevorzugtes Modell der Rolle (Analyst/Guardian)
+            thinking_budget: Konfiguriertes Thinking-Budget
+            max_tokens: Max. Ausgabe-Tokens (für die Kostenschätzung)
+
+        Returns:
+            Route mit Modell, Budget und Begründung
+        """
+        if not self.enabled:
+            return Route(default_model, thinking_budget, 'Routing deaktiviert')
+
+        target = TASK_LATENCY_TARGETS.get(task, LLM_ROUTER_P95_TARGET_CYCLE)
+        prompt_tokens = count_tokens(prompt)
+        candidates = [default_model] + [m for m in self.fallback_models if m != default_model]
+        rejected = []
+        for model in candidates:
+            reason = self._rejection(model, target, prompt_tokens, max_tokens)
+            if reason is None:
+                budget = self._thinking_for(model, target, thinking_budget)
+                if model == default_model and not rejected:
+                    why = 'Standard'
+                else:
+                    why = 'degradiert: ' + '; '.join(rejected)
+                if budget != thinking_budget:
+                    why += f'; Thinking {thinking_budget} → {budget}'
+                route = Route(model, budget, why)
+                if route.model != default_model or budget != thinking_budget:
+                    logger.info(f"Routing {task}: {default_model} → {model} ({why})")
+                return route
+            rejected.append(f"{model}: {reason}")
+
+        # Kein Modell erfüllt alle Kriterien → schnellstes Ausweich-Modell ohne Thinking-Zwang
+        model = candidates[-1]
+        why = 'kein Modell im Ziel: ' + '; '.join(rejected)
+        logger.warning(f"Routing {task}: {why} → {model}")
+        return Route(model, self._thinking_for(model, target, thinking_budget), why)
@@ -0,0 +1,251 @@
+"""
+Portfolio-VaR/CVaR-Engine (Monte Carlo und gefilterte historische Simulation).
+
+Beide Verfahren simulieren 1-Perioden-Log-Returns für alle Coins gleichzeitig,
+bewerten das Portfolio vektorisiert und leiten VaR/CVaR für mehrere
+Konfidenzniveaus aus der Verlustverteilung ab. Die Simulation läuft in
+Chunks, deren Größe aus einem Speicherbudget abgeleitet wird.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import (
+    PORTFOLIO_VAR_PATHS, PORTFOLIO_VAR_CONFIDENCES, PORTFOLIO_VAR_MEMORY_MB,
+    PORTFOLIO_VAR_WORKERS, PORTFOLIO_FHS_MIN_RETURNS, RISK_EWMA_DECAY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pro simuliertem Pfad und Coin gehaltene float64-Arrays (Zufallszahlen, Returns, Wertänderung)
+_ARRAYS_PER_PATH = 3
+
+
+def robust_cholesky(cov: np.ndarray) -> np.ndarray:
+    """Cholesky-Zerlegung, die auch nicht streng positiv definite Matrizen verträgt.
+
+    EWMA-Kovarianzen mit wenigen Beobachtungen sind oft nur semidefinit. In dem
+    Fall werden negative Eigenwerte abgeschnitten und ein minimaler Jitter
+    addiert.
+
+    Args:
+        cov: Symmetrische Kovarianzmatrix (k, k)
+
+    Returns:
+        Untere Dreiecksmatrix L mit L @ L.T ≈ cov
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh((cov + cov.T) / 2)
+        eigvals = np.clip(eigvals, 0.0, None)
+        repaired = (eigvecs * eigvals) @ eigvecs.T
+        jitter = max(float(np.mean(np.diag(repaired))), 1e-12) * 1e-10
+        return np.linalg.cholesky(repaired + np.eye(len(cov)) * jitter)
+
+
+def chunk_size_for_budget(n_coins: int, memory_budget_mb: float) -> int:
+    """Maximale Pfade pro Chunk, damit die Zwischen-Arrays ins Budget passen."""
+    bytes_per_path = max(n_coins, 1) * 8 * _ARRAYS_PER_PATH
+    return max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_path))
+
+
+def simulate_mc_losses(values: np.ndarray, mean: np.ndarray, chol: np.ndarray,
+                       n_paths: int, chunk_size: int, seed) -> np.ndarray:
+    """Simuliert Portfolio-Verluste mit korrelierten Normal-Returns.
+
+    Args:
+        values: Positionswerte in EUR (k,)
+        mean: Erwartete Log-Returns (k,)
+        chol: Cholesky-Faktor der Kovarianz (k, k)
+        n_paths: Anzahl Pfade
+        chunk_size: Pfade pro Chunk
+        seed: Seed oder SeedSequence für den Generator
+
+    Returns:
+        Verluste in EUR (positiv = Verlust) der Länge n_paths
+    """
+    rng = np.random.default_rng(seed)
+    losses = np.empty(n_paths)
+    chol_t = chol.T
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        z = rng.standard_normal((stop - start, len(values)))
+        returns = z @ chol_t
+        returns += mean
+        np.expm1(returns, out=returns)
+        losses[start:stop] = -(returns @ values)
+    return losses
+
+
+def _mc_worker(args) -> np.ndarray:
+    """Prozess-Worker für simulate_mc_losses (muss auf Modulebene liegen)."""
+    return simulate_mc_losses(*args)
+
+
+def ewma_volatility_series(log_returns: np.ndarray, decay: float = RISK_EWMA_DECAY) -> np.ndarray:
+    """EWMA-Volatilität pro Zeitpunkt und Coin (Vorhersage für t aus Daten bis t-1).
+
+    Args:
+        log_returns: Matrix (n, k)
+        decay: Zerfallsfaktor λ
+
+    Returns:
+        Matrix (n + 1, k); Zeile t ist die Volatilitätsprognose für Return t,
+        die letzte Zeile die Prognose für die nächste Periode
+    """
+    n, k = log_returns.shape
+    variance = np.empty((n + 1, k))
+    variance[0] = np.var(log_returns, axis=0) if n > 1 else log_returns[0] ** 2
+    squared = log_returns ** 2
+    for t in range(n):
+        variance[t + 1] = decay * variance[t] + (1.0 - decay) * squared[t]
+    return np.sqrt(np.maximum(variance, 1e-18))
+
+
+def summarize_losses(losses: np.ndarray, portfolio_value: float,
+                     confidences: Sequence[float]) -> Dict[str, Dict[str, float]]:
+    """Leitet VaR und CVaR aus einer Verlustverteilung ab.
+
+    Args:
+        losses: Simulierte Verluste in EUR
+        portfolio_value: Aktueller Portfolio-Wert in EUR
+        confidences: Konfidenzniveaus (z.B. 0.95, 0.99)
+
+    Returns:
+        Dict Konfidenz (als String) → {'var_eur', 'var_percent', 'cvar_eur', 'cvar_percent'}
+    """
+    levels = {}
+    sorted_losses = np.sort(losses)
+    n = len(sorted_losses)
+    for confidence in confidences:
+        var = float(np.quantile(sorted_losses, confidence))
+        tail_start = min(int(np.searchsorted(sorted_losses, var, side='left')), n - 1)
+        cvar = float(sorted_losses[tail_start:].mean())
+        levels[f"{confidence:g}"] = {
+            'var_eur': round(var, 2),
+            'var_percent': round(var / portfolio_value * 100, 2) if portfolio_value else None,
+            'cvar_eur': round(cvar, 2),
+            'cvar_percent': round(cvar / portfolio_value * 100, 2) if portfolio_value else None,
+        }
+    return levels
+
+
+class PortfolioRiskEngine:
+    """Berechnet Portfolio-VaR/CVaR über Monte Carlo und gefilterte historische Simulation."""
+
+    def __init__(self, n_paths: int = PORTFOLIO_VAR_PATHS,
+                 confidences: Sequence[float] = PORTFOLIO_VAR_CONFIDENCES,
+                 memory_budget_mb: float = PORTFOLIO_VAR_MEMORY_MB,
+                 n_workers: int = PORTFOLIO_VAR_WORKERS):
+        """Initialisiert die Engine.
+
+        Args:
+            n_paths: Anzahl simulierter Pfade
+            confidences: Konfidenzniveaus für VaR/CVaR
+            memory_budget_mb: Speicherbudget pro Chunk (pro Prozess)
+            n_workers: Anzahl Prozesse für Monte Carlo (1 = im aktuellen Prozess)
+        """
+        self.n_paths = n_paths
+        self.confidences = tuple(confidences)
+        self.memory_budget_mb = memory_budget_mb
+        self.n_workers = max(1, n_workers)
+
+    def monte_carlo(self, coins: List[str], values: Dict[str, float], mean: np.ndarray,
+                    cov: np.ndarray, seed: Optional[int] = None,
+                    n_workers: Optional[int] = None) -> Optional[Dict]:
+        """Monte-Carlo-VaR/CVaR mit korrelierten Ziehungen über Cholesky.
+
+        Args:
+            coins: Coin-Reihenfolge von mean und cov
+            values: Dict Coin → Positionswert in EUR
+            mean: Erwartete 1-Perioden-Log-Returns (k,)
+            cov: Kovarianzmatrix der Log-Returns (k, k)
+            seed: Optionaler Seed für reproduzierbare Ergebnisse
+            n_workers: Überschreibt die konfigurierte Prozessanzahl
+
+        Returns:
+            Ergebnis-Dict oder None wenn keine Positionen vorhanden sind
+        """
+        position_values = np.array([values.get(c, 0.0) or 0.0 for c in coins], dtype=np.float64)
+        total = float(position_values.sum())
+        if not coins or total <= 0:
+            return None
+
+        chol = robust_cholesky(np.asarray(cov, dtype=np.float64))
+        mean = np.asarray(mean, dtype=np.float64)
+        chunk = chunk_size_for_budget(len(coins), self.memory_budget_mb)
+        workers = max(1, n_workers if n_workers is not None else self.n_workers)
+
+        seq = np.random.SeedSequence(seed)
+        if workers == 1:
+            losses = simulate_mc_losses(position_values, mean, chol, self.n_paths, chunk, seq)
+        else:
+            shares = np.full(workers, self.n_paths // workers)
+            shares[: self.n_paths % workers] += 1
+            tasks = [
+                (position_values, mean, chol, int(n), chunk, child)
+                for n, child in zip(shares, seq.spawn(workers)) if n > 0
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                losses = np.concatenate(list(pool.map(_mc_worker, tasks)))
+
+        return {
+            'method': 'monte_carlo',
+            'paths': self.n_paths,
+            'coins': list(coins),
+            'portfolio_value_eur': round(total, 2),
+            'levels': summarize_losses(losses, total, self.confidences),
+        }
+
+    def filtered_historical(self, coins: List[str], values: Dict[str, float],
+                            log_returns: np.ndarray, decay: float = RISK_EWMA_DECAY,
+                            seed: Optional[int] = None) -> Optional[Dict]:
+        """Gefilterte historische Simulation (FHS).
+
+        Historische Returns werden mit ihrer EWMA-Volatilität standardisiert,
+        zeilenweise per Bootstrap gezogen (erhält die Abhängigkeit zwischen
+        Coins) und mit der aktuellen Volatilitätsprognose reskaliert.
+
+        Args:
+            coins: Spalten-Reihenfolge von log_returns
+            values: Dict Coin → Positionswert in EUR
+            log_returns: Ausgerichtete Return-Matrix (n, k)
+            decay: EWMA-Zerfallsfaktor für den Volatilitätsfilter
+            seed: Optionaler Seed
+
+        Returns:
+            Ergebnis-Dict oder None bei zu wenig Historie
+        """
+        if log_returns is None or len(log_returns) < PORTFOLIO_FHS_MIN_RETURNS:
+            return None
+        position_values = np.array([values.get(c, 0.0) or 0.0 for c in coins], dtype=np.float64)
+        total = float(position_values.sum())
+        if total <= 0:
+            return None
+
+        sigma = ewma_volatility_series(log_returns, decay)
+        residuals = log_returns / sigma[:-1]
+        current_sigma = sigma[-1]
+
+        rng = np.random.default_rng(seed)
+        chunk = chunk_size_for_budget(len(coins), self.memory_budget_mb)
+        losses = np.empty(self.n_paths)
+        for start in range(0, self.n_paths, chunk):
+            stop = min(start + chunk, self.n_paths)
+            rows = rng.integers(0, len(residuals), size=stop - start)
+            scenario = residuals[rows] * current_sigma
+            np.expm1(scenario, out=scenario)
+            losses[start:stop] = -(scenario @ position_values)
+
+        return {
+            'method': 'filtered_historical',
+            'paths': self.n_paths,
+            'history_returns': int(len(log_returns)),
+            'coins': list(coins),
+            'portfolio_value_eur': round(total, 2),
+            'levels': summarize_losses(losses, total, self.confidences),
+        }
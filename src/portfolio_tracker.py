@@ -1,40 +1,101 @@
 import json
 import logging
-from config import BASELINE_PATH
+import os
+import tempfile
+import time
+import numpy as np
+from config import (
+    BASELINE_PATH, BASELINE_REVALIDATE_SECONDS, BASELINE_WATCH_EXTERNAL, TIMESERIES_PATH, LOT_LEDGER_PATH,
+)
+from lot_ledger import LotLedger
+from positions import PositionVectors
+from timeseries_store import TimeSeriesStore
 
 logger = logging.getLogger(__name__)
 
+# Felder der Portfolio-Snapshots (Schlüssel aus calculate_performance)
+SNAPSHOT_FIELDS = ('portfolio_value_eur', 'baseline_value_eur', 'total_pnl_eur')
+
 
 class PortfolioTracker:
-    def __init__(self, baseline_path=None):
+    def __init__(self, baseline_path=None, revalidate_seconds=BASELINE_REVALIDATE_SECONDS, timeseries_path=None,
+                 ledger_path=None, watch_external=BASELINE_WATCH_EXTERNAL):
         if baseline_path is None:
             baseline_path = BASELINE_PATH
+        if timeseries_path is None:
+            timeseries_path = TIMESERIES_PATH
+        if ledger_path is None:
+            ledger_path = LOT_LEDGER_PATH
         self.baseline_path = baseline_path
+        # Equity-Kurve: raw 24h → stündlich 30 Tage → täglich
+        self.timeseries = TimeSeriesStore(SNAPSHOT_FIELDS, path=timeseries_path)
+        # Einstandspreise aus echten Trades (FIFO/LIFO/AVG), inkrementell synchronisiert
+        self.ledger = LotLedger(state_path=ledger_path)
+        # Geparste Baseline im Speicher. Nur save_baseline schreibt die Datei und
+        # aktualisiert dabei Cache und Version; per stat() revalidiert wird nur,
+        # wenn die Datei auch extern geändert werden kann (watch_external),
+        # dann höchstens alle revalidate_seconds
+        self.watch_external = watch_external
+        self.revalidate_seconds = revalidate_seconds
+        self._baseline = None
+        self._baseline_stat = None
+        self._baseline_checked_at = 0.0
+        self.version = 0
+
+    def _stat_key(self):
+        """Identität der Baseline-Datei (mtime, Größe, Inode) oder None wenn sie fehlt"""
+        try:
+            st = os.stat(self.baseline_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _set_baseline(self, baseline, stat_key):
+        """Übernimmt eine Baseline in den Speicher und erhöht die Version"""
+        self._baseline = baseline
+        self._baseline_stat = stat_key
+        self._baseline_checked_at = time.monotonic()
+        self.version += 1
+
+    def _cache_is_fresh(self):
+        """True wenn die gecachte Baseline ohne stat() verwendet werden darf"""
+        if self._baseline is None:
+            return False
+        if not self.watch_external:
+            return True
+        return time.monotonic() - self._baseline_checked_at < self.revalidate_seconds
 
     def has_baseline(self):
         """Prüft ob Baseline existiert"""
         try:
-            import os
+            if self._cache_is_fresh():
+                return True
             return os.path.exists(self.baseline_path)
         except Exception as e:
             logger.error(f"Fehler beim Prüfen der Baseline: {e}")
             return False
 
     def save_baseline(self, portfolio, prices):
-        """Speichert ersten Portfolio-Snapshot als Baseline"""
+        """Speichert ersten Portfolio-Snapshot als Baseline (atomar via Temp-Datei + rename)"""
         try:
             baseline = {
                 'portfolio': portfolio.copy(),
                 'prices': prices.copy(),
-                'timestamp': None  # Wird beim Speichern gesetzt
+                'timestamp': time.time()
             }
-            
-            import time
-            baseline['timestamp'] = time.time()
-            
-            with open(self.baseline_path, 'w') as f:
-                json.dump(baseline, f, indent=2)
-            
+
+            directory = os.path.dirname(self.baseline_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.baseline_', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(baseline, f, indent=2)
+                os.replace(tmp_path, self.baseline_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._set_baseline(baseline, self._stat_key())
+
             # Portfolio-Wert berechnen
             total_value = sum(portfolio.get(coin, 0) * prices.get(coin, 0) for coin in portfolio.keys() if prices.get(coin))
             
@@ -46,14 +107,24 @@ class PortfolioTracker:
             return False
 
     def load_baseline(self):
-        """Lädt Baseline (None wenn nicht vorhanden)"""
+        """Lädt Baseline (None wenn nicht vorhanden), aus dem Speicher solange die Datei unverändert ist"""
         try:
-            if not self.has_baseline():
+            if self._cache_is_fresh():
+                return self._baseline
+
+            stat_key = self._stat_key()
+            if stat_key is None:
+                if self._baseline is not None:
+                    self._set_baseline(None, None)
                 return None
-            
+            if self._baseline is not None and stat_key == self._baseline_stat:
+                self._baseline_checked_at = time.monotonic()
+                return self._baseline
+
             with open(self.baseline_path, 'r') as f:
                 baseline = json.load(f)
-            
+            self._set_baseline(baseline, stat_key)
+
             logger.info("Baseline geladen")
             return baseline
             
@@ -62,105 +133,93 @@ class PortfolioTracker:
             return None
 
     def calculate_performance(self, current_portfolio, current_prices, baseline):
-        """Berechnet Performance vs. Baseline"""
+        """Berechnet Performance vs. Baseline (vektorisiert über PositionVectors)"""
         if baseline is None:
             logger.warning("Keine Baseline vorhanden für Performance-Berechnung")
             return None
         
         try:
-            baseline_portfolio = baseline.get('portfolio', {})
-            baseline_prices = baseline.get('prices', {})
-            
-            coin_performance = {}
-            total_value_eur = 0
-            total_baseline_value_eur = 0
-            
-            # Performance pro Coin berechnen
-            for coin in current_portfolio.keys():
-                current_amount = current_portfolio.get(coin, 0)
-                current_price = current_prices.get(coin)
-                
-                if current_price is None or current_price == 0:
-                    logger.warning(f"Kein Preis für {coin} verfügbar")
-                    continue
-                
-                current_value = current_amount * current_price
-                total_value_eur += current_value
-                
-                # Baseline-Werte
-                baseline_amount = baseline_portfolio.get(coin, 0)
-                baseline_price = baseline_prices.get(coin, 0)
-                baseline_value = baseline_amount * baseline_price
-                total_baseline_value_eur += baseline_value
-                
-                # Entry-Preis (Durchschnittspreis aus Baseline)
-                if baseline_amount > 0:
-                    entry_price = baseline_price
-                else:
-                    # Coin war nicht in Baseline, verwende aktuellen Preis als Entry
-                    entry_price = current_price
-                
-                # Gewinn/Verlust berechnen
-                pnl_eur = current_value - baseline_value
-                
-                # ROI berechnen
-                if baseline_value > 0:
-                    roi_percent = (pnl_eur / baseline_value) * 100
-                else:
-                    # Neuer Coin, ROI = 0 (noch kein Gewinn/Verlust)
-                    roi_percent = 0.0
-                
-                coin_performance[coin] = {
-                    'amount': current_amount,
-                    'current_price': round(current_price, 2),
-                    'current_value_eur': round(current_value, 2),
-                    'entry_price': round(entry_price, 2),
-                    'baseline_value_eur': round(baseline_value, 2),
-                    'pnl_eur': round(pnl_eur, 2),
-                    'roi_percent': round(roi_percent, 2)
-                }
-            
-            # Gesamt-Performance
-            total_pnl_eur = total_value_eur - total_baseline_value_eur
-            if total_baseline_value_eur > 0:
-                total_roi_percent = (total_pnl_eur / total_baseline_value_eur) * 100
-            else:
-                total_roi_percent = 0.0
-            
-            # Best/Worst Performer identifizieren
-            best_performer = None
-            worst_performer = None
-            best_roi = float('-inf')
-            worst_roi = float('inf')
-            
-            for coin, perf in coin_performance.items():
-                roi = perf['roi_percent']
-                if roi > best_roi:
-                    best_roi = roi
-                    best_performer = coin
-                if roi < worst_roi:
-                    worst_roi = roi
-                    worst_performer = coin
-            
-            result = {
-                'portfolio_value_eur': round(total_value_eur, 2),
-                'baseline_value_eur': round(total_baseline_value_eur, 2),
-                'total_pnl_eur': round(total_pnl_eur, 2),
-                'total_roi_percent': round(total_roi_percent, 2),
-                'coin_performance': coin_performance,
-                'best_performer': {
-                    'coin': best_performer,
-                    'roi_percent': round(best_roi, 2) if best_performer else None
-                } if best_performer else None,
-                'worst_performer': {
-                    'coin': worst_performer,
-                    'roi_percent': round(worst_roi, 2) if worst_performer else None
-                } if worst_performer else None
-            }
-            
-            logger.info(f"Performance berechnet: Portfolio-Wert {total_value_eur:.2f} EUR, ROI {total_roi_percent:.2f}%")
+            positions = PositionVectors.from_dicts(
+                current_portfolio,
+                current_prices,
+                baseline.get('portfolio', {}),
+                baseline.get('prices', {}),
+            )
+            result = positions.performance()
+            self._apply_lots(result['coin_performance'], current_prices)
+            
+            logger.info(
+                f"Performance berechnet: Portfolio-Wert {result['portfolio_value_eur']:.2f} EUR, "
+                f"ROI {result['total_roi_percent']:.2f}%"
+            )
             return result
             
         except Exception as e:
             logger.error(f"Fehler bei Performance-Berechnung: {e}")
             return None
+
+    def sync_trades(self, market):
+        """Verbucht neue Kraken-Trades im Lot-Ledger (nur seit dem letzten Cursor)"""
+        return self.ledger.sync(market)
+
+    def _apply_lots(self, coin_performance, current_prices):
+        """Ergänzt Lot-Einstandspreis und realisierten/unrealisierten P&L (falls Trades vorliegen)"""
+        if not self.ledger.coins:
+            return
+        lots = self.ledger.positions(current_prices)
+        for coin, perf in coin_performance.items():
+            lot = lots.get(coin)
+            if not lot:
+                continue
+            if lot['average_entry'] is not None:
+                perf['entry_price'] = lot['average_entry']
+            perf['realized_pnl_eur'] = lot['realized_pnl_eur']
+            perf['unrealized_pnl_eur'] = lot['unrealized_pnl_eur']
+
+    def record_snapshot(self, performance_data, timestamp=None):
+        """Hängt einen Portfolio-Snapshot (aus calculate_performance) an die Zeitreihe an.
+
+        Nur im Speicher – persistiert wird gebündelt über flush_snapshots().
+        """
+        if not performance_data:
+            return
+        try:
+            self.timeseries.append({f: performance_data.get(f) for f in SNAPSHOT_FIELDS}, timestamp)
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern des Snapshots: {e}")
+
+    def flush_snapshots(self):
+        """Schreibt neue Snapshots auf die Platte (Timer-Job und Shutdown)"""
+        self.timeseries.flush()
+
+    def equity_curve(self, start=None, end=None, field='portfolio_value_eur'):
+        """Equity-Kurve als (timestamps, values) numpy-Arrays"""
+        return self.timeseries.series(field, start, end)
+
+    def equity_curve_summary(self, days=7, now=None):
+        """Kennzahlen der Equity-Kurve der letzten Tage (None bei < 2 Snapshots)"""
+        try:
+            now = time.time() if now is None else now
+            ts, values = self.equity_curve(start=now - days * 86400, end=now)
+            mask = np.isfinite(values)
+            ts, values = ts[mask], values[mask]
+            if len(values) < 2:
+                return None
+
+            running_max = np.maximum.accumulate(values)
+            drawdowns = (values - running_max) / running_max * 100
+            start_value, end_value = float(values[0]), float(values[-1])
+            return {
+                'days': days,
+                'points': int(len(values)),
+                'start_value_eur': round(start_value, 2),
+                'end_value_eur': round(end_value, 2),
+                'change_eur': round(end_value - start_value, 2),
+                'change_percent': round((end_value / start_value - 1) * 100, 2) if start_value else None,
+                'high_eur': round(float(values.max()), 2),
+                'low_eur': round(float(values.min()), 2),
+                'max_drawdown_percent': round(float(drawdowns.min()), 2),
+            }
+        except Exception as e:
+            logger.error(f"Fehler bei Equity-Kurven-Auswertung: {e}")
+            return None
@@ -0,0 +1,118 @@
+"""
+Array-basiertes Positionsmodell für die Performance-Berechnung.
+
+Pro Aufruf werden Mengen, Preise und Baseline-Werte einmal aus den Dicts
+von Exchange und Baseline in ausgerichtete numpy-Vektoren übertragen
+(Mengen und Preise ändern sich ohnehin mit jedem Abruf). Wert, P&L, ROI
+sowie Best/Worst-Performer werden dann in einem vektorisierten Durchlauf
+berechnet; Dicts entstehen erst bei der Ausgabe.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PositionVectors:
+    """Ausgerichtete Positions-Vektoren; Index i gehört zu coins[i]."""
+
+    def __init__(self, coins: List[str], amount: np.ndarray, price: np.ndarray,
+                 baseline_amount: np.ndarray, baseline_price: np.ndarray):
+        self.coins = coins
+        self.amount = amount
+        self.price = price
+        self.baseline_amount = baseline_amount
+        self.baseline_price = baseline_price
+
+    @classmethod
+    def from_dicts(cls, portfolio: Dict[str, float],
+                   prices: Dict[str, Optional[float]], baseline_portfolio: Dict[str, float],
+                   baseline_prices: Dict[str, Optional[float]]) -> "PositionVectors":
+        """Baut die Vektoren aus den Dicts von Exchange und Baseline.
+
+        Coins ohne aktuellen Preis werden (mit Warnung) ausgelassen.
+
+        Args:
+            portfolio: Dict Coin → aktuelle Menge
+            prices: Dict Coin → aktueller Preis
+            baseline_portfolio: Dict Coin → Menge zur Baseline
+            baseline_prices: Dict Coin → Preis zur Baseline
+        """
+        coins = []
+        for coin in portfolio:
+            if not prices.get(coin):
+                logger.warning(f"Kein Preis für {coin} verfügbar")
+                continue
+            coins.append(coin)
+
+        n = len(coins)
+        return cls(
+            coins,
+            np.fromiter((portfolio.get(c) or 0 for c in coins), dtype=np.float64, count=n),
+            np.fromiter((prices[c] for c in coins), dtype=np.float64, count=n),
+            np.fromiter((baseline_portfolio.get(c) or 0 for c in coins), dtype=np.float64, count=n),
+            np.fromiter((baseline_prices.get(c) or 0 for c in coins), dtype=np.float64, count=n),
+        )
+
+    def __len__(self):
+        return len(self.coins)
+
+    def performance(self) -> Dict:
+        """Berechnet Performance vs. Baseline in einem vektorisierten Durchlauf.
+
+        Returns:
+            Dict im Format von PortfolioTracker.calculate_performance
+        """
+        value = self.amount * self.price
+        baseline_value = self.baseline_amount * self.baseline_price
+        pnl = value - baseline_value
+        # Neuer Coin (nicht in Baseline): Entry = aktueller Preis, ROI = 0
+        entry_price = np.where(self.baseline_amount > 0, self.baseline_price, self.price)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            roi = np.where(baseline_value > 0, pnl / baseline_value * 100, 0.0)
+
+        total_value = float(value.sum())
+        total_baseline = float(baseline_value.sum())
+        total_pnl = total_value - total_baseline
+        total_roi = total_pnl / total_baseline * 100 if total_baseline > 0 else 0.0
+
+        roi_rounded = np.round(roi, 2)
+        coins = self.coins
+        best = worst = None
+        if len(coins):
+            # argmax/argmin liefern bei Gleichstand den ersten Coin (wie die frühere Schleife)
+            b, w = int(np.argmax(roi_rounded)), int(np.argmin(roi_rounded))
+            best = {'coin': coins[b], 'roi_percent': float(roi_rounded[b])}
+            worst = {'coin': coins[w], 'roi_percent': float(roi_rounded[w])}
+
+        # Ab hier nur noch Darstellung
+        columns = zip(
+            coins, self.amount.tolist(), np.round(self.price, 2).tolist(), np.round(value, 2).tolist(),
+            np.round(entry_price, 2).tolist(), np.round(baseline_value, 2).tolist(),
+            np.round(pnl, 2).tolist(), roi_rounded.tolist(),
+        )
+        coin_performance = {
+            coin: {
+                'amount': amount,
+                'current_price': price,
+                'current_value_eur': cur_value,
+                'entry_price': entry,
+                'baseline_value_eur': base_value,
+                'pnl_eur': coin_pnl,
+                'roi_percent': coin_roi,
+            }
+            for coin, amount, price, cur_value, entry, base_value, coin_pnl, coin_roi in columns
+        }
+
+        return {
+            'portfolio_value_eur': round(total_value, 2),
+            'baseline_value_eur': round(total_baseline, 2),
+            'total_pnl_eur': round(total_pnl, 2),
+            'total_roi_percent': round(total_roi, 2),
+            'coin_performance': coin_performance,
+            'best_performer': best,
+            'worst_performer': worst,
+        }
@@ -0,0 +1,277 @@
+"""
+Delta-Prompting für die tägliche Markt-Analyse.
+
+Der PromptContext merkt sich die Eingaben und Schlussfolgerungen der
+letzten Analysen. Statt jeden Tag alle Indikatoren, die komplette
+Markt-Übersicht und alle Risiko-Metriken zu senden, bekommt der Analyst:
+
+    - Portfolio und Performance (wie bisher, sie sind klein und zentral)
+    - Portfolio-Indikatoren auf die Kernsignale reduziert
+    - nur die Markt-Coins mit Signalwechsel oder großer Preisbewegung
+    - nur die wesentlich veränderten Risiko-Metriken
+    - eine strukturierte Änderungsliste und die letzten Schlussfolgerungen
+
+Verglichen wird mit dem Stand, den der Analyst zuletzt gesehen hat: nicht
+gemeldete Coins und Metriken behalten ihren alten Wert, damit sich langsame
+Drift aufsummiert, bis sie die Schwelle überschreitet.
+
+Alle N Zyklen (und ohne gespeicherten Stand) wird vollständig gesendet.
+"""
+
+import copy
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from config import (
+    PROMPT_CONTEXT_PATH, PROMPT_DELTA_ENABLED, PROMPT_DELTA_FULL_REFRESH_CYCLES,
+    PROMPT_DELTA_PRICE_THRESHOLD, PROMPT_DELTA_METRIC_THRESHOLD, PROMPT_DELTA_SUMMARY_LENGTH,
+)
+from response_cache import indicator_signals
+
+logger = logging.getLogger(__name__)
+
+# Indikator-Felder, die im Delta-Modus pro Portfolio-Coin erhalten bleiben
+COMPACT_INDICATOR_FIELDS = (
+    'price', 'rsi_14', 'trend', 'macd_bullish', 'macd_bearish', 'bb_position',
+    'volume_ratio', 'obv_trend', 'ichimoku_cloud_position', 'volatility_30d',
+)
+# Kategoriale Signale, deren Wechsel gemeldet wird
+_SIGNAL_FIELDS = ('trend', 'rsi', 'macd_bullish', 'macd_bearish', 'bb_position',
+                  'volume', 'obv_trend', 'ichimoku_cloud_position')
+
+
+def _flatten(obj: Any, prefix: str = '') -> Dict[str, Any]:
+    """Verschachtelte Dicts → {'a.b': Wert} (Listen bleiben Werte)."""
+    if not isinstance(obj, dict):
+        return {prefix.rstrip('.'): obj} if prefix else {}
+    flat = {}
+    for key, value in obj.items():
+        flat.update(_flatten(value, f"{prefix}{key}.") if isinstance(value, dict) else {f"{prefix}{key}": value})
+    return flat
+
+
+def _set_path(target: Dict[str, Any], key: str, value: Any) -> None:
+    """Gegenstück zu _flatten für einen Schlüssel 'a.b' (value=None entfernt ihn)."""
+    *parents, leaf = key.split('.')
+    for part in parents:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    if value is None:
+        target.pop(leaf, None)
+    else:
+        target[leaf] = value
+
+
+def diff_metrics(previous: Optional[Dict], current: Optional[Dict],
+                 threshold: float = PROMPT_DELTA_METRIC_THRESHOLD) -> Dict[str, Any]:
+    """Wesentlich geänderte Werte zweier (verschachtelter) Dicts.
+
+    Zahlen gelten als geändert, wenn sie sich relativ um mehr als threshold
+    bewegen; alle anderen Werte bei Ungleichheit.
+
+    Returns:
+        Dict 'a.b' → [alt, neu] (neue Schlüssel mit alt=None, entfernte mit neu=None)
+    """
+    old, new = _flatten(previous or {}), _flatten(current or {})
+    changes = {}
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+                and not isinstance(a, bool) and not isinstance(b, bool):
+            scale = max(abs(a), abs(b))
+            if scale and abs(b - a) / scale > threshold:
+                changes[key] = [a, b]
+        elif a != b:
+            changes[key] = [a, b]
+    return changes
+
+
+def diff_indicators(previous: Optional[Dict], current: Optional[Dict],
+                    price_threshold: float = PROMPT_DELTA_PRICE_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+    """Signalwechsel und Preisbewegungen pro Coin.
+
+    Returns:
+        Dict Coin → {'signals': {Feld: [alt, neu]}, 'price_change_pct': x, 'status': 'new'|'removed'}
+    """
+    previous, current = previous or {}, current or {}
+    changes = {}
+    for coin in set(previous) | set(current):
+        old, new = previous.get(coin), current.get(coin)
+        if not new:
+            if old:
+                changes[coin] = {'status': 'removed'}
+            continue
+        if not old:
+            changes[coin] = {'status': 'new'}
+            continue
+        entry = {}
+        old_signals, new_signals = indicator_signals(old), indicator_signals(new)
+        flips = {f: [old_signals.get(f), new_signals.get(f)] for f in _SIGNAL_FIELDS
+                 if old_signals.get(f) != new_signals.get(f)}
+        if flips:
+            entry['signals'] = flips
+        old_price, new_price = old.get('price'), new.get('price')
+        if old_price and new_price:
+            move = new_price / old_price - 1
+            if abs(move) > price_threshold:
+                entry['price_change_pct'] = round(move * 100, 2)
+        if entry:
+            changes[coin] = entry
+    return dict(sorted(changes.items()))
+
+
+def compact_indicators(indicators: Optional[Dict]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Reduziert Indikatoren pro Coin auf COMPACT_INDICATOR_FIELDS."""
+    return {
+        coin: {f: values.get(f) for f in COMPACT_INDICATOR_FIELDS} if values else None
+        for coin, values in (indicators or {}).items()
+    }
+
+
+class PromptContext:
+    """Persistenter Kontext der letzten Analysen für Delta-Prompts."""
+
+    def __init__(self, state_path: Optional[str] = PROMPT_CONTEXT_PATH,
+                 full_refresh_cycles: int = PROMPT_DELTA_FULL_REFRESH_CYCLES,
+                 enabled: bool = PROMPT_DELTA_ENABLED):
+        """Initialisiert den Kontext und lädt ggf. den gespeicherten Stand.
+
+        Args:
+            state_path: JSON-Datei für Eingaben und Schlussfolgerungen (None = nur im Speicher)
+            full_refresh_cycles: Spätestens nach so vielen Delta-Zyklen vollständig senden
+            enabled: False = immer vollständige Prompts
+        """
+        self.state_path = state_path
+        self.full_refresh_cycles = full_refresh_cycles
+        self.enabled = enabled
+        self.inputs: Optional[Dict[str, Any]] = None
+        self.summary: List[Dict[str, Any]] = []
+        self.cycles_since_full = 0
+        if state_path:
+            self.load()
+
+    def needs_full_refresh(self) -> bool:
+        return not self.enabled or self.inputs is None or self.cycles_since_full >= self.full_refresh_cycles
+
+    def prepare(self, portfolio_data: Dict, portfolio_indicators: Dict, market_overview: Dict,
+                performance_data: Optional[Dict], risk_metrics: Optional[Dict]) -> Dict[str, Any]:
+        """Abschnitte für den Analyst-Prompt (vollständig oder als Delta).
+
+        Returns:
+            Dict mit 'mode' ('full' | 'delta') und 'fields' (Template-Abschnitte,
+            im Delta-Modus zusätzlich 'delta_context')
+        """
+        fields = {
+            'portfolio': portfolio_data,
+            'portfolio_indicators': portfolio_indicators,
+            'market_overview': market_overview,
+            'performance_data': performance_data,
+            'risk_metrics': risk_metrics,
+        }
+        if self.needs_full_refresh():
+            return {'mode': 'full', 'fields': fields}
+
+        previous = self.inputs
+        market_changes = diff_indicators(previous.get('market_overview'), market_overview)
+        changes = {
+            'portfolio': diff_metrics(previous.get('portfolio'), portfolio_data, threshold=0.001),
+            'portfolio_indicators': diff_indicators(previous.get('portfolio_indicators'), portfolio_indicators),
+            'market_overview': market_changes,
+            'risk_metrics': diff_metrics(previous.get('risk_metrics'), risk_metrics),
+        }
+        fields['portfolio_indicators'] = compact_indicators(portfolio_indicators)
+        # Nur Markt-Coins mit Änderung; die übrigen sind seit der letzten Analyse unverändert
+        fields['market_overview'] = compact_indicators({
+            coin: values for coin, values in (market_overview or {}).items() if coin in market_changes
+        })
+        fields['risk_metrics'] = {key: new for key, (_, new) in changes['risk_metrics'].items()}
+        fields['delta_context'] = {
+            'cycles_since_full_analysis': self.cycles_since_full + 1,
+            'last_analysis_at': previous.get('timestamp'),
+            'changes': {section: diff for section, diff in changes.items() if diff},
+            'previous_analyses': self.summary,
+        }
+        return {'mode': 'delta', 'fields': fields}
+
+    @staticmethod
+    def reported_inputs(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+        """Stand nach einem Delta-Prompt: was der Analyst jetzt kennt.
+
+        Portfolio und Portfolio-Indikatoren werden immer gesendet; von der
+        Markt-Übersicht und den Risiko-Metriken nur die gemeldeten Coins bzw.
+        Werte – für alle übrigen bleibt der alte Stand die Basis.
+        """
+        market = dict(previous.get('market_overview') or {})
+        current_market = current.get('market_overview') or {}
+        for coin, change in diff_indicators(previous.get('market_overview'), current_market).items():
+            if change.get('status') == 'removed':
+                market.pop(coin, None)
+            else:
+                market[coin] = current_market[coin]
+        risk = copy.deepcopy(previous.get('risk_metrics') or {})
+        for key, (_, new) in diff_metrics(previous.get('risk_metrics'), current.get('risk_metrics')).items():
+            _set_path(risk, key, new)
+        return {**current, 'market_overview': market, 'risk_metrics': risk}
+
+    def record(self, mode: str, inputs: Dict[str, Any], conclusion: Dict[str, Any],
+               timestamp: Optional[float] = None) -> None:
+        """Speichert die Eingaben und die Schlussfolgerung einer erfolgreichen Analyse.
+
+        Args:
+            mode: 'full' oder 'delta' (aus prepare)
+            inputs: Vollständige Eingaben (im Delta-Modus zählt für den nächsten
+                Diff nur, was davon gemeldet wurde)
+            conclusion: Analyst-JSON (recommendation, sentiment, urgency_score, reasoning)
+            timestamp: Zeitpunkt (Default: jetzt)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if mode == 'delta' and self.inputs is not None:
+            inputs = self.reported_inputs(self.inputs, inputs)
+        self.inputs = {**inputs, 'timestamp': int(timestamp)}
+        self.cycles_since_full = 0 if mode == 'full' else self.cycles_since_full + 1
+        self.summary.append({
+            'timestamp': int(timestamp),
+            'recommendation': conclusion.get('recommendation'),
+            'sentiment': conclusion.get('sentiment'),
+            'urgency_score': conclusion.get('urgency_score'),
+            'reasoning': (conclusion.get('reasoning') or '')[:300],
+        })
+        self.summary = self.summary[-PROMPT_DELTA_SUMMARY_LENGTH:]
+        self.save()
+
+    # ── Persistenz ───────────────────────────────────────────────────────────
+
+    def save(self) -> None:
+        """Schreibt den Kontext atomar (Temp-Datei + rename)."""
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(self.state_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.prompt_context_', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'inputs': self.inputs,
+                    'summary': self.summary,
+                    'cycles_since_full': self.cycles_since_full,
+                }, f, default=str)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Fehler beim Speichern des Prompt-Kontexts: {e}")
+
+    def load(self) -> None:
+        """Lädt einen gespeicherten Kontext (falls vorhanden)."""
+        try:
+            if not self.state_path or not os.path.exists(self.state_path):
+                return
+            with open(self.state_path, 'r') as f:
+                data = json.load(f)
+            self.inputs = data.get('inputs')
+            self.summary = data.get('summary', [])
+            self.cycles_since_full = data.get('cycles_since_full', 0)
+        except Exception as e:
+            logger.warning(f"Fehler beim Laden des Prompt-Kontexts: {e}")
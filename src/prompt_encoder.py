@@ -0,0 +1,174 @@
+"""
+Kompakte Serialisierung der Prompt-Daten.
+
+Statt json.dumps(..., indent=2) werden Coin-Tabellen (Dict Coin → Dict) als
+CSV mit Kopfzeile ausgegeben, alles andere als JSON ohne Leerzeichen. Zahlen
+werden auf eine konfigurierbare Anzahl signifikanter Stellen gerundet.
+Pro Aufruf werden die Token vorher/nachher gezählt und geloggt.
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from config import PROMPT_COMPACT_ENABLED, PROMPT_SIGNIFICANT_DIGITS
+from token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def round_significant(value: float, digits: int) -> float:
+    """Rundet auf `digits` signifikante Stellen (0, inf und NaN bleiben unverändert)."""
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def _format_number(value: float, digits: int) -> str:
+    """Zahl → kürzeste Darstellung nach Rundung (ganze Zahlen ohne .0)."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    if not math.isfinite(value):
+        return 'null'
+    rounded = round_significant(value, digits)
+    if rounded.is_integer() and abs(rounded) < 1e15:
+        return str(int(rounded))
+    return repr(rounded)
+
+
+def _round_tree(obj: Any, digits: int) -> Any:
+    """Rundet alle Floats in verschachtelten Dicts/Listen."""
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, float):
+        if not math.isfinite(obj):
+            return None
+        rounded = round_significant(obj, digits)
+        return int(rounded) if rounded.is_integer() and abs(rounded) < 1e15 else rounded
+    if isinstance(obj, dict):
+        return {k: _round_tree(v, digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_round_tree(v, digits) for v in obj]
+    return obj
+
+
+def _flatten(row: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Flacht verschachtelte Dicts zu 'a.b'-Spalten ab."""
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def is_table(obj: Any) -> bool:
+    """True für Dict Coin → (flaches oder leicht verschachteltes) Dict bzw. None."""
+    if not isinstance(obj, dict) or not obj:
+        return False
+    rows = [v for v in obj.values() if v is not None]
+    return bool(rows) and all(
+        isinstance(v, dict) and not any(isinstance(x, (list, tuple)) for x in _flatten(v).values())
+        for v in rows
+    )
+
+
+def encode_table(rows: Dict[str, Optional[Dict[str, Any]]], digits: int,
+                 key_name: str = 'coin') -> str:
+    """Dict Coin → Dict als CSV (Spalten = Vereinigung aller Schlüssel).
+
+    Args:
+        rows: Dict Zeilen-Schlüssel → Dict (None = leere Zeile)
+        digits: Signifikante Stellen für Zahlen
+        key_name: Name der Schlüssel-Spalte
+
+    Returns:
+        CSV-Text mit Kopfzeile; fehlende Werte bleiben leer
+    """
+    flat_rows = {key: _flatten(row) if row else {} for key, row in rows.items()}
+    columns: List[str] = []
+    seen = set()
+    for row in flat_rows.values():
+        for col in row:
+            if col not in seen:
+                seen.add(col)
+                columns.append(col)
+    # None-Spalte eines sonst verschachtelten Feldes (z.B. rsi_divergence=None) entfällt
+    columns = [
+        col for col in columns
+        if not (any(c.startswith(f"{col}.") for c in columns)
+                and all(row.get(col) is None for row in flat_rows.values()))
+    ]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow([key_name] + columns)
+    for key, row in flat_rows.items():
+        cells = [key]
+        for col in columns:
+            value = row.get(col)
+            if value is None:
+                cells.append('')
+            elif isinstance(value, (int, float)):
+                cells.append(_format_number(value, digits))
+            else:
+                cells.append(str(value))
+        writer.writerow(cells)
+    return buffer.getvalue().rstrip('\n')
+
+
+class PromptEncoder:
+    """Serialisiert Prompt-Payloads kompakt und zählt die eingesparten Token."""
+
+    def __init__(self, digits: int = PROMPT_SIGNIFICANT_DIGITS, enabled: bool = PROMPT_COMPACT_ENABLED):
+        """Initialisiert den Encoder.
+
+        Args:
+            digits: Signifikante Stellen für Zahlen
+            enabled: False = klassisches json.dumps(indent=2)
+        """
+        self.digits = digits
+        self.enabled = enabled
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def encode(self, obj: Any) -> str:
+        """Serialisiert ein einzelnes Objekt (Tabelle oder kompaktes JSON)."""
+        if not self.enabled:
+            return json.dumps(obj, indent=2)
+        if is_table(obj):
+            return encode_table(obj, self.digits)
+        return json.dumps(_round_tree(obj, self.digits), separators=(',', ':'), ensure_ascii=False)
+
+    def encode_payload(self, fields: Dict[str, Any], label: str = '') -> Dict[str, str]:
+        """Serialisiert alle Felder eines Prompts und loggt die Token-Ersparnis.
+
+        Args:
+            fields: Dict Template-Variable → Objekt (None wird zu {})
+            label: Name für das Log (z.B. Template-Name)
+
+        Returns:
+            Dict Template-Variable → serialisierter String
+        """
+        encoded = {}
+        before = after = 0
+        for name, obj in fields.items():
+            obj = {} if obj is None else obj
+            encoded[name] = self.encode(obj)
+            before += count_tokens(json.dumps(obj, indent=2))
+            after += count_tokens(encoded[name])
+        self.tokens_before += before
+        self.tokens_after += after
+        if before:
+            logger.info(
+                f"Prompt-Payload {label}: {before} → {after} Token "
+                f"({(1 - after / before) * 100:.0f}% gespart)"
+            )
+        return encoded
@@ -0,0 +1,195 @@
+"""
+Persistenter Antwort-Cache für LLM-Aufrufe.
+
+Der Schlüssel ist ein Fingerprint der *materiellen* Eingaben: Preise werden
+in logarithmische Buckets (~0.5%) quantisiert, Indikatoren auf kategoriale
+Signale reduziert (Trend, RSI-Zone, MACD, Bollinger, ...), Risiko-Metriken
+auf Drawdown-Zonen, Konzentration und gerasterte Gewichte. Simulierte VaR-Werte
+und der EWMA-Zustand ändern sich mit jedem Zyklus und fließen nicht ein.
+Solange sich an den Eingaben nichts ändert, liefert der Cache die letzte
+Antwort ohne Modell-Aufruf.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Dict, Optional
+
+from cache_manager import IntelligentCache
+from config import (
+    LLM_RESPONSE_CACHE_ENABLED, LLM_RESPONSE_CACHE_DIR, LLM_CACHE_PRICE_BUCKET,
+    LLM_CACHE_WEIGHT_STEP,
+)
+
+logger = logging.getLogger(__name__)
+
+# Indikator-Felder, die bereits kategorial sind und direkt übernommen werden
+_CATEGORICAL_FIELDS = (
+    'trend', 'macd_bullish', 'macd_bearish', 'bb_position', 'obv_trend',
+    'ichimoku_cloud_position', 'rsi_divergence',
+)
+
+
+def price_bucket(price: Optional[float], bucket: float = LLM_CACHE_PRICE_BUCKET) -> Optional[int]:
+    """Logarithmischer Preis-Bucket: gleiche Zahl ⇔ Preise liegen ~bucket auseinander."""
+    if not price or price <= 0:
+        return None
+    return int(round(math.log(price) / math.log1p(bucket)))
+
+
+def rsi_zone(rsi: Optional[float]) -> Optional[str]:
+    """RSI → Zone (oversold / weak / neutral / strong / overbought)."""
+    if rsi is None:
+        return None
+    if rsi < 30:
+        return 'oversold'
+    if rsi < 45:
+        return 'weak'
+    if rsi <= 55:
+        return 'neutral'
+    if rsi <= 70:
+        return 'strong'
+    return 'overbought'
+
+
+def volume_state(ratio: Optional[float]) -> Optional[str]:
+    """Volume-Ratio → low / normal / high."""
+    if ratio is None:
+        return None
+    return 'low' if ratio < 0.8 else 'high' if ratio > 1.5 else 'normal'
+
+
+def drawdown_zone(drawdown: Optional[float]) -> Optional[str]:
+    """Aktueller Drawdown in % → Zone (none / moderate / severe / extreme)."""
+    if drawdown is None:
+        return None
+    if drawdown < 5:
+        return 'none'
+    if drawdown < 15:
+        return 'moderate'
+    if drawdown < 30:
+        return 'severe'
+    return 'extreme'
+
+
+def weight_step(weight: Optional[float], step: float = LLM_CACHE_WEIGHT_STEP) -> Optional[float]:
+    """Gewicht in % → nächstes Vielfaches von `step` Prozentpunkten."""
+    if weight is None:
+        return None
+    return round(weight / step) * step
+
+
+def indicator_signals(indicators: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reduziert ein Indikator-Dict auf Preis-Bucket und kategoriale Signale."""
+    if not indicators:
+        return None
+    signals = {field: indicators.get(field) for field in _CATEGORICAL_FIELDS}
+    signals['price'] = price_bucket(indicators.get('price'))
+    signals['rsi'] = rsi_zone(indicators.get('rsi_14'))
+    signals['volume'] = volume_state(indicators.get('volume_ratio'))
+    return signals
+
+
+def risk_signals(risk_metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reduziert Risiko-Metriken auf stabile Eingaben.
+
+    Übernommen werden nur Drawdown-Zonen, die konzentrierten Coins und die
+    gerasterten Portfolio-Gewichte. VaR, Volatilitäten und Korrelationen
+    (EWMA-Zustand, Simulation) bleiben außen vor.
+    """
+    if not risk_metrics:
+        return None
+    return {
+        'drawdown': {c: drawdown_zone(d) for c, d in (risk_metrics.get('current_drawdown_percent') or {}).items()},
+        'concentrated': sorted(r.get('coin') for r in (risk_metrics.get('concentration_risks') or [])),
+        'weights': {c: weight_step(w) for c, w in (risk_metrics.get('portfolio_weights') or {}).items()},
+    }
+
+
+def quantize_numbers(obj: Any, digits: int = 2) -> Any:
+    """Rundet alle Zahlen in einer Struktur auf `digits` signifikante Stellen."""
+    if isinstance(obj, bool) or obj is None or isinstance(obj, str):
+        return obj
+    if isinstance(obj, (int, float)):
+        if obj == 0 or not math.isfinite(obj):
+            return 0
+        return round(obj, digits - 1 - int(math.floor(math.log10(abs(obj)))))
+    if isinstance(obj, dict):
+        return {str(k): quantize_numbers(v, digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [quantize_numbers(v, digits) for v in obj]
+    return str(obj)
+
+
+def fingerprint(kind: str, **inputs: Any) -> str:
+    """SHA-256 über die kanonische JSON-Form der (bereits quantisierten) Eingaben."""
+    payload = json.dumps({'kind': kind, **inputs}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Antwort-Cache auf Basis von IntelligentCache (feste TTL, persistent)."""
+
+    def __init__(self, cache_dir: str = LLM_RESPONSE_CACHE_DIR, enabled: bool = LLM_RESPONSE_CACHE_ENABLED):
+        """Initialisiert den Cache.
+
+        Args:
+            cache_dir: Verzeichnis für die Cache-Dateien
+            enabled: False = Cache vollständig deaktiviert
+        """
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._cache = None
+        if enabled:
+            self._cache = IntelligentCache(cache_dir=cache_dir)
+            # TTLs sind fachlich vorgegeben – keine automatische Anpassung
+            self._cache.enable_adaptive_ttl(False)
+
+    def market_fingerprint(self, kind: str, portfolio_data: Optional[Dict] = None,
+                           portfolio_indicators: Optional[Dict] = None,
+                           market_overview: Optional[Dict] = None,
+                           performance_data: Optional[Dict] = None,
+                           risk_metrics: Optional[Dict] = None, **extra: Any) -> str:
+        """Fingerprint für eine Markt-Analyse aus quantisierten Eingaben.
+
+        Args:
+            kind: Art des Aufrufs (z.B. 'analyze_market', 'next_invest')
+            portfolio_data: Dict Coin → Menge (3 signifikante Stellen)
+            portfolio_indicators: Dict Coin → Indikatoren
+            market_overview: Dict Coin → Indikatoren
+            performance_data: Performance vs. Baseline
+            risk_metrics: Risiko-Metriken (nur stabile Anteile, siehe risk_signals)
+            **extra: Weitere Eingaben (Modelle, Template-Hash, Betrag, ...)
+
+        Returns:
+            Hex-Fingerprint
+        """
+        return fingerprint(
+            kind,
+            portfolio={c: quantize_numbers(a, 3) for c, a in (portfolio_data or {}).items()},
+            portfolio_signals={c: indicator_signals(i) for c, i in (portfolio_indicators or {}).items()},
+            market_signals={c: indicator_signals(i) for c, i in (market_overview or {}).items()},
+            roi=quantize_numbers((performance_data or {}).get('total_roi_percent'), 1),
+            risk=risk_signals(risk_metrics),
+            **extra,
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Gecachte Antwort oder None."""
+        if not self.enabled:
+            return None
+        value = self._cache.get(f"llm_{key}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"LLM-Antwort aus Cache ({key[:12]}…) – kein Modell-Aufruf")
+        return value
+
+    def set(self, key: str, response: Dict[str, Any], ttl: int) -> None:
+        """Speichert eine Antwort (ttl <= 0 = nicht cachen)."""
+        if not self.enabled or ttl <= 0 or response is None:
+            return
+        self._cache.set(f"llm_{key}", response, ttl=ttl)
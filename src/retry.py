@@ -4,8 +4,18 @@ from typing import Callable, Type, Tuple
 import random
 import logging
 
+from config import RETRY_DELAY_BUCKETS
+from metrics import registry
+
 logger = logging.getLogger(__name__)
 
+_RETRY_ATTEMPTS = registry.counter('retry_attempts_total', 'Aufrufversuche retry-dekorierter Funktionen', ('function',))
+_RETRY_FAILURES = registry.counter('retry_failures_total', 'Fehlgeschlagene Versuche', ('function',))
+_RETRY_EXHAUSTED = registry.counter('retry_exhausted_total', 'Aufrufe, bei denen alle Versuche scheiterten',
+                                    ('function',))
+_RETRY_DELAY = registry.histogram('retry_delay_seconds', 'Wartezeit vor einem erneuten Versuch', ('function',),
+                                  RETRY_DELAY_BUCKETS)
+
 
 def retry(
     max_attempts: int = 3,
@@ -29,17 +39,25 @@ def retry(
         logger: Optional logger for retry logging
     """
     def decorator(func: Callable):
+        # Metriken einmal pro Funktion binden, nicht pro Aufruf
+        name = func.__qualname__
+        attempts_metric = _RETRY_ATTEMPTS.labels(name)
+        failures_metric = _RETRY_FAILURES.labels(name)
+        delay_metric = _RETRY_DELAY.labels(name)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             last_exception = None
             attempt = 0
 
             while attempt < max_attempts:
+                attempts_metric.inc()
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
                     last_exception = e
                     attempt += 1
+                    failures_metric.inc()
 
                     if attempt == max_attempts:
                         break
@@ -66,9 +84,11 @@ def retry(
                         print(f"Retry attempt {attempt}/{max_attempts} for {func.__name__} - "
                               f"Exception: {e} - Waiting {delay:.2f}s")
 
+                    delay_metric.observe(delay)
                     time.sleep(delay)
 
             # If we get here, all attempts failed
+            _RETRY_EXHAUSTED.labels(name).inc()
             if logger:
                 logger.error(
                     f"All {max_attempts} attempts failed for {func.__name__}",
@@ -1,17 +1,133 @@
 import json
 import logging
+import os
+import threading
 import numpy as np
 import pandas as pd
-from config import PERFORMANCE_HISTORY_PATH, MAX_HISTORY_PER_COIN, MAX_TOTAL_HISTORY_ENTRIES
+from typing import Dict, List, Optional, Tuple
+from config import (
+    PERFORMANCE_HISTORY_PATH, MAX_HISTORY_PER_COIN, MAX_TOTAL_HISTORY_ENTRIES,
+    CORRELATION_MIN_POINTS, PORTFOLIO_VAR_SEED,
+)
+from risk_state import EwmaRiskState
+from portfolio_risk import PortfolioRiskEngine
 
 logger = logging.getLogger(__name__)
 
 
+def align_price_histories(
+    price_history_dict: Dict[str, List[Dict]],
+    coins: List[str],
+    step: Optional[float] = None,
+) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """Richtet Preis-Historien mehrerer Coins auf ein gemeinsames Zeitraster aus.
+
+    Das Raster deckt nur den Zeitraum ab, in dem alle Coins Daten haben, und
+    nutzt als Schrittweite das gröbste mediane Abtastintervall der Coins.
+    Jeder Rasterpunkt übernimmt per As-of-Join (``searchsorted``) den letzten
+    bekannten Preis des Coins.
+
+    Args:
+        price_history_dict: Dict Coin → Liste von {'price', 'timestamp'}
+        coins: Zu berücksichtigende Coins
+        step: Feste Schrittweite in Sekunden; None = gröbstes medianes
+            Abtastintervall. Ist ein Coin gröber abgetastet als step, gibt es
+            kein Ergebnis (sonst künstliche Null-Returns)
+
+    Returns:
+        Tuple aus (coins, grid, log_returns) mit log_returns der Form
+        (len(grid) - 1, len(coins)), oder None wenn nicht genug Daten
+    """
+    usable = []
+    timestamps = []
+    prices = []
+    for coin in coins:
+        entries = price_history_dict.get(coin) or []
+        if len(entries) < 2:
+            continue
+        ts = np.fromiter((e['timestamp'] for e in entries), dtype=np.float64, count=len(entries))
+        px = np.fromiter((e['price'] for e in entries), dtype=np.float64, count=len(entries))
+        if np.any(np.diff(ts) < 0):
+            order = np.argsort(ts, kind='stable')
+            ts, px = ts[order], px[order]
+        valid = px > 0
+        if valid.sum() < 2:
+            continue
+        usable.append(coin)
+        timestamps.append(ts[valid])
+        prices.append(px[valid])
+
+    if len(usable) < 2:
+        return None
+
+    start = max(ts[0] for ts in timestamps)
+    end = min(ts[-1] for ts in timestamps)
+    if end <= start:
+        return None
+
+    # Gröbstes Abtastintervall bestimmt das Raster (vermeidet künstliche Null-Returns)
+    coarsest = max(float(np.median(np.diff(ts))) for ts in timestamps)
+    if step is None:
+        step = coarsest
+    elif coarsest > step:
+        return None
+    if step <= 0:
+        return None
+    n_points = int(np.floor((end - start) / step)) + 1
+    if n_points < CORRELATION_MIN_POINTS:
+        return None
+    grid = start + step * np.arange(n_points, dtype=np.float64)
+
+    aligned = np.empty((n_points, len(usable)), dtype=np.float64)
+    for j, (ts, px) in enumerate(zip(timestamps, prices)):
+        idx = np.searchsorted(ts, grid, side='right') - 1
+        aligned[:, j] = px[idx]
+
+    log_returns = np.diff(np.log(aligned), axis=0)
+    return usable, grid, log_returns
+
+
+def correlation_from_returns(log_returns: np.ndarray) -> np.ndarray:
+    """Berechnet die Pearson-Korrelationsmatrix aus einer Return-Matrix.
+
+    Spalten ohne Varianz erhalten Korrelation 0 zu allen anderen Coins.
+
+    Args:
+        log_returns: Matrix der Form (n_returns, n_coins)
+
+    Returns:
+        Korrelationsmatrix der Form (n_coins, n_coins)
+    """
+    centered = log_returns - log_returns.mean(axis=0)
+    std = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized = np.where(std > 0, centered / std, 0.0)
+    corr = normalized.T @ normalized
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
 class RiskAnalyzer:
     def __init__(self, history_path=None):
         if history_path is None:
             history_path = PERFORMANCE_HISTORY_PATH
         self.history_path = history_path
+        # In-Memory Kopie der Historie, invalidiert über mtime/Größe der Datei
+        self._history = None
+        self._history_stat = None
+        self.history_version = 0
+        self._correlation_cache = {}
+        self._aligned_cache = {}
+        self.portfolio_risk_engine = PortfolioRiskEngine()
+        # Letzte VaR-Simulation als (Cache-Key, Ergebnis); Lock verhindert Doppelrechnung
+        self._var_simulation = None
+        self._var_lock = threading.Lock()
+        # Schützt Preis-Historie und EWMA-Zustand: analyze_risks, der VaR-Job und
+        # Befehle laufen per asyncio.to_thread in verschiedenen Worker-Threads
+        self._state_lock = threading.RLock()
+        # Online EWMA-Zustand, Snapshot liegt neben der Historie
+        self.risk_state = EwmaRiskState(state_path=self._risk_state_path())
         logger.info(
             "RiskAnalyzer initialisiert",
             extra={
@@ -20,15 +136,53 @@ class RiskAnalyzer:
             },
         )
 
+    def _risk_state_path(self):
+        """Pfad des EWMA-Snapshots neben der Historien-Datei"""
+        root, _ = os.path.splitext(self.history_path)
+        return f"{root}_risk_state.json"
+
+    def _update_risk_state(self, portfolio, prices, price_history_dict):
+        """Aktualisiert den EWMA-Zustand mit dem aktuellen Preisvektor.
+
+        Ein leerer Zustand wird einmalig aus der Historie initialisiert, die
+        dafür auf den festen EWMA-Schritt ausgerichtet wird. Danach schreibt
+        update() höchstens einmal pro Schritt fort – mehrere analyze_risks-
+        Aufrufe (Zyklus, Weekly Summary) ändern den Return-Horizont nicht.
+        """
+        if self.risk_state.is_empty():
+            aligned = self.get_aligned_returns(
+                list(portfolio.keys()), price_history_dict, self.history_version,
+                step=self.risk_state.step_seconds,
+            )
+            if aligned is not None:
+                coins, grid, log_returns = aligned
+                last_prices = {c: price_history_dict[c][-1]['price'] for c in coins}
+                last_seen = min(price_history_dict[c][-1]['timestamp'] for c in coins)
+                self.risk_state.bootstrap(coins, log_returns, last_prices, timestamp=last_seen)
+                self.risk_state.save()
+                return
+        if self.risk_state.update({coin: prices.get(coin) for coin in portfolio.keys()}):
+            self.risk_state.save()
+
     def _load_history(self):
-        """Lädt Performance-Historie"""
+        """Lädt Performance-Historie (aus dem Speicher, solange die Datei unverändert ist).
+
+        Das Ergebnis ist die gemeinsame In-Memory-Kopie und darf nicht verändert
+        werden; Änderungen laufen über eine Kopie und _save_history.
+        """
         try:
-            import os
             if not os.path.exists(self.history_path):
                 return {}
-            
+
+            st = os.stat(self.history_path)
+            stat_key = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if self._history is not None and stat_key == self._history_stat:
+                return self._history
+
             with open(self.history_path, 'r') as f:
-                return json.load(f)
+                history = json.load(f)
+            self._set_history(history, stat_key)
+            return history
         except Exception as e:
             logger.warning(f"Fehler beim Laden der Historie: {e}")
             return {}
@@ -38,15 +192,52 @@ class RiskAnalyzer:
         try:
             with open(self.history_path, 'w') as f:
                 json.dump(history, f, indent=2)
+            st = os.stat(self.history_path)
+            self._set_history(history, (st.st_mtime_ns, st.st_size, st.st_ino))
         except Exception as e:
             logger.warning(f"Fehler beim Speichern der Historie: {e}")
 
+    def _set_history(self, history, stat_key):
+        """Übernimmt eine neue Historie in den Speicher und erhöht die Version"""
+        self._history = history
+        self._history_stat = stat_key
+        self.history_version += 1
+        # Abgeleitete Ergebnisse gehören zur alten Version
+        self._correlation_cache.clear()
+        self._aligned_cache.clear()
+
+    def _is_current_history(self, price_history_dict, history_version):
+        """True, wenn price_history_dict die aktuelle In-Memory-Historie dieser Version ist.
+
+        Nur dann dürfen abgeleitete Ergebnisse gecacht werden – eine vom Aufrufer
+        übergebene Historie hat mit history_version nichts zu tun.
+        """
+        return (
+            history_version is not None
+            and history_version == self.history_version
+            and self._history is not None
+            and price_history_dict is self._history.get('price_history')
+        )
+
+    def get_aligned_returns(self, coins, price_history_dict, history_version=None, step=None):
+        """Ausgerichtete Log-Returns (siehe align_price_histories), gecacht pro Historien-Version"""
+        cacheable = self._is_current_history(price_history_dict, history_version)
+        cache_key = (history_version, tuple(coins), step)
+        if cacheable and cache_key in self._aligned_cache:
+            return self._aligned_cache[cache_key]
+        aligned = align_price_histories(price_history_dict, list(coins), step=step)
+        if cacheable:
+            self._aligned_cache[cache_key] = aligned
+        return aligned
+
     def _update_price_history(self, coin, current_price):
         """Aktualisiert Preis-Historie für einen Coin mit Memory Management"""
-        history = self._load_history()
-        
-        if 'price_history' not in history:
-            history['price_history'] = {}
+        # Kopie statt der gemeinsamen In-Memory-Historie verändern; erst
+        # _save_history übernimmt sie (neue history_version, Caches geleert)
+        history = dict(self._load_history())
+        history['price_history'] = {
+            c: list(entries) for c, entries in history.get('price_history', {}).items()
+        }
         
         if coin not in history['price_history']:
             history['price_history'][coin] = []
@@ -158,44 +349,50 @@ class RiskAnalyzer:
         drawdown = ((peak_price - current_price) / peak_price) * 100
         return max(0.0, drawdown)
 
-    def calculate_correlation_matrix(self, portfolio_coins, price_history_dict):
-        """Berechnet Korrelationsmatrix zwischen Coins"""
-        if len(portfolio_coins) < 2:
-            return {}
-        
-        # Preis-Serien für alle Coins erstellen
-        price_series = {}
-        min_length = float('inf')
-        
-        for coin in portfolio_coins.keys():
-            if coin in price_history_dict and len(price_history_dict[coin]) > 1:
-                prices = [entry['price'] for entry in price_history_dict[coin]]
-                price_series[coin] = prices
-                min_length = min(min_length, len(prices))
-        
-        if min_length == float('inf') or min_length < 2:
-            logger.warning("Nicht genug Preis-Historie für Korrelationsberechnung")
+    def calculate_correlation_matrix(self, portfolio_coins, price_history_dict, history_version=None):
+        """Berechnet Korrelationsmatrix der Returns zwischen Coins.
+
+        Die Preis-Historien werden zuerst per As-of-Join auf ein gemeinsames
+        Zeitraster gelegt; korreliert werden die Log-Returns, nicht die Preise.
+
+        Args:
+            portfolio_coins: Coins (Liste oder Dict Coin → Menge)
+            price_history_dict: Dict Coin → Liste von {'price', 'timestamp'}
+            history_version: Version der Historie (siehe history_version). Wenn
+                gesetzt und price_history_dict die aktuelle In-Memory-Historie
+                ist, wird das Ergebnis pro Version gecacht.
+        """
+        coins = list(portfolio_coins)
+        if len(coins) < 2:
             return {}
-        
-        # Auf gleiche Länge kürzen
-        for coin in price_series.keys():
-            price_series[coin] = price_series[coin][-int(min_length):]
-        
-        # DataFrame erstellen
+
+        cache_key = None
+        if self._is_current_history(price_history_dict, history_version):
+            cache_key = (history_version, tuple(coins))
+            cached = self._correlation_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            df = pd.DataFrame(price_series)
-            correlation_matrix = df.corr().to_dict()
-            
-            # Runden für bessere Lesbarkeit
-            for coin1 in correlation_matrix:
-                for coin2 in correlation_matrix[coin1]:
-                    correlation_matrix[coin1][coin2] = round(correlation_matrix[coin1][coin2], 3)
-            
-            return correlation_matrix
+            aligned = self.get_aligned_returns(coins, price_history_dict, history_version)
+            if aligned is None:
+                logger.warning("Nicht genug Preis-Historie für Korrelationsberechnung")
+                return {}
+
+            usable, _, log_returns = aligned
+            corr = np.round(correlation_from_returns(log_returns), 3)
+            correlation_matrix = {
+                coin1: {coin2: float(corr[i, j]) for j, coin2 in enumerate(usable)}
+                for i, coin1 in enumerate(usable)
+            }
         except Exception as e:
             logger.error(f"Fehler bei Korrelationsberechnung: {e}")
             return {}
 
+        if cache_key is not None:
+            self._correlation_cache[cache_key] = correlation_matrix
+        return correlation_matrix
+
     def calculate_diversification_score(self, correlations, portfolio_weights):
         """Berechnet Diversification Score 0-100%"""
         if not correlations or len(portfolio_weights) < 2:
@@ -296,6 +493,71 @@ class RiskAnalyzer:
             logger.warning(f"VaR Berechnung fehlgeschlagen: {e}")
             return None
 
+    def calculate_portfolio_var_simulation(self, portfolio, prices, price_history_dict=None):
+        """Portfolio-VaR/CVaR per Monte Carlo (EWMA-Kovarianz) und gefilterter historischer Simulation.
+
+        Teuer (2 × PORTFOLIO_VAR_PATHS Pfade) und daher nicht Teil von
+        analyze_risks: läuft im eigenen Job bzw. per asyncio.to_thread. Das
+        Ergebnis ist geseedet und wird pro history_version und Bestand gecacht.
+
+        Returns:
+            Dict mit 'monte_carlo' und 'filtered_historical' (jeweils None wenn
+            nicht genug Daten vorliegen)
+        """
+        with self._var_lock:
+            values = {
+                coin: portfolio[coin] * prices[coin]
+                for coin in portfolio.keys() if prices.get(coin)
+            }
+            # Zustand nur unter dem State-Lock lesen (Kopien), simuliert wird danach ohne Lock
+            with self._state_lock:
+                if price_history_dict is None:
+                    price_history_dict = self._load_history().get('price_history', {})
+                history_version = self.history_version
+                cache_key = (history_version, tuple(sorted((c, round(v, 2)) for c, v in values.items())))
+                if self._var_simulation is not None and self._var_simulation[0] == cache_key:
+                    return self._var_simulation[1]
+                coins, mean, cov = self.risk_state.moments(values.keys())
+                aligned = self.get_aligned_returns(list(values.keys()), price_history_dict, history_version)
+
+            result = {'monte_carlo': None, 'filtered_historical': None}
+            try:
+                if coins:
+                    result['monte_carlo'] = self.portfolio_risk_engine.monte_carlo(
+                        coins, values, mean, cov, seed=PORTFOLIO_VAR_SEED
+                    )
+
+                if aligned is not None:
+                    hist_coins, _, log_returns = aligned
+                    result['filtered_historical'] = self.portfolio_risk_engine.filtered_historical(
+                        hist_coins, values, log_returns, seed=PORTFOLIO_VAR_SEED
+                    )
+            except Exception as e:
+                logger.warning(f"Portfolio-VaR-Simulation fehlgeschlagen: {e}")
+                return result
+            self._var_simulation = (cache_key, result)
+            return result
+
+    def var_simulation_summary(self):
+        """Gerundete Kurzfassung der letzten Simulation (VaR/CVaR in % je Methode und Konfidenz).
+
+        Rechnet nicht neu; None solange noch keine Simulation gelaufen ist.
+        """
+        if self._var_simulation is None:
+            return None
+        summary = {}
+        for method, data in self._var_simulation[1].items():
+            if not data:
+                continue
+            summary[method] = {
+                confidence: {
+                    'var_percent': round(level['var_percent'], 1) if level['var_percent'] is not None else None,
+                    'cvar_percent': round(level['cvar_percent'], 1) if level['cvar_percent'] is not None else None,
+                }
+                for confidence, level in data['levels'].items()
+            }
+        return summary or None
+
     def calculate_fibonacci_levels(self, high, low, current_price):
         """Berechnet Fibonacci Retracement Levels und identifiziert nächstes Support/Resistance"""
         levels = {
@@ -331,8 +593,29 @@ class RiskAnalyzer:
             'nearest_resistance': nearest_resistance
         }
 
+    def moments(self, coins):
+        """EWMA-Mittelwerte und -Kovarianz (Kopien) der warmen Coins, threadsicher gelesen"""
+        with self._state_lock:
+            return self.risk_state.moments(coins)
+
+    def current_correlation_matrix(self, coins):
+        """Korrelationsmatrix der Coins: EWMA sobald warm, sonst aus der Historie (threadsicher)"""
+        coins = list(coins)
+        with self._state_lock:
+            matrix = self.risk_state.correlation_matrix(coins)
+            if len(matrix) < 2:
+                matrix = self.calculate_correlation_matrix(
+                    coins, self._load_history().get('price_history', {}), history_version=self.history_version
+                )
+            return matrix
+
     def analyze_risks(self, portfolio, prices, indicators, performance_data=None):
-        """Komplette Risiko-Analyse durchführen"""
+        """Komplette Risiko-Analyse durchführen (exklusiv, siehe _state_lock)"""
+        with self._state_lock:
+            return self._analyze_risks(portfolio, prices, indicators, performance_data)
+
+    def _analyze_risks(self, portfolio, prices, indicators, performance_data=None):
+        """Risiko-Analyse; der Aufrufer hält _state_lock"""
         try:
             # Preis-Historie aktualisieren
             history = self._load_history()
@@ -382,8 +665,15 @@ class RiskAnalyzer:
                     peak_prices[coin] = prices.get(coin)
                     recovery_days[coin] = None
             
-            # Korrelationsmatrix
-            correlation_matrix = self.calculate_correlation_matrix(portfolio, price_history_dict)
+            # EWMA-Zustand fortschreiben (O(k²) statt Neuberechnung aus der Historie)
+            self._update_risk_state(portfolio, prices, price_history_dict)
+
+            # Korrelationsmatrix: EWMA sobald warm, sonst aus der ausgerichteten Historie
+            correlation_matrix = self.risk_state.correlation_matrix(portfolio.keys())
+            if not correlation_matrix:
+                correlation_matrix = self.calculate_correlation_matrix(
+                    portfolio, price_history_dict, history_version=self.history_version
+                )
             
             # Diversification Score
             diversification_score = self.calculate_diversification_score(correlation_matrix, portfolio_weights)
@@ -404,9 +694,18 @@ class RiskAnalyzer:
             # Volatilitäts-Ranking
             volatility_ranking = self.get_volatility_ranking(coin_volatilities)
 
-            # VaR berechnen (tägliche Returns aus Preis-Historie)
+            # VaR: parametrisch aus dem EWMA-Zustand, sonst historisch aus der Preis-Historie
             var_metrics = {}
+            for coin in self.risk_state.warm_coins(portfolio.keys()):
+                var_95 = self.risk_state.coin_var(coin, confidence=0.95)
+                var_99 = self.risk_state.coin_var(coin, confidence=0.99)
+                var_metrics[coin] = {
+                    'var_95': round(var_95 * 100, 2) if var_95 is not None else None,
+                    'var_99': round(var_99 * 100, 2) if var_99 is not None else None
+                }
             for coin in portfolio.keys():
+                if coin in var_metrics:
+                    continue
                 if coin in price_history_dict and len(price_history_dict[coin]) > 10:
                     prices_list = [entry['price'] for entry in price_history_dict[coin]]
                     returns = pd.Series(prices_list).pct_change().dropna().tolist()
@@ -418,6 +717,9 @@ class RiskAnalyzer:
                             'var_99': round(var_99 * 100, 2) if var_99 else None
                         }
 
+            portfolio_var = self.risk_state.portfolio_var(portfolio_weights, confidence=0.95)
+            portfolio_var_99 = self.risk_state.portfolio_var(portfolio_weights, confidence=0.99)
+
             # Fibonacci Levels für jeden Coin berechnen
             fibonacci_levels = {}
             for coin in portfolio.keys():
@@ -441,6 +743,13 @@ class RiskAnalyzer:
                 'portfolio_weights': {coin: round(w * 100, 2) for coin, w in portfolio_weights.items()},
                 'recovery_days': recovery_days,
                 'var_metrics': var_metrics,
+                'portfolio_var_parametric': {
+                    'var_95': round(portfolio_var * 100, 2) if portfolio_var is not None else None,
+                    'var_99': round(portfolio_var_99 * 100, 2) if portfolio_var_99 is not None else None,
+                },
+                'ewma_volatility': self.risk_state.volatilities(portfolio.keys()),
+                # Nur die gerundete Kurzfassung des letzten Simulations-Jobs, keine neue Simulation
+                'portfolio_var_simulation': self.var_simulation_summary(),
                 'fibonacci_levels': fibonacci_levels,
             }
             
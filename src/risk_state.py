@@ -0,0 +1,281 @@
+"""
+Online-Risiko-Zustand mit EWMA-Schätzern (RiskMetrics-Stil).
+
+Hält pro Coin den EWMA-Mittelwert der Log-Returns sowie die vollständige
+EWMA-Kovarianzmatrix und aktualisiert beides in O(k²) pro neuem Preisvektor.
+Korrelation, Volatilität und parametrischer VaR sind damit ohne Zugriff auf
+die Preis-Historie sofort verfügbar.
+
+Alle Returns beziehen sich auf einen festen Schritt (RISK_EWMA_STEP_SECONDS):
+Preisvektoren innerhalb eines Schritts nach dem letzten Update werden
+ignoriert, längere Lücken auf einen Schritt skaliert. λ, Volatilitäten und
+VaR haben damit eine definierte Halteperiode.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import RISK_EWMA_DECAY, RISK_STATE_MIN_OBSERVATIONS, RISK_EWMA_STEP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class EwmaRiskState:
+    """EWMA-Mittelwerte, Varianzen und paarweise Kovarianzen pro Coin."""
+
+    def __init__(self, state_path: Optional[str] = None, decay: float = RISK_EWMA_DECAY,
+                 min_observations: int = RISK_STATE_MIN_OBSERVATIONS,
+                 step_seconds: float = RISK_EWMA_STEP_SECONDS):
+        """Initialisiert den Zustand und lädt ggf. einen gespeicherten Snapshot.
+
+        Args:
+            state_path: Pfad der Snapshot-Datei (None = keine Persistenz)
+            decay: EWMA-Zerfallsfaktor λ (0.94 = RiskMetrics)
+            min_observations: Returns pro Coin, ab denen Schätzer als belastbar gelten
+            step_seconds: Return-Horizont eines Updates in Sekunden
+        """
+        self.state_path = state_path
+        self.decay = decay
+        self.min_observations = min_observations
+        self.step_seconds = step_seconds
+
+        self.coins: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.mean = np.zeros(0)
+        self.cov = np.zeros((0, 0))
+        self.last_prices = np.zeros(0)
+        self.observations = np.zeros(0, dtype=np.int64)
+        self.last_update: Optional[float] = None
+        self.version = 0
+
+        if state_path:
+            self.load()
+
+    # ── Zustandsverwaltung ───────────────────────────────────────────────────
+
+    def _ensure_coins(self, coins: Iterable[str]) -> None:
+        """Erweitert die Arrays um noch unbekannte Coins."""
+        new_coins = [c for c in coins if c not in self._index]
+        if not new_coins:
+            return
+        old_k = len(self.coins)
+        k = old_k + len(new_coins)
+        for offset, coin in enumerate(new_coins):
+            self._index[coin] = old_k + offset
+        self.coins.extend(new_coins)
+
+        cov = np.zeros((k, k))
+        cov[:old_k, :old_k] = self.cov
+        self.cov = cov
+        self.mean = np.concatenate([self.mean, np.zeros(len(new_coins))])
+        self.last_prices = np.concatenate([self.last_prices, np.full(len(new_coins), np.nan)])
+        self.observations = np.concatenate([self.observations, np.zeros(len(new_coins), dtype=np.int64)])
+
+    def _apply_returns(self, idx: np.ndarray, returns: np.ndarray) -> None:
+        """Aktualisiert Mittelwert und Kovarianz für die beobachteten Coins.
+
+        S ← λ · (S + (1 − λ) · δδᵀ) mit δ = r − μ, μ ← μ + (1 − λ) · δ
+        """
+        lam = self.decay
+        delta = returns - self.mean[idx]
+        self.mean[idx] += (1.0 - lam) * delta
+        block = np.ix_(idx, idx)
+        self.cov[block] = lam * (self.cov[block] + (1.0 - lam) * np.outer(delta, delta))
+        self.observations[idx] += 1
+
+    def update(self, prices: Dict[str, Optional[float]], timestamp: Optional[float] = None) -> bool:
+        """Verarbeitet einen neuen Preisvektor.
+
+        Coins ohne gültigen Preis werden übersprungen; ihre Kovarianzen bleiben
+        unverändert, bis wieder ein Preis vorliegt. Liegt das letzte Update
+        weniger als einen Schritt zurück, passiert nichts; nach n Schritten
+        werden die Returns mit 1/√n auf einen Schritt skaliert.
+
+        Args:
+            prices: Dict Coin → aktueller Preis
+            timestamp: Zeitpunkt der Preise (Default: jetzt)
+
+        Returns:
+            True wenn der Zustand fortgeschrieben wurde
+        """
+        now = time.time() if timestamp is None else timestamp
+        elapsed = None if self.last_update is None else now - self.last_update
+        if elapsed is not None and elapsed < self.step_seconds:
+            return False
+        valid = {c: float(p) for c, p in prices.items() if p}
+        if not valid:
+            return False
+        self._ensure_coins(valid.keys())
+
+        idx = np.fromiter((self._index[c] for c in valid), dtype=np.int64, count=len(valid))
+        current = np.fromiter(valid.values(), dtype=np.float64, count=len(valid))
+        previous = self.last_prices[idx]
+
+        has_previous = np.isfinite(previous) & (previous > 0)
+        if has_previous.any():
+            returns = np.log(current[has_previous] / previous[has_previous])
+            if elapsed is not None:
+                returns /= np.sqrt(elapsed / self.step_seconds)
+            self._apply_returns(idx[has_previous], returns)
+
+        self.last_prices[idx] = current
+        self.last_update = now
+        self.version += 1
+        return True
+
+    def bootstrap(self, coins: List[str], log_returns: np.ndarray, last_prices: Dict[str, float],
+                  timestamp: Optional[float] = None) -> None:
+        """Initialisiert einen leeren Zustand aus einer ausgerichteten Return-Matrix.
+
+        Args:
+            coins: Spalten-Reihenfolge von log_returns
+            log_returns: Matrix der Form (n_returns, len(coins)), Raster = step_seconds
+            last_prices: Letzte bekannte Preise der Coins
+            timestamp: Zeitpunkt von last_prices (Default: jetzt)
+        """
+        self._ensure_coins(coins)
+        idx = np.fromiter((self._index[c] for c in coins), dtype=np.int64, count=len(coins))
+        for row in log_returns:
+            self._apply_returns(idx, row)
+        for coin in coins:
+            if last_prices.get(coin):
+                self.last_prices[self._index[coin]] = float(last_prices[coin])
+        self.last_update = time.time() if timestamp is None else timestamp
+        self.version += 1
+        logger.info(f"EWMA-Risiko-Zustand aus Historie initialisiert: {len(coins)} Coins, {len(log_returns)} Returns")
+
+    def is_empty(self) -> bool:
+        """True wenn noch keine Returns verarbeitet wurden."""
+        return not self.observations.any()
+
+    def warm_coins(self, coins: Optional[Iterable[str]] = None) -> List[str]:
+        """Gibt die Coins mit ausreichend vielen Beobachtungen zurück."""
+        candidates = self.coins if coins is None else [c for c in coins if c in self._index]
+        return [c for c in candidates if self.observations[self._index[c]] >= self.min_observations]
+
+    # ── Abfragen ─────────────────────────────────────────────────────────────
+
+    def correlation_matrix(self, coins: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Korrelationsmatrix der warmen Coins (gerundet auf 3 Stellen).
+
+        Returns:
+            Dict-of-Dicts wie RiskAnalyzer.calculate_correlation_matrix,
+            leer wenn weniger als 2 Coins warm sind
+        """
+        warm = self.warm_coins(coins)
+        if len(warm) < 2:
+            return {}
+        idx = np.array([self._index[c] for c in warm])
+        sub = self.cov[np.ix_(idx, idx)]
+        std = np.sqrt(np.diag(sub))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = sub / np.outer(std, std)
+        corr = np.nan_to_num(corr, nan=0.0)
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        corr = np.round(corr, 3)
+        return {c1: {c2: float(corr[i, j]) for j, c2 in enumerate(warm)} for i, c1 in enumerate(warm)}
+
+    def moments(self, coins: Optional[Iterable[str]] = None):
+        """Mittelwert-Vektor und Kovarianzmatrix der warmen Coins.
+
+        Returns:
+            Tuple aus (coins, mean, cov)
+        """
+        warm = self.warm_coins(coins)
+        idx = np.array([self._index[c] for c in warm], dtype=np.int64)
+        return warm, self.mean[idx].copy(), self.cov[np.ix_(idx, idx)].copy()
+
+    def volatilities(self, coins: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """EWMA-Volatilität pro Schritt (step_seconds) in Prozent."""
+        return {
+            c: round(float(np.sqrt(self.cov[self._index[c], self._index[c]])) * 100, 4)
+            for c in self.warm_coins(coins)
+        }
+
+    def coin_var(self, coin: str, confidence: float = 0.95) -> Optional[float]:
+        """Parametrischer VaR über einen Schritt als positiver Anteil (0.05 = 5%)."""
+        if coin not in self.warm_coins([coin]):
+            return None
+        i = self._index[coin]
+        z = NormalDist().inv_cdf(confidence)
+        return float(z * np.sqrt(self.cov[i, i]) - self.mean[i])
+
+    def portfolio_var(self, weights: Dict[str, float], confidence: float = 0.95) -> Optional[float]:
+        """Parametrischer Portfolio-VaR über einen Schritt als positiver Anteil.
+
+        Args:
+            weights: Dict Coin → Gewicht (Summe ~1); nicht warme Coins werden ignoriert
+            confidence: Konfidenzniveau
+        """
+        warm = self.warm_coins(weights.keys())
+        if not warm:
+            return None
+        idx = np.array([self._index[c] for c in warm])
+        w = np.array([weights[c] for c in warm], dtype=np.float64)
+        sigma = float(np.sqrt(max(w @ self.cov[np.ix_(idx, idx)] @ w, 0.0)))
+        mu = float(w @ self.mean[idx])
+        return NormalDist().inv_cdf(confidence) * sigma - mu
+
+    # ── Persistenz ───────────────────────────────────────────────────────────
+
+    def to_dict(self) -> Dict:
+        """Serialisierbarer Snapshot des Zustands."""
+        return {
+            'decay': self.decay,
+            'coins': self.coins,
+            'mean': self.mean.tolist(),
+            'cov': self.cov.tolist(),
+            'last_prices': [None if not np.isfinite(p) else float(p) for p in self.last_prices],
+            'observations': self.observations.tolist(),
+            'last_update': self.last_update,
+        }
+
+    def save(self) -> None:
+        """Schreibt den Snapshot atomar (Temp-Datei + rename) neben die Historie."""
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(self.state_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.risk_state_', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Fehler beim Speichern des Risiko-Zustands: {e}")
+
+    def load(self) -> None:
+        """Lädt einen gespeicherten Snapshot (falls vorhanden)."""
+        try:
+            if not self.state_path or not os.path.exists(self.state_path):
+                return
+            with open(self.state_path, 'r') as f:
+                data = json.load(f)
+            if abs(data.get('decay', self.decay) - self.decay) > 1e-12:
+                logger.info("Risiko-Zustand mit anderem Zerfallsfaktor gespeichert – starte neu")
+                return
+            coins = list(data['coins'])
+            k = len(coins)
+            mean = np.array(data['mean'], dtype=np.float64).reshape(k)
+            cov = np.array(data['cov'], dtype=np.float64).reshape(k, k)
+            last_prices = np.array(
+                [np.nan if p is None else p for p in data['last_prices']], dtype=np.float64
+            ).reshape(k)
+            observations = np.array(data['observations'], dtype=np.int64).reshape(k)
+
+            self.coins = coins
+            self._index = {c: i for i, c in enumerate(coins)}
+            self.mean, self.cov = mean, cov
+            self.last_prices, self.observations = last_prices, observations
+            self.last_update = data.get('last_update')
+            self.version += 1
+            logger.info(f"Risiko-Zustand geladen: {len(coins)} Coins")
+        except Exception as e:
+            logger.warning(f"Fehler beim Laden des Risiko-Zustands: {e}")
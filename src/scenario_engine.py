@@ -0,0 +1,221 @@
+"""
+Batch-Szenario-Engine für /what_if.
+
+Bewertet beliebig viele Preis- und Mengen-Schocks über alle Coins als eine
+Matrix-Operation: Jede Zeile ist ein Szenario, jede Spalte ein Coin.
+Portfolio-Wert, P&L, Konzentration und parametrischer VaR werden für alle
+Szenarien gleichzeitig berechnet. Schocks einzelner Coins werden im Raster
+direkt aus dem Basisvektor abgeleitet, der Speicher wächst nur mit k·m.
+Das Raster enthält nur Preis-Schocks: eine Mengenänderung (Kauf/Verkauf)
+tauscht Coin gegen Cash und ist kein Gewinn oder Verlust.
+"""
+
+import logging
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def shock_grid(range_percent: float = 50.0, step_percent: float = 1.0) -> np.ndarray:
+    """Erzeugt symmetrische Schocks von −range bis +range in step-Schritten.
+
+    Args:
+        range_percent: Maximaler Schock in Prozent (z.B. 50 → −50%…+50%)
+        step_percent: Schrittweite in Prozent
+
+    Returns:
+        Array der Schocks als Dezimalzahlen (−0.5 … 0.5)
+    """
+    n_steps = int(round(range_percent / step_percent))
+    return np.arange(-n_steps, n_steps + 1, dtype=np.float64) * step_percent / 100.0
+
+
+class ScenarioEngine:
+    """Bewertet Preis-/Mengen-Schocks für ein Portfolio vektorisiert."""
+
+    def __init__(self, amounts: Dict[str, float], prices: Dict[str, Optional[float]],
+                 cov_coins: Optional[List[str]] = None, cov: Optional[np.ndarray] = None):
+        """Initialisiert die Engine mit dem aktuellen Portfolio.
+
+        Coins ohne gültigen Preis werden ignoriert.
+
+        Args:
+            amounts: Dict Coin → Menge
+            prices: Dict Coin → aktueller Preis
+            cov_coins: Coin-Reihenfolge der Kovarianzmatrix (optional)
+            cov: Kovarianzmatrix der 1-Perioden-Returns (optional, für VaR)
+        """
+        self.coins = [c for c in amounts if prices.get(c)]
+        self._index = {c: i for i, c in enumerate(self.coins)}
+        self.amounts = np.array([amounts[c] for c in self.coins], dtype=np.float64)
+        self.prices = np.array([prices[c] for c in self.coins], dtype=np.float64)
+        self.base_values = self.amounts * self.prices
+        self.base_total = float(self.base_values.sum())
+
+        # Kovarianz auf die Coin-Reihenfolge der Engine abbilden (fehlende Coins → 0)
+        self.cov = None
+        if cov is not None and cov_coins:
+            k = len(self.coins)
+            full = np.zeros((k, k))
+            src = [i for i, c in enumerate(cov_coins) if c in self._index]
+            dst = [self._index[cov_coins[i]] for i in src]
+            if dst:
+                full[np.ix_(dst, dst)] = np.asarray(cov)[np.ix_(src, src)]
+                self.cov = full
+
+    def evaluate(self, price_shocks: np.ndarray, amount_shocks: Optional[np.ndarray] = None,
+                 confidence: float = 0.95) -> Dict[str, np.ndarray]:
+        """Bewertet eine Szenario-Matrix.
+
+        Args:
+            price_shocks: Relative Preisänderungen (n_scenarios, n_coins)
+            amount_shocks: Relative Mengenänderungen (n_scenarios, n_coins), optional
+            confidence: Konfidenzniveau für den parametrischen VaR
+
+        Returns:
+            Dict mit Arrays der Länge n_scenarios: 'value', 'pnl', 'pnl_percent',
+            'max_weight' und (falls Kovarianz vorhanden) 'var'
+        """
+        factors = 1.0 + np.asarray(price_shocks, dtype=np.float64)
+        if amount_shocks is not None:
+            factors = factors * (1.0 + np.asarray(amount_shocks, dtype=np.float64))
+        position_values = factors * self.base_values
+        totals = position_values.sum(axis=1)
+        pnl = totals - self.base_total
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weights = np.where(totals[:, None] > 0, position_values / totals[:, None], 0.0)
+
+        result = {
+            'value': totals,
+            'pnl': pnl,
+            'pnl_percent': pnl / self.base_total * 100 if self.base_total else np.zeros_like(pnl),
+            'max_weight': weights.max(axis=1) * 100 if len(self.coins) else np.zeros_like(pnl),
+        }
+        if self.cov is not None:
+            variance = np.einsum('ij,jk,ik->i', weights, self.cov, weights)
+            result['var'] = NormalDist().inv_cdf(confidence) * np.sqrt(np.maximum(variance, 0.0)) * totals
+        return result
+
+    def single_change(self, coin: str, amount_change: float = 0.0, price_change: float = 0.0) -> Dict[str, float]:
+        """Bewertet eine einzelne Änderung eines Coins (klassisches /what_if).
+
+        Args:
+            coin: Betroffener Coin
+            amount_change: Relative Mengenänderung (−0.2 = 20% verkaufen)
+            price_change: Relative Preisänderung
+
+        Returns:
+            Dict mit 'value', 'pnl', 'pnl_percent', 'max_weight' (und ggf. 'var')
+        """
+        price_shocks = np.zeros((1, len(self.coins)))
+        amount_shocks = np.zeros((1, len(self.coins)))
+        i = self._index[coin]
+        price_shocks[0, i] = price_change
+        amount_shocks[0, i] = amount_change
+        return {k: float(v[0]) for k, v in self.evaluate(price_shocks, amount_shocks).items()}
+
+    def grid(self, shocks: np.ndarray, confidence: float = 0.95) -> Dict[str, object]:
+        """Bewertet das komplette Schock-Raster in einem Durchlauf.
+
+        Szenario-Blöcke:
+            1. Marktweit: alle Preise gleichzeitig um s (Matrix m × k)
+            2. Einzelpreis: nur Coin j um s
+
+        Block 2 ändert nur eine Position und wird direkt aus dem Basisvektor
+        berechnet (O(k·m) statt einer dichten (k·m) × k Matrix).
+
+        Args:
+            shocks: Schock-Vektor, z.B. shock_grid(50, 1)
+            confidence: Konfidenzniveau für den parametrischen VaR
+
+        Returns:
+            Dict mit 'shocks', 'market' (Ergebnis-Arrays), 'price'
+            (Ergebnis-Arrays der Form (n_coins, n_shocks)) sowie 'n_scenarios'
+        """
+        shocks = np.asarray(shocks, dtype=np.float64)
+        k, m = len(self.coins), len(shocks)
+        market = self.evaluate(np.repeat(shocks[:, None], k, axis=1), confidence=confidence)
+        return {
+            'shocks': shocks,
+            'market': market,
+            'price': self._single_coin_block(shocks, confidence),
+            'n_scenarios': m + k * m,
+        }
+
+    def _single_coin_block(self, shocks: np.ndarray, confidence: float) -> Dict[str, np.ndarray]:
+        """Ergebnisse für "nur Coin j um s" als (k, m)-Arrays ohne Szenario-Matrix."""
+        values = self.base_values
+        k = len(self.coins)
+        delta = np.outer(values, shocks)              # Wertänderung der geschockten Position
+        totals = self.base_total + delta
+        pnl = delta
+
+        # Größte Position: geschockter Coin oder der größte der übrigen
+        if k:
+            order = np.argsort(-values)
+            other_max = np.full(k, values[order[0]])
+            if k > 1:
+                other_max[order[0]] = values[order[1]]
+            else:
+                other_max[order[0]] = 0.0
+            largest = np.maximum(values[:, None] + delta, other_max[:, None])
+        else:
+            largest = np.zeros_like(totals)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            max_weight = np.where(totals > 0, largest / totals, 0.0) * 100
+
+        result = {
+            'value': totals,
+            'pnl': pnl,
+            'pnl_percent': pnl / self.base_total * 100 if self.base_total else np.zeros_like(pnl),
+            'max_weight': max_weight,
+        }
+        if self.cov is not None:
+            # (v + δ·e_j)ᵀ C (v + δ·e_j) = vᵀCv + 2δ(Cv)_j + δ²C_jj
+            cv = self.cov @ values
+            variance = float(values @ cv) + 2 * delta * cv[:, None] + delta ** 2 * np.diag(self.cov)[:, None]
+            var = NormalDist().inv_cdf(confidence) * np.sqrt(np.maximum(variance, 0.0))
+            result['var'] = np.where(totals > 0, var, 0.0)
+        return result
+
+    def summary_table(self, grid_result: Dict[str, object],
+                      highlight: Sequence[float] = (-0.5, -0.25, -0.1, 0.1, 0.25, 0.5)) -> str:
+        """Kompakte Text-Tabelle für Telegram aus einem grid()-Ergebnis.
+
+        Args:
+            grid_result: Ergebnis von grid()
+            highlight: Schocks, die in der Markt-Tabelle gezeigt werden
+
+        Returns:
+            Mehrzeiliger String (für einen Markdown-Codeblock gedacht)
+        """
+        shocks = grid_result['shocks']
+        market = grid_result['market']
+        price = grid_result['price']
+        has_var = 'var' in market
+
+        shown = [s for s in highlight if np.any(np.isclose(shocks, s))]
+        if not shown:
+            shown = [float(shocks[0]), float(shocks[-1])]
+        lines = ["Markt   Wert EUR      P&L EUR  MaxGew" + ("   VaR95" if has_var else "")]
+        for s in shown:
+            i = int(np.argmin(np.abs(shocks - s)))
+            row = (f"{shocks[i] * 100:+4.0f}% {market['value'][i]:10.2f} {market['pnl'][i]:+12.2f}"
+                   f" {market['max_weight'][i]:6.1f}%")
+            if has_var:
+                row += f" {market['var'][i]:7.2f}"
+            lines.append(row)
+
+        # Sensitivität je Coin: P&L bei größtem negativen/positiven Preisschock
+        lo, hi = 0, len(shocks) - 1
+        lines.append("")
+        lines.append(f"Coin   P&L {shocks[lo] * 100:+.0f}%   P&L {shocks[hi] * 100:+.0f}%   EUR/1%")
+        order = np.argsort(-self.base_values)
+        for j in order:
+            per_percent = self.base_values[j] / 100
+            lines.append(f"{self.coins[j]:<6} {price['pnl'][j, lo]:+10.2f} {price['pnl'][j, hi]:+10.2f} {per_percent:8.2f}")
+        return "\n".join(lines)
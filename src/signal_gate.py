@@ -0,0 +1,253 @@
+"""
+Regelbasierter Vorfilter für den täglichen Analyse-Zyklus.
+
+Bevor Analyst (mit Thinking-Budget) und Guardian aufgerufen werden, prüft
+das SignalGate die bereits berechneten Indikatoren und Risiko-Metriken des
+Portfolios auf handlungsrelevante Signale:
+
+    - RSI-Extreme (überverkauft / überkauft)
+    - MACD-Crossover in den letzten Kerzen
+    - Bollinger-Ausbruch (Preis auf/außerhalb eines Bands)
+    - RSI-Divergenz
+    - Drawdown eines Coins über dem Schwellenwert
+    - Konzentration eines Coins über dem Schwellenwert
+
+Ausgelöst wird nur durch neue Bedingungen: was bei der letzten Analyse
+schon bestand (z.B. ein dauerhaft konzentriertes Portfolio), löst erst
+wieder aus, wenn es zwischendurch verschwunden war. Ohne neues Signal wird
+die LLM-Analyse übersprungen – spätestens nach SIGNAL_GATE_MAX_SKIP_DAYS
+Tagen wird trotzdem analysiert. Als Analyse zählt erst ein erfolgreicher
+LLM-Lauf (mark_analyzed); Zeitpunkt und bekannte Bedingungen liegen in
+einer kleinen State-Datei neben dem Log. Jede Entscheidung wird mit den
+Merkmalen als JSON-Zeile protokolliert, damit sich das Gate offline gegen
+die LLM-Empfehlungen auswerten lässt; ab SIGNAL_GATE_LOG_MAX_BYTES wird das
+Log nach ``<log>.1`` rotiert.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import (
+    SIGNAL_GATE_ENABLED, SIGNAL_GATE_LOG_PATH, SIGNAL_GATE_RSI_LOW, SIGNAL_GATE_RSI_HIGH,
+    SIGNAL_GATE_DRAWDOWN_PCT, SIGNAL_GATE_CONCENTRATION_PCT, SIGNAL_GATE_MAX_SKIP_DAYS,
+    SIGNAL_GATE_LOG_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GateDecision(NamedTuple):
+    """Ergebnis einer Gate-Prüfung."""
+    analyze: bool
+    triggers: List[str]
+    elapsed_us: float
+
+
+def coin_triggers(coin: str, ind: Optional[Dict[str, Any]],
+                  rsi_low: float = SIGNAL_GATE_RSI_LOW,
+                  rsi_high: float = SIGNAL_GATE_RSI_HIGH) -> List[str]:
+    """Indikator-Signale eines Coins als lesbare Trigger."""
+    if not ind:
+        return []
+    triggers = []
+    rsi = ind.get('rsi_14')
+    if rsi is not None:
+        if rsi < rsi_low:
+            triggers.append(f"{coin}: RSI {rsi:g} < {rsi_low:g}")
+        elif rsi > rsi_high:
+            triggers.append(f"{coin}: RSI {rsi:g} > {rsi_high:g}")
+    if ind.get('macd_crossover'):
+        triggers.append(f"{coin}: MACD-Crossover {ind['macd_crossover']}")
+    if ind.get('bb_position') in ('overbought', 'oversold'):
+        triggers.append(f"{coin}: Bollinger-Ausbruch {ind['bb_position']}")
+    divergence = ind.get('rsi_divergence') or {}
+    for side in ('bullish', 'bearish'):
+        if divergence.get(side):
+            triggers.append(f"{coin}: RSI-Divergenz {side}")
+    return triggers
+
+
+def risk_triggers(risk_metrics: Optional[Dict[str, Any]],
+                  drawdown_pct: float = SIGNAL_GATE_DRAWDOWN_PCT,
+                  concentration_pct: float = SIGNAL_GATE_CONCENTRATION_PCT) -> List[str]:
+    """Drawdown- und Konzentrations-Signale aus den Risiko-Metriken."""
+    if not risk_metrics:
+        return []
+    triggers = []
+    for coin, drawdown in sorted((risk_metrics.get('current_drawdown_percent') or {}).items()):
+        if drawdown is not None and drawdown > drawdown_pct:
+            triggers.append(f"{coin}: Drawdown {drawdown:.1f}% > {drawdown_pct:g}%")
+    for coin, weight in sorted((risk_metrics.get('portfolio_weights') or {}).items()):
+        if weight is not None and weight > concentration_pct:
+            triggers.append(f"{coin}: Gewicht {weight:.1f}% > {concentration_pct:g}%")
+    return triggers
+
+
+def condition_key(trigger: str) -> str:
+    """Bedingung hinter einem Trigger, ohne die Messwerte ('BTC: Gewicht #% > #%')."""
+    coin, _, rule = trigger.partition(': ')
+    return f"{coin}: {re.sub(r'-?[0-9]+(?:[.][0-9]+)?', '#', rule)}"
+
+
+def _features(portfolio_indicators: Dict[str, Any], risk_metrics: Optional[Dict[str, Any]]) -> Dict[str, Dict]:
+    """Kompakter Merkmals-Snapshot pro Coin für das Entscheidungs-Log."""
+    risk_metrics = risk_metrics or {}
+    drawdowns = risk_metrics.get('current_drawdown_percent') or {}
+    weights = risk_metrics.get('portfolio_weights') or {}
+    features = {}
+    for coin, ind in (portfolio_indicators or {}).items():
+        ind = ind or {}
+        features[coin] = {
+            'rsi_14': ind.get('rsi_14'),
+            'macd_histogram': ind.get('macd_histogram'),
+            'macd_crossover': ind.get('macd_crossover'),
+            'bb_position': ind.get('bb_position'),
+            'rsi_divergence': ind.get('rsi_divergence'),
+            'drawdown_pct': drawdowns.get(coin),
+            'weight_pct': weights.get(coin),
+        }
+    return features
+
+
+class SignalGate:
+    """Entscheidet ohne LLM, ob eine Markt-Analyse nötig ist."""
+
+    def __init__(self, log_path: Optional[str] = SIGNAL_GATE_LOG_PATH, enabled: bool = SIGNAL_GATE_ENABLED,
+                 max_skip_days: float = SIGNAL_GATE_MAX_SKIP_DAYS,
+                 log_max_bytes: int = SIGNAL_GATE_LOG_MAX_BYTES):
+        """Initialisiert das Gate.
+
+        Args:
+            log_path: JSONL-Datei für Entscheidungen (None = kein Log, kein State)
+            enabled: False = immer analysieren (Entscheidungen werden trotzdem protokolliert)
+            max_skip_days: Spätestens nach so vielen Tagen ohne Analyse analysieren
+            log_max_bytes: Ab dieser Größe wird das Log nach ``<log>.1`` rotiert
+        """
+        self.log_path = log_path
+        self.enabled = enabled
+        self.max_skip_days = max_skip_days
+        self.log_max_bytes = log_max_bytes
+        state = self._load_state()
+        self.last_analysis: Optional[float] = state.get('last_analysis')
+        # Bedingungen, die der Analyst schon kennt (lösen erst nach Verschwinden wieder aus)
+        self.known_conditions = set(state.get('known_conditions') or [])
+        # Bedingungen der letzten Prüfung, bekannt ab mark_analyzed
+        self._active_conditions = set()
+
+    def _state_path(self) -> Optional[str]:
+        """Pfad der State-Datei (letzte Analyse, bekannte Bedingungen) neben dem Log."""
+        if not self.log_path:
+            return None
+        root, _ = os.path.splitext(self.log_path)
+        return f"{root}_state.json"
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Inhalt der State-Datei (leer, wenn keine vorhanden)."""
+        path = self._state_path()
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Fehler beim Lesen des Signal-Gate-States: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        """Schreibt die State-Datei atomar (Temp-Datei + rename)."""
+        path = self._state_path()
+        if not path:
+            return
+        try:
+            directory = os.path.dirname(path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.signal_gate_', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'last_analysis': self.last_analysis,
+                    'known_conditions': sorted(self.known_conditions),
+                }, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Fehler beim Speichern des Signal-Gate-States: {e}")
+
+    def mark_analyzed(self, now: Optional[float] = None) -> None:
+        """Hält eine erfolgreiche LLM-Analyse fest (setzt den Max-Skip-Zähler zurück).
+
+        Alle Bedingungen der letzten Prüfung gelten danach als bekannt.
+
+        Args:
+            now: Zeitpunkt der Analyse (Default: jetzt)
+        """
+        self.last_analysis = time.time() if now is None else now
+        self.known_conditions = set(self._active_conditions)
+        self._save_state()
+
+    def evaluate(self, portfolio_indicators: Dict[str, Any], risk_metrics: Optional[Dict[str, Any]],
+                 now: Optional[float] = None) -> GateDecision:
+        """Prüft die Signale und protokolliert die Entscheidung.
+
+        Args:
+            portfolio_indicators: Indikatoren pro Portfolio-Coin
+            risk_metrics: Ergebnis von RiskAnalyzer.analyze_risks
+            now: Zeitpunkt der Prüfung (Default: jetzt)
+
+        Returns:
+            GateDecision (analyze, triggers, elapsed_us) – triggers enthält nur neue Bedingungen
+        """
+        now = time.time() if now is None else now
+        start = time.perf_counter()
+        signals = []
+        for coin, ind in sorted((portfolio_indicators or {}).items()):
+            signals.extend(coin_triggers(coin, ind))
+        signals.extend(risk_triggers(risk_metrics))
+        active = {condition_key(signal): signal for signal in signals}
+        triggers = [signal for key, signal in active.items() if key not in self.known_conditions]
+        persisting = [signal for key, signal in active.items() if key in self.known_conditions]
+        self._active_conditions = set(active)
+        if not self.known_conditions <= self._active_conditions:
+            # Verschwundene Bedingungen vergessen: kehren sie zurück, lösen sie wieder aus
+            self.known_conditions &= self._active_conditions
+            self._save_state()
+
+        if not self.enabled:
+            triggers.append('Gate deaktiviert')
+        elif self.last_analysis is None:
+            triggers.append('Keine frühere Analyse')
+        elif now - self.last_analysis >= self.max_skip_days * 86400:
+            triggers.append(f"Letzte Analyse vor ≥ {self.max_skip_days:g} Tagen")
+        elapsed_us = (time.perf_counter() - start) * 1e6
+
+        # last_analysis setzt erst mark_analyzed nach erfolgreicher Analyse
+        decision = GateDecision(bool(triggers), triggers, round(elapsed_us, 1))
+        self._log(now, decision, persisting, _features(portfolio_indicators, risk_metrics))
+        logger.info(
+            f"Signal-Gate: {'Analyse' if decision.analyze else 'keine Analyse'} "
+            f"({len(triggers)} neue, {len(persisting)} bekannte Signale, {decision.elapsed_us:.0f} µs)"
+        )
+        return decision
+
+    def _log(self, now: float, decision: GateDecision, persisting: List[str],
+             features: Dict[str, Dict]) -> None:
+        """Hängt die Entscheidung als JSON-Zeile an das Log an (mit Rotation)."""
+        if not self.log_path:
+            return
+        try:
+            if self.log_max_bytes and os.path.exists(self.log_path) \
+                    and os.path.getsize(self.log_path) >= self.log_max_bytes:
+                os.replace(self.log_path, f"{self.log_path}.1")
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps({
+                    'timestamp': now,
+                    'analyze': decision.analyze,
+                    'triggers': decision.triggers,
+                    'persisting': persisting,
+                    'elapsed_us': decision.elapsed_us,
+                    'features': features,
+                }, default=str) + '\n')
+        except Exception as e:
+            logger.warning(f"Fehler beim Schreiben des Signal-Gate-Logs: {e}")
@@ -0,0 +1,176 @@
+"""
+Kompakter Zeitreihen-Speicher für Portfolio-Snapshots mit Downsampling-Stufen.
+
+Stufen (Default):
+    raw     – jeder Snapshot, 24 Stunden
+    hourly  – letzter Wert pro Stunde, 30 Tage
+    daily   – letzter Wert pro Tag, unbegrenzt
+
+Ältere Einträge wandern beim Anhängen automatisch in die gröbere Stufe.
+Alle Stufen liegen als numpy-Arrays vor und werden als .npz persistiert;
+Bereichsabfragen liefern direkt Arrays. Anhängen verändert nur den
+Speicher, geschrieben wird gebündelt über flush() (Timer, Shutdown).
+"""
+
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import TIMESERIES_RAW_RETENTION_HOURS, TIMESERIES_HOURLY_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+
+
+class TimeSeriesStore:
+    """Mehrstufiger Zeitreihen-Speicher für feste Felder (z.B. Wert und P&L)."""
+
+    def __init__(self, fields: Sequence[str], path: Optional[str] = None,
+                 raw_retention: float = TIMESERIES_RAW_RETENTION_HOURS * HOUR,
+                 hourly_retention: float = TIMESERIES_HOURLY_RETENTION_DAYS * DAY):
+        """Initialisiert den Speicher und lädt ggf. einen gespeicherten Stand.
+
+        Args:
+            fields: Namen der Felder pro Snapshot
+            path: .npz-Datei für die Persistenz (None = nur im Speicher)
+            raw_retention: Aufbewahrung der Rohdaten in Sekunden
+            hourly_retention: Aufbewahrung der Stundenwerte in Sekunden
+        """
+        self.fields = tuple(fields)
+        self._field_index = {f: i for i, f in enumerate(self.fields)}
+        self.path = path
+        # (Stufe, Bucket-Breite in s, Aufbewahrung in s) – von fein nach grob
+        self.tiers = (('raw', 0, raw_retention), ('hourly', HOUR, hourly_retention), ('daily', DAY, None))
+        self._ts = {name: np.zeros(0) for name, _, _ in self.tiers}
+        self._values = {name: np.zeros((0, len(self.fields))) for name, _, _ in self.tiers}
+        # Ungespeicherte Änderungen seit dem letzten save()
+        self.dirty = False
+        if path:
+            self.load()
+
+    def __len__(self):
+        return sum(len(ts) for ts in self._ts.values())
+
+    # ── Schreiben ────────────────────────────────────────────────────────────
+
+    def append(self, values: Dict[str, float], timestamp: Optional[float] = None) -> None:
+        """Hängt einen Snapshot an und verdichtet abgelaufene Einträge.
+
+        Args:
+            values: Dict Feld → Wert (fehlende Felder werden NaN)
+            timestamp: Zeitpunkt (Default: jetzt); muss monoton steigen
+        """
+        ts = time.time() if timestamp is None else float(timestamp)
+        raw_ts = self._ts['raw']
+        if len(raw_ts) and ts < raw_ts[-1]:
+            logger.warning("Snapshot älter als letzter Eintrag – ignoriert")
+            return
+        row = np.array([[values.get(f, np.nan) for f in self.fields]], dtype=np.float64)
+        self._ts['raw'] = np.append(raw_ts, ts)
+        self._values['raw'] = np.vstack([self._values['raw'], row])
+        self._compact(ts)
+        self.dirty = True
+
+    def _compact(self, now: float) -> None:
+        """Verschiebt abgelaufene Einträge jeder Stufe in die nächstgröbere."""
+        for (name, _, retention), (next_name, bucket, _) in zip(self.tiers, self.tiers[1:]):
+            ts = self._ts[name]
+            expired = int(np.searchsorted(ts, now - retention, side='left'))
+            if expired == 0:
+                continue
+            self._merge_into(next_name, bucket, ts[:expired], self._values[name][:expired])
+            self._ts[name] = ts[expired:]
+            self._values[name] = self._values[name][expired:]
+
+    def _merge_into(self, tier: str, bucket: int, ts: np.ndarray, values: np.ndarray) -> None:
+        """Verdichtet Einträge auf Buckets (letzter Wert je Bucket) und hängt sie an."""
+        bucket_ts = np.floor(ts / bucket) * bucket
+        # Letzter Eintrag je Bucket: Position vor jedem Bucket-Wechsel plus der letzte
+        last = np.flatnonzero(np.diff(bucket_ts, append=np.inf) != 0)
+        new_ts, new_values = bucket_ts[last], values[last]
+
+        target_ts = self._ts[tier]
+        target_values = self._values[tier]
+        if len(target_ts) and len(new_ts) and new_ts[0] == target_ts[-1]:
+            # Bucket war schon teilweise verdichtet → späterer Wert gewinnt
+            target_ts, target_values = target_ts[:-1], target_values[:-1]
+        self._ts[tier] = np.concatenate([target_ts, new_ts])
+        self._values[tier] = np.vstack([target_values, new_values])
+
+    # ── Lesen ────────────────────────────────────────────────────────────────
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              fields: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Bereichsabfrage über alle Stufen in zeitlicher Reihenfolge.
+
+        Args:
+            start: Beginn (inklusive, None = unbegrenzt)
+            end: Ende (inklusive, None = unbegrenzt)
+            fields: Auszugebende Felder (Default: alle)
+
+        Returns:
+            Tuple aus (timestamps (n,), values (n, len(fields)))
+        """
+        cols = [self._field_index[f] for f in (fields or self.fields)]
+        # Gröbere Stufen enthalten die älteren Daten
+        ts = np.concatenate([self._ts[name] for name, _, _ in reversed(self.tiers)])
+        values = np.vstack([self._values[name] for name, _, _ in reversed(self.tiers)])
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='right'))
+        return ts[lo:hi], values[lo:hi][:, cols]
+
+    def series(self, field: str, start: Optional[float] = None,
+               end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Wie range(), aber für ein einzelnes Feld als 1-D-Array."""
+        ts, values = self.range(start, end, fields=[field])
+        return ts, values[:, 0]
+
+    # ── Persistenz ───────────────────────────────────────────────────────────
+
+    def save(self) -> None:
+        """Schreibt alle Stufen atomar (Temp-Datei + rename) als .npz."""
+        if not self.path:
+            return
+        # Vor dem Einsammeln zurücksetzen: Anhänge während des Schreibens
+        # (flush läuft im Worker-Thread) bleiben für den nächsten flush markiert
+        self.dirty = False
+        try:
+            arrays = {'fields': np.array(self.fields)}
+            for name, _, _ in self.tiers:
+                arrays[f'{name}_ts'] = self._ts[name]
+                arrays[f'{name}_values'] = self._values[name]
+            directory = os.path.dirname(self.path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.timeseries_', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.dirty = True
+            logger.warning(f"Fehler beim Speichern der Zeitreihen: {e}")
+
+    def flush(self) -> None:
+        """Speichert nur, wenn seit dem letzten save() Snapshots hinzugekommen sind."""
+        if self.dirty:
+            self.save()
+
+    def load(self) -> None:
+        """Lädt einen gespeicherten Stand (falls vorhanden und mit gleichen Feldern)."""
+        try:
+            if not self.path or not os.path.exists(self.path):
+                return
+            with np.load(self.path) as data:
+                if tuple(data['fields'].tolist()) != self.fields:
+                    logger.info("Zeitreihen mit anderen Feldern gespeichert – starte neu")
+                    return
+                ts = {name: data[f'{name}_ts'] for name, _, _ in self.tiers}
+                values = {name: data[f'{name}_values'].reshape(-1, len(self.fields)) for name, _, _ in self.tiers}
+            self._ts, self._values = ts, values
+            logger.info(f"Zeitreihen geladen: {len(self)} Einträge")
+        except Exception as e:
+            logger.warning(f"Fehler beim Laden der Zeitreihen: {e}")
@@ -0,0 +1,135 @@
+"""
+Token-Budget für Prompts mit Prioritäten pro Abschnitt.
+
+Token werden mit einem lokalen Tokenizer gezählt (tiktoken, falls
+installiert, sonst eine konservative Schätzung). Überschreitet ein Prompt
+MAX_PROMPT_TOKENS, werden Abschnitte niedriger Priorität zeilenweise
+gekürzt (z.B. Markt-Übersicht: Coins mit dem geringsten Volumen zuerst),
+bis das Budget passt. Abschnitte ohne Priorität werden nie gekürzt.
+"""
+
+import logging
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from config import MAX_PROMPT_TOKENS, PROMPT_SECTION_PRIORITY
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optionaler Tokenizer
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\d{1,3}|[^\W\d_]+|[^\w\s]|_", re.UNICODE)
+_encoding = None
+
+
+def _get_encoding():
+    """Lädt das tiktoken-Encoding einmalig (None wenn nicht verfügbar)."""
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken-Encoding nicht verfügbar, nutze Schätzung: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """Zählt Token mit tiktoken bzw. schätzt sie (Wörter à ~4 Zeichen, Ziffern in 3er-Gruppen)."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(math.ceil(len(piece) / 4) if piece[0].isalpha() else 1
+               for piece in _TOKEN_PATTERN.findall(text))
+
+
+def _trim_order(rows: Dict[str, Any], weights: Optional[Dict[str, float]]) -> List[str]:
+    """Reihenfolge, in der Zeilen entfernt werden (unwichtigste zuerst).
+
+    Mit Gewichten: kleinstes Gewicht zuerst. Sonst 'volume_24h' aufsteigend,
+    falls vorhanden, ansonsten von hinten (Daten sind nach Relevanz sortiert).
+    """
+    keys = list(rows)
+    if weights:
+        return sorted(keys, key=lambda k: weights.get(k, 0.0))
+    if all(isinstance(rows[k], dict) and 'volume_24h' in rows[k] for k in keys):
+        return sorted(keys, key=lambda k: rows[k]['volume_24h'] or 0)
+    return keys[::-1]
+
+
+class TokenBudgeter:
+    """Kürzt Prompt-Abschnitte nach Priorität, bis der Prompt ins Budget passt."""
+
+    def __init__(self, max_tokens: int = MAX_PROMPT_TOKENS,
+                 priority: Sequence[str] = PROMPT_SECTION_PRIORITY):
+        """Initialisiert den Budgeter.
+
+        Args:
+            max_tokens: Token-Budget für den gerenderten Prompt
+            priority: Abschnitte von wichtig nach unwichtig; nur diese werden gekürzt
+        """
+        self.max_tokens = max_tokens
+        self.priority = list(priority)
+        self.trimmed_rows = 0
+
+    def fit(self, fields: Dict[str, Any], encoded: Dict[str, str],
+            render: Callable[[Dict[str, str]], str], encode: Callable[[Any], str],
+            weights: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """Rendert den Prompt und kürzt bei Bedarf Abschnitte niedriger Priorität.
+
+        Args:
+            fields: Abschnitt → Original-Objekt (vor der Serialisierung)
+            encoded: Template-Variablen (serialisierte Abschnitte + sonstige Werte)
+            render: Funktion encoded → Prompt-Text
+            encode: Serialisierung eines einzelnen Abschnitts
+            weights: Optionale Zeilengewichte pro Abschnitt (kleinstes wird zuerst entfernt)
+
+        Returns:
+            Prompt-Text (im Budget, sofern nicht nur unkürzbare Daten übrig sind)
+        """
+        prompt = render(encoded)
+        total = count_tokens(prompt)
+        if total <= self.max_tokens:
+            return prompt
+
+        before = total
+        encoded = dict(encoded)
+        dropped: Dict[str, List[str]] = {}
+        for section in reversed(self.priority):
+            rows = fields.get(section)
+            if not isinstance(rows, dict) or not rows:
+                continue
+            remaining = dict(rows)
+            section_tokens = count_tokens(encoded[section])
+            for key in _trim_order(rows, (weights or {}).get(section)):
+                if total <= self.max_tokens:
+                    break
+                del remaining[key]
+                dropped.setdefault(section, []).append(key)
+                new_text = encode(remaining)
+                new_tokens = count_tokens(new_text)
+                # Token sind über Abschnittsgrenzen hinweg nahezu additiv
+                total += new_tokens - section_tokens
+                section_tokens = new_tokens
+                encoded[section] = new_text
+            if total <= self.max_tokens:
+                # Schätzung gegen den echten Prompt prüfen
+                prompt = render(encoded)
+                total = count_tokens(prompt)
+                if total <= self.max_tokens:
+                    break
+
+        prompt = render(encoded)
+        total = count_tokens(prompt)
+        n_dropped = sum(len(v) for v in dropped.values())
+        self.trimmed_rows += n_dropped
+        summary = ", ".join(f"{s}: {len(keys)}" for s, keys in dropped.items()) or "nichts kürzbar"
+        if total > self.max_tokens:
+            logger.warning(f"Prompt über Budget: {total} > {self.max_tokens} Token ({summary})")
+        else:
+            logger.info(f"Prompt gekürzt: {before} → {total} Token, entfernte Zeilen ({summary})")
+        return prompt
@@ -0,0 +1,75 @@
+"""Tests für das Zyklus-Tracing (Span-Bäume, Ringpuffer, Chrome-Trace, cProfile)."""
+import asyncio
+import json
+
+import pytest
+
+from src.cycle_trace import CycleTracer
+
+
+def test_spans_form_tree_across_await_and_ring_buffer_keeps_last_cycles():
+    tracer = CycleTracer(capacity=2, profile_rate=0.0)
+
+    async def llm_stage():
+        with tracer.span('analyst', model='m1'):
+            await asyncio.sleep(0.01)
+        with tracer.span('guardian'):
+            await asyncio.sleep(0)
+
+    async def cycle(n):
+        with tracer.cycle('run_cycle', n=n):
+            with tracer.span('portfolio'):
+                pass
+            with tracer.span('llm_analysis'):
+                await llm_stage()
+            tracer.annotate(outcome='alert')
+
+    for n in range(3):
+        asyncio.run(cycle(n))
+
+    cycles = tracer.to_json()
+    assert [c['attrs']['n'] for c in cycles] == [2, 1]  # neuester zuerst, ältester verdrängt
+    latest = cycles[0]
+    assert latest['attrs']['outcome'] == 'alert'
+    assert [c['name'] for c in latest['children']] == ['portfolio', 'llm_analysis']
+    llm = latest['children'][1]
+    assert [c['name'] for c in llm['children']] == ['analyst', 'guardian']
+    assert llm['children'][0]['attrs'] == {'model': 'm1'}
+    assert llm['children'][0]['duration_ms'] >= 5
+    assert llm['duration_ms'] <= latest['duration_ms']
+
+
+def test_span_outside_cycle_is_noop_and_errors_are_recorded():
+    tracer = CycleTracer()
+    with tracer.span('orphan') as span:
+        assert span is None
+    assert tracer.recent() == []
+
+    with pytest.raises(RuntimeError):
+        with tracer.cycle('run_cycle'):
+            with tracer.span('risk'):
+                raise RuntimeError('boom')
+    root = tracer.recent()[-1]
+    assert root.error == 'RuntimeError' and root.children[0].error == 'RuntimeError'
+
+
+def test_chrome_trace_and_sampled_profile(tmp_path):
+    tracer = CycleTracer(profile_rate=1.0, profile_top_n=5)
+    with tracer.cycle('run_cycle'):
+        with tracer.span('indicators'):
+            sum(i * i for i in range(20000))
+            with tracer.span('inner'):
+                pass
+
+    root = tracer.recent()[-1]
+    stage = root.children[0]
+    assert stage.profile and len(stage.profile) <= 5
+    assert stage.children[0].profile is None  # nur Stufen der obersten Ebene
+
+    path = tmp_path / 'trace.json'
+    tracer.export_chrome_trace(str(path))
+    events = json.loads(path.read_text())['traceEvents']
+    complete = {e['name']: e for e in events if e['ph'] == 'X'}
+    assert set(complete) == {'run_cycle', 'indicators', 'inner'}
+    assert complete['run_cycle']['ts'] <= complete['indicators']['ts'] <= complete['inner']['ts']
+    assert complete['indicators']['dur'] <= complete['run_cycle']['dur']
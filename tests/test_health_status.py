@@ -0,0 +1,51 @@
+"""Tests für den In-Memory-Health-Status und den nebenläufigen Health-Server."""
+import json
+import threading
+import time
+import urllib.request
+
+from src.health_status import HealthStatus
+
+
+def test_snapshot_reflects_cycle_updates():
+    status = HealthStatus()
+    before = status.snapshot()
+    assert before['status'] == 'ok' and before['container'] == 'SlopCoin_advisor'
+    assert before['last_cycle'] is None and before['uptime'] is None
+
+    status.mark_started(time.time() - 5)
+    status.update(portfolio_size=4)
+    status.record_cycle(outcome='no_signal', duration_ms=1234.56, consecutive_errors=0)
+
+    data = json.loads(status.to_json())
+    assert data['portfolio_size'] == 4
+    assert data['last_outcome'] == 'no_signal' and data['last_cycle_duration_ms'] == 1234.6
+    assert data['last_cycle'] <= data['timestamp'] and data['uptime'] >= 5
+    # Leser-Kopie ist vom Snapshot entkoppelt
+    data['status'] = 'changed'
+    assert status.snapshot()['status'] == 'ok'
+
+
+def test_health_probe_is_not_blocked_by_slow_metrics_scrape():
+    import src.main as app
+
+    release = threading.Event()
+    app.registry.register_collector('slow_test', lambda: release.wait(5) and [])
+    server = app.start_health_server(port=0)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        scrape = threading.Thread(target=lambda: urllib.request.urlopen(f'{base}/metrics', timeout=10).read())
+        scrape.start()
+        time.sleep(0.1)  # Scrape hängt jetzt im Collector
+
+        start = time.perf_counter()
+        with urllib.request.urlopen(f'{base}/health', timeout=2) as response:
+            data = json.loads(response.read())
+        assert time.perf_counter() - start < 1
+        assert data['status'] == 'ok' and data['container'] == 'SlopCoin_advisor'
+    finally:
+        release.set()
+        scrape.join()
+        app.registry.register_collector('slow_test', lambda: [])
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+"""Tests für den inkrementellen JSON-Parser."""
+
+import pytest
+
+from src.json_stream import JSONStreamParser, StreamingJSONError, parse_complete, repair_json
+
+
+def test_feed_in_chunks_completes_at_closing_brace():
+    """Das Objekt ist fertig, sobald die äußere Klammer schließt – Fences davor/danach egal."""
+    text = '```json\n{"a": [1, 2, {"b": "x}y"}], "c": true, "d": null}\n```'
+    parser = JSONStreamParser()
+    done = [parser.feed(text[i:i + 3]) for i in range(0, len(text), 3)]
+    assert parser.complete
+    assert done.index(True) < len(done) - 1  # vor dem Ende des Streams
+    assert parser.result() == {"a": [1, 2, {"b": "x}y"}], "c": True, "d": None}
+
+
+def test_escaped_quotes_inside_strings():
+    assert parse_complete('{"msg": "er sagte \\"hallo\\" {"}') == {"msg": 'er sagte "hallo" {'}
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": 1]',            # falsche Klammer
+    "{'a': 1}",            # einfache Anführungszeichen
+    '{"a": hallo}',        # nacktes Wort
+    '{"a": "zeile\nzwei"}',  # Zeilenumbruch im String
+])
+def test_malformed_structure_fails_early(text):
+    parser = JSONStreamParser()
+    with pytest.raises(StreamingJSONError):
+        parser.feed(text)
+
+
+def test_incomplete_and_missing_object():
+    parser = JSONStreamParser()
+    parser.feed('{"a": 1,')
+    with pytest.raises(StreamingJSONError):
+        parser.result()
+
+    with pytest.raises(StreamingJSONError):
+        JSONStreamParser(max_preamble=10).feed("Hier kommt leider nur Prosa ohne JSON")
+
+
+def test_error_is_json_decode_error():
+    """Aufrufer, die json.JSONDecodeError fangen, funktionieren unverändert."""
+    import json
+    with pytest.raises(json.JSONDecodeError):
+        parse_complete('{"a": 1,}')
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": [1, 2,],}\n``` Fazit', {"a": [1, 2]}),      # Trailing Commas, Text danach
+    ('{"a": True, "b": None}', {"a": True, "b": None}),          # Python-Literale
+    ('{"msg": "zeile\nzwei"}', {"msg": "zeile\nzwei"}),          # Zeilenumbruch im String
+    ('{"a": 1] und mehr', {"a": 1}),                             # falsche Klammer
+    ('{"a": {"b": "abgeschnit', {"a": {"b": "abgeschnit"}}),     # abgeschnittenes Ende
+])
+def test_repair_near_valid_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_repair_gives_up_on_missing_values():
+    with pytest.raises(StreamingJSONError):
+        repair_json('{"a": 1, "b": }')
+    with pytest.raises(StreamingJSONError):
+        repair_json('Nur Prosa')
@@ -0,0 +1,56 @@
+"""Tests für den Kraken-Stand-in (echter ccxt.kraken, In-Process und HTTP)."""
+import os
+import sys
+
+import ccxt
+import pytest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, 'benchmarks'))
+
+from kraken_standin import ExchangeProfile, KrakenStandin, MarketSnapshot, make_exchange
+from src import data_fetcher
+from src.cache_manager import IntelligentCache
+from src.data_fetcher import MarketData
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_fetcher, 'cache_manager', IntelligentCache(cache_dir=str(tmp_path / 'cache')))
+
+
+@pytest.mark.parametrize('http', [False, True])
+def test_market_data_against_standin(fresh_cache, http):
+    standin = KrakenStandin(MarketSnapshot.synthetic(n_coins=12, portfolio_size=3), ExchangeProfile(latency=0))
+    if http:
+        standin.start()
+    try:
+        market = MarketData(exchange=make_exchange(standin, http=http))
+        portfolio, prices = market.get_portfolio_with_prices()
+        indicators = market.get_portfolio_indicators(portfolio)
+        overview = market.get_market_overview(top_n=2, exclude_coins=list(portfolio))
+    finally:
+        standin.stop()
+
+    # XXBT/XETH werden von ccxt auf BTC/ETH abgebildet, EUR bleibt Basis-Währung
+    assert set(portfolio) == {'EUR', 'BTC', 'ETH', 'SOL'}
+    assert prices['EUR'] == 250.0 and all(prices[c] > 0 for c in ('BTC', 'ETH', 'SOL'))
+    assert indicators['EUR'] == {} and 0 <= indicators['BTC']['rsi_14'] <= 100
+    assert len(overview) == 2 and not set(overview) & set(portfolio)
+    # Balance + ein Batch-Ticker, danach eine OHLC-Abfrage pro Coin
+    assert standin.stats['requests_BalanceEx'] == 1
+    assert standin.stats['requests_OHLC'] == 3 + 2
+    assert standin.stats['bytes_received'] > 0
+
+
+def test_rate_limit_and_injected_errors_map_to_ccxt_exceptions():
+    snapshot = MarketSnapshot.synthetic(n_coins=3, portfolio_size=1)
+    limited = make_exchange(KrakenStandin(snapshot, ExchangeProfile(latency=0, rate_limit=0.001, burst=3)))
+    limited.load_markets()  # Assets + AssetPairs
+    limited.fetch_ticker('BTC/EUR')
+    with pytest.raises(ccxt.RateLimitExceeded):
+        limited.fetch_ticker('BTC/EUR')
+
+    failing = make_exchange(KrakenStandin(snapshot, ExchangeProfile(latency=0, error_rate=1.0)))
+    with pytest.raises(ccxt.NetworkError):
+        failing.load_markets()
@@ -0,0 +1,46 @@
+"""Tests für Preistabelle, Kosten und Histogramme der LLM-Aufrufe."""
+import os
+
+from src.llm_costs import CostTracker, Histogram, load_price_table, parse_price
+
+PRICES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prices.csv')
+
+
+def test_parse_price_formats():
+    assert parse_price("$0.45M tokens") == 0.45
+    assert parse_price("$11.00M tokens") == 11.0
+    assert parse_price("Free") == 0.0 and parse_price("?Free") == 0.0
+    assert parse_price("") is None
+
+
+def test_load_price_table_skips_continuation_rows():
+    table = load_price_table(PRICES_CSV)
+    assert table["claude-opus-4-6"] == (5.0, 25.0)
+    assert table["intfloat/e5-mistral-7b-instruct"] == (0.08, 0.0)
+    assert "claude-opus-4-6*" not in table
+    assert "" not in table
+
+
+def test_cost_tracker_accumulates_cost():
+    tracker = CostTracker(price_table={"claude-sonnet-4-6": (3.0, 15.0)})
+    tracker.log_usage("claude-sonnet-4-6", 10_000, 2_000, template="2_guardian.j2", thinking_tokens=500)
+    tracker.log_usage("unknown-model", 1_000, 1_000)
+    assert abs(tracker.total_cost - (0.03 + 0.03)) < 1e-12
+    assert tracker.total_tokens == 14_000
+    assert tracker.cost_by_model["unknown-model"] == 0.0
+
+
+def test_histogram_buckets_and_export():
+    hist = Histogram([1, 5, 10])
+    for value in (0.5, 1.0, 3, 12):
+        hist.observe(value)
+    assert hist.counts.tolist() == [2, 1, 0, 1]
+    assert hist.quantile(0.5) == 1.0
+    assert hist.quantile(1.0) == float('inf')
+
+    tracker = CostTracker(price_table={})
+    tracker.observe_call("m", "1_analyst.j2", 3.2, 1)
+    lines = tracker.prometheus_lines()
+    assert 'SlopCoin_llm_latency_seconds_bucket{model="m",template="1_analyst.j2",le="5"} 1' in lines
+    assert 'SlopCoin_llm_retries_count{model="m",template="1_analyst.j2"} 1' in lines
+    assert tracker.latency_quantile("m", 0.95) == 5.0
@@ -0,0 +1,53 @@
+"""Tests für den OpenAI-kompatiblen LLM-Stand-in (echte HTTP-Aufrufe über LLMEngine)."""
+import asyncio
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, 'benchmarks'))
+
+from llm_standin import LLMStandin, StandinProfile, detect_role
+from src.llm_engine import LLMEngine
+from src.prompt_context import PromptContext
+from src.response_cache import ResponseCache
+
+
+def _engine(standin, tmp_path, model_name="analyst"):
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("standin-key")
+    engine = LLMEngine(base_url=standin.base_url, api_key_path=str(key_file),
+                       model_name=model_name, guardian_model_name="guardian")
+    engine.response_cache = ResponseCache(enabled=False)
+    engine.prompt_context = PromptContext(state_path=None, enabled=False)
+    return engine
+
+
+def test_detect_role_from_markers_and_schema():
+    assert detect_role({'messages': [{'content': '<analyst_proposal>{}</analyst_proposal>'}]}) == 'guardian'
+    assert detect_role({'messages': [{'content': '<previous_answer>{"splits": [</previous_answer>'}]}) == 'next_invest'
+    assert detect_role({'messages': [{'content': 'x'}],
+                        'response_format': {'json_schema': {'name': 'weekly_summary'}}}) == 'weekly_summary'
+
+
+def test_next_investment_through_standin(tmp_path):
+    """Analyst und Guardian laufen gestreamt über HTTP; Usage (dict im Stream) wird verbucht."""
+    standin = LLMStandin(StandinProfile(time_scale=0, reject_thinking=("analyst",), seed=1)).start()
+    engine = _engine(standin, tmp_path)
+
+    async def run():
+        try:
+            result = await engine.analyze_next_investment(500, {"BTC": 0.1}, {}, {})
+            await asyncio.gather(*engine._drain_tasks)
+            return result
+        finally:
+            await engine.aclose()
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        standin.stop()
+    assert result["approved"] and result["message"]
+    assert standin.stats["requests_next_invest"] >= 1 and standin.stats["requests_guardian"] == 1
+    assert engine.cost_tracker.total_tokens > 0
+    if engine._thinking_support.get("analyst") is not None:
+        assert engine._thinking_support["analyst"] is False
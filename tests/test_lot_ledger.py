@@ -0,0 +1,73 @@
+import os
+import tempfile
+from src.lot_ledger import LotLedger
+
+
+def _trade(trade_id, ts, side, amount, price, symbol='BTC/EUR', fee=0.0):
+    return {
+        'id': str(trade_id), 'timestamp': ts, 'symbol': symbol, 'side': side,
+        'amount': amount, 'price': price, 'cost': amount * price,
+        'fee': {'cost': fee, 'currency': 'EUR'},
+    }
+
+
+TRADES = [
+    _trade(1, 1000, 'buy', 1.0, 100.0),
+    _trade(2, 2000, 'buy', 1.0, 200.0),
+    _trade(3, 3000, 'sell', 1.5, 300.0),
+]
+
+
+def test_fifo_lifo_avg_matching():
+    """Testet realisierten/unrealisierten P&L für alle Cost-Basis-Methoden"""
+    expected = {
+        # FIFO: 1×100 + 0.5×200 = 200 Kosten → 450 − 200
+        'FIFO': (250.0, 0.5, 200.0),
+        # LIFO: 1×200 + 0.5×100 = 250 Kosten
+        'LIFO': (200.0, 0.5, 100.0),
+        # AVG: 1.5×150 = 225 Kosten
+        'AVG': (225.0, 0.5, 150.0),
+    }
+    for method, (realized, amount, entry) in expected.items():
+        ledger = LotLedger(method=method)
+        assert ledger.ingest(TRADES) == 3
+        pos = ledger.positions({'BTC': 400.0})['BTC']
+        assert pos['realized_pnl_eur'] == realized, method
+        assert pos['amount'] == amount
+        assert pos['average_entry'] == entry
+        assert pos['unrealized_pnl_eur'] == round(amount * 400.0 - amount * entry, 2)
+
+
+def test_incremental_cursor_and_persistence():
+    """Überlappende Seiten und Wiederholungen werden per Trade-ID erkannt"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ledger.json')
+        ledger = LotLedger(state_path=path)
+        assert ledger.ingest(TRADES[:2]) == 2
+        ledger.save()
+
+        reloaded = LotLedger(state_path=path)
+        # Seite ab since=2000 enthält Trade 2 erneut plus einen weiteren zum selben Zeitpunkt
+        page = [TRADES[1], _trade(4, 2000, 'buy', 1.0, 100.0), TRADES[2], _trade(5, 3500, 'buy', 1.0, 1.0, 'ETH/USD')]
+        assert reloaded.ingest(page) == 2
+        assert reloaded.last_timestamp == 3500
+        assert reloaded.ingest(page) == 0
+        assert reloaded.positions({})['BTC']['amount'] == 1.5
+        assert 'ETH' not in reloaded.coins
+
+
+def test_sync_uses_cursor():
+    """sync() fragt nur ab dem gespeicherten Cursor ab"""
+    class FakeMarket:
+        def __init__(self):
+            self.calls = []
+
+        def fetch_my_trades_since(self, since):
+            self.calls.append(since)
+            return [t for t in TRADES if since is None or t['timestamp'] >= since]
+
+    market = FakeMarket()
+    ledger = LotLedger(method='FIFO')
+    assert ledger.sync(market) == 3
+    assert ledger.sync(market) == 0
+    assert market.calls == [None, 3000]
@@ -0,0 +1,128 @@
+"""Tests für die Metrik-Registry (/metrics) und ihre Quellen (Cache, Retry, Jobs)."""
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.metrics import MetricsRegistry, registry, track_job
+from src.cache_manager import IntelligentCache
+from src.retry import retry
+# cache_manager/retry importieren "metrics" flach (PYTHONPATH=src) – deren Registry prüfen
+from src.cache_manager import registry as app_registry
+
+
+def _value(text, sample):
+    """Wert einer Zeile ``name{labels} value`` aus der Exposition."""
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{sample} fehlt in\n{text}')
+
+
+def test_exposition_format_and_histogram_buckets():
+    reg = MetricsRegistry(prefix='t')
+    requests = reg.counter('requests_total', 'Requests', ('endpoint',))
+    requests.labels('ticker').inc()
+    requests.inc(2, endpoint='ohlc "4h"')
+    reg.gauge('queue', 'Warteschlange').set(3)
+    latency = reg.histogram('latency_seconds', 'Latenz', ('endpoint',), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.observe(value, endpoint='ticker')
+    reg.register_collector('extra', lambda: ['t_extra 1'])
+    reg.register_collector('broken', lambda: 1 / 0)
+
+    text = reg.exposition()
+    assert text.endswith('\n')
+    assert '# TYPE t_requests_total counter' in text and '# HELP t_requests_total Requests' in text
+    assert _value(text, 't_requests_total{endpoint="ticker"}') == 1
+    assert _value(text, 't_requests_total{endpoint="ohlc \\"4h\\""}') == 2
+    assert _value(text, 't_queue') == 3
+    # Buckets kumulativ, le inklusive Grenze
+    assert _value(text, 't_latency_seconds_bucket{endpoint="ticker",le="0.1"}') == 2
+    assert _value(text, 't_latency_seconds_bucket{endpoint="ticker",le="1"}') == 3
+    assert _value(text, 't_latency_seconds_bucket{endpoint="ticker",le="+Inf"}') == 4
+    assert _value(text, 't_latency_seconds_count{endpoint="ticker"}') == 4
+    assert _value(text, 't_latency_seconds_sum{endpoint="ticker"}') == pytest.approx(7.65)
+    assert 't_extra 1' in text
+
+
+def test_counter_shards_sum_across_threads():
+    reg = MetricsRegistry(prefix='t')
+    counter = reg.counter('hits_total', 'Treffer', ('cache',))
+    bound = counter.labels('prices')
+
+    def work():
+        for _ in range(10000):
+            bound.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value('prices') == 80000
+
+
+def test_cache_and_retry_feed_global_registry(tmp_path):
+    cache = IntelligentCache(cache_dir=str(tmp_path / 'metrics_cache'))
+    cache.set('a', {'x': 1}, ttl=60)
+    cache.set('old', 1, ttl=-1)
+    cache.get('a')
+    cache.get('missing')
+    cache.get('old')  # abgelaufen → Miss + Eviction
+
+    calls = []
+
+    @retry(max_attempts=3, base_delay=0, jitter=False, exceptions=(ValueError,))
+    def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ValueError('transient')
+        return 'ok'
+
+    assert flaky() == 'ok'
+
+    text = app_registry.exposition()
+    label = '{cache="metrics_cache"}'
+    assert _value(text, f'SlopCoin_cache_hits_total{label}') == 1
+    assert _value(text, f'SlopCoin_cache_misses_total{label}') == 2
+    assert _value(text, 'SlopCoin_cache_evictions_total{cache="metrics_cache",reason="ttl"}') == 1
+    assert _value(text, f'SlopCoin_cache_entries{label}') == 1
+    assert _value(text, f'SlopCoin_cache_bytes{label}') == os.path.getsize(tmp_path / 'metrics_cache' / 'a.json')
+
+    fn = 'test_cache_and_retry_feed_global_registry.<locals>.flaky'
+    assert _value(text, f'SlopCoin_retry_attempts_total{{function="{fn}"}}') == 2
+    assert _value(text, f'SlopCoin_retry_failures_total{{function="{fn}"}}') == 1
+    assert _value(text, f'SlopCoin_retry_delay_seconds_count{{function="{fn}"}}') == 1
+
+
+def test_track_job_records_duration_lag_and_overlap():
+    async def slow(context):
+        await asyncio.sleep(0.02)
+
+    async def failing(context):
+        raise RuntimeError('boom')
+
+    # next_t zeigt nach dem Auslösen auf den nächsten Durchlauf (60 s Intervall, 2 s verspätet)
+    next_t = datetime.now(timezone.utc) + timedelta(seconds=58)
+    context = SimpleNamespace(job=SimpleNamespace(next_t=next_t))
+    job_a = track_job('metrics_test_a', slow, 60)
+    job_b = track_job('metrics_test_b', failing, 60)
+
+    async def run():
+        await asyncio.gather(job_a(context), job_a(context))
+        with pytest.raises(RuntimeError):
+            await job_b(context)
+
+    asyncio.run(run())
+
+    text = registry.exposition()
+    assert _value(text, 'SlopCoin_job_runs_total{job="metrics_test_a",status="ok"}') == 2
+    assert _value(text, 'SlopCoin_job_runs_total{job="metrics_test_b",status="error"}') == 1
+    assert _value(text, 'SlopCoin_job_overlap_total{job="metrics_test_a"}') == 1
+    assert _value(text, 'SlopCoin_job_duration_seconds_bucket{job="metrics_test_a",le="0.1"}') == 2
+    assert _value(text, 'SlopCoin_job_lag_seconds_bucket{job="metrics_test_a",le="1"}') == 0
+    assert _value(text, 'SlopCoin_job_lag_seconds_bucket{job="metrics_test_a",le="5"}') == 2
@@ -0,0 +1,79 @@
+"""Tests für das kosten- und latenzbewusste Modell-Routing."""
+
+from src.llm_costs import CostTracker
+from src.model_router import ModelRouter
+
+PRICES = {"opus": (5.0, 25.0), "sonnet": (3.0, 15.0), "haiku": (1.0, 5.0)}
+
+
+def _router(**kwargs):
+    return ModelRouter(CostTracker(price_table=PRICES), fallback_models=("sonnet", "haiku"), **kwargs)
+
+
+def test_default_model_without_history():
+    route = _router().route('next', "prompt", "opus", 8000, 16000)
+    assert route.model == "opus"
+    assert route.thinking_budget == 8000
+
+
+def test_degrades_when_p95_exceeds_task_target():
+    """/next hat ein engeres Latenz-Ziel als der tägliche Zyklus."""
+    router = _router()
+    for _ in range(10):
+        router.cost_tracker.observe_call("opus", "3_next_invest.j2", 100.0, 0)  # Bucket ≤120s
+    next_route = router.route('next', "prompt", "opus", 8000, 16000)
+    assert next_route.model == "sonnet"
+    assert "p95" in next_route.reason
+    assert router.route('cycle', "prompt", "opus", 8000, 16000).model == "opus"
+
+
+def test_error_rate_and_cost_budget():
+    router = _router(max_call_cost=0.1)
+    # opus: 16000 × $25/1M = $0.40 > Budget; sonnet: $0.24 > Budget → haiku
+    assert router.route('cycle', "prompt", "opus", 0, 16000).model == "haiku"
+
+    router = _router()
+    router.record("opus", None, False)  # ein einzelner Fehlschlag sperrt nicht
+    assert router.route('cycle', "prompt", "opus", 0, 16000).model == "opus"
+    for _ in range(3):
+        router.record("opus", None, False)
+    assert router.route('cycle', "prompt", "opus", 0, 16000).model == "sonnet"
+
+
+def test_avoided_model_is_probed_and_recovers():
+    """Nach der Probe-Pause bekommt das Standard-Modell wieder einen Aufruf."""
+    router = _router(probe_interval=600)
+    for _ in range(10):
+        router.cost_tracker.observe_call("opus", "3_next_invest.j2", 100.0, 0)
+        router.record("opus", None, False)
+    assert router.route('next', "prompt", "opus", 0, 16000).model == "sonnet"
+
+    router.last_attempt["opus"] -= 600
+    assert router.route('next', "prompt", "opus", 0, 16000).model == "opus"
+    # Bis zum Ergebnis der Probe wird nicht parallel weiter geprobt
+    assert router.route('next', "prompt", "opus", 0, 16000).model == "sonnet"
+    router.cost_tracker.observe_call("opus", "3_next_invest.j2", 20.0, 0)
+    router.record("opus", 20.0, True)
+    assert router.route('next', "prompt", "opus", 0, 16000) == ("opus", 0, 'Standard')
+
+    # Gescheiterte Probe → weiter ausweichen bis zur nächsten Pause
+    for _ in range(5):
+        router.record("opus", None, False)
+    router.last_attempt["opus"] -= 600
+    assert router.route('next', "prompt", "opus", 0, 16000).model == "opus"
+    router.record("opus", None, False)
+    assert router.route('next', "prompt", "opus", 0, 16000).model == "sonnet"
+
+
+def test_thinking_budget_scaled_by_latency_ewma():
+    router = _router()
+    router.record("opus", 180.0, True)  # doppelt so langsam wie das /next-Ziel (90s)
+    assert router.route('next', "prompt", "opus", 8000, 16000).thinking_budget == 4000
+    router.record("opus", 5000.0, True)  # EWMA 1144s → Budget unter THINKING_MIN_BUDGET
+    assert router.route('next', "prompt", "opus", 8000, 16000).thinking_budget == 0
+
+
+def test_disabled_router_keeps_defaults():
+    router = _router(enabled=False)
+    router.record("opus", None, False)
+    assert router.route('next', "prompt", "opus", 8000, 16000) == ("opus", 8000, 'Routing deaktiviert')
@@ -0,0 +1,53 @@
+import numpy as np
+from src.portfolio_risk import PortfolioRiskEngine, robust_cholesky, summarize_losses
+
+
+def test_monte_carlo_var_matches_normal_quantile():
+    """Testet Monte-Carlo-VaR gegen die analytische Normalverteilung"""
+    engine = PortfolioRiskEngine(n_paths=200000, confidences=(0.95, 0.99), memory_budget_mb=1)
+
+    result = engine.monte_carlo(['BTC'], {'BTC': 1000.0}, np.zeros(1), np.array([[0.02 ** 2]]), seed=3)
+
+    # 95%-Quantil der Normalverteilung: 1.645 * 2% ≈ 3.29% (expm1 verschiebt minimal)
+    assert abs(result['levels']['0.95']['var_percent'] - 3.2) < 0.15
+    for metrics in result['levels'].values():
+        assert metrics['cvar_eur'] >= metrics['var_eur']
+    assert result['levels']['0.99']['var_eur'] > result['levels']['0.95']['var_eur']
+
+
+def test_monte_carlo_chunking_is_deterministic():
+    """Testet dass das Speicherbudget das Ergebnis nicht verändert"""
+    cov = np.array([[0.0004, 0.0003], [0.0003, 0.0009]])
+    values = {'BTC': 500.0, 'ETH': 500.0}
+
+    small = PortfolioRiskEngine(n_paths=5000, memory_budget_mb=0.01).monte_carlo(['BTC', 'ETH'], values, np.zeros(2), cov, seed=11)
+    large = PortfolioRiskEngine(n_paths=5000, memory_budget_mb=64).monte_carlo(['BTC', 'ETH'], values, np.zeros(2), cov, seed=11)
+
+    assert small['levels'] == large['levels']
+
+
+def test_filtered_historical_and_singular_covariance():
+    """Testet FHS-Ergebnis und Cholesky bei singulärer Kovarianz"""
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0, 0.02, (200, 2))
+    engine = PortfolioRiskEngine(n_paths=20000, confidences=(0.95,))
+
+    result = engine.filtered_historical(['A', 'B'], {'A': 100.0, 'B': 100.0}, returns, seed=1)
+    assert result['method'] == 'filtered_historical'
+    assert result['levels']['0.95']['var_eur'] > 0
+
+    # Zu wenig Historie → kein Ergebnis
+    assert engine.filtered_historical(['A', 'B'], {'A': 1.0, 'B': 1.0}, returns[:5]) is None
+
+    # Perfekt korrelierte Coins → Matrix nur semidefinit
+    chol = robust_cholesky(np.array([[1.0, 1.0], [1.0, 1.0]]) * 1e-4)
+    assert np.allclose(chol @ chol.T, np.array([[1.0, 1.0], [1.0, 1.0]]) * 1e-4, atol=1e-8)
+
+
+def test_summarize_losses():
+    """Testet VaR/CVaR aus einer bekannten Verlustverteilung"""
+    losses = np.arange(1, 101, dtype=float)
+    levels = summarize_losses(losses, 1000.0, (0.9,))
+
+    assert abs(levels['0.9']['var_eur'] - 90.1) < 0.01
+    assert levels['0.9']['cvar_eur'] == 95.5
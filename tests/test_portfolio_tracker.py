@@ -115,3 +115,92 @@ def test_calculate_performance_with_zero_baseline_value():
     assert perf is not None
     # Bei Baseline-Wert 0 sollte ROI 0 sein
     assert perf['total_roi_percent'] == 0.0
+
+
+def test_baseline_cache_and_revalidation():
+    """Testet In-Memory-Baseline mit Revalidierung über mtime/Inode"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'baseline.json')
+        tracker = PortfolioTracker(baseline_path=path, revalidate_seconds=0, watch_external=True)
+        assert tracker.load_baseline() is None
+        assert tracker.version == 0
+
+        assert tracker.save_baseline({'BTC': 0.1}, {'BTC': 50000.0}) is True
+        assert tracker.version == 1
+        assert not [f for f in os.listdir(tmp) if f.endswith('.tmp')]
+
+        # Unveränderte Datei → gleiches Objekt, keine neue Version
+        first = tracker.load_baseline()
+        assert tracker.load_baseline() is first
+        assert tracker.version == 1
+
+        # Externe Änderung (neue Datei per rename) wird erkannt
+        other = os.path.join(tmp, 'other.json')
+        with open(other, 'w') as f:
+            json.dump({'portfolio': {'ETH': 1.0}, 'prices': {'ETH': 3000.0}}, f)
+        os.replace(other, path)
+        assert tracker.load_baseline()['portfolio'] == {'ETH': 1.0}
+        assert tracker.version == 2
+
+        os.remove(path)
+        assert tracker.has_baseline() is False
+        assert tracker.load_baseline() is None
+
+
+def test_baseline_cache_skips_disk_within_interval():
+    """Innerhalb des Revalidierungs-Intervalls wird die Datei nicht angefasst"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'baseline.json')
+        tracker = PortfolioTracker(baseline_path=path, revalidate_seconds=3600, watch_external=True)
+        tracker.save_baseline({'BTC': 0.1}, {'BTC': 50000.0})
+
+        os.remove(path)
+        assert tracker.has_baseline() is True
+        assert tracker.load_baseline()['portfolio'] == {'BTC': 0.1}
+
+
+def test_baseline_cache_without_external_writes_never_stats(monkeypatch):
+    """Ohne externe Schreiber gilt der Cache bis zum nächsten save_baseline"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'baseline.json')
+        tracker = PortfolioTracker(baseline_path=path, revalidate_seconds=0, watch_external=False)
+        tracker.save_baseline({'BTC': 0.1}, {'BTC': 50000.0})
+
+        def no_disk(*args, **kwargs):
+            raise AssertionError('Dateizugriff pro Tick')
+
+        monkeypatch.setattr(os, 'stat', no_disk)
+        monkeypatch.setattr(os.path, 'exists', no_disk)
+        assert tracker.has_baseline() is True
+        assert tracker.load_baseline()['portfolio'] == {'BTC': 0.1}
+        monkeypatch.undo()
+
+        tracker.save_baseline({'ETH': 1.0}, {'ETH': 3000.0})
+        assert tracker.load_baseline()['portfolio'] == {'ETH': 1.0}
+        assert tracker.version == 2
+
+
+def test_calculate_performance_vectorized_fields():
+    """Testet die Felder der vektorisierten Performance-Berechnung"""
+    tracker = PortfolioTracker()
+
+    baseline = {
+        'portfolio': {'BTC': 0.1, 'ETH': 1.0, 'XRP': 100.0},
+        'prices': {'BTC': 50000, 'ETH': 3000, 'XRP': 0.5}
+    }
+    current = {'XRP': 100.0, 'ETH': 1.0, 'BTC': 0.1, 'SOL': 2.0}
+    prices = {'BTC': 55000, 'ETH': 2700, 'XRP': 0.5, 'SOL': 150}
+
+    perf = tracker.calculate_performance(current, prices, baseline)
+
+    assert list(perf['coin_performance']) == ['XRP', 'ETH', 'BTC', 'SOL']
+    assert perf['coin_performance']['BTC'] == {
+        'amount': 0.1, 'current_price': 55000.0, 'current_value_eur': 5500.0,
+        'entry_price': 50000.0, 'baseline_value_eur': 5000.0, 'pnl_eur': 500.0, 'roi_percent': 10.0,
+    }
+    assert perf['coin_performance']['SOL']['entry_price'] == 150.0
+    assert perf['portfolio_value_eur'] == 8550.0
+    assert perf['total_pnl_eur'] == 500.0
+    assert perf['best_performer'] == {'coin': 'BTC', 'roi_percent': 10.0}
+    assert perf['worst_performer'] == {'coin': 'ETH', 'roi_percent': -10.0}
+    assert isinstance(perf['coin_performance']['ETH']['pnl_eur'], float)
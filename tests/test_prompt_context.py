@@ -0,0 +1,103 @@
+"""Tests für Delta-Prompting (PromptContext)."""
+
+from src.prompt_context import PromptContext, diff_indicators, diff_metrics
+
+
+def _coin(price, rsi=50.0, trend='bullish'):
+    return {'price': price, 'rsi_14': rsi, 'trend': trend, 'macd_bullish': True,
+            'volume_ratio': 1.0, 'bb_position': 'middle', 'sma200': price * 0.9}
+
+
+def _inputs(eth_price=3000.0, sol_trend='bullish', drawdown=-0.10):
+    return {
+        'portfolio_data': {'BTC': 0.1, 'ETH': 2.0},
+        'portfolio_indicators': {'BTC': _coin(60000.0), 'ETH': _coin(eth_price)},
+        'market_overview': {'BTC': _coin(60000.0), 'ETH': _coin(eth_price), 'SOL': _coin(150.0, trend=sol_trend)},
+        'performance_data': {'outperformance_pct': 2.0},
+        'risk_metrics': {'max_drawdown': drawdown, 'correlation': {'BTC_ETH': 0.8}},
+    }
+
+
+def _record(context, prepared, inputs):
+    context.record(prepared['mode'], {
+        'portfolio': inputs['portfolio_data'],
+        'portfolio_indicators': inputs['portfolio_indicators'],
+        'market_overview': inputs['market_overview'],
+        'risk_metrics': inputs['risk_metrics'],
+    }, {'recommendation': 'HOLD', 'sentiment': 'neutral', 'urgency_score': 2, 'reasoning': 'x' * 1000})
+
+
+def test_diff_reports_flips_and_large_moves_only():
+    """Signalwechsel und Bewegungen über dem Schwellenwert, kleine Schwankungen nicht."""
+    before = {'BTC': _coin(60000.0), 'ETH': _coin(3000.0), 'SOL': _coin(150.0)}
+    after = {'BTC': _coin(60300.0), 'ETH': _coin(3300.0), 'SOL': _coin(150.0, rsi=75.0), 'ADA': _coin(0.5)}
+    changes = diff_indicators(before, after, price_threshold=0.03)
+    assert 'BTC' not in changes
+    assert changes['ETH'] == {'price_change_pct': 10.0}
+    assert changes['SOL']['signals']['rsi'] == ['neutral', 'overbought']
+    assert changes['ADA'] == {'status': 'new'}
+
+    metrics = diff_metrics({'a': {'b': 1.0, 'c': 'low'}}, {'a': {'b': 1.01, 'c': 'high'}}, threshold=0.05)
+    assert metrics == {'a.c': ['low', 'high']}
+
+
+def test_full_then_delta_then_refresh(tmp_path):
+    """Erster Zyklus vollständig, danach Delta, nach N Zyklen wieder vollständig."""
+    path = str(tmp_path / 'context.json')
+    context = PromptContext(state_path=path, full_refresh_cycles=2, enabled=True)
+
+    inputs = _inputs()
+    first = context.prepare(**inputs)
+    assert first['mode'] == 'full' and 'delta_context' not in first['fields']
+    _record(context, first, inputs)
+
+    inputs = _inputs(eth_price=3300.0, sol_trend='bearish', drawdown=-0.20)
+    second = PromptContext(state_path=path, full_refresh_cycles=2, enabled=True).prepare(**inputs)
+    assert second['mode'] == 'delta'
+    fields = second['fields']
+    # Nur geänderte Markt-Coins, kompakte Indikatoren, geänderte Risiko-Metriken
+    assert set(fields['market_overview']) == {'ETH', 'SOL'}
+    assert 'sma200' not in fields['portfolio_indicators']['BTC']
+    assert fields['risk_metrics'] == {'max_drawdown': -0.20}
+    delta = fields['delta_context']
+    assert delta['changes']['market_overview']['SOL']['signals']['trend'] == ['bullish', 'bearish']
+    assert delta['previous_analyses'][0]['recommendation'] == 'HOLD'
+    assert len(delta['previous_analyses'][0]['reasoning']) == 300
+
+    _record(context, second, inputs)
+    third = context.prepare(**inputs)
+    assert third['mode'] == 'delta'
+    _record(context, third, inputs)
+    assert context.prepare(**inputs)['mode'] == 'full'
+
+
+def test_slow_drift_accumulates_until_reported():
+    """Nicht gemeldete Coins und Metriken bleiben auf dem zuletzt gesendeten Stand."""
+    context = PromptContext(state_path=None, full_refresh_cycles=10, enabled=True)
+    inputs = _inputs()
+    _record(context, context.prepare(**inputs), inputs)
+
+    # 2 % pro Zyklus liegt unter der 3-%-Schwelle, summiert sich aber auf
+    inputs = _inputs(eth_price=3060.0, drawdown=-0.104)
+    second = context.prepare(**inputs)
+    assert 'ETH' not in second['fields']['market_overview']
+    assert second['fields']['risk_metrics'] == {}
+    _record(context, second, inputs)
+
+    inputs = _inputs(eth_price=3121.2, drawdown=-0.108)
+    third = context.prepare(**inputs)
+    assert third['fields']['delta_context']['changes']['market_overview']['ETH'] == {'price_change_pct': 4.04}
+    assert third['fields']['risk_metrics'] == {'max_drawdown': -0.108}
+    _record(context, third, inputs)
+
+    # Gemeldete Werte sind die neue Basis
+    assert context.inputs['market_overview']['ETH']['price'] == 3121.2
+    assert context.inputs['risk_metrics'] == {'max_drawdown': -0.108, 'correlation': {'BTC_ETH': 0.8}}
+    assert 'ETH' not in context.prepare(**inputs)['fields']['market_overview']
+
+
+def test_disabled_always_full():
+    context = PromptContext(state_path=None, enabled=False)
+    inputs = _inputs()
+    _record(context, context.prepare(**inputs), inputs)
+    assert context.prepare(**inputs)['mode'] == 'full'
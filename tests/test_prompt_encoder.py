@@ -0,0 +1,46 @@
+import json
+from src.prompt_encoder import PromptEncoder, encode_table, round_significant, is_table
+
+
+INDICATORS = {
+    'BTC': {'symbol': 'BTC/EUR', 'price': 61234.56789, 'rsi_14': 55.123456, 'obv': 123456789.0,
+            'macd_bullish': True, 'rsi_divergence': {'bullish': False, 'bearish': True}},
+    'ETH': {'symbol': 'ETH/EUR', 'price': 3012.3456, 'rsi_14': 44.5, 'obv': -98765.0,
+            'macd_bullish': False, 'rsi_divergence': None},
+    'XRP': None,
+}
+
+
+def test_round_significant():
+    """Testet Rundung auf signifikante Stellen"""
+    assert round_significant(61234.56789, 5) == 61235.0
+    assert round_significant(0.000123456, 3) == 0.000123
+    assert round_significant(0.0, 3) == 0.0
+
+
+def test_indicator_table_is_compact_and_complete():
+    """Coin-Indikatoren werden als CSV mit Kopfzeile ausgegeben"""
+    assert is_table(INDICATORS)
+    table = encode_table(INDICATORS, digits=5)
+    lines = table.splitlines()
+    assert lines[0] == 'coin,symbol,price,rsi_14,obv,macd_bullish,rsi_divergence.bullish,rsi_divergence.bearish'
+    assert lines[1] == 'BTC,BTC/EUR,61235,55.123,123460000,true,false,true'
+    assert lines[2] == 'ETH,ETH/EUR,3012.3,44.5,-98765,false,,'
+    assert lines[3] == 'XRP,,,,,,,'
+
+
+def test_encode_payload_reports_savings():
+    """Kompakter Payload ist kleiner als indent=2 und bleibt parsebar"""
+    encoder = PromptEncoder(digits=5)
+    risk = {'max_drawdown': -12.345678, 'var_metrics': {'BTC': {'var_95': 0.0412345}}, 'flags': ['a', 'b']}
+    payload = encoder.encode_payload({'portfolio_indicators': INDICATORS, 'risk_metrics': risk, 'performance_data': None})
+
+    assert payload['performance_data'] == '{}'
+    assert json.loads(payload['risk_metrics']) == {
+        'max_drawdown': -12.346, 'var_metrics': {'BTC': {'var_95': 0.041235}}, 'flags': ['a', 'b']
+    }
+    assert ' ' not in payload['risk_metrics']
+    assert 0 < encoder.tokens_after < encoder.tokens_before
+
+    legacy = PromptEncoder(enabled=False)
+    assert legacy.encode(risk) == json.dumps(risk, indent=2)
@@ -8,14 +8,14 @@ from unittest.mock import patch, MagicMock, mock_open
 # Füge das Projekt-Root zum Python-Pfad hinzu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Mocke alle externen Abhängigkeiten vor dem Import
-sys.modules['openai'] = MagicMock()
-sys.modules['telegram'] = MagicMock()
-sys.modules['telegram.ext'] = MagicMock()
-sys.modules['ccxt'] = MagicMock()
-sys.modules['pandas'] = MagicMock()
-sys.modules['numpy'] = MagicMock()
-sys.modules['pandas_ta'] = MagicMock()
+# Mocke fehlende externe Abhängigkeiten vor dem Import (installierte Pakete
+# bleiben echt, sonst erhalten später gesammelte Tests ein gemocktes numpy)
+import importlib
+for _module in ('openai', 'telegram', 'telegram.ext', 'ccxt', 'pandas', 'numpy', 'pandas_ta'):
+    try:
+        importlib.import_module(_module)
+    except ImportError:
+        sys.modules[_module] = MagicMock()
 
 from src.llm_engine import LLMEngine
 from src.config import (
@@ -96,6 +96,341 @@ def test_prompt_hash_consistency():
         print("✅ Prompt-Hash-Konsistenz erfolgreich getestet")
 
 
+def test_templates_precompiled_and_reloaded_on_change(tmp_path):
+    """Templates werden beim Start kompiliert und nur bei geänderter mtime neu geladen."""
+    from jinja2 import Environment, FileSystemLoader
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file))
+    assert '1_analyst.j2' in engine._templates
+
+    template_file = tmp_path / "t.j2"
+    template_file.write_text("A {{ x }}")
+    engine.template_env = Environment(loader=FileSystemLoader(str(tmp_path)))
+    first = engine._get_template_entry('t.j2')
+    assert engine._get_template_entry('t.j2') is first
+
+    template_file.write_text("B {{ x }}")
+    mtime = first['mtime_ns'] + 2 * 10**9
+    os.utime(template_file, ns=(mtime, mtime))
+    second = engine._get_template_entry('t.j2')
+    assert second['source_hash'] != first['source_hash']
+    assert second['template'].render(x=1) == "B 1"
+
+
+def test_prompt_cache_expires_oldest_first(tmp_path):
+    """Abgelaufene Prompts werden von vorne entfernt, ohne das Dict neu aufzubauen."""
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file))
+
+    with patch('src.llm_engine.time.time', return_value=1000.0):
+        engine._cache_prompt('1_analyst.j2', {'a': 1}, "alt")
+    with patch('src.llm_engine.time.time', return_value=1000.0 + PROMPT_CACHE_TTL + 1):
+        engine._cache_prompt('1_analyst.j2', {'a': 2}, "neu")
+        assert engine._get_cached_prompt('1_analyst.j2', {'a': 1}) is None
+        assert engine._get_cached_prompt('1_analyst.j2', {'a': 2}) == "neu"
+    assert len(engine.prompt_cache) == 1
+
+
+def test_async_engine_passes_guardian_model_per_call(tmp_path):
+    """Parallele /next-Analysen teilen die Event-Loop; das Guardian-Modell wird pro Aufruf übergeben."""
+    import asyncio
+    from types import SimpleNamespace
+    from src.response_cache import ResponseCache
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst", guardian_model_name="guardian")
+    engine.response_cache = ResponseCache(enabled=False)
+    calls = []
+
+    async def create(model, messages, stream=False, **kwargs):
+        calls.append(model)
+        await asyncio.sleep(0.01)
+        content = ('{"approved": true, "final_message": "ok"}' if model == "guardian"
+                   else '{"splits": [], "telegram_message": "plan"}')
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+        async def chunks():
+            for i in range(0, len(content), 8):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 8]))])
+        return chunks()
+
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def run_two():
+        return await asyncio.gather(
+            engine.analyze_next_investment(500, {"BTC": 0.1}, {}, {}),
+            engine.analyze_next_investment(1000, {"BTC": 0.1}, {}, {}),
+        )
+
+    results = asyncio.run(run_two())
+    assert all(r["approved"] and r["message"] == "ok" for r in results)
+    # Beide Analysten laufen an, bevor ein Guardian startet (kein Blockieren)
+    assert calls[:2] == ["analyst", "analyst"]
+    assert calls.count("guardian") == 2
+    assert engine.model_name == "analyst"
+
+
+def test_streaming_repairs_malformed_json_without_new_call(tmp_path):
+    """Fast gültiges JSON wird zu Ende gelesen und repariert – kein zweiter Aufruf, kein Backoff."""
+    import asyncio
+    from types import SimpleNamespace
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file))
+    responses = ['{"a": 1] und noch sehr viel mehr Text', '```json\n{"a": 2}\n```']
+    consumed = []
+
+    async def create(model, messages, stream=False, **kwargs):
+        content = responses.pop(0)
+
+        async def chunks():
+            for char in content:
+                consumed.append(char)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=char))],
+                                      usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+        return chunks()
+
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def run():
+        result = await engine._execute_with_retry("prompt", 100, 0.0)
+        await asyncio.gather(*engine._drain_tasks)
+        return result
+
+    with patch('src.llm_engine.asyncio.sleep') as mock_sleep:
+        assert asyncio.run(run()) == {"a": 1}
+        mock_sleep.assert_not_called()
+    # Erster Stream wurde komplett gelesen (inkl. Usage), zweite Antwort nie angefragt
+    assert "".join(consumed) == '{"a": 1] und noch sehr viel mehr Text'
+    assert len(responses) == 1
+    assert engine.cost_tracker.total_tokens == 15
+
+
+def test_unrepairable_json_is_reasked_with_error_only(tmp_path):
+    """Nicht reparierbares JSON → Korrektur-Anfrage mit Fehler und Antwort, ohne den Original-Prompt."""
+    import asyncio
+    from types import SimpleNamespace
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst")
+    responses = ['{"splits": [], "telegram_message": "plan", "x": }', '{"splits": [], "telegram_message": "plan"}']
+    prompts = []
+
+    async def create(model, messages, stream=False, **kwargs):
+        prompts.append((messages[0]["content"], kwargs.get("response_format")))
+        content = responses.pop(0)
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+        return chunks()
+
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    result = asyncio.run(engine._execute_with_retry("ORIGINAL PROMPT", 100, 0.0, template='3_next_invest.j2'))
+    assert result == {"splits": [], "telegram_message": "plan"}
+    reask_prompt, output_format = prompts[1]
+    assert "ORIGINAL PROMPT" not in reask_prompt
+    assert '"x": }' in reask_prompt and "<schema>" in reask_prompt
+    assert output_format["json_schema"]["name"] == "next_invest"
+
+
+def test_response_cache_key_follows_routed_model(tmp_path):
+    """Degradierte Antworten werden nie unter dem Schlüssel des Standard-Modells ausgeliefert."""
+    import asyncio
+    from src.model_router import Route
+    from src.response_cache import ResponseCache
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst", guardian_model_name="guardian")
+    engine.response_cache = ResponseCache(cache_dir=str(tmp_path / "responses"))
+    calls = []
+
+    def handler(model, kwargs):
+        calls.append(model)
+        if model.startswith("guardian"):
+            return 0, '{"approved": true, "final_message": "ok von %s"}' % model
+        return 0, '{"splits": [], "telegram_message": "plan"}'
+
+    engine.client = _stream_create(handler)
+    degraded = {}
+    engine.router.route = lambda task, prompt, default_model, budget, max_tokens: Route(
+        degraded.get(default_model, default_model), budget, 'test')
+
+    def ask():
+        return asyncio.run(engine.analyze_next_investment(500, {"BTC": 0.1}, {}, {}))
+
+    # Analyst degradiert → eigener Schlüssel; der Standard-Lauf danach ruft das Modell erneut
+    degraded["analyst"] = "fallback"
+    assert ask()["message"] == "ok von guardian"
+    degraded.clear()
+    assert not ask().get("cached")
+    assert calls == ["fallback", "guardian", "analyst", "guardian"]
+    assert ask().get("cached")
+
+    # Guardian degradiert → Antwort wird nicht gecacht
+    engine.response_cache = ResponseCache(cache_dir=str(tmp_path / "responses_2"))
+    degraded["guardian"] = "guardian-fast"
+    assert ask()["message"] == "ok von guardian-fast"
+    degraded.clear()
+    assert ask()["message"] == "ok von guardian"
+
+
+def test_schema_violation_triggers_reask_and_format_rejection_is_cached(tmp_path):
+    """Falsche Typen werden nachgefordert; lehnt der Proxy response_format ab, wird das gemerkt."""
+    import asyncio
+    import httpx
+    from openai import BadRequestError
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst")
+    responses = ['{"approved": "ja"}', '{"approved": true}']
+    format_calls = []
+
+    def handler(model, kwargs):
+        if 'response_format' in kwargs:
+            format_calls.append(model)
+            response = httpx.Response(400, request=httpx.Request("POST", "http://proxy"))
+            raise BadRequestError("response_format not supported", response=response, body=None)
+        return 0, responses.pop(0)
+
+    engine.client = _stream_create(handler)
+    result = asyncio.run(engine._execute_with_retry("p", 100, 0.0, template='2_guardian.j2'))
+    assert result == {"approved": True}
+    assert format_calls == ["analyst"]
+    assert engine._structured_support == {"analyst": False}
+
+
+def test_partial_answers_reach_caller_fallbacks():
+    """Felder mit Default beim Aufrufer sind nicht Pflicht; fehlende Splits schon."""
+    from src.llm_schemas import validate
+
+    assert validate('1_analyst.j2', {'sentiment': 'neutral'}) == []
+    assert validate('2_guardian.j2', {'warnings': []}) == []
+    assert validate('4_weekly_summary.j2', {'weekly_recap': 'ruhig'}) == []
+    assert validate('3_next_invest.j2', {'telegram_message': 'x'}) == ["Pflichtfeld 'splits' fehlt"]
+    assert validate('2_guardian.j2', {'approved': 'ja'}) == ["Feld 'approved' muss vom Typ boolean sein, ist str"]
+
+
+def test_weekly_summary_without_telegram_message_uses_fallback(tmp_path):
+    """Fehlt telegram_message, baut analyze_weekly_summary die Nachricht selbst – ohne Korrektur-Anfrage."""
+    import asyncio
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst")
+    calls = []
+
+    def handler(model, kwargs):
+        calls.append(model)
+        return 0, '{"week_number": "KW 42", "recommendation": "WATCH", "weekly_recap": "ruhig"}'
+
+    engine.client = _stream_create(handler)
+    engine.router.enabled = False
+    result = asyncio.run(engine.analyze_weekly_summary({}, {}, {}, {}, {}))
+    assert calls == ["analyst"]
+    assert "KW 42" in result["message"] and "WATCH" in result["message"]
+
+
+def _stream_create(handler):
+    """Fake für client.chat.completions.create: handler(model, kwargs) → (Verzögerung, Inhalt)."""
+    import asyncio
+    from types import SimpleNamespace
+
+    async def create(model, messages, stream=False, **kwargs):
+        delay, content = handler(model, kwargs)
+
+        async def chunks():
+            await asyncio.sleep(delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+        return chunks()
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_thinking_rejection_is_cached_per_model(tmp_path):
+    """Lehnt der Proxy Thinking ab, wird es für dieses Modell nicht erneut versucht."""
+    import asyncio
+    import httpx
+    from openai import BadRequestError
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst")
+    thinking_calls = []
+
+    def handler(model, kwargs):
+        if 'thinking' in kwargs.get('extra_body', {}):
+            thinking_calls.append(model)
+            response = httpx.Response(400, request=httpx.Request("POST", "http://proxy"))
+            raise BadRequestError("thinking not supported", response=response, body=None)
+        return 0, '{"ok": true}'
+
+    engine.client = _stream_create(handler)
+    with patch('src.llm_engine.THINKING_ENABLED', True):
+        for _ in range(2):
+            assert asyncio.run(engine._execute_with_retry("p", 100, 0.1, thinking_budget=500)) == {"ok": True}
+    assert thinking_calls == ["analyst"]
+    assert engine._thinking_support == {"analyst": False}
+
+
+def test_unrelated_client_error_keeps_thinking_and_structured_output(tmp_path):
+    """Ein 400 ohne Bezug auf Thinking oder response_format schaltet nichts dauerhaft ab."""
+    import asyncio
+    import httpx
+    import pytest
+    from openai import BadRequestError
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="analyst")
+
+    def handler(model, kwargs):
+        response = httpx.Response(400, request=httpx.Request("POST", "http://proxy"))
+        raise BadRequestError("prompt is too long: context length exceeded", response=response, body=None)
+
+    engine.client = _stream_create(handler)
+    with patch('src.llm_engine.THINKING_ENABLED', True):
+        with pytest.raises(BadRequestError):
+            asyncio.run(engine._call_with_thinking_probe("analyst", "p", 100, 0.1, 500, None,
+                                                         template='2_guardian.j2'))
+        assert engine._thinking_budget_for("analyst", 500) == 500
+    assert engine._output_format_for("analyst", '2_guardian.j2') is not None
+    assert engine._thinking_support == {} and engine._structured_support == {}
+
+
+def test_hedged_request_uses_faster_backup(tmp_path):
+    """Bleibt das erste Token über dem Perzentil aus, gewinnt die Backup-Anfrage."""
+    import asyncio
+
+    key_file = tmp_path / "key.txt"
+    key_file.write_text("mock_api_key")
+    engine = LLMEngine(api_key_path=str(key_file), model_name="slow")
+    for _ in range(20):
+        engine._record_first_token("slow", 0.01)
+    engine.client = _stream_create(
+        lambda model, kwargs: (5.0, '{"from": "slow"}') if model == "slow" else (0.0, '{"from": "backup"}')
+    )
+
+    with patch('src.llm_engine.LLM_HEDGE_BACKUP_MODEL', "backup"):
+        result = asyncio.run(asyncio.wait_for(engine._execute_with_retry("p", 100, 0.0), timeout=2))
+    assert result == {"from": "backup"}
+    assert engine._hedge_delay("slow") == 0.01
+    # Antwort und Latenz gehören zum Backup, die abgebrochene Primär-Anfrage zählt als Fehlschlag
+    assert engine.router.error_rate["backup"] == 0.0
+    assert engine.router.error_rate["slow"] > 0.0
+    assert engine.cost_tracker.latency_quantile("backup") is not None
+    assert engine.cost_tracker.latency_quantile("slow") is None
+    assert engine.cost_tracker.histograms[("input_tokens", "slow", "")].count == 1
+
+
 def test_adaptive_ttl_integration():
     """Testet die Integration der adaptiven TTL."""
     from src.data_fetcher import MarketData
@@ -0,0 +1,98 @@
+"""Tests für den LLM-Antwort-Cache (quantisierter Fingerprint)."""
+import tempfile
+import time
+
+import numpy as np
+
+from src.response_cache import ResponseCache, price_bucket, rsi_zone, indicator_signals, risk_signals
+from src.risk_analyzer import RiskAnalyzer
+
+
+def _indicators(price, rsi, trend='bullish'):
+    return {'BTC': {'price': price, 'rsi_14': rsi, 'trend': trend, 'macd_bullish': True,
+                    'volume_ratio': 1.1, 'bb_position': 'middle'}}
+
+
+def test_price_bucket_resolution():
+    """Preise innerhalb ~0.5% landen im gleichen Bucket, 1% Bewegung nicht."""
+    center = 1.005 ** 2170  # Bucket-Mitte (~50'000)
+    assert price_bucket(center) == price_bucket(center * 1.002) == price_bucket(center * 0.998)
+    assert price_bucket(center) != price_bucket(center * 1.01)
+    assert price_bucket(0) is None and price_bucket(None) is None
+
+
+def test_indicator_signals_are_categorical():
+    """RSI wird zur Zone, Volume-Ratio zur Kategorie."""
+    assert rsi_zone(25) == 'oversold' and rsi_zone(50) == 'neutral' and rsi_zone(75) == 'overbought'
+    signals = indicator_signals(_indicators(100.0, 62.3)['BTC'])
+    assert signals['rsi'] == 'strong'
+    assert signals['volume'] == 'normal'
+    assert signals['trend'] == 'bullish'
+
+
+def test_fingerprint_ignores_immaterial_moves():
+    """Kleine Bewegungen ändern den Schlüssel nicht, ein Trendwechsel schon."""
+    center = 1.005 ** 2170
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(cache_dir=tmp)
+        base = cache.market_fingerprint('next_invest', {'BTC': 0.1}, _indicators(center, 52.0),
+                                        invest_amount=500)
+        same = cache.market_fingerprint('next_invest', {'BTC': 0.1}, _indicators(center * 1.001, 53.5),
+                                        invest_amount=500)
+        moved = cache.market_fingerprint('next_invest', {'BTC': 0.1}, _indicators(center * 1.001, 53.5, 'bearish'),
+                                         invest_amount=500)
+        other_amount = cache.market_fingerprint('next_invest', {'BTC': 0.1}, _indicators(center, 52.0),
+                                                invest_amount=1000)
+        assert base == same
+        assert base != moved
+        assert base != other_amount
+
+
+def test_identical_cycles_share_key(tmp_path):
+    """Zwei identische Zyklen ergeben denselben Schlüssel, obwohl EWMA-Zustand und VaR weiterlaufen."""
+    analyzer = RiskAnalyzer(history_path=str(tmp_path / 'history.json'))
+    rng = np.random.default_rng(3)
+    t0 = time.time() - 60 * 86400
+    history = {
+        coin: [{'price': p, 'timestamp': t0 + i * 86400}
+               for i, p in enumerate(start * np.exp(np.cumsum(rng.normal(0, 0.02, 60))))]
+        for coin, start in (('BTC', 50000.0), ('ETH', 3000.0))
+    }
+    analyzer._save_history({'price_history': history})
+    portfolio = {'BTC': 0.1, 'ETH': 1.0}
+    prices = {'BTC': history['BTC'][-1]['price'], 'ETH': history['ETH'][-1]['price']}
+    indicators = {'BTC': {'price': prices['BTC'], 'rsi_14': 48.0, 'trend': 'bullish'}}
+
+    first = analyzer.analyze_risks(portfolio, prices, indicators)
+    analyzer.risk_state.last_update -= analyzer.risk_state.step_seconds  # nächster Zyklus, ein Schritt später
+    second = analyzer.analyze_risks(portfolio, prices, indicators)
+    assert first['ewma_volatility'] != second['ewma_volatility']
+
+    cache = ResponseCache(cache_dir=str(tmp_path / 'cache'))
+    keys = [cache.market_fingerprint('analyze_market', portfolio, indicators, risk_metrics=risks)
+            for risks in (first, second)]
+    assert keys[0] == keys[1]
+    weights = risk_signals(first)['weights']
+    assert set(weights) == {'BTC', 'ETH'} and all(w % 5 == 0 for w in weights.values())
+
+    # Gekaufte Menge ändert den Schlüssel
+    assert cache.market_fingerprint('analyze_market', {'BTC': 0.2, 'ETH': 1.0}, indicators,
+                                    risk_metrics=second) != keys[0]
+
+
+def test_get_set_and_ttl():
+    """Antworten werden persistent gespeichert; TTL 0 bzw. deaktiviert = kein Cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(cache_dir=tmp)
+        assert cache.get('abc') is None
+        cache.set('abc', {'approved': True, 'message': 'HOLD'}, ttl=60)
+        cache.set('weekly', {'message': 'x'}, ttl=0)
+
+        reloaded = ResponseCache(cache_dir=tmp)
+        assert reloaded.get('abc') == {'approved': True, 'message': 'HOLD'}
+        assert reloaded.get('weekly') is None
+        assert reloaded.hits == 1 and reloaded.misses == 1
+
+    disabled = ResponseCache(enabled=False)
+    disabled.set('abc', {'message': 'x'}, ttl=60)
+    assert disabled.get('abc') is None
@@ -2,6 +2,7 @@ import pytest
 import json
 import tempfile
 import os
+import time
 import numpy as np
 from src.risk_analyzer import RiskAnalyzer
 
@@ -252,3 +253,112 @@ def test_analyze_risks_integration():
 
     # Volatility Ranking sollte beide Coins enthalten
     assert len(risks['volatility_ranking']) == 2
+
+
+def test_correlation_matrix_aligns_timestamps():
+    """Testet dass Historien mit unterschiedlichen Zeitstempeln ausgerichtet werden"""
+    analyzer = RiskAnalyzer()
+
+    # ETH wird doppelt so oft abgetastet wie BTC, beide folgen demselben Muster
+    btc = [{'price': p, 'timestamp': t} for t, p in zip(range(0, 20, 2), [100, 110, 99, 120, 108, 130, 117, 140, 126, 150])]
+    eth = [{'price': p / 10, 'timestamp': t} for t, p in zip(range(0, 20), [100, 100, 110, 110, 99, 99, 120, 120, 108, 108,
+                                                                            130, 130, 117, 117, 140, 140, 126, 126, 150, 150])]
+
+    corr_matrix = analyzer.calculate_correlation_matrix(['BTC', 'ETH'], {'BTC': btc, 'ETH': eth})
+
+    # Positionsbasiertes Kürzen würde die Serien gegeneinander verschieben
+    assert corr_matrix['BTC']['ETH'] == 1.0
+
+
+def test_correlation_matrix_uses_returns_and_cache(tmp_path):
+    """Testet Return-Korrelation und Cache nur für die eigene Historien-Version"""
+    analyzer = RiskAnalyzer(history_path=str(tmp_path / 'history.json'))
+
+    # Beide Preise steigen (Preis-Korrelation ~1), die Returns laufen aber gegenläufig
+    a = [100, 102, 103, 105, 106, 108]
+    b = [100, 101, 103, 104, 106, 107]
+    history = {
+        'A': [{'price': p, 'timestamp': t} for t, p in enumerate(a)],
+        'B': [{'price': p, 'timestamp': t} for t, p in enumerate(b)],
+    }
+    analyzer._save_history({'price_history': history})
+    own = analyzer._load_history()['price_history']
+
+    corr_matrix = analyzer.calculate_correlation_matrix(['A', 'B'], own, history_version=analyzer.history_version)
+    assert corr_matrix['A']['B'] < 0
+
+    # Gleiche Version und eigene Historie → gecachtes Ergebnis
+    again = analyzer.calculate_correlation_matrix(['A', 'B'], own, history_version=analyzer.history_version)
+    assert again is corr_matrix
+
+    # Vom Aufrufer übergebene Historie wird nicht aus dem Cache beantwortet
+    parallel = {'A': history['A'], 'B': [{'price': p, 'timestamp': t} for t, p in enumerate(a)]}
+    other = analyzer.calculate_correlation_matrix(['A', 'B'], parallel, history_version=analyzer.history_version)
+    assert other['A']['B'] == 1.0
+
+
+def test_update_price_history_does_not_mutate_loaded_history(tmp_path):
+    """Testet dass _update_price_history die gemeinsame In-Memory-Historie nicht verändert"""
+    analyzer = RiskAnalyzer(history_path=str(tmp_path / 'history.json'))
+    analyzer._update_price_history('BTC', 100.0)
+    before = analyzer._load_history()
+    version = analyzer.history_version
+
+    analyzer._update_price_history('BTC', 101.0)
+
+    assert len(before['price_history']['BTC']) == 1
+    assert len(analyzer._load_history()['price_history']['BTC']) == 2
+    assert analyzer.history_version > version
+
+
+def test_var_simulation_is_seeded_cached_and_not_run_by_analyze_risks(tmp_path):
+    """Testet dass die VaR-Simulation reproduzierbar ist und analyze_risks nur die Kurzfassung liefert"""
+    analyzer = RiskAnalyzer(history_path=str(tmp_path / 'history.json'))
+    analyzer.portfolio_risk_engine.n_paths = 2000
+    rng = np.random.default_rng(5)
+    t0 = time.time() - 60 * 86400
+    history = {
+        coin: [{'price': p, 'timestamp': t0 + i * 86400}
+               for i, p in enumerate(start * np.exp(np.cumsum(rng.normal(0, 0.02, 60))))]
+        for coin, start in (('BTC', 50000.0), ('ETH', 3000.0))
+    }
+    analyzer._save_history({'price_history': history})
+    portfolio = {'BTC': 0.1, 'ETH': 1.0}
+    prices = {'BTC': history['BTC'][-1]['price'], 'ETH': history['ETH'][-1]['price']}
+
+    risks = analyzer.analyze_risks(portfolio, prices, {})
+    assert risks['portfolio_var_simulation'] is None  # noch kein Simulations-Lauf
+
+    first = analyzer.calculate_portfolio_var_simulation(portfolio, prices)
+    assert analyzer.calculate_portfolio_var_simulation(portfolio, prices) is first
+    analyzer._var_simulation = None
+    again = analyzer.calculate_portfolio_var_simulation(portfolio, prices)
+    assert again == first  # geseedet → identisch
+
+    summary = analyzer.var_simulation_summary()
+    assert set(summary) == {'monte_carlo', 'filtered_historical'}
+    assert summary['monte_carlo']['0.95']['var_percent'] == round(first['monte_carlo']['levels']['0.95']['var_percent'], 1)
+    assert analyzer.analyze_risks(portfolio, prices, {})['portfolio_var_simulation'] == summary
+
+
+def test_concurrent_analyze_risks_keeps_every_history_update(tmp_path):
+    """Testet dass parallele analyze_risks-Aufrufe (Worker-Threads) keine Historien-Updates verlieren"""
+    import threading
+
+    analyzer = RiskAnalyzer(history_path=str(tmp_path / 'history.json'))
+    portfolio = {'BTC': 0.1, 'ETH': 1.0}
+    prices = {'BTC': 50000.0, 'ETH': 3000.0}
+
+    def work():
+        for _ in range(5):
+            analyzer.analyze_risks(portfolio, prices, {})
+            analyzer.current_correlation_matrix(portfolio)
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    history = analyzer._load_history()['price_history']
+    assert len(history['BTC']) == len(history['ETH']) == 30
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import numpy as np
+from src.risk_state import EwmaRiskState
+
+STEP = 86400
+
+
+def _feed(state, n=60, seed=7):
+    """Füttert den Zustand mit korrelierten Random-Walk-Preisen (ein Vektor pro Schritt)"""
+    rng = np.random.default_rng(seed)
+    btc, eth, xrp = 50000.0, 3000.0, 0.5
+    for i in range(n):
+        common = rng.normal(0, 0.02)
+        btc *= np.exp(common + rng.normal(0, 0.005))
+        eth *= np.exp(common + rng.normal(0, 0.005))
+        xrp *= np.exp(rng.normal(0, 0.02))
+        state.update({'BTC': btc, 'ETH': eth, 'XRP': xrp}, timestamp=i * STEP)
+
+
+def test_ewma_correlation_and_var():
+    """Testet EWMA-Korrelation, Volatilität und parametrischen VaR"""
+    state = EwmaRiskState(min_observations=10)
+    assert state.correlation_matrix() == {}
+
+    _feed(state)
+    corr = state.correlation_matrix()
+
+    assert corr['BTC']['BTC'] == 1.0
+    assert corr['BTC']['ETH'] > 0.8
+    assert abs(corr['BTC']['XRP']) < corr['BTC']['ETH']
+    assert corr['ETH']['BTC'] == corr['BTC']['ETH']
+
+    vols = state.volatilities()
+    assert set(vols) == {'BTC', 'ETH', 'XRP'}
+    assert all(v > 0 for v in vols.values())
+
+    var_95 = state.portfolio_var({'BTC': 0.5, 'ETH': 0.5}, confidence=0.95)
+    var_99 = state.portfolio_var({'BTC': 0.5, 'ETH': 0.5}, confidence=0.99)
+    assert 0 < var_95 < var_99
+
+
+def test_ewma_snapshot_roundtrip():
+    """Testet das Speichern und Laden des Snapshots"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history_risk_state.json')
+        state = EwmaRiskState(state_path=path, min_observations=10)
+        _feed(state)
+        state.save()
+
+        restored = EwmaRiskState(state_path=path, min_observations=10)
+        assert restored.coins == state.coins
+        assert restored.correlation_matrix() == state.correlation_matrix()
+
+        # Neue Coins werden nachträglich aufgenommen
+        restored.update({'SOL': 100.0, 'BTC': 51000.0}, timestamp=60 * STEP)
+        assert 'SOL' in restored.coins
+        assert 'SOL' not in restored.warm_coins()
+
+
+def test_updates_follow_fixed_step():
+    """Updates innerhalb eines Schritts werden ignoriert, Lücken auf einen Schritt skaliert"""
+    state = EwmaRiskState(min_observations=1, step_seconds=STEP)
+    assert state.update({'BTC': 100.0}, timestamp=0)
+    assert not state.update({'BTC': 150.0}, timestamp=STEP / 2)  # z.B. Weekly Summary im selben Schritt
+    assert state.observations.tolist() == [0]
+
+    assert state.update({'BTC': 110.0}, timestamp=STEP)
+    one_step = state.cov[0, 0]
+
+    other = EwmaRiskState(min_observations=1, step_seconds=STEP)
+    other.update({'BTC': 100.0}, timestamp=0)
+    # Gleicher Return über 4 Schritte zählt wie der halbe Return über einen Schritt
+    other.update({'BTC': 110.0}, timestamp=4 * STEP)
+    assert np.isclose(other.cov[0, 0], one_step / 4)
@@ -0,0 +1,83 @@
+import numpy as np
+from src.scenario_engine import ScenarioEngine, shock_grid
+from src.input_validator import validate_what_if_grid_args
+
+
+def test_grid_matches_scalar_revaluation():
+    """Testet das Schock-Raster gegen eine Einzelbewertung je Szenario"""
+    portfolio = {'BTC': 0.1, 'ETH': 2.0, 'XRP': 1000.0, 'DOGE': 5.0}
+    prices = {'BTC': 50000.0, 'ETH': 3000.0, 'XRP': 0.5, 'DOGE': None}
+    engine = ScenarioEngine(portfolio, prices)
+    assert engine.coins == ['BTC', 'ETH', 'XRP']
+    assert engine.base_total == 11500.0
+
+    shocks = shock_grid(50, 1)
+    assert len(shocks) == 101 and shocks[0] == -0.5 and shocks[-1] == 0.5
+
+    result = engine.grid(shocks)
+    assert result['n_scenarios'] == 101 * (1 + 3)
+    assert 'amount' not in result
+
+    # Marktweiter Schock skaliert den Gesamtwert linear
+    assert np.allclose(result['market']['value'], 11500.0 * (1 + shocks))
+    # Nur ETH-Preis −20%: 6000 → 4800
+    i = int(np.argmin(np.abs(shocks + 0.2)))
+    assert np.isclose(result['price']['pnl'][1, i], -1200.0)
+
+    single = engine.single_change('BTC', amount_change=-0.2)
+    assert np.isclose(single['value'], 10500.0)
+    assert np.isclose(single['max_weight'], 6000 / 10500 * 100)
+
+
+def test_var_and_summary_table():
+    """Testet parametrischen VaR aus der Kovarianz und die Text-Tabelle"""
+    engine = ScenarioEngine(
+        {'BTC': 1.0, 'ETH': 10.0}, {'BTC': 100.0, 'ETH': 10.0},
+        cov_coins=['ETH', 'SOL', 'BTC'], cov=np.diag([0.0004, 0.0009, 0.0001]),
+    )
+    # Kovarianz wird auf die Engine-Reihenfolge abgebildet, SOL fällt weg
+    assert np.allclose(engine.cov, np.diag([0.0001, 0.0004]))
+
+    result = engine.grid(shock_grid(10, 5))
+    var = result['market']['var']
+    assert np.all(var > 0)
+    # Marktweiter Schock ändert die Gewichte nicht → VaR skaliert mit dem Wert
+    assert np.allclose(var / result['market']['value'], var[0] / result['market']['value'][0])
+
+    table = engine.summary_table(result)
+    assert 'VaR95' in table
+    assert '-10%' in table and '+10%' in table
+    assert table.splitlines()[-2].startswith('BTC')
+
+
+def test_validate_what_if_grid_args():
+    """Testet Defaults und Grenzen der Raster-Validierung"""
+    valid, request, _ = validate_what_if_grid_args([])
+    assert valid and request.range_percent == 50 and request.step_percent == 1
+
+    valid, request, _ = validate_what_if_grid_args(['30', '2,5'])
+    assert valid and request.step_percent == 2.5
+
+    assert not validate_what_if_grid_args(['95'])[0]
+    assert not validate_what_if_grid_args(['10', '20'])[0]
+    assert not validate_what_if_grid_args(['abc'])[0]
+
+
+def test_single_coin_blocks_match_dense_evaluation():
+    """Testet die O(k·m)-Einzel-Coin-Blöcke gegen die dichte Szenario-Matrix"""
+    rng = np.random.default_rng(3)
+    coins = ['A', 'B', 'C', 'D']
+    amounts = dict(zip(coins, rng.uniform(1, 10, 4)))
+    prices = dict(zip(coins, rng.uniform(10, 100, 4)))
+    a = rng.normal(0, 0.02, (30, 4))
+    engine = ScenarioEngine(amounts, prices, cov_coins=coins, cov=a.T @ a / 30)
+
+    shocks = shock_grid(80, 5)
+    k, m = len(coins), len(shocks)
+    result = engine.grid(shocks)
+
+    dense = np.zeros((k * m, k))
+    dense[np.arange(k * m), np.repeat(np.arange(k), m)] = np.tile(shocks, k)
+    expected = engine.evaluate(dense)
+    for key in ('value', 'pnl', 'pnl_percent', 'max_weight', 'var'):
+        assert np.allclose(result['price'][key], expected[key].reshape(k, m)), key
@@ -0,0 +1,116 @@
+"""Tests für den regelbasierten Vorfilter (SignalGate)."""
+import json
+import os
+
+from src.signal_gate import SignalGate, coin_triggers, risk_triggers
+
+DAY = 86400
+
+
+def _quiet(**overrides):
+    ind = {'rsi_14': 52.0, 'macd_crossover': None, 'bb_position': 'neutral',
+           'rsi_divergence': {'bullish': False, 'bearish': False}, 'macd_histogram': 0.1}
+    ind.update(overrides)
+    return ind
+
+
+def _risk(drawdown=5.0, weights=None):
+    return {'current_drawdown_percent': {'BTC': drawdown, 'ETH': 2.0},
+            'portfolio_weights': weights or {'BTC': 45.0, 'ETH': 35.0, 'SOL': 20.0}}
+
+
+def test_triggers_per_rule():
+    """Jede Regel liefert genau dann einen Trigger, wenn der Schwellenwert gerissen wird."""
+    assert coin_triggers('BTC', _quiet()) == []
+    assert coin_triggers('BTC', None) == []
+    assert coin_triggers('BTC', _quiet(rsi_14=25.0)) == ['BTC: RSI 25 < 30']
+    assert coin_triggers('BTC', _quiet(macd_crossover='bearish')) == ['BTC: MACD-Crossover bearish']
+    assert coin_triggers('BTC', _quiet(bb_position='oversold')) == ['BTC: Bollinger-Ausbruch oversold']
+    assert coin_triggers('BTC', _quiet(rsi_divergence={'bullish': True})) == ['BTC: RSI-Divergenz bullish']
+
+    assert risk_triggers(_risk()) == []
+    assert risk_triggers(_risk(drawdown=20.0)) == ['BTC: Drawdown 20.0% > 15%']
+    assert risk_triggers(_risk(weights={'BTC': 60.0})) == ['BTC: Gewicht 60.0% > 50%']
+
+
+def test_skip_without_signals_and_log(tmp_path):
+    """Ruhiger Markt → keine Analyse; jede Entscheidung landet im JSONL-Log."""
+    log_path = str(tmp_path / 'gate.jsonl')
+    gate = SignalGate(log_path=log_path, enabled=True, max_skip_days=7)
+    indicators = {'BTC': _quiet(), 'ETH': _quiet()}
+
+    # Ohne frühere Analyse wird immer analysiert
+    assert gate.evaluate(indicators, _risk(), now=0).analyze
+    gate.mark_analyzed(now=0)
+    quiet = gate.evaluate(indicators, _risk(), now=DAY)
+    assert not quiet.analyze and quiet.triggers == []
+    assert gate.evaluate({'BTC': _quiet(rsi_14=75.0)}, _risk(), now=2 * DAY).analyze
+    gate.mark_analyzed(now=2 * DAY)
+
+    with open(log_path) as f:
+        entries = [json.loads(line) for line in f]
+    assert [e['analyze'] for e in entries] == [True, False, True]
+    assert entries[1]['features']['BTC']['weight_pct'] == 45.0
+
+    # Letzte Analyse kommt aus der State-Datei; nach max_skip_days wird erzwungen
+    restarted = SignalGate(log_path=log_path, enabled=True, max_skip_days=7)
+    assert restarted.last_analysis == 2 * DAY
+    assert not restarted.evaluate(indicators, _risk(), now=8 * DAY).analyze
+    assert restarted.evaluate(indicators, _risk(), now=9 * DAY).analyze
+
+
+def test_persistent_conditions_fire_on_transition_only(tmp_path):
+    """Ein dauerhaft konzentriertes Portfolio löst nicht jeden Zyklus aus, erst nach Verschwinden wieder."""
+    log_path = str(tmp_path / 'gate.jsonl')
+    gate = SignalGate(log_path=log_path, enabled=True, max_skip_days=7)
+    indicators = {'BTC': _quiet(), 'ETH': _quiet()}
+    concentrated = _risk(weights={'BTC': 60.0})
+
+    gate.mark_analyzed(now=0)
+    first = gate.evaluate(indicators, concentrated, now=DAY)
+    assert first.triggers == ['BTC: Gewicht 60.0% > 50%']
+    # Analyse gescheitert → Bedingung bleibt neu
+    assert gate.evaluate(indicators, _risk(weights={'BTC': 61.0}), now=2 * DAY).analyze
+    gate.mark_analyzed(now=2 * DAY)
+
+    # Bekannte Bedingung (auch mit anderem Wert und nach Neustart) löst nicht erneut aus
+    restarted = SignalGate(log_path=log_path, enabled=True, max_skip_days=7)
+    persisting = restarted.evaluate(indicators, _risk(weights={'BTC': 62.0}), now=3 * DAY)
+    assert not persisting.analyze and persisting.triggers == []
+    # Ein neues Signal daneben zählt weiterhin
+    assert restarted.evaluate({'BTC': _quiet(rsi_14=25.0)}, concentrated, now=4 * DAY).triggers == ['BTC: RSI 25 < 30']
+
+    # Unter die Schwelle und zurück → wieder ein Übergang
+    assert not restarted.evaluate(indicators, _risk(), now=5 * DAY).analyze
+    assert restarted.evaluate(indicators, concentrated, now=6 * DAY).analyze
+
+    with open(log_path) as f:
+        entries = [json.loads(line) for line in f]
+    assert entries[2]['persisting'] == ['BTC: Gewicht 62.0% > 50%']
+
+
+def test_failed_analysis_keeps_forcing_and_log_rotates(tmp_path):
+    """Ohne mark_analyzed bleibt die erzwungene Analyse fällig; das Log wird rotiert."""
+    log_path = str(tmp_path / 'gate.jsonl')
+    gate = SignalGate(log_path=log_path, enabled=True, max_skip_days=7, log_max_bytes=600)
+    indicators = {'BTC': _quiet(), 'ETH': _quiet()}
+
+    # LLM-Lauf schlägt fehl → kein mark_analyzed → nächster Zyklus analysiert erneut
+    assert gate.evaluate(indicators, _risk(), now=0).analyze
+    assert gate.evaluate(indicators, _risk(), now=DAY).analyze
+    assert gate.last_analysis is None
+
+    for day in range(2, 10):
+        gate.evaluate(indicators, _risk(), now=day * DAY)
+    assert os.path.exists(log_path + '.1')
+    with open(log_path) as f:
+        lines = f.readlines()
+    # Aktuelles Log: höchstens Schwelle + eine Zeile, neueste Entscheidung am Ende
+    assert os.path.getsize(log_path) < 600 + len(lines[-1])
+    assert json.loads(lines[-1])['timestamp'] == 9 * DAY
+
+
+def test_disabled_gate_always_analyzes():
+    gate = SignalGate(log_path=None, enabled=False)
+    gate.last_analysis = 0
+    assert gate.evaluate({'BTC': _quiet()}, _risk(), now=DAY).analyze
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import numpy as np
+from src.timeseries_store import TimeSeriesStore, HOUR, DAY
+from src.portfolio_tracker import PortfolioTracker
+
+
+def test_downsampling_tiers():
+    """Testet Verdichtung raw → stündlich → täglich (letzter Wert je Bucket)"""
+    store = TimeSeriesStore(['value'], raw_retention=DAY, hourly_retention=30 * DAY)
+    t0 = 1_700_000_000 - 1_700_000_000 % DAY
+    # 40 Tage, alle 30 Minuten ein Snapshot mit Wert = Index
+    n = 40 * 48
+    for i in range(n):
+        store.append({'value': float(i)}, timestamp=t0 + i * 1800)
+    now = t0 + (n - 1) * 1800
+
+    assert len(store._ts['raw']) == 49  # 24h inklusive Grenze
+    assert np.all(np.diff(store._ts['hourly']) == HOUR)
+    assert np.all(np.diff(store._ts['daily']) == DAY)
+    assert store._ts['daily'][-1] < store._ts['hourly'][0] < store._ts['raw'][0]
+
+    ts, values = store.series('value')
+    assert np.all(np.diff(ts) > 0)
+    assert values[-1] == n - 1
+    # Tageswert = letzter Snapshot des Tages
+    assert values[0] == 47
+
+    ts, values = store.series('value', start=now - 2 * HOUR)
+    assert len(ts) == 5 and values[0] == n - 5
+
+
+def test_persistence_and_tracker_equity_curve():
+    """Testet .npz-Persistenz und die Equity-Kurven-Kennzahlen des Trackers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ts.npz')
+        tracker = PortfolioTracker(baseline_path=os.path.join(tmp, 'b.json'), timeseries_path=path)
+        assert tracker.equity_curve_summary(now=1000) is None
+
+        now = 1_700_000_000
+        for i, value in enumerate([1000, 1200, 900, 1100]):
+            tracker.record_snapshot(
+                {'portfolio_value_eur': value, 'baseline_value_eur': 1000, 'total_pnl_eur': value - 1000},
+                timestamp=now - (3 - i) * DAY,
+            )
+        # Snapshots bleiben im Speicher bis zum gebündelten flush
+        assert not os.path.exists(path)
+        tracker.flush_snapshots()
+        assert os.path.exists(path) and not tracker.timeseries.dirty
+
+        reloaded = PortfolioTracker(baseline_path=os.path.join(tmp, 'b.json'), timeseries_path=path)
+        ts, values = reloaded.equity_curve()
+        assert len(values) == 4
+
+        summary = reloaded.equity_curve_summary(days=7, now=now)
+        assert summary['start_value_eur'] == 1000
+        assert summary['end_value_eur'] == 1100
+        assert summary['high_eur'] == 1200
+        assert summary['max_drawdown_percent'] == -25.0
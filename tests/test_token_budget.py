@@ -0,0 +1,64 @@
+from src.token_budget import TokenBudgeter, count_tokens
+from src.prompt_encoder import PromptEncoder
+
+
+def _market(n):
+    return {f"C{i}": {'symbol': f"C{i}/EUR", 'price': 1.5 + i, 'rsi_14': 40 + i, 'trend': 'bullish'} for i in range(n)}
+
+
+def _setup(max_tokens):
+    encoder = PromptEncoder()
+    fields = {
+        'portfolio': {'BTC': 0.1, 'ETH': 2.0},
+        'risk_metrics': {'max_drawdown': -5.0},
+        'portfolio_indicators': {'BTC': {'price': 50000, 'rsi_14': 50}, 'ETH': {'price': 3000, 'rsi_14': 60}},
+        'market_overview': _market(30),
+    }
+    encoded = encoder.encode_payload(fields)
+
+    def render(data):
+        return "\n".join(f"<{k}>\n{v}\n</{k}>" for k, v in data.items())
+
+    budgeter = TokenBudgeter(max_tokens=max_tokens,
+                             priority=['risk_metrics', 'portfolio_indicators', 'market_overview'])
+    return budgeter, fields, encoded, render, encoder
+
+
+def test_count_tokens_is_positive_and_monotonic():
+    """Token-Zählung wächst mit dem Text"""
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("BTC,50000,55.1") < count_tokens("BTC,50000,55.1\nETH,3000,44.2")
+
+
+def test_prompt_within_budget_is_unchanged():
+    """Passt der Prompt ins Budget, wird nichts gekürzt"""
+    budgeter, fields, encoded, render, encoder = _setup(100000)
+    assert budgeter.fit(fields, encoded, render, encoder.encode) == render(encoded)
+    assert budgeter.trimmed_rows == 0
+
+
+def test_low_priority_rows_trimmed_first():
+    """Markt-Übersicht wird von hinten gekürzt, Portfolio bleibt vollständig"""
+    budgeter, fields, encoded, render, encoder = _setup(10**6)
+    full = count_tokens(render(encoded))
+    budgeter.max_tokens = full - 100
+
+    prompt = budgeter.fit(fields, encoded, render, encoder.encode)
+    assert count_tokens(prompt) <= budgeter.max_tokens
+    assert 'C0/EUR' in prompt and 'C29/EUR' not in prompt
+    assert encoded['portfolio'] in prompt
+    assert encoded['portfolio_indicators'] in prompt
+    assert 0 < budgeter.trimmed_rows < 30
+
+
+def test_weights_decide_trim_order():
+    """Mit Gewichten wird die kleinste Position zuerst entfernt"""
+    budgeter, fields, encoded, render, encoder = _setup(10**6)
+    fields['market_overview'] = {}
+    encoded = encoder.encode_payload(fields)
+    budgeter.max_tokens = count_tokens(render(encoded)) - 3
+
+    prompt = budgeter.fit(fields, encoded, render, encoder.encode,
+                          weights={'portfolio_indicators': {'BTC': 5000.0, 'ETH': 6000.0}})
+    assert 'ETH' in prompt.split('<portfolio_indicators>')[1]
+    assert 'BTC,50000' not in prompt